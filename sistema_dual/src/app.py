@@ -6,11 +6,24 @@ import streamlit as st
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.views.auth import render_login
-from src.views.dashboard import render_dashboard
-from src.views.registro import render_registro
 from src.utils.ui import inject_custom_css, render_header
+from src.utils.query_metrics import start_rerun, finish_rerun
+
+@st.cache_resource(show_spinner=False)
+def warm_email_templates():
+    # Compila las plantillas de correo una sola vez por proceso del servidor
+    from src.utils.notifications import prewarm_email_templates
+    return prewarm_email_templates()
 
 def main():
+    # Consultas de este rerun (ver src/utils/query_metrics.py); el dashboard le pone el nombre de la vista
+    collector = start_rerun(st.session_state.get("role") or "login")
+    try:
+        _render_app()
+    finally:
+        finish_rerun(collector)
+
+def _render_app():
     # MUST BE THE FIRST STREAMLIT COMMAND
     st.set_page_config(
         page_title="Sistema de Gestión DUAL",
@@ -69,6 +82,9 @@ def main():
         role = st.session_state.get("role")
         
         if role == "coordinator":
+            # Dashboard (and the email/document stack) only after login
+            warm_email_templates()
+            from src.views.dashboard import render_dashboard
             render_dashboard()
         elif role == "student":
             st.title("Portal del Alumno DUAL")
@@ -81,6 +97,7 @@ def main():
             except ImportError:
                 pass
         elif role == "student_register":
+            from src.views.registro import render_registro
             render_registro()
         else:
             st.error("Rol desconocido. Contacte al administrador.")
@@ -0,0 +1,72 @@
+import os
+import streamlit as st
+from datetime import datetime
+from src.utils.cohort_export import export_cohort_zip, COHORT_DOCUMENTS
+
+def _discard_export(state_key):
+    previous = st.session_state.pop(state_key, None)
+    if previous and os.path.exists(previous["path"]):
+        os.remove(previous["path"])
+
+def _zip_reader(path):
+    """Lee el ZIP solo cuando el usuario hace clic en Descargar (data diferida)."""
+    def read():
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+def render_cohort_export_panel(key="cohort_export"):
+    """
+    Descarga en un solo ZIP de los documentos de todos los alumnos del periodo activo
+    (Anexos 5.1, 5.4, 5.5, Carta Mentor IE y Acta), organizados por carrera/matrícula.
+    El ZIP se escribe en disco documento por documento y se ofrece al terminar.
+    Los reruns no lo leen: el botón recibe una función y Streamlit carga el archivo
+    (completo, en su almacén de medios) solo al hacer clic en Descargar.
+    """
+    state_key = f"{key}_result"
+    with st.expander("📦 Exportar expedientes de la cohorte (ZIP)", expanded=False):
+        st.caption("Incluye: " + ", ".join(name.replace("_", " ") for name, _, _ in COHORT_DOCUMENTS)
+                   + ". Carpetas por carrera y matrícula; los documentos sin requisitos se omiten.")
+
+        if st.button("Generar ZIP de la cohorte", key=f"{key}_generate", type="primary", use_container_width=True):
+            _discard_export(state_key)
+            status = st.empty()
+            def _on_progress(written, result):
+                status.caption(f"Documentos escritos: {written} · último: {result['key']}")
+
+            with st.spinner("Generando documentos y comprimiendo..."):
+                ok, result = export_cohort_zip(progress_callback=_on_progress)
+            status.empty()
+            if ok:
+                st.session_state[state_key] = result
+            else:
+                st.error(result)
+
+        result = st.session_state.get(state_key)
+        if not result:
+            return
+        if not os.path.exists(result["path"]):
+            st.session_state.pop(state_key, None)
+            return
+
+        size_mb = os.path.getsize(result["path"]) / (1024 * 1024)
+        st.success(f"ZIP listo: {result['written']} documentos de {result['students']} alumnos ({size_mb:.1f} MB).")
+        if result["skipped"]:
+            st.caption(f"{len(result['skipped'])} documentos omitidos por requisitos o datos incompletos.")
+        if result["errors"]:
+            st.warning(f"{len(result['errors'])} documentos fallaron (ver ERRORES.txt dentro del ZIP).")
+
+        c_dl, c_discard = st.columns([3, 1])
+        c_dl.download_button(
+            label="⬇️ Descargar ZIP",
+            data=_zip_reader(result["path"]),
+            file_name=f"Expedientes_DUAL_{datetime.now().strftime('%Y%m%d')}.zip",
+            mime="application/zip",
+            type="primary",
+            use_container_width=True,
+            on_click="ignore",
+            key=f"{key}_download",
+        )
+        if c_discard.button("Descartar", key=f"{key}_discard", use_container_width=True):
+            _discard_export(state_key)
+            st.rerun()
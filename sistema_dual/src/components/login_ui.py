@@ -1,6 +1,6 @@
 
-import os
 import base64
+from src.utils.assets import logo_src
 
 def load_image_as_base64(path):
     try:
@@ -77,18 +77,9 @@ def get_login_css():
     """
 
 def get_login_header():
-    # Paths
-    # Paths - Robust fix using __file__
-    # Current file is in src/components, logos are in src/assets/images/logos
-    # We go up one level (to src) then into assets/images/logos
-    base_path = os.path.join(os.path.dirname(__file__), "../assets/images/logos")
-
-    if not os.path.exists(base_path):
-        # Fallback to CWD relative if seemingly not found (though abspath is best)
-        base_path = "src/assets/images/logos"
-    
-    logo_tese = load_image_as_base64(os.path.join(base_path, "logo_institucional_tese.png"))
-    logo_edomex = load_image_as_base64(os.path.join(base_path, "logo_estado_mexico.png"))
+    # Logos reducidos y cacheados (URL de static serving o data URI), ver src/utils/assets.py
+    logo_tese = logo_src("tese")
+    logo_edomex = logo_src("edomex")
     
     img_tese = f'<img src="{logo_tese}" class="logo-img-login">' if logo_tese else ''
     img_edomex = f'<img src="{logo_edomex}" class="logo-img-login">' if logo_edomex else ''
@@ -0,0 +1,54 @@
+import streamlit as st
+from datetime import datetime
+from src.utils.mail_queue import queue_stats, list_messages, retry_failed
+
+STATUS_LABELS = {
+    "pending": "⏳ Pendiente",
+    "sending": "📤 Enviando",
+    "sent": "✅ Enviado",
+    "failed": "❌ Fallido",
+}
+
+def _fmt_ts(ts):
+    return datetime.fromtimestamp(ts).strftime("%d/%m/%Y %H:%M:%S") if ts else ""
+
+@st.fragment(run_every=5)
+def render_outbox_panel(key="outbox", limit=25):
+    """
+    Estado en vivo de la bandeja de salida: profundidad de la cola y estado por mensaje.
+    Se refresca sola cada 5 segundos sin recargar el resto de la vista.
+    """
+    try:
+        stats = queue_stats()
+    except Exception as e:
+        st.warning(f"No se pudo leer la cola de correos: {e}")
+        return
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("En cola", stats["pending"])
+    c2.metric("Enviando", stats["sending"])
+    c3.metric("Enviados", stats["sent"])
+    c4.metric("Fallidos", stats["failed"])
+    if stats["oldest_pending_seconds"] > 300:
+        st.caption(f"⚠️ El mensaje más antiguo lleva {stats['oldest_pending_seconds'] // 60} min en cola. Verifica que el worker de correo esté activo.")
+
+    with st.expander("Detalle de la bandeja de salida", expanded=False):
+        rows = list_messages(limit=limit)
+        if not rows:
+            st.info("No hay correos en la bandeja de salida.")
+            return
+        st.dataframe([{
+            "#": r["id"],
+            "Destinatario": r["recipient"],
+            "Asunto": r["subject"],
+            "Estado": STATUS_LABELS.get(r["status"], r["status"]),
+            "Intentos": r["attempts"],
+            "Encolado": _fmt_ts(r["created_at"]),
+            "Enviado": _fmt_ts(r["sent_at"]),
+            "Próximo intento": _fmt_ts(r["next_attempt_at"]) if r["status"] == "pending" else "",
+            "Último error": r["last_error"] or "",
+        } for r in rows], use_container_width=True, hide_index=True)
+
+        if stats["failed"] and st.button("🔁 Reintentar fallidos", key=f"{key}_retry_failed"):
+            n = retry_failed()
+            st.success(f"{n} correos reprogramados.")
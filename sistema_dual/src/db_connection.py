@@ -1,16 +1,29 @@
 import os
 import streamlit as st
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
+from src.utils.query_metrics import QUERY_METRICS, instrument_client, register_pool_stats
 
 # Load environment variables
 load_dotenv()
 
+# "supabase" (default) or "fake": in-memory PostgREST stand-in for offline tests and benchmarks
+SUPABASE_BACKEND = os.getenv("SUPABASE_BACKEND", "supabase").lower()
+
 @st.cache_resource
 def get_supabase_client() -> Client:
     """
     Returns a cached Supabase client instance.
+    With QUERY_METRICS=1 the client is instrumented (see src/utils/query_metrics.py).
+    With SUPABASE_BACKEND=fake no network is used (see src/utils/fake_backend.py).
+    PostgREST, storage, auth and functions share one pooled httpx client
+    (HTTP/2, keep-alive and timeouts from src/utils/http_pool.py).
     """
+    if SUPABASE_BACKEND == "fake":
+        from src.utils.fake_backend import get_fake_client
+        client = get_fake_client()
+        return instrument_client(client) if QUERY_METRICS else client
+
     url: str = os.environ.get("SUPABASE_URL")
     key: str = os.environ.get("SUPABASE_KEY")
 
@@ -18,4 +31,9 @@ def get_supabase_client() -> Client:
         st.error("Supabase credentials not found in environment variables.")
         st.stop()
 
-    return create_client(url, key)
+    from src.utils.http_pool import build_http_client, pool_stats
+    http_client = build_http_client()
+    register_pool_stats("supabase", lambda: pool_stats(http_client))
+
+    client = create_client(url, key, options=ClientOptions(httpx_client=http_client))
+    return instrument_client(client) if QUERY_METRICS else client
@@ -1,6 +1,46 @@
 from src.db_connection import get_supabase_client
 from datetime import datetime
 
+# Tamaño máximo de lista por filtro in_ (evita URLs demasiado largas en PostgREST)
+IN_FILTER_CHUNK = 150
+
+def _fetch_in(build_query, column, values, chunk_size=IN_FILTER_CHUNK):
+    """
+    Ejecuta build_query().in_(column, ...) por bloques y concatena las filas.
+    build_query debe regresar un query builder nuevo en cada llamada.
+    """
+    rows = []
+    values = list(values)
+    for i in range(0, len(values), chunk_size):
+        res = build_query().in_(column, values[i:i + chunk_size]).execute()
+        rows.extend(res.data or [])
+    return rows
+
+def _load_competencias_y_actividades(supabase, asignatura_ids):
+    """
+    Carga las competencias de varias asignaturas y sus actividades con
+    una consulta por tabla (filtros in_) en lugar de una por fila.
+    Regresa (competencias por asignatura_id, actividades por competencia_id),
+    conservando el orden de numero_competencia y el orden de la BD.
+    """
+    comps_by_asig = {}
+    acts_by_comp = {}
+    asignatura_ids = list(dict.fromkeys(asignatura_ids))
+    if not asignatura_ids:
+        return comps_by_asig, acts_by_comp
+
+    comps = _fetch_in(lambda: supabase.table("asignatura_competencias").select("*").order("numero_competencia"), "asignatura_id", asignatura_ids)
+    for comp in comps:
+        comps_by_asig.setdefault(comp["asignatura_id"], []).append(comp)
+
+    competencia_ids = [comp["id"] for comp in comps]
+    if competencia_ids:
+        acts = _fetch_in(lambda: supabase.table("actividades_aprendizaje").select("*"), "competencia_id", competencia_ids)
+        for act in acts:
+            acts_by_comp.setdefault(act["competencia_id"], []).append(act)
+
+    return comps_by_asig, acts_by_comp
+
 def get_anexo_5_1_data(student_id):
     """
     Recupera y formatea los datos necesarios para el Anexo 5.1
@@ -22,40 +62,69 @@ def get_anexo_5_1_data(student_id):
         return None, "El alumno no tiene un proyecto dual registrado."
     
     proyecto = res_proj.data[0]
-    ue = proyecto.get("unidades_economicas", {}) or {}
-    mentor_ue_data = proyecto.get("mentores_ue", {}) or {}
-    mentor_ie_data = proyecto.get("maestros", {}) or {}
     
     # 3. Recuperar Inscripciones (Asignaturas)
     res_insc = supabase.table("inscripciones_asignaturas").select("*, asignaturas(id, nombre, clave_asignatura)").eq("alumno_id", student_id).execute()
     inscripciones = res_insc.data
     
-    # 4. Construir Listas de Competencias y Actividades
+    # 4. Competencias y Actividades
+    # Todas las competencias y actividades se cargan en dos consultas (in_)
+    # y se agrupan en memoria, respetando el orden de inscripción.
+    asignatura_ids = [insc["asignaturas"]["id"] for insc in inscripciones]
+    comps_by_asig, acts_by_comp = _load_competencias_y_actividades(supabase, asignatura_ids)
+
+    return _build_anexo_5_1_context(alumno, proyecto, inscripciones, comps_by_asig, acts_by_comp), None
+
+def get_anexo_5_1_data_for_projects(projects, supabase=None):
+    """
+    Versión masiva de get_anexo_5_1_data para proyectos ya cargados con el alumno
+    (alumnos(*, carreras(nombre))), la empresa y los mentores embebidos, como los
+    de la exportación de la cohorte. No se vuelve a leer ni el alumno ni el
+    proyecto: el contexto usa el proyecto recibido (el del periodo exportado).
+    Inscripciones, competencias y actividades se cargan una vez para todos.
+    Genera tuplas (proyecto, context, error_msg) en el orden recibido.
+    """
+    supabase = supabase or get_supabase_client()
+    projects = list(projects)
+    student_ids = list(dict.fromkeys(p["alumno_id"] for p in projects if p.get("alumnos")))
+
+    insc_by_alumno = {}
+    inscripciones = []
+    if student_ids:
+        inscripciones = _fetch_in(lambda: supabase.table("inscripciones_asignaturas").select("*, asignaturas(id, nombre, clave_asignatura)"), "alumno_id", student_ids)
+    for insc in inscripciones:
+        insc_by_alumno.setdefault(insc["alumno_id"], []).append(insc)
+    comps_by_asig, acts_by_comp = _load_competencias_y_actividades(supabase, [insc["asignaturas"]["id"] for insc in inscripciones])
+
+    for proyecto in projects:
+        alumno = proyecto.get("alumnos")
+        if not alumno:
+            yield proyecto, None, "Alumno no encontrado"
+            continue
+        context = _build_anexo_5_1_context(alumno, proyecto, insc_by_alumno.get(proyecto["alumno_id"], []), comps_by_asig, acts_by_comp)
+        yield proyecto, context, None
+
+def _build_anexo_5_1_context(alumno, proyecto, inscripciones, comps_by_asig, acts_by_comp):
+    """Arma el contexto del Anexo 5.1 de un alumno a partir de datos ya cargados."""
+    ue = proyecto.get("unidades_economicas", {}) or {}
+    mentor_ue_data = proyecto.get("mentores_ue", {}) or {}
+    mentor_ie_data = proyecto.get("maestros", {}) or {}
+
     competencias_list = []
     actividades_list = []
     
     for insc in inscripciones:
         asig = insc["asignaturas"]
-        asig_id = asig["id"]
         asig_nombre = asig["nombre"]
         
-        # Obtener Competencias de esta Asignatura
-        res_comp = supabase.table("asignatura_competencias").select("*").eq("asignatura_id", asig_id).order("numero_competencia").execute()
-        comps = res_comp.data
-        
-        for comp in comps:
+        for comp in comps_by_asig.get(asig["id"], []):
             # Tabla 1: Competencia + Asignatura
             competencias_list.append({
                 "competencia": comp["descripcion_competencia"],
                 "asignatura": asig_nombre
             })
             
-            # Obtener Actividades de esta Competencia
-            # Usando la NUEVA tabla actividades_aprendizaje
-            res_act = supabase.table("actividades_aprendizaje").select("*").eq("competencia_id", comp["id"]).execute()
-            acts = res_act.data
-            
-            for act in acts:
+            for act in acts_by_comp.get(comp["id"], []):
                 # Tabla 2: Detalles de Actividad
                 # Formato de ponderación: Asegurar que se vea bonito (ej. "20%")
                 pond = float(act["ponderacion"]) if act["ponderacion"] else 0
@@ -68,7 +137,7 @@ def get_anexo_5_1_data(student_id):
                     "ponderacion": f"{pond:.1f}%"
                 })
 
-    # 5. Formatear Contexto Final
+    # Formatear Contexto Final
     # Algunos campos calculados o estáticos por ahora
     fecha_inicio = datetime.fromisoformat(proyecto["fecha_inicio_convenio"]).strftime("%B %Y") if proyecto.get("fecha_inicio_convenio") else "Inicio"
     fecha_fin = datetime.fromisoformat(proyecto["fecha_fin_convenio"]).strftime("%B %Y") if proyecto.get("fecha_fin_convenio") else "Fin"
@@ -76,7 +145,7 @@ def get_anexo_5_1_data(student_id):
     context = {
         "nombre_proyecto": proyecto.get("nombre_proyecto", ""),
         "unidad_economica": ue.get("nombre_comercial", ""),
-        "programa_educativo": alumno.get("carreras", {}).get("nombre", ""),
+        "programa_educativo": (alumno.get("carreras") or {}).get("nombre", ""),
         # Estos campos suelen ser inputs manuales o estáticos del periodo, 
         # por ahora los dejamos con placeholders o valores por defecto.
         "num_estudiantes": "1", 
@@ -85,10 +154,6 @@ def get_anexo_5_1_data(student_id):
         "periodos_vigencia": f"{fecha_inicio} - {fecha_fin}",
         "descripcion_proyecto": proyecto.get("descripcion_proyecto", ""),
         "horas_semanales": "40", # Valor estándar DUAL, podría ser campo en BD
-        # Nuevas etiquetas
-        "mentor_ue": mentor_ue_data.get("nombre_completo", "No Asignado"),
-        "mentor_ie": mentor_ie_data.get("nombre_completo", "No Asignado"),
-        
         # Nuevas etiquetas
         "mentor_ue": mentor_ue_data.get("nombre_completo", "No Asignado"),
         "mentor_ie": mentor_ie_data.get("nombre_completo", "No Asignado"),
@@ -99,49 +164,79 @@ def get_anexo_5_1_data(student_id):
         "actividades_list": actividades_list
     }
     
-    return context, None
+    return context
 
 def get_anexo_5_4_data(student_id):
     """
     Recupera y formatea los datos necesarios para el Anexo 5.4
     basado en el ID del alumno.
     """
+    for _, context, error in get_anexo_5_4_data_bulk([student_id]):
+        return context, error
+    return None, "Alumno no encontrado"
+
+def get_anexo_5_4_data_bulk(student_ids):
+    """
+    Versión masiva de get_anexo_5_4_data: carga cada tabla una sola vez con
+    filtros in_ y une los registros en memoria.
+    Genera tuplas (student_id, context, error_msg) en el orden recibido.
+    """
     supabase = get_supabase_client()
+    student_ids = list(dict.fromkeys(student_ids))
+    if not student_ids:
+        return
     
-    # 1. Recuperar Alumno y Carrera
-    res_alumno = supabase.table("alumnos").select("*, carreras(nombre)").eq("id", student_id).single().execute()
-    alumno = res_alumno.data
-    if not alumno: return None, "Alumno no encontrado"
+    # 1. Alumnos y Carrera
+    alumnos = _fetch_in(lambda: supabase.table("alumnos").select("*, carreras(nombre)"), "id", student_ids)
+    alumnos_by_id = {a["id"]: a for a in alumnos}
 
-    # 2. Recuperar Proyecto Dual
-    res_proj = supabase.table("proyectos_dual").select("*, unidades_economicas(*), mentores_ue(*), maestros(*), periodos(*)").eq("alumno_id", student_id).order("created_at", desc=True).limit(1).execute()
-    if not res_proj.data: return None, "El alumno no tiene un proyecto dual registrado."
-    
-    proyecto = res_proj.data[0]
+    # 2. Proyecto Dual más reciente por alumno (orden desc: el primero gana)
+    proyectos = _fetch_in(
+        lambda: supabase.table("proyectos_dual").select("*, unidades_economicas(*), mentores_ue(*), maestros(*), periodos(*)").order("created_at", desc=True),
+        "alumno_id", student_ids
+    )
+    proyecto_by_alumno = {}
+    for proj in proyectos:
+        proyecto_by_alumno.setdefault(proj["alumno_id"], proj)
+
+    # 3. Inscripciones, Competencias y Actividades
+    inscripciones = _fetch_in(lambda: supabase.table("inscripciones_asignaturas").select("*, asignaturas(id, nombre, clave_asignatura)"), "alumno_id", student_ids)
+    insc_by_alumno = {}
+    for insc in inscripciones:
+        insc_by_alumno.setdefault(insc["alumno_id"], []).append(insc)
+    comps_by_asig, acts_by_comp = _load_competencias_y_actividades(supabase, [insc["asignaturas"]["id"] for insc in inscripciones])
+
+    for student_id in student_ids:
+        alumno = alumnos_by_id.get(student_id)
+        if not alumno:
+            yield student_id, None, "Alumno no encontrado"
+            continue
+        proyecto = proyecto_by_alumno.get(student_id)
+        if not proyecto:
+            yield student_id, None, "El alumno no tiene un proyecto dual registrado."
+            continue
+        context = _build_anexo_5_4_context(alumno, proyecto, insc_by_alumno.get(student_id, []), comps_by_asig, acts_by_comp)
+        yield student_id, context, None
+
+def _build_anexo_5_4_context(alumno, proyecto, inscripciones, comps_by_asig, acts_by_comp):
+    """Arma el contexto del Anexo 5.4 de un alumno a partir de datos ya cargados."""
     ue = proyecto.get("unidades_economicas", {}) or {}
     mentor_ue = proyecto.get("mentores_ue", {}) or {}
     mentor_ie = proyecto.get("maestros", {}) or {}
     periodo = proyecto.get("periodos", {}) or {}
     
-    import os
-    from src.utils.pdf_generator_images import create_percentage_donut
-    import tempfile
+    from src.utils.pdf_generator_images import percentage_donut_png
     
-    # Generar gráfica temporal de logro
+    # Gráfica de logro (PNG en memoria, cacheado por porcentaje)
     final_grade = 0.0
     c_ue = proyecto.get('calificacion_ue')
     c_ie = proyecto.get('calificacion_ie')
     if c_ue is not None and c_ie is not None:
          final_grade = (float(c_ue) * 0.7) + (float(c_ie) * 0.3)
     
-    chart_path = os.path.join(tempfile.gettempdir(), f"chart_54_{student_id}.png")
     # Donut expects percentage 0-100
     percentage = min(100, max(0, int(final_grade * 10)))
-    create_percentage_donut(percentage, chart_path)
-    
-    # 3. Recuperar Inscripciones y Competencias
-    res_insc = supabase.table("inscripciones_asignaturas").select("*, asignaturas(id, nombre, clave_asignatura)").eq("alumno_id", student_id).execute()
-    inscripciones = res_insc.data
+    chart_png = percentage_donut_png(percentage)
     
     lista_competencias = []
     lista_actividades = [] # For evaluation table
@@ -153,16 +248,16 @@ def get_anexo_5_4_data(student_id):
         if not insc_descripcion:
             insc_descripcion = "Actividades generales de la materia en el proyecto DUAL"
             
-        # Obtener Competencias (Intentar mapa curricular)
-        res_comp = supabase.table("asignatura_competencias").select("*").eq("asignatura_id", asig["id"]).order("numero_competencia").execute()
+        # Competencias del mapa curricular (precargadas en bloque)
+        comps = comps_by_asig.get(asig["id"], [])
         
-        if res_comp.data:
-            for comp in res_comp.data:
-                # Obtener Actividades para marco/descripcion
-                res_act = supabase.table("actividades_aprendizaje").select("*").eq("competencia_id", comp["id"]).execute()
+        if comps:
+            for comp in comps:
+                # Actividades para marco/descripcion
+                acts_data = acts_by_comp.get(comp["id"], [])
                 
-                conocimientos = "\\n".join([f"- {a['descripcion_actividad']}" for a in res_act.data]) if res_act.data else f"- {insc_descripcion}"
-                desc_acts = "\\n".join([f"- Evidencia: {a['evidencia']} ({a['horas_dedicacion']}h)" for a in res_act.data]) if res_act.data else "- Evidencia: Reporte"
+                conocimientos = "\\n".join([f"- {a['descripcion_actividad']}" for a in acts_data]) if acts_data else f"- {insc_descripcion}"
+                desc_acts = "\\n".join([f"- Evidencia: {a['evidencia']} ({a['horas_dedicacion']}h)" for a in acts_data]) if acts_data else "- Evidencia: Reporte"
                 
                 lista_competencias.append({
                     "numero_consecutivo": consecutivo,
@@ -174,8 +269,8 @@ def get_anexo_5_4_data(student_id):
                 
                 # Formatear actividades para la tabla de evaluación
                 acts = []
-                if res_act.data:
-                    for a in res_act.data:
+                if acts_data:
+                    for a in acts_data:
                          acts.append({
                              "descripcion_actividad": a["descripcion_actividad"],
                              "evidencia": a["evidencia"],
@@ -239,9 +334,9 @@ def get_anexo_5_4_data(student_id):
         "mentor_ie": mentor_ie.get("nombre_completo", "No Asignado"),
         "telefono_mentorie": mentor_ie.get("telefono", "No Registrado"),
         "fecha_elaboracion": datetime.today().strftime('%d/%m/%Y'),
-        "grafica_promedio": f"IMAGE_PATH:{chart_path}" if os.path.exists(chart_path) else "",
+        "grafica_promedio": chart_png,
         "lista_competencias": lista_competencias,
         "evaluaciones": lista_actividades
     }
     
-    return context, None
+    return context
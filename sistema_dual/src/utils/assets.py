@@ -0,0 +1,108 @@
+"""
+Logos optimizados para el encabezado y el login.
+
+Los PNG originales (hasta 2 MB) se reducen una sola vez a la resolución en que
+se muestran y se guardan en la carpeta static/ junto al script principal, que
+Streamlit sirve en app/static/ (--server.enableStaticServing=true). El HTML
+solo lleva la URL; si el static serving no está activo se usa un data URI del
+PNG ya reducido, calculado una vez por proceso.
+
+Se puede generar en la imagen de Docker con: python -m src.utils.assets
+"""
+import io
+import os
+import sys
+import base64
+from functools import lru_cache
+
+LOGOS_SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets", "images", "logos")
+LOGO_FILES = {
+    "tese": "logo_institucional_tese.png",
+    "edomex": "logo_estado_mexico.png",
+    "dual": "logo_dual_sistema.png",
+}
+# Alto máximo en que se muestran los logos (65px) al doble para pantallas de alta densidad
+LOGO_DISPLAY_HEIGHT = int(os.getenv("LOGO_DISPLAY_HEIGHT", "130"))
+STATIC_SUBDIR = "logos"
+
+def get_static_dir():
+    """Carpeta static/ que sirve Streamlit: junto al script principal (src/app.py en Docker)."""
+    if os.getenv("STREAMLIT_STATIC_DIR"):
+        return os.getenv("STREAMLIT_STATIC_DIR")
+    main_file = getattr(sys.modules.get("__main__"), "__file__", None)
+    if main_file and os.path.basename(main_file) in ("app.py", "streamlit_app.py"):
+        return os.path.join(os.path.dirname(os.path.abspath(main_file)), "static")
+    return os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+
+def optimize_logo(source_path, height=None):
+    """PNG reducido (bytes) al alto indicado, conservando proporción y transparencia. Nunca amplía."""
+    from PIL import Image
+
+    height = height or LOGO_DISPLAY_HEIGHT
+    with Image.open(source_path) as img:
+        if img.height > height:
+            img = img.resize((max(1, round(img.width * height / img.height)), height), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+def build_logo_assets(static_dir=None, height=None):
+    """
+    Genera static/logos/*.png a partir de los originales (solo si el original es más nuevo).
+    Regresa {nombre: ruta generada}.
+    """
+    out_dir = os.path.join(static_dir or get_static_dir(), STATIC_SUBDIR)
+    os.makedirs(out_dir, exist_ok=True)
+    built = {}
+    for name, filename in LOGO_FILES.items():
+        source = os.path.join(LOGOS_SOURCE_DIR, filename)
+        if not os.path.exists(source):
+            continue
+        target = os.path.join(out_dir, filename)
+        if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source):
+            data = optimize_logo(source, height)
+            tmp = target + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        built[name] = target
+    return built
+
+@lru_cache(maxsize=None)
+def _logo_data_uri(name):
+    source = os.path.join(LOGOS_SOURCE_DIR, LOGO_FILES[name])
+    if not os.path.exists(source):
+        return ""
+    return "data:image/png;base64," + base64.b64encode(optimize_logo(source)).decode()
+
+@lru_cache(maxsize=None)
+def _logo_static_urls(static_dir):
+    try:
+        built = build_logo_assets(static_dir)
+    except OSError:
+        # Carpeta de solo lectura: se usará el data URI
+        return {}
+    return {name: f"app/static/{STATIC_SUBDIR}/{os.path.basename(path)}?v={int(os.path.getmtime(path))}"
+            for name, path in built.items()}
+
+def static_serving_enabled():
+    try:
+        import streamlit as st
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+def logo_src(name):
+    """
+    Valor para el atributo src de un logo: URL de static serving si está activo,
+    si no, data URI del PNG reducido. Cadena vacía si el logo no existe.
+    """
+    if static_serving_enabled():
+        url = _logo_static_urls(get_static_dir()).get(name)
+        if url:
+            return url
+    return _logo_data_uri(name)
+
+if __name__ == "__main__":
+    for logo_name, logo_path in build_logo_assets().items():
+        print(f"{logo_name}: {logo_path} ({os.path.getsize(logo_path)} bytes)")
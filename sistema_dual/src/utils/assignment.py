@@ -1,44 +1,124 @@
+import heapq
 from src.db_connection import get_supabase_client
-from src.utils.db_actions import get_active_period_id
+from src.utils.db_actions import get_active_period_id, fetch_all_rows, BULK_WRITE_CHUNK
 
-def assign_mentors_round_robin():
+def plan_least_loaded(project_ids, mentor_loads):
     """
-    Assigns Academic Mentors (es_mentor_ie=True) to students in the active period
-    who do not yet have a mentor assigned. Uses a Round Robin distribution.
+    Reparte proyectos llenando primero al mentor con menos carga (min-heap).
+    mentor_loads: dict {mentor_id: proyectos ya asignados}; en empate gana el
+    primero del dict, así el resultado es determinista.
+
+    Regresa dict {proyecto_id: mentor_id}.
+    """
+    heap = [(load, order, mentor_id) for order, (mentor_id, load) in enumerate(mentor_loads.items())]
+    heapq.heapify(heap)
+    assignments = {}
+    for project_id in project_ids:
+        load, order, mentor_id = heapq.heappop(heap)
+        assignments[project_id] = mentor_id
+        heapq.heappush(heap, (load + 1, order, mentor_id))
+    return assignments
+
+def load_assignment_state(supabase=None, period_id=None, pending_columns="id, alumno_id"):
+    """
+    Lee lo necesario para planear la asignación del periodo activo:
+    Mentores IE, carga actual por mentor y proyectos sin Mentor IE
+    (pending_columns permite traer datos del alumno embebidos).
+    Regresa (True, estado) o (False, mensaje).
     """
-    supabase = get_supabase_client()
-    period_id = get_active_period_id()
-    
+    supabase = supabase or get_supabase_client()
+    period_id = period_id or get_active_period_id()
     if not period_id:
         return False, "No active period found."
 
     # 1. Fetch available Mentors
-    res_mentors = supabase.table("maestros").select("id").eq("es_mentor_ie", True).execute()
-    mentors = [m["id"] for m in res_mentors.data]
-    
+    res_mentors = supabase.table("maestros").select("id, nombre_completo").eq("es_mentor_ie", True).execute()
+    mentors = {m["id"]: m.get("nombre_completo", "") for m in (res_mentors.data or [])}
     if not mentors:
         return False, "No Academic Mentors available for assignment."
 
-    # 2. Fetch Projects without Mentor IE in active period
-    # We query projects_dual where mentor_ie_id is null and period_id matches
-    res_projects = supabase.table("proyectos_dual").select("id, alumno_id").eq("periodo_id", period_id).is_("mentor_ie_id", "null").execute()
-    projects = res_projects.data
-    
-    if not projects:
+    # 2. Current load per mentor in the active period
+    assigned = fetch_all_rows(lambda: supabase.table("proyectos_dual").select("id, mentor_ie_id")
+                              .eq("periodo_id", period_id).not_.is_("mentor_ie_id", "null").order("id"))
+    loads = {mentor_id: 0 for mentor_id in mentors}
+    for row in assigned:
+        if row["mentor_ie_id"] in loads:
+            loads[row["mentor_ie_id"]] += 1
+
+    # 3. Projects without Mentor IE in active period
+    pending = fetch_all_rows(lambda: supabase.table("proyectos_dual").select(pending_columns)
+                             .eq("periodo_id", period_id).is_("mentor_ie_id", "null").order("id"))
+
+    return True, {"period_id": period_id, "mentors": mentors, "loads": loads, "pending": pending}
+
+def plan_mentor_assignment(supabase=None):
+    """
+    Calcula en memoria la asignación balanceada (sin escribir nada).
+    Regresa (True, plan) o (False, mensaje); plan incluye "assignments"
+    {proyecto_id: mentor_id}, "before"/"after" (carga por mentor) y "mentors" (nombres).
+    """
+    ok, state = load_assignment_state(supabase)
+    if not ok:
+        return False, state
+    assignments = plan_least_loaded([p["id"] for p in state["pending"]], state["loads"])
+    after = dict(state["loads"])
+    for mentor_id in assignments.values():
+        after[mentor_id] += 1
+    return True, {
+        "period_id": state["period_id"],
+        "mentors": state["mentors"],
+        "assignments": assignments,
+        "before": state["loads"],
+        "after": after,
+    }
+
+def assignment_distribution(plan):
+    """Filas para la vista previa: carga actual, nuevos y total por mentor."""
+    return [{
+        "Mentor IE": plan["mentors"].get(mentor_id, mentor_id),
+        "Asignados actualmente": plan["before"].get(mentor_id, 0),
+        "Nuevos": plan["after"][mentor_id] - plan["before"].get(mentor_id, 0),
+        "Total": plan["after"][mentor_id],
+    } for mentor_id in sorted(plan["after"], key=lambda m: (-plan["after"][m], plan["mentors"].get(m, "")))]
+
+def apply_mentor_assignment(plan, supabase=None):
+    """
+    Escribe un plan con un update por mentor y bloque de ids: solo se toca la
+    columna mentor_ie_id. El filtro mentor_ie_id IS NULL omite los proyectos que
+    alguien asignó mientras tanto (no vuelven en la respuesta del update).
+    """
+    supabase = supabase or get_supabase_client()
+    assignments = plan["assignments"]
+    if not assignments:
         return True, "No pending assignments found."
-    
+
+    by_mentor = {}
+    for project_id, mentor_id in assignments.items():
+        by_mentor.setdefault(mentor_id, []).append(project_id)
+
     assigned_count = 0
-    mentor_idx = 0
-    total_mentors = len(mentors)
-    
-    # 3. Round Robin Distribution
-    for project in projects:
-        mentor_id = mentors[mentor_idx]
-        
-        # Update project with assigned mentor
-        supabase.table("proyectos_dual").update({"mentor_ie_id": mentor_id}).eq("id", project["id"]).execute()
-        
-        assigned_count += 1
-        mentor_idx = (mentor_idx + 1) % total_mentors
-
-    return True, f"Successfully assigned mentors to {assigned_count} students."
+    for mentor_id, ids in by_mentor.items():
+        for start in range(0, len(ids), BULK_WRITE_CHUNK):
+            res = supabase.table("proyectos_dual").update({"mentor_ie_id": mentor_id}) \
+                .in_("id", ids[start:start + BULK_WRITE_CHUNK]).is_("mentor_ie_id", "null").execute()
+            assigned_count += len(res.data or [])
+    skipped = len(assignments) - assigned_count
+    msg = f"Successfully assigned mentors to {assigned_count} students."
+    if skipped:
+        msg += f" {skipped} already had a mentor and were skipped."
+    return True, msg
+
+def assign_mentors_round_robin(dry_run=False):
+    """
+    Assigns Academic Mentors (es_mentor_ie=True) to students in the active period
+    who do not yet have a mentor assigned. Starts from each mentor's current load
+    and always fills the least-loaded mentor first; the plan is written in bulk.
+
+    dry_run=True only computes the plan and returns (True, plan) for preview.
+    """
+    ok, plan = plan_mentor_assignment()
+    if not ok or dry_run:
+        return ok, plan
+    if not plan["assignments"]:
+        return True, "No pending assignments found."
+    return apply_mentor_assignment(plan)
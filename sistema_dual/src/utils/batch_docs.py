@@ -0,0 +1,93 @@
+import os
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Número de procesos para generación masiva (0 = os.cpu_count())
+DOC_WORKERS = int(os.getenv("DOC_WORKERS", "0"))
+# "spawn" evita heredar los hilos del servidor de Streamlit al crear los procesos
+DOC_POOL_START_METHOD = os.getenv("DOC_POOL_START_METHOD", "spawn")
+# Trabajos en vuelo por proceso: acota la memoria cuando los trabajos llegan de un generador
+DOC_PENDING_PER_WORKER = int(os.getenv("DOC_PENDING_PER_WORKER", "2"))
+
+def _render_job(job):
+    """
+    Ejecuta un trabajo de render en el proceso worker.
+    Cada proceso conserva su propia caché de plantillas preprocesadas.
+    """
+    from src.utils.pdf_generator_docx import render_docx_bytes
+    return render_docx_bytes(job["template_name"], job["context"], job.get("template_path"))
+
+def _job_result(job, success, payload):
+    return {
+        "key": job.get("key", job["template_name"]),
+        "template_name": job["template_name"],
+        "success": success,
+        "data": payload if success else None,
+        "error": None if success else payload,
+    }
+
+def render_documents_batch(jobs, max_workers=None, progress_callback=None):
+    """
+    Genera muchos DOCX en paralelo sobre un ProcessPoolExecutor.
+
+    jobs: lista o generador de dicts {"key", "template_name", "context", "template_path" (opcional)}.
+          Se consumen conforme hay lugar en el pool: a lo sumo DOC_PENDING_PER_WORKER
+          trabajos por proceso en vuelo, así que un generador nunca se materializa completo.
+    max_workers: procesos a usar (por defecto DOC_WORKERS o el número de núcleos);
+                 con 1 se genera en el proceso actual sin crear el pool.
+    progress_callback: función opcional (terminados, total, resultado) llamada por trabajo;
+                       total es None si jobs no tiene len().
+
+    Genera dicts {"key", "template_name", "success", "data" (bytes), "error"}
+    en orden de terminación, conforme cada documento queda listo.
+    """
+    total = len(jobs) if hasattr(jobs, "__len__") else None
+    if total == 0:
+        return
+    jobs = iter(jobs)
+
+    workers = max_workers or DOC_WORKERS or os.cpu_count() or 1
+    if total is not None:
+        workers = min(workers, total)
+    done = 0
+
+    if workers == 1:
+        for job in jobs:
+            try:
+                success, payload = _render_job(job)
+            except Exception as e:
+                success, payload = False, str(e)
+            result = _job_result(job, success, payload)
+            done += 1
+            if progress_callback:
+                progress_callback(done, total, result)
+            yield result
+        return
+
+    max_pending = workers * max(1, DOC_PENDING_PER_WORKER)
+    ctx = multiprocessing.get_context(DOC_POOL_START_METHOD)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+        pending = {}
+        while True:
+            for job in islice(jobs, max_pending - len(pending)):
+                pending[executor.submit(_render_job, job)] = job
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                # Se suelta el futuro para que sus bytes se liberen en cuanto el consumidor termine
+                job = pending.pop(future)
+                try:
+                    success, payload = future.result()
+                except Exception as e:
+                    # Errores del worker (p. ej. contexto no serializable) se reportan por trabajo
+                    success, payload = False, f"Error en proceso de generación: {str(e)}"
+                result = _job_result(job, success, payload)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total, result)
+                yield result
@@ -0,0 +1,101 @@
+"""
+Catálogos compartidos (tablas de referencia pequeñas y de cambio poco frecuente).
+
+Se cachean con st.cache_data durante CATALOG_TTL segundos para que cada
+interacción con un widget no repita las mismas consultas. Los handlers que
+crean, editan o borran registros deben llamar a invalidate_catalogs(...)
+con el catálogo afectado para que el cambio se vea de inmediato.
+"""
+import os
+import streamlit as st
+from dotenv import load_dotenv
+from src.db_connection import get_supabase_client
+
+load_dotenv()
+
+# Segundos que un catálogo permanece en caché si nadie lo invalida
+CATALOG_TTL = int(os.getenv("CATALOG_TTL", "600"))
+
+CARRERAS = "carreras"
+UNIDADES_ECONOMICAS = "unidades_economicas"
+ASIGNATURAS = "asignaturas"
+MAESTROS = "maestros"
+MENTORES_UE = "mentores_ue"
+
+@st.cache_data(ttl=CATALOG_TTL, show_spinner=False)
+def _fetch_carreras():
+    res = get_supabase_client().table("carreras").select("id, nombre").order("nombre").execute()
+    return res.data or []
+
+@st.cache_data(ttl=CATALOG_TTL, show_spinner=False)
+def _fetch_unidades_economicas():
+    res = get_supabase_client().table("unidades_economicas").select("id, nombre_comercial").execute()
+    return res.data or []
+
+@st.cache_data(ttl=CATALOG_TTL, show_spinner=False)
+def _fetch_asignaturas():
+    res = get_supabase_client().table("asignaturas").select(
+        "id, nombre, clave_asignatura, semestre, carrera_id"
+    ).execute()
+    return res.data or []
+
+@st.cache_data(ttl=CATALOG_TTL, show_spinner=False)
+def _fetch_maestros():
+    res = get_supabase_client().table("maestros").select(
+        "id, nombre_completo, clave_maestro, email_institucional, es_mentor_ie, carrera_id"
+    ).execute()
+    return res.data or []
+
+@st.cache_data(ttl=CATALOG_TTL, show_spinner=False)
+def _fetch_mentores_ue(ue_id):
+    res = get_supabase_client().table("mentores_ue").select("id, nombre_completo, email").eq("ue_id", ue_id).execute()
+    return res.data or []
+
+_CACHES = {
+    CARRERAS: _fetch_carreras,
+    UNIDADES_ECONOMICAS: _fetch_unidades_economicas,
+    ASIGNATURAS: _fetch_asignaturas,
+    MAESTROS: _fetch_maestros,
+    MENTORES_UE: _fetch_mentores_ue,
+}
+
+def get_carreras():
+    """Carreras (id, nombre) ordenadas por nombre."""
+    return _fetch_carreras()
+
+def get_unidades_economicas():
+    """Unidades Económicas (id, nombre_comercial)."""
+    return _fetch_unidades_economicas()
+
+def get_asignaturas(carrera_id=None, semestre=None):
+    """Asignaturas, opcionalmente filtradas por carrera y semestre."""
+    asignaturas = _fetch_asignaturas()
+    if carrera_id:
+        asignaturas = [a for a in asignaturas if a.get("carrera_id") == carrera_id]
+    if semestre is not None:
+        asignaturas = [a for a in asignaturas if str(a.get("semestre")) == str(semestre)]
+    return asignaturas
+
+def get_maestros(solo_mentores_ie=False, ids=None):
+    """Maestros; solo_mentores_ie deja únicamente a los Mentores IE e ids limita a esos registros."""
+    maestros = _fetch_maestros()
+    if solo_mentores_ie:
+        maestros = [m for m in maestros if m.get("es_mentor_ie")]
+    if ids is not None:
+        ids = set(ids)
+        maestros = [m for m in maestros if m["id"] in ids]
+    return maestros
+
+def get_mentores_ue(ue_id):
+    """Mentores UE (id, nombre_completo, email) de una Unidad Económica."""
+    if not ue_id:
+        return []
+    return _fetch_mentores_ue(ue_id)
+
+def invalidate_catalogs(*names):
+    """
+    Descarta los catálogos indicados (todos si no se indica ninguno).
+    Llamar después de insertar, editar o borrar registros de esas tablas.
+    """
+    for name in names or _CACHES.keys():
+        _CACHES[name].clear()
@@ -0,0 +1,200 @@
+"""
+Exportación en ZIP de los documentos de toda la cohorte de un periodo.
+
+Los contextos se arman con un generador (un alumno a la vez), los DOCX se
+renderizan en el pool de batch_docs con un número acotado de trabajos en vuelo
+y cada documento se escribe al ZIP en disco en cuanto termina. La memoria no
+crece con el tamaño de la cohorte: solo los documentos en vuelo están en RAM.
+
+Estructura del archivo: <carrera>/<matrícula>/<documento>_<matrícula>.docx
+"""
+import os
+import re
+import zipfile
+import tempfile
+from itertools import islice
+from datetime import datetime
+from src.db_connection import get_supabase_client
+from src.utils.db_actions import get_active_period_id, fetch_all_rows
+
+# Carpeta donde se escriben los ZIP (por defecto el temporal del sistema)
+COHORT_EXPORT_DIR = os.getenv("COHORT_EXPORT_DIR") or None
+
+# Alumnos por bloque al leer los datos del Anexo 5.1 (una consulta por tabla y bloque)
+COHORT_CHUNK = int(os.getenv("COHORT_CHUNK", "150"))
+
+COHORT_PROJECT_COLUMNS = "*, alumnos(*, carreras(nombre)), unidades_economicas(*), mentores_ue(*), maestros(*)"
+
+ANEXO_5_1_TEMPLATE = "Anexo_5.1_Plan_de_Formacion.docx"
+
+# (prefijo del archivo, plantilla, requisito) en el mismo orden que las tarjetas de Documentos del alumno.
+# Requisitos: "ue" = Empresa y Mentor UE, "mentor_ie" = Mentor IE, "all" = ambos.
+COHORT_DOCUMENTS = [
+    ("Anexo_5.1", ANEXO_5_1_TEMPLATE, "ue"),
+    ("Anexo_5.4", "Anexo_5.4_Reporte_de_Actividades.docx", "all"),
+    ("Anexo_5.5", "Anexo_5.5_Seguimiento_Modificado.docx", "all"),
+    ("Carta_Mentor_IE", "Carta_Asignacion_Mentor_IE.docx", "mentor_ie"),
+    ("Acta_Calificaciones", "Acta_Calificaciones_Materia.docx", "all"),
+]
+
+_UNSAFE_PATH_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+def _safe_component(value, default):
+    """Nombre de carpeta/archivo válido en Windows y Linux."""
+    cleaned = _UNSAFE_PATH_CHARS.sub("_", str(value or "").strip()).strip("._")
+    return cleaned or default
+
+def document_requirements(project):
+    """Requisitos cumplidos por el proyecto: {"ue", "mentor_ie", "all"}."""
+    has_ue = bool(project.get("ue_id") and project.get("mentor_ue_id"))
+    has_mentor_ie = bool(project.get("mentor_ie_id"))
+    return {"ue": has_ue, "mentor_ie": has_mentor_ie, "all": has_ue and has_mentor_ie}
+
+def build_generic_context(student, project):
+    """Contexto de Anexo 5.4, 5.5, Carta Mentor IE y Acta a partir del alumno y su proyecto con embebidos."""
+    ue = project.get("unidades_economicas", {}) or {}
+    mentor_ue = project.get("mentores_ue", {}) or {}
+    mentor_ie = project.get("maestros", {}) or {}
+    return {
+        "alumno_nombre": f"{student.get('nombre')} {student.get('ap_paterno')} {student.get('ap_materno', '')}".strip(),
+        "alumno_matricula": student.get('matricula'),
+        "alumno_carrera": student.get('carrera', 'N/A'),
+        "alumno_semestre": str(student.get('semestre', 'N/A')),
+        "empresa_nombre": ue.get('nombre_comercial', 'N/A'),
+        "empresa_rfc": ue.get('rfc', 'N/A'),
+        "empresa_direccion": ue.get('direccion_fiscal', 'N/A'),
+        "empresa_representante": ue.get('nombre_titular', 'N/A'),
+        "empresa_cargo_representante": ue.get('cargo_titular', 'N/A'),
+        "mentor_ue_nombre": mentor_ue.get('nombre_completo', 'N/A'),
+        "mentor_ue_cargo": mentor_ue.get('cargo', 'N/A'),
+        "mentor_ue_email": mentor_ue.get('email', 'N/A'),
+        "mentor_ue_telefono": mentor_ue.get('telefono', 'N/A'),
+        "mentor_ie_nombre": mentor_ie.get('nombre_completo', 'N/A'),
+        "proyecto_nombre": project.get('nombre_proyecto', 'N/A'),
+        "proyecto_fecha_inicio": str(project.get('fecha_inicio_convenio', 'N/A')),
+        "proyecto_fecha_fin": str(project.get('fecha_fin_convenio', 'N/A')),
+        "materia_nombre": "Asignaturas Modelo DUAL",
+        "calificacion": "100", # Demostrativo
+        "fecha_actual": datetime.now().strftime('%d/%m/%Y'),
+
+        # Context overrides for 5.4 format block
+        "numero_reporte": 1,
+        "fechas_periodo": str(project.get('fecha_inicio_convenio', 'N/A')),
+        "empresa": ue.get('nombre_comercial', 'N/A'),
+        "institucion_educativa": "TESE",
+        "carrera": student.get('carrera', 'N/A'),
+        "nombre_alumno": f"{student.get('nombre')} {student.get('ap_paterno')}",
+    }
+
+def load_cohort_projects(period_id=None, supabase=None):
+    """
+    Proyecto más reciente de cada alumno del periodo (activo por defecto), con alumno,
+    empresa y mentores embebidos, paginado de 1000 en 1000.
+    """
+    supabase = supabase or get_supabase_client()
+    period_id = period_id or get_active_period_id()
+    if not period_id:
+        return []
+    rows = fetch_all_rows(lambda: supabase.table("proyectos_dual").select(COHORT_PROJECT_COLUMNS)
+                          .eq("periodo_id", period_id).order("created_at", desc=True).order("id"))
+    latest = {}
+    for row in rows:
+        if row.get("alumnos") and row["alumno_id"] not in latest:
+            latest[row["alumno_id"]] = row
+    return list(latest.values())
+
+def cohort_arcname(student, filename):
+    """Ruta dentro del ZIP: <carrera>/<matrícula>/<documento>_<matrícula>.docx"""
+    carrera = (student.get("carreras") or {}).get("nombre") or student.get("carrera")
+    matricula = _safe_component(student.get("matricula"), f"alumno_{student.get('id', 'sin_id')}")
+    return f"{_safe_component(carrera, 'Sin_carrera')}/{matricula}/{filename}_{matricula}.docx"
+
+def iter_cohort_jobs(projects, documents=None, skipped=None, supabase=None):
+    """
+    Genera trabajos de batch_docs ({"key": ruta en el ZIP, "template_name", "context"})
+    alumno por alumno. Los documentos cuyo requisito no se cumple o cuyos datos no
+    se pudieron recuperar se agregan a skipped como (ruta, motivo).
+
+    El Anexo 5.1 se arma con el proyecto ya cargado; sus inscripciones y
+    competencias se leen por bloques de COHORT_CHUNK alumnos, no por alumno.
+    """
+    from src.utils.anexo_data import get_anexo_5_1_data_for_projects
+
+    documents = documents or COHORT_DOCUMENTS
+    skipped = skipped if skipped is not None else []
+    needs_5_1 = any(template_name == ANEXO_5_1_TEMPLATE for _, template_name, _ in documents)
+    projects = iter(projects)
+    while True:
+        chunk = list(islice(projects, COHORT_CHUNK))
+        if not chunk:
+            break
+        contexts_5_1 = {}
+        if needs_5_1:
+            eligible = [p for p in chunk if document_requirements(p)["ue"]]
+            if eligible:
+                for project, context, msg_err in get_anexo_5_1_data_for_projects(eligible, supabase):
+                    contexts_5_1[project["id"]] = (context, msg_err)
+        for project in chunk:
+            student = project.get("alumnos") or {}
+            reqs = document_requirements(project)
+            generic_context = None
+            for filename, template_name, requirement in documents:
+                arcname = cohort_arcname(student, filename)
+                if not reqs[requirement]:
+                    skipped.append((arcname, "Requisitos incompletos"))
+                    continue
+                if template_name == ANEXO_5_1_TEMPLATE:
+                    context, msg_err = contexts_5_1[project["id"]]
+                    if not context:
+                        skipped.append((arcname, f"Error recuperando datos: {msg_err}"))
+                        continue
+                else:
+                    generic_context = generic_context or build_generic_context(student, project)
+                    context = generic_context
+                yield {"key": arcname, "template_name": template_name, "context": context}
+
+def write_cohort_zip(jobs, fileobj, max_workers=None, progress_callback=None):
+    """
+    Renderiza los trabajos y escribe cada DOCX en el ZIP conforme termina.
+    progress_callback(escritos, resultado) se llama por documento.
+    Regresa {"written": n, "errors": [(ruta, motivo)]}; los errores también quedan
+    en ERRORES.txt dentro del ZIP.
+    """
+    from src.utils.batch_docs import render_documents_batch
+
+    written, errors = 0, []
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for result in render_documents_batch(jobs, max_workers=max_workers):
+            if result["success"]:
+                zf.writestr(result["key"], result["data"])
+                written += 1
+            else:
+                errors.append((result["key"], result["error"]))
+            if progress_callback:
+                progress_callback(written, result)
+        if errors:
+            zf.writestr("ERRORES.txt", "\n".join(f"{path}: {msg}" for path, msg in errors))
+    return {"written": written, "errors": errors}
+
+def export_cohort_zip(period_id=None, output_path=None, max_workers=None, progress_callback=None, supabase=None):
+    """
+    Exporta a un ZIP en disco todos los documentos de la cohorte del periodo.
+    Regresa (True, {"path", "students", "written", "skipped", "errors"}) o (False, mensaje).
+    """
+    try:
+        projects = load_cohort_projects(period_id, supabase)
+        if not projects:
+            return False, "No hay alumnos con proyecto en el periodo."
+
+        if output_path is None:
+            fd, output_path = tempfile.mkstemp(prefix="expedientes_", suffix=".zip", dir=COHORT_EXPORT_DIR)
+            os.close(fd)
+        skipped = []
+        tmp_path = output_path + ".part"
+        with open(tmp_path, "wb") as f:
+            summary = write_cohort_zip(iter_cohort_jobs(projects, skipped=skipped, supabase=supabase), f, max_workers, progress_callback)
+        # El ZIP solo aparece completo: el directorio central se escribe al cerrar
+        os.replace(tmp_path, output_path)
+        return True, dict(summary, path=output_path, students=len(projects), skipped=skipped)
+    except Exception as e:
+        return False, f"Error exportando expedientes: {str(e)}"
@@ -1,7 +1,11 @@
+import re
 import streamlit as st
 from datetime import date
 from src.db_connection import get_supabase_client
 
+# Columnas que necesita el listado de alumnos (evita traer el registro completo)
+STUDENT_LIST_COLUMNS = "id, matricula, nombre, ap_paterno, ap_materno, estatus"
+
 def get_active_period_id():
     """Fetches the ID of the currently active period."""
     supabase = get_supabase_client()
@@ -10,6 +14,156 @@ def get_active_period_id():
         return response.data[0]["id"]
     return None
 
+def _student_search_filter(search):
+    """
+    Filtro or_ de PostgREST para buscar (ilike) en matrícula, nombre y apellido paterno.
+    Se eliminan los caracteres reservados de la sintaxis de filtros.
+    """
+    term = re.sub(r'[,()*%\\"]', ' ', search or '').strip()
+    if not term:
+        return None
+    return ",".join(f"{col}.ilike.*{term}*" for col in ("matricula", "nombre", "ap_paterno"))
+
+def count_students(estatus=None, search="", supabase=None):
+    """Número exacto de alumnos con los estatus indicados (None = todos), sin descargar filas."""
+    supabase = supabase or get_supabase_client()
+    query = supabase.table("alumnos").select("id", count="exact", head=True)
+    if estatus:
+        query = query.in_("estatus", list(estatus))
+    search_filter = _student_search_filter(search)
+    if search_filter:
+        query = query.or_(search_filter)
+    return query.execute().count or 0
+
+def get_students_page(estatus=None, search="", page=1, page_size=25, supabase=None):
+    """
+    Una página del listado de alumnos, filtrada y paginada en el servidor.
+    estatus: lista de estatus a incluir (None = todos).
+    search: texto a buscar en matrícula, nombre o apellido paterno.
+    page: página (empieza en 1).
+
+    Regresa (filas, total) donde total es el conteo exacto con los mismos filtros.
+    """
+    supabase = supabase or get_supabase_client()
+    start = (max(page, 1) - 1) * page_size
+    query = supabase.table("alumnos").select(STUDENT_LIST_COLUMNS, count="exact")
+    if estatus:
+        query = query.in_("estatus", list(estatus))
+    search_filter = _student_search_filter(search)
+    if search_filter:
+        query = query.or_(search_filter)
+    res = query.order("ap_paterno").order("id").range(start, start + page_size - 1).execute()
+    return res.data or [], res.count or 0
+
+# Filas por página al leer tablas completas (max-rows por defecto de PostgREST en Supabase)
+FETCH_PAGE_SIZE = 1000
+# Filas por petición en escrituras masivas
+BULK_WRITE_CHUNK = 500
+
+def fetch_all_rows(build_query, page_size=FETCH_PAGE_SIZE):
+    """
+    Lee todas las filas de una consulta paginando con range(), ya que PostgREST
+    corta cada respuesta en max-rows.
+    build_query: función sin argumentos que regresa un query builder nuevo (debe incluir order()).
+    """
+    rows = []
+    start = 0
+    while True:
+        page = build_query().range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+def bulk_upsert_rows(table, rows, on_conflict="id", chunk_size=BULK_WRITE_CHUNK, supabase=None):
+    """
+    Escribe muchas filas completas con upsert por bloques (una petición por bloque).
+    Las filas deben traer todas las columnas obligatorias: el INSERT implícito del
+    upsert valida NOT NULL aunque la fila ya exista.
+    Regresa el número de filas escritas.
+    """
+    supabase = supabase or get_supabase_client()
+    written = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        supabase.table(table).upsert(chunk, on_conflict=on_conflict).execute()
+        written += len(chunk)
+    return written
+
+# Listado de la Fase 2: el alumno viene embebido para no consultarlo fila por fila
+PHASE2_PROJECT_COLUMNS = (
+    "id, alumno_id, mentor_ie_id, ue_id, mentor_ue_id, periodo_id, "
+    "alumnos(nombre, ap_paterno, email_institucional, email_personal), "
+    "mentores_ue(nombre_completo), unidades_economicas(nombre_comercial), "
+    "maestros(nombre_completo, email_institucional), "
+    "periodos(inicio_anexo_1, fin_anexo_1, fecha_inicio, fecha_fin)"
+)
+
+def get_phase2_projects(period_id=None, supabase=None):
+    """
+    Proyectos del periodo activo que ya tienen Mentor IE, con alumno, mentores,
+    empresa y fechas del periodo embebidos: una sola consulta (por cada 1000 filas)
+    sin importar cuántos proyectos haya.
+    """
+    supabase = supabase or get_supabase_client()
+    period_id = period_id or get_active_period_id()
+    if not period_id:
+        return []
+    return fetch_all_rows(lambda: supabase.table("proyectos_dual").select(PHASE2_PROJECT_COLUMNS)
+                          .eq("periodo_id", period_id).not_.is_("mentor_ie_id", "null").order("id"))
+
+ESTATUS_ESPERA_EGRESO = "En Espera de Egreso"
+ESTATUS_ESPERA_REINSCRIPCION = "En Espera de Reinscripción"
+
+def wipe_mentor_passwords(supabase):
+    """Borra todas las contraseñas de los Mentores UE cuando se cierra un periodo."""
+    try:
+        supabase.table("mentores_ue").update({"password_hash": None}).neq("nombre_completo", "").execute()
+    except Exception as e:
+        print(f"Error wiped: {e}")
+
+def close_period(period, supabase=None):
+    """
+    Cierre automático de un periodo:
+    1. Lo desactiva y borra las contraseñas de los Mentores UE.
+    2. Manda a 'En Espera de Egreso' a los alumnos cuyo convenio termina a más
+       tardar en la fecha fin del periodo y a 'En Espera de Reinscripción' al resto.
+    Los proyectos se leen paginados y las actualizaciones van en bloques de
+    IN_FILTER_CHUNK ids para no exceder el largo de URL con cohortes grandes.
+    period: fila de periodos (id y fecha_fin).
+    Regresa (True, (egresos, reinscripciones)) o (False, mensaje).
+    """
+    from src.utils.anexo_data import IN_FILTER_CHUNK
+
+    supabase = supabase or get_supabase_client()
+    try:
+        supabase.table("periodos").update({"activo": False}).eq("id", period["id"]).execute()
+        wipe_mentor_passwords(supabase)
+
+        projects = fetch_all_rows(lambda: supabase.table("proyectos_dual").select("id, alumno_id, fecha_fin_convenio")
+                                  .eq("periodo_id", period["id"]).order("id"))
+        period_end_str = period.get("fecha_fin")
+        period_end = date.fromisoformat(period_end_str) if period_end_str else date.today()
+
+        to_grad, to_keep = [], []
+        for row in projects:
+            try:
+                finished = bool(row.get("fecha_fin_convenio")) and date.fromisoformat(row["fecha_fin_convenio"]) <= period_end
+            except ValueError:
+                finished = False # Safe fallback: reinscribe
+            (to_grad if finished else to_keep).append(row["alumno_id"])
+        # Un alumno con dos proyectos en el periodo queda en Reinscripción (antes se escribía al último)
+        to_keep = list(dict.fromkeys(to_keep))
+        keep_set = set(to_keep)
+        to_grad = [a for a in dict.fromkeys(to_grad) if a not in keep_set]
+
+        for estatus, ids in ((ESTATUS_ESPERA_EGRESO, to_grad), (ESTATUS_ESPERA_REINSCRIPCION, to_keep)):
+            for start in range(0, len(ids), IN_FILTER_CHUNK):
+                supabase.table("alumnos").update({"estatus": estatus}).in_("id", ids[start:start + IN_FILTER_CHUNK]).execute()
+        return True, (len(to_grad), len(to_keep))
+    except Exception as e:
+        return False, str(e)
+
 def create_student_transaction(student_data, project_data, subjects_data):
     """
     Executes the registration transaction:
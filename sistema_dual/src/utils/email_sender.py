@@ -133,9 +133,11 @@ def send_period_invites(to_email, period_name, dates_dict):
         except: pass
         return False
 
-def send_document_email(to_email, student_name, document_name, file_path):
+def send_document_email(to_email, student_name, document_name, file_path=None, file_bytes=None, file_name=None):
     """
     Sends an email with a document attached manually.
+    The document can be given as a path (file_path) or as in-memory bytes
+    (file_bytes + file_name), e.g. the output of render_docx_bytes.
     """
     smtp_server = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
     smtp_port = int(os.environ.get("SMTP_PORT", 587))
@@ -161,16 +163,18 @@ def send_document_email(to_email, student_name, document_name, file_path):
         msg['Subject'] = subject
         msg.attach(MIMEText(body, 'plain'))
         
-        if os.path.exists(file_path):
+        if file_bytes is None:
+            if not file_path or not os.path.exists(file_path):
+                return False
             with open(file_path, "rb") as f:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(f.read())
-            encoders.encode_base64(part)
+                file_bytes = f.read()
             file_name = os.path.basename(file_path)
-            part.add_header('Content-Disposition', f'attachment; filename="{file_name}"')
-            msg.attach(part)
-        else:
-            return False
+
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(file_bytes)
+        encoders.encode_base64(part)
+        part.add_header('Content-Disposition', f'attachment; filename="{file_name}"')
+        msg.attach(part)
 
         server = smtplib.SMTP(smtp_server, smtp_port)
         server.starttls()
@@ -0,0 +1,583 @@
+"""
+Backend falso de Supabase/PostgREST en memoria, para pruebas y benchmarks sin red.
+
+Implementa el subconjunto del query builder de supabase-py que usa el proyecto:
+
+    select("*, alumnos(nombre, carreras(nombre))", count="exact", head=False)
+    eq / neq / gt / gte / lt / lte / like / ilike / in_ / is_ / not_ / match / or_
+    order(col, desc=) / limit / range / single
+    insert / upsert(on_conflict=) / update / delete
+
+Las tablas se indexan por llave primaria ("id") y por cada columna que se filtra
+con eq/in_ (índices hash creados bajo demanda y mantenidos en las escrituras).
+Las relaciones embebidas se resuelven con FOREIGN_KEYS, como lo haría PostgREST
+con las llaves foráneas del esquema, en ambos sentidos (a uno y a muchos).
+
+Con log_requests=True la base guarda cada petición ejecutada (FakeQuery) en
+db.log, para pruebas que verifican cuántas y cuáles peticiones hace un flujo.
+
+Se activa con SUPABASE_BACKEND=fake en db_connection.py:
+    FAKE_SUPABASE_LATENCY_MS  latencia simulada por petición (default 0)
+    FAKE_SUPABASE_MAX_ROWS    max-rows de PostgREST (default 1000)
+    FAKE_SUPABASE_SEED        JSON opcional {tabla: [filas]} que se carga al iniciar
+"""
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from dotenv import load_dotenv
+from postgrest.exceptions import APIError
+
+load_dotenv()
+
+FAKE_SUPABASE_LATENCY_MS = float(os.getenv("FAKE_SUPABASE_LATENCY_MS", "0"))
+FAKE_SUPABASE_MAX_ROWS = int(os.getenv("FAKE_SUPABASE_MAX_ROWS", "1000"))
+FAKE_SUPABASE_SEED = os.getenv("FAKE_SUPABASE_SEED")
+
+# tabla -> {columna FK: tabla referenciada}
+FOREIGN_KEYS = {
+    "proyectos_dual": {"alumno_id": "alumnos", "ue_id": "unidades_economicas", "mentor_ue_id": "mentores_ue",
+                       "mentor_ie_id": "maestros", "periodo_id": "periodos"},
+    "alumnos": {"carrera_id": "carreras"},
+    "maestros": {"carrera_id": "carreras"},
+    "asignaturas": {"carrera_id": "carreras"},
+    "usuarios_coordinadores": {"carrera_id": "carreras"},
+    "lista_blanca": {"carrera_id": "carreras"},
+    "mentores_ue": {"ue_id": "unidades_economicas"},
+    "inscripciones_asignaturas": {"alumno_id": "alumnos", "asignatura_id": "asignaturas", "maestro_id": "maestros"},
+    "asignatura_competencias": {"asignatura_id": "asignaturas"},
+    "actividades_aprendizaje": {"competencia_id": "asignatura_competencias"},
+    "rel_maestros_asignaturas": {"maestro_id": "maestros", "asignatura_id": "asignaturas"},
+}
+
+_SPLIT_TOP_LEVEL = re.compile(r",(?![^()]*\))")
+
+def _api_error(message, code):
+    return APIError({"message": message, "code": code, "hint": None, "details": None})
+
+
+def _split_columns(columns):
+    """Divide "a, b(c, d(e)), f" en elementos de primer nivel respetando paréntesis anidados."""
+    items, depth, current = [], 0, []
+    for ch in columns:
+        if ch == "," and depth == 0:
+            items.append("".join(current).strip())
+            current = []
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        current.append(ch)
+    items.append("".join(current).strip())
+    return [i for i in items if i]
+
+def parse_select(columns):
+    """
+    Árbol de un select de PostgREST: lista de ("*", None) | ("col", alias) |
+    ("embed", {"alias", "table", "hint", "inner", "children"}).
+    """
+    parsed = []
+    for item in _split_columns(columns or "*"):
+        alias = None
+        if ":" in item.split("(")[0] and "::" not in item.split("(")[0]:
+            alias, item = [p.strip() for p in item.split(":", 1)]
+        if "(" in item:
+            head, inner = item.split("(", 1)
+            name, _, hint = head.strip().partition("!")
+            parsed.append(("embed", {
+                "alias": alias or name,
+                "table": name,
+                "hint": None if hint in ("", "inner", "left") else hint,
+                "inner": hint == "inner",
+                "children": parse_select(inner.rsplit(")", 1)[0]),
+            }))
+        elif item == "*":
+            parsed.append(("*", None))
+        else:
+            column = item.split("::")[0].strip()
+            parsed.append((column, alias or column))
+    return parsed
+
+
+def _like_regex(pattern, case_insensitive):
+    parts = [".*" if ch in "%*" else "." if ch == "_" else re.escape(ch) for ch in str(pattern)]
+    return re.compile("^" + "".join(parts) + "$", re.IGNORECASE if case_insensitive else 0)
+
+def _coerce_is(value):
+    if isinstance(value, str):
+        return {"null": None, "true": True, "false": False}[value.lower()]
+    return value
+
+def _same(a, b):
+    if a is None or b is None:
+        return False
+    return a == b or str(a) == str(b)
+
+def _compare(a, b):
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        return (str(a) > str(b)) - (str(a) < str(b))
+
+def _matches(row, op, column, value):
+    current = row.get(column)
+    if op == "eq":
+        return _same(current, value)
+    if op == "neq":
+        return current is not None and not _same(current, value)
+    if op == "in":
+        return any(_same(current, v) for v in value)
+    if op == "is":
+        return current is value
+    if op in ("like", "ilike"):
+        return current is not None and bool(value.match(str(current)))
+    if current is None:
+        return False
+    cmp = _compare(current, value)
+    return {"gt": cmp > 0, "gte": cmp >= 0, "lt": cmp < 0, "lte": cmp <= 0}[op]
+
+def _make_filter(op, column, value):
+    if op == "in":
+        value = list(value)
+    elif op == "is":
+        value = _coerce_is(value)
+    elif op in ("like", "ilike"):
+        value = _like_regex(value, op == "ilike")
+    return (op, column, value)
+
+def _parse_or(expression):
+    """Filtros de or_("col.op.valor,col.op.valor"); not. como prefijo del operador."""
+    filters = []
+    for part in _SPLIT_TOP_LEVEL.split(expression):
+        column, rest = part.strip().split(".", 1)
+        negate = rest.startswith("not.")
+        if negate:
+            rest = rest[4:]
+        op, raw = rest.split(".", 1)
+        if op in ("and", "or"):
+            raise NotImplementedError("or_ anidado no soportado en el backend falso")
+        value = [v.strip().strip('"') for v in raw.strip("()").split(",")] if op == "in" else raw
+        filters.append((negate,) + _make_filter(op, column, value))
+    return filters
+
+
+class FakeTable:
+    """Filas por llave primaria más índices hash por columna creados bajo demanda."""
+
+    def __init__(self, name, primary_key="id"):
+        self.name = name
+        self.primary_key = primary_key
+        self.rows = {}
+        self.seq = {}
+        self.indexes = {}
+        self._next_seq = 0
+
+    def index(self, column):
+        idx = self.indexes.get(column)
+        if idx is None:
+            idx = {}
+            for pk, row in self.rows.items():
+                idx.setdefault(self._index_key(row.get(column)), set()).add(pk)
+            self.indexes[column] = idx
+        return idx
+
+    @staticmethod
+    def _index_key(value):
+        # eq compara también como texto (PostgREST recibe todos los valores como texto)
+        return None if value is None else str(value)
+
+    def lookup(self, column, values):
+        """Llaves primarias (en orden de inserción) de las filas cuyo valor en column está en values."""
+        idx = self.index(column)
+        found = set()
+        for v in values:
+            found |= idx.get(self._index_key(v), set())
+        return sorted(found, key=self.seq.__getitem__)
+
+    def put(self, row):
+        pk = row[self.primary_key]
+        old = self.rows.get(pk)
+        for column, idx in self.indexes.items():
+            if old is not None:
+                bucket = idx.get(self._index_key(old.get(column)))
+                if bucket:
+                    bucket.discard(pk)
+            idx.setdefault(self._index_key(row.get(column)), set()).add(pk)
+        if old is None:
+            self.seq[pk] = self._next_seq
+            self._next_seq += 1
+        self.rows[pk] = row
+
+    def remove(self, pk):
+        old = self.rows.pop(pk)
+        self.seq.pop(pk, None)
+        for column, idx in self.indexes.items():
+            bucket = idx.get(self._index_key(old.get(column)))
+            if bucket:
+                bucket.discard(pk)
+        return old
+
+
+class FakeDatabase:
+    """Tablas en memoria compartidas por todos los clientes falsos del proceso."""
+
+    def __init__(self, tables=None, latency_ms=None, max_rows=None, foreign_keys=None, log_requests=False):
+        self.tables = {}
+        self.latency_ms = FAKE_SUPABASE_LATENCY_MS if latency_ms is None else latency_ms
+        self.max_rows = FAKE_SUPABASE_MAX_ROWS if max_rows is None else max_rows
+        self.foreign_keys = foreign_keys or FOREIGN_KEYS
+        self.lock = threading.RLock()
+        self.requests = 0
+        self.log = [] if log_requests else None
+        self._clock = 0
+        for name, rows in (tables or {}).items():
+            self.load(name, rows)
+
+    def table(self, name):
+        with self.lock:
+            if name not in self.tables:
+                self.tables[name] = FakeTable(name)
+            return self.tables[name]
+
+    def _timestamp(self):
+        # Marca de tiempo creciente aunque se inserten miles de filas en el mismo microsegundo
+        self._clock += 1
+        now = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+        return f"{now[:-6]}.{self._clock % 1000000:06d}+00:00"
+
+    def prepare_row(self, row):
+        row = dict(row)
+        if row.get("id") is None:
+            row["id"] = str(uuid.uuid4())
+        if "created_at" not in row:
+            row["created_at"] = self._timestamp()
+        return row
+
+    def load(self, name, rows):
+        """Carga masiva (sin latencia) con los mismos valores por defecto que insert."""
+        with self.lock:
+            table = self.table(name)
+            for row in rows:
+                table.put(self.prepare_row(row))
+        return len(rows)
+
+    def calls(self):
+        """(tabla, operación) de cada petición registrada en log."""
+        return [(q.table_name, q.op) for q in self.log or []]
+
+    def dump(self):
+        with self.lock:
+            return {name: [dict(r) for r in t.rows.values()] for name, t in self.tables.items()}
+
+    def load_json(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for name, rows in json.load(f).items():
+                self.load(name, rows)
+
+    def save_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.dump(), f, ensure_ascii=False, default=str)
+
+    def relation(self, base, embed_table, hint=None):
+        """("one", columna FK en base) o ("many", columna FK en embed_table)."""
+        base_fks = self.foreign_keys.get(base, {})
+        if hint and base_fks.get(hint) == embed_table:
+            return "one", hint
+        for column, target in base_fks.items():
+            if target == embed_table and not hint:
+                return "one", column
+        for column, target in self.foreign_keys.get(embed_table, {}).items():
+            if target == base and (not hint or hint == column):
+                return "many", column
+        raise _api_error(f"Could not find a relationship between '{base}' and '{embed_table}'", "PGRST200")
+
+
+class FakeQuery:
+    """Query builder encadenable con la interfaz de postgrest-py."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table_name = table
+        self.op = "select"
+        self.columns = "*"
+        self.filters = []
+        self.orders = []
+        self.window = None
+        self.limit_count = None
+        self.count = None
+        self.head = False
+        self.single_row = False
+        self.payload = None
+        self.on_conflict = "id"
+        self.ignore_duplicates = False
+        self.default_to_null = True
+        self._negate_next = False
+        self.or_expressions = []
+
+    # --- operación ---
+    def select(self, *columns, count=None, head=False):
+        self.columns = ",".join(columns) if columns else "*"
+        self.count = count
+        self.head = head
+        return self
+
+    def insert(self, json, count=None, returning="representation", upsert=False, default_to_null=True):
+        self.op, self.payload, self.count = ("upsert" if upsert else "insert"), json, count
+        self.default_to_null = default_to_null
+        return self
+
+    def upsert(self, json, count=None, returning="representation", ignore_duplicates=False,
+               on_conflict="", default_to_null=True):
+        self.op, self.payload, self.count = "upsert", json, count
+        self.on_conflict = on_conflict or "id"
+        self.ignore_duplicates = ignore_duplicates
+        self.default_to_null = default_to_null
+        return self
+
+    def update(self, json, count=None, returning="representation"):
+        self.op, self.payload, self.count = "update", json, count
+        return self
+
+    def delete(self, count=None, returning="representation"):
+        self.op, self.count = "delete", count
+        return self
+
+    # --- filtros ---
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def _filter(self, op, column, value):
+        negate, self._negate_next = self._negate_next, False
+        self.filters.append((negate,) + _make_filter(op, column, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column, value):
+        return self._filter("neq", column, value)
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def like(self, column, pattern):
+        return self._filter("like", column, pattern)
+
+    def ilike(self, column, pattern):
+        return self._filter("ilike", column, pattern)
+
+    def in_(self, column, values):
+        return self._filter("in", column, values)
+
+    def is_(self, column, value):
+        return self._filter("is", column, value)
+
+    def match(self, query):
+        for column, value in query.items():
+            self.eq(column, value)
+        return self
+
+    def or_(self, filters, reference_table=None):
+        self.filters.append(("or", _parse_or(filters)))
+        self.or_expressions.append(filters)
+        return self
+
+    # --- modificadores ---
+    def order(self, column, desc=False, nullsfirst=None, foreign_table=None):
+        self.orders.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, size, foreign_table=None):
+        self.limit_count = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self.window = (start, end)
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    # --- evaluación ---
+    def _candidates(self, table):
+        """Filas a evaluar: usa un índice si hay un eq/in_ sin negar; si no, toda la tabla."""
+        for f in self.filters:
+            if f[0] is False and f[1] in ("eq", "in"):
+                values = [f[3]] if f[1] == "eq" else f[3]
+                return [table.rows[pk] for pk in table.lookup(f[2], values)]
+        return list(table.rows.values())
+
+    def _row_matches(self, row):
+        for f in self.filters:
+            if f[0] == "or":
+                if not any(_matches(row, op, col, val) != neg for neg, op, col, val in f[1]):
+                    return False
+            elif _matches(row, f[1], f[2], f[3]) == f[0]:
+                return False
+        return True
+
+    def _matching_rows(self, table):
+        # Sin order() PostgREST no garantiza orden; aquí se conserva el de inserción
+        rows = [r for r in self._candidates(table) if self._row_matches(r)]
+        for column, desc, nulls_first in reversed(self.orders):
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: _SortKey(r[column]), reverse=desc)
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    def _project(self, table_name, row, spec):
+        out = {}
+        for kind, arg in spec:
+            if kind == "*":
+                out.update(row)
+            elif kind == "embed":
+                out[arg["alias"]] = self._embed(table_name, row, arg)
+            else:
+                out[arg] = row.get(kind)
+        return out
+
+    def _embed(self, base, row, embed):
+        kind, column = self.db.relation(base, embed["table"], embed["hint"])
+        target = self.db.table(embed["table"])
+        if kind == "one":
+            value = row.get(column)
+            if value is None:
+                return None
+            pks = target.lookup(target.primary_key, [value])
+            return self._project(embed["table"], target.rows[next(iter(pks))], embed["children"]) if pks else None
+        children = [target.rows[pk] for pk in target.lookup(column, [row.get(self.db.table(base).primary_key)])]
+        return [self._project(embed["table"], child, embed["children"]) for child in children]
+
+    def _run_select(self, table):
+        spec = parse_select(self.columns)
+        rows = self._matching_rows(table)
+        for kind, arg in spec:
+            if kind == "embed" and arg["inner"]:
+                rows = [r for r in rows if self._embed(self.table_name, r, arg)]
+        total = len(rows)
+        start, end = self.window if self.window else (0, len(rows) - 1)
+        if self.limit_count is not None:
+            end = min(end, start + self.limit_count - 1)
+        if self.db.max_rows:
+            end = min(end, start + self.db.max_rows - 1)
+        page = [] if self.head else [self._project(self.table_name, r, spec) for r in rows[start:end + 1]]
+        return page, total
+
+    def _run_write(self, table):
+        if self.op == "delete":
+            rows = self._matching_rows(table)
+            return [table.remove(r[table.primary_key]) for r in rows]
+        if self.op == "update":
+            changed = []
+            for row in self._matching_rows(table):
+                updated = dict(row, **self.payload)
+                table.put(updated)
+                changed.append(dict(updated))
+            return changed
+
+        payload = self.payload if isinstance(self.payload, list) else [self.payload]
+        # En un insert/upsert masivo PostgREST usa la unión de columnas: las que falten en una fila van NULL
+        columns = set().union(*(r.keys() for r in payload)) if payload else set()
+        if self.default_to_null:
+            payload = [{c: r.get(c) for c in columns} for r in payload]
+        conflict = [c.strip() for c in self.on_conflict.split(",")]
+        written = []
+        for raw in payload:
+            existing = None
+            if self.op == "upsert" and all(raw.get(c) is not None for c in conflict):
+                matches = [table.rows[pk] for pk in table.lookup(conflict[0], [raw[conflict[0]]])
+                           if all(_same(table.rows[pk].get(c), raw[c]) for c in conflict)]
+                existing = matches[0] if matches else None
+            if existing is not None:
+                if self.ignore_duplicates:
+                    continue
+                row = dict(existing, **{k: v for k, v in raw.items() if not (k == "id" and v is None)})
+            else:
+                if self.op == "insert" and raw.get("id") is not None and table.lookup(table.primary_key, [raw["id"]]):
+                    raise _api_error(f'duplicate key value violates unique constraint "{table.name}_pkey"', "23505")
+                row = self.db.prepare_row(raw)
+            table.put(row)
+            written.append(dict(row))
+        return written
+
+    def execute(self):
+        if self.db.latency_ms:
+            # Fuera del candado: peticiones concurrentes esperan en paralelo, como en la red
+            time.sleep(self.db.latency_ms / 1000)
+        with self.db.lock:
+            self.db.requests += 1
+            if self.db.log is not None:
+                self.db.log.append(self)
+            table = self.db.table(self.table_name)
+            if self.op == "select":
+                data, total = self._run_select(table)
+            else:
+                data = self._run_write(table)
+                total = len(data)
+        if self.single_row:
+            if len(data) != 1:
+                raise _api_error("JSON object requested, multiple (or no) rows returned", "PGRST116")
+            data = data[0]
+        return SimpleNamespace(data=data, count=total if self.count else None)
+
+
+class _SortKey:
+    """Orden estable entre tipos mezclados (fechas como texto, números, etc.)."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return _compare(self.value, other.value) < 0
+
+    def __eq__(self, other):
+        return _compare(self.value, other.value) == 0
+
+
+class FakeSupabaseClient:
+    """Cliente con table()/from_() sobre una FakeDatabase."""
+
+    def __init__(self, db=None, **kwargs):
+        self.db = db or FakeDatabase(**kwargs)
+
+    def table(self, name):
+        return FakeQuery(self.db, name)
+
+    def from_(self, name):
+        return self.table(name)
+
+
+_fake_db = None
+_fake_db_lock = threading.Lock()
+
+def get_fake_database():
+    """Base en memoria del proceso (cargada con FAKE_SUPABASE_SEED si está definido)."""
+    global _fake_db
+    if _fake_db is None:
+        with _fake_db_lock:
+            if _fake_db is None:
+                db = FakeDatabase()
+                if FAKE_SUPABASE_SEED and os.path.exists(FAKE_SUPABASE_SEED):
+                    db.load_json(FAKE_SUPABASE_SEED)
+                _fake_db = db
+    return _fake_db
+
+def get_fake_client():
+    return FakeSupabaseClient(get_fake_database())
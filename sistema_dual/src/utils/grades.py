@@ -0,0 +1,111 @@
+"""
+Consolidación de calificaciones DUAL (Fase 5).
+
+La calificación final se calcula para toda la cohorte con operaciones
+vectorizadas; la usan tanto la pantalla de captura como la exportación de Actas
+para que ambas muestren exactamente lo mismo.
+
+    final = min(10, (calificacion_ue / 10) * PESO_UE + calificacion_ie * PESO_IE)
+
+calificacion_ue va en escala 0-100 y calificacion_ie en escala 0-10.
+"""
+import numpy as np
+import pandas as pd
+from src.db_connection import get_supabase_client
+from src.utils.db_actions import BULK_WRITE_CHUNK
+
+PESO_UE = 0.7
+PESO_IE = 0.3
+CALIFICACION_MINIMA = 7.0
+
+GRADE_COLUMNS = ["calificacion_ue", "calificacion_ie"]
+
+ESTATUS_ACREDITADA = "Acreditada"
+ESTATUS_NO_ACREDITADA = "No Acreditada"
+ESTATUS_PENDIENTE = "Pendiente de Evaluar"
+
+def grades_frame(projects):
+    """
+    DataFrame de la cohorte a partir de proyectos_dual con alumnos(...) embebido.
+    Columnas: id, matricula, alumno, nombre_completo, calificacion_ue, calificacion_ie.
+    """
+    rows = []
+    for proj in projects:
+        student = proj.get("alumnos") or {}
+        rows.append({
+            "id": proj["id"],
+            "matricula": student.get("matricula", "S/N"),
+            "alumno": f"{student.get('nombre', '')} {student.get('ap_paterno', '')}".strip(),
+            "nombre_completo": f"{student.get('nombre', '')} {student.get('ap_paterno', '')} {student.get('ap_materno', '')}".strip(),
+            "calificacion_ue": proj.get("calificacion_ue"),
+            "calificacion_ie": proj.get("calificacion_ie"),
+        })
+    frame = pd.DataFrame(rows, columns=["id", "matricula", "alumno", "nombre_completo"] + GRADE_COLUMNS)
+    frame[GRADE_COLUMNS] = frame[GRADE_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    return frame
+
+def consolidate_grades(frame):
+    """
+    Agrega calificacion_final (NaN si falta alguna calificación), estatus y semaforo.
+    No modifica el DataFrame recibido.
+    """
+    frame = frame.copy()
+    ue = frame["calificacion_ue"].astype(float)
+    ie = frame["calificacion_ie"].astype(float)
+    complete = ue.notna() & ie.notna()
+    final = np.minimum(10.0, (ue / 10.0) * PESO_UE + ie * PESO_IE)
+    passed = final >= CALIFICACION_MINIMA
+    frame["calificacion_final"] = final.where(complete)
+    frame["estatus"] = np.select([~complete, passed], [ESTATUS_PENDIENTE, ESTATUS_ACREDITADA], ESTATUS_NO_ACREDITADA)
+    frame["semaforo"] = np.select([~complete, passed], ["🟡", "🟢"], "🔴")
+    return frame
+
+def acta_rows(frame):
+    """Filas para la plantilla Acta_Calificaciones_Materia.docx a partir de una cohorte consolidada."""
+    final = frame["calificacion_final"].map(lambda v: "N/A" if pd.isna(v) else f"{v:.2f}")
+    return [{
+        "numero": i + 1,
+        "matricula": matricula,
+        "nombre_alumno": nombre,
+        "calificacion_final": calificacion,
+        "calificacion_letra": estatus,
+    } for i, (matricula, nombre, calificacion, estatus) in enumerate(
+        zip(frame["matricula"], frame["nombre_completo"], final, frame["estatus"]))]
+
+def diff_grade_edits(original, edited):
+    """
+    Compara la cohorte original contra la editada (mismo orden de filas, p. ej. de st.data_editor).
+    Regresa {id: {columna: valor}} solo con las calificaciones que cambiaron (None = borrada).
+    """
+    before = original[GRADE_COLUMNS].astype(float).to_numpy()
+    after = edited[GRADE_COLUMNS].apply(pd.to_numeric, errors="coerce").astype(float).to_numpy()
+    changed = ~((before == after) | (np.isnan(before) & np.isnan(after)))
+    changes = {}
+    for r, c in zip(*np.nonzero(changed)):
+        value = after[r, c]
+        changes.setdefault(original["id"].iloc[r], {})[GRADE_COLUMNS[c]] = None if np.isnan(value) else float(value)
+    return changes
+
+def save_grade_edits(changes, supabase=None):
+    """
+    Guarda todas las calificaciones editadas. Los proyectos con el mismo cambio
+    (mismas columnas y valores) se escriben juntos con un update por bloque de
+    ids, así que solo viajan las columnas de calificación y no la fila completa.
+    Regresa (True, mensaje) o (False, error).
+    """
+    if not changes:
+        return True, "No hay cambios por guardar."
+    supabase = supabase or get_supabase_client()
+    try:
+        groups = {}
+        for project_id, payload in changes.items():
+            groups.setdefault(tuple(sorted(payload.items())), []).append(project_id)
+        written = 0
+        for payload, ids in groups.items():
+            for start in range(0, len(ids), BULK_WRITE_CHUNK):
+                res = supabase.table("proyectos_dual").update(dict(payload)) \
+                    .in_("id", ids[start:start + BULK_WRITE_CHUNK]).execute()
+                written += len(res.data or [])
+        return True, f"Se guardaron las calificaciones de {written} proyectos."
+    except Exception as e:
+        return False, str(e)
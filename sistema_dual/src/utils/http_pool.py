@@ -0,0 +1,163 @@
+"""
+Transporte HTTP compartido por el cliente de Supabase.
+
+get_supabase_client() pasa un único httpx.Client (ClientOptions.httpx_client)
+a los subclientes de PostgREST, storage, auth y functions, en lugar de que
+cada uno abra su propio pool con los valores por defecto de httpx. Así todas
+las sesiones de Streamlit comparten las mismas conexiones:
+
+- Pool HTTP/1.1 acotado (SUPABASE_POOL_MAX_CONNECTIONS): las sesiones reusan
+  conexiones TLS ya abiertas en lugar de abrir una por petición. HTTP/2 queda
+  como opción (SUPABASE_HTTP2=1, requiere h2): en tests/bench/bench_http_pool.py
+  baja el p95 pero sube el p50 frente al pool HTTP/1.1, así que no es el default.
+- Keep-alive largo: una conexión inactiva entre reruns no se cierra a los 5 s
+  (default de httpx) y no se repite el handshake en el siguiente clic.
+- Timeouts por fase: una petición colgada ya no retiene el hilo de la sesión
+  120 s (default de postgrest); esperar una conexión libre también tiene tope.
+
+PoolStatsTransport lleva la cuenta de conexiones abiertas/inactivas, peticiones
+en vuelo y esperas por conexión; query_metrics las expone en el panel de
+depuración (register_pool_stats).
+"""
+import os
+import weakref
+import threading
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# HTTP/2 con negociación ALPN (opcional, requiere el paquete h2; si falta se usa HTTP/1.1)
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "0").lower() in ("1", "true", "yes")
+# Conexiones simultáneas del proceso y cuántas se conservan abiertas entre peticiones
+SUPABASE_POOL_MAX_CONNECTIONS = int(os.getenv("SUPABASE_POOL_MAX_CONNECTIONS", "20"))
+SUPABASE_POOL_MAX_KEEPALIVE = int(os.getenv("SUPABASE_POOL_MAX_KEEPALIVE", "20"))
+# Segundos que una conexión inactiva sigue abierta
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60"))
+# Timeouts (s): conectar, leer respuesta, enviar cuerpo y esperar conexión libre del pool
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "30"))
+SUPABASE_WRITE_TIMEOUT = float(os.getenv("SUPABASE_WRITE_TIMEOUT", "30"))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "10"))
+
+
+def http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Cuerpo de la respuesta que avisa al transporte cuando se cierra."""
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close:
+                on_close()
+
+
+class PoolStatsTransport(httpx.HTTPTransport):
+    """
+    httpx.HTTPTransport con contadores del pool.
+    Una "espera" es una petición que llegó con el pool lleno y sin conexión
+    disponible (ni inactiva en HTTP/1.1 ni con streams libres en HTTP/2).
+    """
+
+    def __init__(self, limits, http1=True, http2=False, **kwargs):
+        super().__init__(limits=limits, http1=http1, http2=http2, **kwargs)
+        self.max_connections = limits.max_connections
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self._seen = weakref.WeakSet()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waits = 0
+        self.connections_opened = 0
+
+    def _connections(self):
+        return list(getattr(self._pool, "connections", []))
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def handle_request(self, request):
+        with self._lock:
+            self.requests += 1
+            connections = self._connections()
+            if (self.max_connections is not None and len(connections) >= self.max_connections
+                    and not any(c.is_available() for c in connections)):
+                self.waits += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = super().handle_request(request)
+        except Exception:
+            self._release()
+            raise
+        with self._lock:
+            for connection in self._connections():
+                if connection not in self._seen:
+                    self._seen.add(connection)
+                    self.connections_opened += 1
+        response.stream = _ReleasingStream(response.stream, self._release)
+        return response
+
+    def stats(self):
+        """Foto del pool: conexiones abiertas/inactivas y contadores desde el arranque."""
+        connections = self._connections()
+        idle = sum(1 for c in connections if c.is_idle())
+        with self._lock:
+            return {
+                "http2": self.http2,
+                "max_connections": self.max_connections,
+                "connections": len(connections),
+                "idle": idle,
+                "active": len(connections) - idle,
+                "http2_connections": sum(1 for c in connections if "HTTP/2" in c.info()),
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "waits": self.waits,
+                "connections_opened": self.connections_opened,
+            }
+
+
+def build_http_client(http2=None, http1=True, max_connections=None, max_keepalive=None,
+                      keepalive_expiry=None, timeout=None, **kwargs):
+    """
+    httpx.Client con el pool y los timeouts configurados (argumentos None = variables de entorno).
+    http1=False fuerza HTTP/2 sin TLS (prior knowledge), útil solo contra servidores locales.
+    """
+    http2 = SUPABASE_HTTP2 if http2 is None else http2
+    if http2 and not http2_available():
+        print("SUPABASE_HTTP2: el paquete h2 no está instalado, se usa HTTP/1.1")
+        http2, http1 = False, True
+    limits = httpx.Limits(
+        max_connections=max_connections or SUPABASE_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=max_keepalive or SUPABASE_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY if keepalive_expiry is None else keepalive_expiry,
+    )
+    timeout = timeout or httpx.Timeout(connect=SUPABASE_CONNECT_TIMEOUT, read=SUPABASE_READ_TIMEOUT,
+                                       write=SUPABASE_WRITE_TIMEOUT, pool=SUPABASE_POOL_TIMEOUT)
+    transport = PoolStatsTransport(limits, http1=http1, http2=http2)
+    return httpx.Client(transport=transport, timeout=timeout, follow_redirects=True, **kwargs)
+
+
+def pool_stats(client):
+    """Estadísticas del pool de un cliente creado con build_http_client (None si es otro)."""
+    transport = getattr(client, "_transport", None)
+    return transport.stats() if isinstance(transport, PoolStatsTransport) else None
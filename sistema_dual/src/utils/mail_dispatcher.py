@@ -0,0 +1,123 @@
+import os
+import queue
+import smtplib
+import threading
+from dotenv import load_dotenv
+from src.utils import notifications
+
+load_dotenv()
+
+# Sesiones SMTP simultáneas para envíos masivos
+MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "3"))
+# Reintentos por mensaje ante desconexiones o errores temporales (4xx)
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", "2"))
+
+def _is_transient(error):
+    """
+    Errores que justifican reconectar y reintentar el mismo mensaje: respuestas
+    4xx, desconexiones y errores de socket. Las 5xx (destinatario rechazado,
+    autenticación, contenido) son permanentes y se reportan sin reintentar.
+    Ojo: smtplib.SMTPException hereda de OSError.
+    """
+    code = getattr(error, "smtp_code", None)
+    if code is None and isinstance(error, smtplib.SMTPRecipientsRefused):
+        # Sin código propio: cuenta el de cada destinatario rechazado
+        codes = [c for c, _ in error.recipients.values()]
+        return bool(codes) and all(400 <= c < 500 for c in codes)
+    if code is not None:
+        return 400 <= code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+def _close(server):
+    if server is None:
+        return
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
+
+def _worker(jobs, results, stats):
+    """
+    Hilo del pool: mantiene una sesión SMTP abierta y envía por ella todos los
+    mensajes que toma de la cola, reconectando cuando la sesión se pierde.
+    """
+    server = None
+    try:
+        while True:
+            try:
+                index, message = jobs.get_nowait()
+            except queue.Empty:
+                break
+
+            to_email = message["to"]
+            try:
+                mime = notifications.build_message(
+                    to_email, message["subject"], message["template_name"],
+                    message.get("context", {}), message.get("attachments")
+                )
+            except Exception as e:
+                results[index] = (to_email, False, f"Error al construir correo: {str(e)}")
+                continue
+
+            attempt = 0
+            while True:
+                try:
+                    if server is None:
+                        server = notifications.open_smtp_connection()
+                        with stats["lock"]:
+                            stats["connections"] += 1
+                    server.sendmail(notifications.FROM_EMAIL, to_email, mime.as_string())
+                    results[index] = (to_email, True, "Correo enviado exitosamente")
+                    break
+                except Exception as e:
+                    if _is_transient(e) and attempt < MAIL_MAX_RETRIES:
+                        attempt += 1
+                        _close(server)
+                        server = None
+                        continue
+                    results[index] = (to_email, False, f"Error al enviar correo: {str(e)}")
+                    if _is_transient(e):
+                        _close(server)
+                        server = None
+                    break
+    finally:
+        _close(server)
+
+def send_many(messages, pool_size=None, stats=None):
+    """
+    Envía muchos correos reutilizando un pool pequeño de sesiones SMTP autenticadas.
+
+    messages: lista de dicts {"to", "subject", "template_name", "context", "attachments" (opcional)}
+              con la misma forma que los argumentos de notifications.send_email.
+    pool_size: sesiones simultáneas (por defecto MAIL_POOL_SIZE).
+    stats: dict opcional que se llena con {"connections": sesiones abiertas}.
+
+    Regresa una lista de tuplas (to_email, success, mensaje) en el mismo orden de entrada.
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+
+    jobs = queue.Queue()
+    for index, message in enumerate(messages):
+        jobs.put((index, message))
+
+    results = [None] * len(messages)
+    counters = {"connections": 0, "lock": threading.Lock()}
+    workers = [
+        threading.Thread(target=_worker, args=(jobs, results, counters), daemon=True)
+        for _ in range(max(1, min(pool_size or MAIL_POOL_SIZE, len(messages))))
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+    if stats is not None:
+        stats["connections"] = counters["connections"]
+    return results
@@ -0,0 +1,372 @@
+"""
+Bandeja de salida persistente (outbox) para correos.
+
+Las vistas encolan con enqueue_email() y regresan de inmediato; un proceso
+aparte drena la cola con reintentos y backoff exponencial:
+
+    python -m src.utils.mail_queue            # worker continuo
+    python -m src.utils.mail_queue --once     # procesa lo pendiente y termina
+
+El encolado es idempotente por (plantilla, destinatario, documento): mientras un
+mensaje con la misma llave siga pendiente se actualiza en lugar de duplicarse, y
+un mensaje idéntico ya enviado hace poco (MAIL_DEDUPE_WINDOW) no se vuelve a enviar.
+Si el contenido cambia mientras el mensaje se está enviando (p. ej. una contraseña
+regenerada), el contenido nuevo queda en la fila y el worker la regresa a
+pendiente al terminar, así que también se envía.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from contextlib import closing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "outbox.sqlite3")
+# Archivo SQLite compartido entre la app y el worker
+MAIL_OUTBOX_PATH = os.getenv("MAIL_OUTBOX_PATH", os.path.abspath(_DEFAULT_PATH))
+# Intentos totales antes de marcar un mensaje como fallido
+MAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("MAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+# Backoff: base * 2^(intento-1) segundos, con tope
+MAIL_OUTBOX_BACKOFF_BASE = float(os.getenv("MAIL_OUTBOX_BACKOFF_BASE", "30"))
+MAIL_OUTBOX_BACKOFF_MAX = float(os.getenv("MAIL_OUTBOX_BACKOFF_MAX", "3600"))
+# Segundos en los que un reenvío idéntico se considera doble clic
+MAIL_DEDUPE_WINDOW = float(os.getenv("MAIL_DEDUPE_WINDOW", "600"))
+# Mensajes "sending" más viejos que esto se consideran de un worker caído
+MAIL_OUTBOX_STALE_SECONDS = float(os.getenv("MAIL_OUTBOX_STALE_SECONDS", "600"))
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedupe_key TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    template_name TEXT NOT NULL,
+    recipient TEXT NOT NULL,
+    document_key TEXT NOT NULL DEFAULT '',
+    subject TEXT NOT NULL,
+    context_json TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_outbox_active
+    ON outbox(dedupe_key) WHERE status IN ('pending', 'sending');
+CREATE INDEX IF NOT EXISTS ix_outbox_due ON outbox(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS ix_outbox_key ON outbox(dedupe_key, status);
+CREATE TABLE IF NOT EXISTS outbox_attachments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id INTEGER NOT NULL REFERENCES outbox(id) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_attachments_msg ON outbox_attachments(message_id);
+"""
+
+def connect(path=None):
+    """
+    Abre la base de la outbox (creándola si no existe) en modo WAL, para que
+    la app pueda encolar mientras el worker lee.
+    """
+    path = path or MAIL_OUTBOX_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(_SCHEMA)
+    return conn
+
+def make_dedupe_key(template_name, to_email, document_key=""):
+    raw = "\x1f".join([template_name, (to_email or "").strip().lower(), document_key or ""])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _content_hash(subject, context_json, files=()):
+    """Huella del contenido: asunto, contexto y nombre/bytes de cada adjunto."""
+    digest = hashlib.sha256(f"{subject}\x1f{context_json}".encode("utf-8"))
+    for filename, payload in files:
+        # Un documento re-generado (p. ej. con calificaciones corregidas) es otro contenido
+        digest.update(f"\x1e{filename}\x1f".encode("utf-8"))
+        digest.update(hashlib.sha256(payload).digest())
+    return digest.hexdigest()
+
+def _read_attachments(attachments):
+    """
+    Normaliza adjuntos a (nombre, bytes). Las rutas se leen al encolar porque
+    pueden ser archivos temporales que ya no existan cuando corra el worker.
+    """
+    files = []
+    for attachment in attachments or []:
+        if isinstance(attachment, (tuple, list)):
+            filename, payload = attachment
+        elif os.path.exists(attachment):
+            filename = os.path.basename(attachment)
+            with open(attachment, "rb") as f:
+                payload = f.read()
+        else:
+            continue
+        files.append((filename, bytes(payload)))
+    return files
+
+def _store_attachments(conn, message_id, files):
+    conn.execute("DELETE FROM outbox_attachments WHERE message_id = ?", (message_id,))
+    conn.executemany(
+        "INSERT INTO outbox_attachments (message_id, filename, payload) VALUES (?, ?, ?)",
+        [(message_id, name, sqlite3.Binary(payload)) for name, payload in files]
+    )
+
+def enqueue_email(to_email, subject, template_name, context, attachments=None, document_key="", path=None):
+    """
+    Encola un correo para envío en segundo plano.
+    Mismos argumentos que notifications.send_email, más document_key para
+    identificar el documento adjunto (p. ej. "anexo_5.4:<proyecto_id>").
+
+    Regresa (True, mensaje) si quedó en cola (o ya lo estaba) y (False, error) si falló.
+    """
+    if not to_email:
+        return False, "Destinatario vacío"
+    try:
+        context_json = json.dumps(context or {}, ensure_ascii=False, sort_keys=True, default=str)
+        files = _read_attachments(attachments)
+        key = make_dedupe_key(template_name, to_email, document_key)
+        content_hash = _content_hash(subject, context_json, files)
+        now = time.time()
+
+        with closing(connect(path)) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                active = conn.execute(
+                    "SELECT id, status, content_hash FROM outbox WHERE dedupe_key = ? AND status IN (?, ?)",
+                    (key, STATUS_PENDING, STATUS_SENDING)
+                ).fetchone()
+                if active is not None:
+                    changed = active["content_hash"] != content_hash
+                    if active["status"] == STATUS_PENDING or changed:
+                        # Doble clic antes de que salga: gana el contenido más reciente.
+                        # Si ya se está enviando, process_due ve el content_hash distinto
+                        # y la regresa a pendiente para enviar también esta versión.
+                        conn.execute(
+                            "UPDATE outbox SET subject = ?, context_json = ?, content_hash = ?, updated_at = ? WHERE id = ?",
+                            (subject, context_json, content_hash, now, active["id"])
+                        )
+                        _store_attachments(conn, active["id"], files)
+                    conn.execute("COMMIT")
+                    if active["status"] == STATUS_SENDING and changed:
+                        return True, f"Correo en cola; se enviará de nuevo con el contenido actualizado (#{active['id']})"
+                    return True, f"El correo ya estaba en cola (#{active['id']})"
+
+                recent = conn.execute(
+                    "SELECT id FROM outbox WHERE dedupe_key = ? AND status = ? AND content_hash = ? AND sent_at >= ? "
+                    "ORDER BY sent_at DESC LIMIT 1",
+                    (key, STATUS_SENT, content_hash, now - MAIL_DEDUPE_WINDOW)
+                ).fetchone()
+                if recent is not None:
+                    conn.execute("COMMIT")
+                    return True, f"El correo ya fue enviado recientemente (#{recent['id']})"
+
+                cur = conn.execute(
+                    "INSERT INTO outbox (dedupe_key, content_hash, template_name, recipient, document_key, subject, "
+                    "context_json, status, attempts, next_attempt_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                    (key, content_hash, template_name, to_email.strip(), document_key or "", subject,
+                     context_json, STATUS_PENDING, now, now, now)
+                )
+                _store_attachments(conn, cur.lastrowid, files)
+                conn.execute("COMMIT")
+                return True, f"Correo en cola de envío (#{cur.lastrowid})"
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    except Exception as e:
+        return False, f"Error al encolar correo: {str(e)}"
+
+def _backoff_seconds(attempts):
+    return min(MAIL_OUTBOX_BACKOFF_BASE * (2 ** max(attempts - 1, 0)), MAIL_OUTBOX_BACKOFF_MAX)
+
+def requeue_stale(path=None, older_than=None):
+    """Regresa a 'pending' los mensajes que quedaron en 'sending' por un worker caído."""
+    limit = time.time() - (MAIL_OUTBOX_STALE_SECONDS if older_than is None else older_than)
+    with closing(connect(path)) as conn:
+        cur = conn.execute(
+            "UPDATE outbox SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+            (STATUS_PENDING, time.time(), STATUS_SENDING, limit)
+        )
+        return cur.rowcount
+
+def _claim_due(conn, batch_size, now):
+    """Toma hasta batch_size mensajes vencidos y los marca como 'sending'."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT * FROM outbox WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT ?",
+            (STATUS_PENDING, now, batch_size)
+        ).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(STATUS_SENDING, now, r["id"]) for r in rows]
+            )
+        conn.execute("COMMIT")
+        return rows
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def process_due(path=None, batch_size=50, pool_size=None):
+    """
+    Envía un lote de mensajes vencidos con el dispatcher SMTP en pool.
+    Éxitos: status 'sent' y se borran contexto y adjuntos (pueden incluir contraseñas).
+    Fallos: se reprograman con backoff exponencial o quedan 'failed' al agotar intentos.
+    Si el contenido se reemplazó mientras se enviaba, el mensaje vuelve a 'pending'
+    (intentos en cero) para enviar la versión nueva.
+
+    Regresa un dict {"claimed", "sent", "retry", "failed"}.
+    """
+    from src.utils.mail_dispatcher import send_many
+
+    summary = {"claimed": 0, "sent": 0, "retry": 0, "failed": 0}
+    with closing(connect(path)) as conn:
+        rows = _claim_due(conn, batch_size, time.time())
+        if not rows:
+            return summary
+        summary["claimed"] = len(rows)
+
+        messages = []
+        for r in rows:
+            files = conn.execute(
+                "SELECT filename, payload FROM outbox_attachments WHERE message_id = ? ORDER BY id", (r["id"],)
+            ).fetchall()
+            messages.append({
+                "to": r["recipient"],
+                "subject": r["subject"],
+                "template_name": r["template_name"],
+                "context": json.loads(r["context_json"] or "{}"),
+                "attachments": [(f["filename"], bytes(f["payload"])) for f in files] or None,
+            })
+
+        results = send_many(messages, pool_size=pool_size)
+
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for r, (_, success, msg) in zip(rows, results):
+                attempts = r["attempts"] + 1
+                current = conn.execute("SELECT content_hash FROM outbox WHERE id = ?", (r["id"],)).fetchone()
+                if current is not None and current["content_hash"] != r["content_hash"]:
+                    # Se encoló contenido nuevo durante el envío: se manda también
+                    conn.execute(
+                        "UPDATE outbox SET status = ?, attempts = 0, last_error = ?, next_attempt_at = ?, updated_at = ? "
+                        "WHERE id = ?",
+                        (STATUS_PENDING, None if success else msg, now, now, r["id"])
+                    )
+                    summary["sent" if success else "retry"] += 1
+                elif success:
+                    conn.execute(
+                        "UPDATE outbox SET status = ?, attempts = ?, sent_at = ?, updated_at = ?, "
+                        "last_error = NULL, context_json = NULL WHERE id = ?",
+                        (STATUS_SENT, attempts, now, now, r["id"])
+                    )
+                    conn.execute("DELETE FROM outbox_attachments WHERE message_id = ?", (r["id"],))
+                    summary["sent"] += 1
+                elif attempts >= MAIL_OUTBOX_MAX_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                        (STATUS_FAILED, attempts, msg, now, r["id"])
+                    )
+                    summary["failed"] += 1
+                else:
+                    conn.execute(
+                        "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ?, updated_at = ? "
+                        "WHERE id = ?",
+                        (STATUS_PENDING, attempts, msg, now + _backoff_seconds(attempts), now, r["id"])
+                    )
+                    summary["retry"] += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return summary
+
+def retry_failed(message_ids=None, path=None):
+    """
+    Reprograma mensajes fallidos (todos o los indicados) para un nuevo ciclo de intentos.
+    Se omiten los que ya tienen otro mensaje pendiente con la misma llave.
+    """
+    now = time.time()
+    count = 0
+    with closing(connect(path)) as conn:
+        rows = conn.execute("SELECT id FROM outbox WHERE status = ?", (STATUS_FAILED,)).fetchall()
+        for row in rows:
+            if message_ids and row["id"] not in message_ids:
+                continue
+            try:
+                count += conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                    (STATUS_PENDING, now, now, row["id"])
+                ).rowcount
+            except sqlite3.IntegrityError:
+                pass
+    return count
+
+def queue_stats(path=None):
+    """
+    Profundidad de la cola: {"pending", "sending", "sent", "failed", "oldest_pending_seconds"}.
+    """
+    stats = {STATUS_PENDING: 0, STATUS_SENDING: 0, STATUS_SENT: 0, STATUS_FAILED: 0, "oldest_pending_seconds": 0}
+    with closing(connect(path)) as conn:
+        for row in conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status"):
+            stats[row["status"]] = row["n"]
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM outbox WHERE status IN (?, ?)", (STATUS_PENDING, STATUS_SENDING)
+        ).fetchone()[0]
+    if oldest:
+        stats["oldest_pending_seconds"] = int(time.time() - oldest)
+    return stats
+
+def list_messages(limit=50, status=None, path=None):
+    """Últimos mensajes de la outbox (sin contexto ni adjuntos) para mostrar su estado."""
+    query = ("SELECT id, recipient, subject, template_name, document_key, status, attempts, "
+             "last_error, created_at, next_attempt_at, sent_at FROM outbox")
+    params = []
+    if status:
+        query += " WHERE status = ?"
+        params.append(status)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    with closing(connect(path)) as conn:
+        return [dict(r) for r in conn.execute(query, params).fetchall()]
+
+def run_worker(poll_interval=2.0, batch_size=50, once=False, path=None):
+    """Bucle del worker: drena la cola hasta que se detenga el proceso (o una vez con once=True)."""
+    from src.utils.notifications import prewarm_email_templates
+    prewarm_email_templates()
+    recovered = requeue_stale(path)
+    if recovered:
+        print(f"[mail_queue] {recovered} mensajes recuperados de un worker anterior", flush=True)
+    while True:
+        summary = process_due(path=path, batch_size=batch_size)
+        if summary["claimed"]:
+            print(f"[mail_queue] enviados={summary['sent']} reintento={summary['retry']} fallidos={summary['failed']}", flush=True)
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker de la outbox de correos del Sistema DUAL")
+    parser.add_argument("--once", action="store_true", help="Procesa lo pendiente y termina")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("MAIL_WORKER_INTERVAL", "2")))
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+    run_worker(poll_interval=args.interval, batch_size=args.batch, once=args.once)
@@ -0,0 +1,219 @@
+"""
+Asignación óptima de Mentores IE por afinidad.
+
+Costo de asignar un proyecto a un maestro:
+    PESO_CARRERA si la carrera del alumno no es la del maestro
+  + PESO_ASIGNATURA por cada asignatura inscrita del alumno que el maestro no imparte
+Cada maestro recibe a lo más CAPACIDAD_MAX proyectos en el periodo (contando los ya asignados).
+
+Es un flujo de costo mínimo con capacidades. Para que escale a miles de
+proyectos se agrupan los alumnos con la misma carrera y asignaturas, y los
+maestros con el mismo perfil; la red es dispersa (ver solve_matching) y se
+resuelve como LP con HiGHS. Después cada grupo de maestros se llena con el de
+menor carga primero.
+"""
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import linprog
+from dotenv import load_dotenv
+from src.db_connection import get_supabase_client
+from src.utils.db_actions import fetch_all_rows
+from src.utils.assignment import load_assignment_state, plan_least_loaded
+
+load_dotenv()
+
+PESO_CARRERA = float(os.getenv("MATCHING_PESO_CARRERA", "10"))
+PESO_ASIGNATURA = float(os.getenv("MATCHING_PESO_ASIGNATURA", "3"))
+# Proyectos por maestro en el periodo
+CAPACIDAD_MAX = int(os.getenv("MATCHING_CAPACIDAD_MAX", "15"))
+
+def _norm(text):
+    return " ".join(str(text or "").split()).casefold()
+
+def _profile_codes(owners, keys, subjects):
+    """
+    Agrupa dueños (alumnos o maestros) con el mismo perfil (carrera, asignaturas).
+    Regresa (código de grupo por dueño, tabla de grupos con carrera y asignaturas).
+    """
+    subj = subjects.groupby("owner")["asignatura_id"].agg(lambda s: tuple(sorted(set(s), key=str))).to_dict()
+    index = {}
+    codes = np.array([index.setdefault((key, subj.get(owner, ())), len(index)) for owner, key in zip(owners, keys)],
+                     dtype=int)
+    groups = pd.DataFrame(list(index), columns=["carrera", "asignaturas"])
+    return codes, groups
+
+def _incidence(groups, subject_index):
+    """Matriz dispersa grupo × asignatura (1 si el perfil incluye la asignatura)."""
+    rows, cols = [], []
+    for i, subjects in enumerate(groups["asignaturas"]):
+        for a in subjects:
+            rows.append(i)
+            cols.append(subject_index[a])
+    return sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(groups), len(subject_index)))
+
+def _pair_hub_flows(inflow, outflow):
+    """Empareja lo que entra a un nodo concentrador con lo que sale (cualquier orden es óptimo)."""
+    pairs, out = [], [list(o) for o in outflow]
+    k = 0
+    for i, f in inflow:
+        while f > 0:
+            j, cap = out[k]
+            take = min(f, cap)
+            pairs.append((i, j, take))
+            f -= take
+            out[k][1] -= take
+            if out[k][1] == 0:
+                k += 1
+    return pairs
+
+def solve_matching(student_groups, mentor_groups, supply, capacity):
+    """
+    Flujo de costo mínimo de grupos de alumnos (oferta) a grupos de maestros (capacidad).
+
+    Solo hay arco directo para los pares que comparten asignaturas (los no ceros del
+    producto disperso alumno×asignatura×maestro). Los pares sin asignaturas en común
+    cuestan lo mismo para cualquier maestro de la misma carrera (o de otra carrera),
+    así que pasan por un nodo concentrador por carrera y uno general: el número de
+    arcos crece con los pares afines, no con alumnos × maestros. Dejar un proyecto
+    sin asignar cuesta más que cualquier asignación.
+
+    La matriz de incidencia de la red es totalmente unimodular, así que el vértice
+    óptimo que regresa HiGHS es entero.
+    Regresa lista de (grupo_alumnos, grupo_maestros, proyectos, asignaturas_en_comun).
+    """
+    n_s, n_m = len(student_groups), len(mentor_groups)
+    if n_s == 0 or n_m == 0:
+        return []
+    subject_index = {a: i for i, a in enumerate(sorted(
+        set(a for g in student_groups["asignaturas"] for a in g) | set(a for g in mentor_groups["asignaturas"] for a in g),
+        key=str))}
+    common = (_incidence(student_groups, subject_index) @ _incidence(mentor_groups, subject_index).T).tocoo()
+    career_codes = {c: k for k, c in enumerate(sorted((set(student_groups["carrera"]) | set(mentor_groups["carrera"])) - {""}))}
+    s_car = student_groups["carrera"].map(lambda c: career_codes.get(c, -1)).to_numpy()
+    m_car = mentor_groups["carrera"].map(lambda c: career_codes.get(c, -1)).to_numpy()
+    n_subj = student_groups["asignaturas"].map(len).to_numpy(dtype=float)
+    n_hubs = 1 + len(career_codes)
+
+    # Arcos: origen (grupo de alumnos o concentrador) -> destino (grupo de maestros o concentrador)
+    d_i, d_j = common.row, common.col
+    d_cost = PESO_CARRERA * ((s_car[d_i] != m_car[d_j]) | (s_car[d_i] < 0)) + PESO_ASIGNATURA * (n_subj[d_i] - common.data)
+    own = np.nonzero(s_car >= 0)[0]
+    m_own = np.nonzero(m_car >= 0)[0]
+    arcs = [
+        # (grupo alumnos, concentrador origen, grupo maestros, concentrador destino, costo)
+        (d_i, -1, d_j, -1, d_cost),
+        (np.arange(n_s), -1, -1, 0, PESO_CARRERA + PESO_ASIGNATURA * n_subj),
+        (own, -1, -1, 1 + s_car[own], PESO_ASIGNATURA * n_subj[own]),
+        (-1, 0, np.arange(n_m), -1, np.zeros(n_m)),
+        (-1, 1 + m_car[m_own], m_own, -1, np.zeros(len(m_own))),
+    ]
+    max_cost = PESO_CARRERA + PESO_ASIGNATURA * float(n_subj.max(initial=0))
+    arcs.append((np.arange(n_s), -1, -1, -1, np.full(n_s, (max_cost + 1) * (float(supply.sum()) + 1))))
+
+    sizes = [len(a[4]) for a in arcs]
+    col = lambda v, n: np.full(n, v) if np.isscalar(v) else np.asarray(v)
+    src_g, src_h, dst_m, dst_h = (np.concatenate([col(a[k], n) for a, n in zip(arcs, sizes)]) for k in range(4))
+    cost = np.concatenate([a[4] for a in arcs])
+    arc = np.arange(len(cost))
+
+    # Igualdades: oferta de cada grupo de alumnos y conservación en concentradores
+    out_g, in_h, out_h = src_g >= 0, dst_h >= 0, src_h >= 0
+    a_eq = sparse.csr_matrix((
+        np.concatenate([np.ones(out_g.sum()), np.ones(in_h.sum()), -np.ones(out_h.sum())]),
+        (np.concatenate([src_g[out_g], n_s + dst_h[in_h], n_s + src_h[out_h]]),
+         np.concatenate([arc[out_g], arc[in_h], arc[out_h]]))), shape=(n_s + n_hubs, len(cost)))
+    b_eq = np.concatenate([supply, np.zeros(n_hubs)])
+    # Desigualdades: capacidad de cada grupo de maestros
+    in_m = dst_m >= 0
+    a_ub = sparse.csr_matrix((np.ones(in_m.sum()), (dst_m[in_m], arc[in_m])), shape=(n_m, len(cost)))
+
+    res = linprog(cost, A_ub=a_ub, b_ub=capacity, A_eq=a_eq, b_eq=b_eq, bounds=(0, None), method="highs")
+    if res.status != 0:
+        raise RuntimeError(f"No se pudo resolver la asignación: {res.message}")
+    flow = np.rint(res.x).astype(int)
+
+    common_at = dict(zip(zip(d_i.tolist(), d_j.tolist()), common.data.astype(int).tolist()))
+    direct = sizes[0]
+    pairs = [(int(d_i[k]), int(d_j[k]), int(flow[k])) for k in np.nonzero(flow[:direct])[0]]
+    for h in range(n_hubs):
+        inflow = [(int(src_g[k]), int(flow[k])) for k in np.nonzero((dst_h == h) & (flow > 0))[0]]
+        outflow = [(int(dst_m[k]), int(flow[k])) for k in np.nonzero((src_h == h) & (flow > 0))[0]]
+        pairs.extend(_pair_hub_flows(inflow, outflow))
+    return [(i, j, f, common_at.get((i, j), 0)) for i, j, f in pairs]
+
+def plan_affinity_assignment(capacity=None, supabase=None):
+    """
+    Calcula (sin escribir) la asignación por afinidad del periodo activo.
+    Regresa (True, plan) con la misma forma que plan_mentor_assignment más
+    "unassigned" (proyectos sin cupo) y "stats"; o (False, mensaje).
+    """
+    supabase = supabase or get_supabase_client()
+    capacity = CAPACIDAD_MAX if capacity is None else int(capacity)
+    ok, state = load_assignment_state(supabase, pending_columns="id, alumno_id, alumnos(carrera)")
+    if not ok:
+        return False, state
+    period_id, mentors, loads, pending = state["period_id"], state["mentors"], state["loads"], state["pending"]
+
+    # 1. Perfil de maestros: carrera (por nombre) y asignaturas que imparten
+    carreras = {c["id"]: c["nombre"] for c in (supabase.table("carreras").select("id, nombre").execute().data or [])}
+    res_m = supabase.table("maestros").select("id, carrera_id").eq("es_mentor_ie", True).execute()
+    mentor_career = {m["id"]: _norm(carreras.get(m.get("carrera_id"))) for m in (res_m.data or [])}
+    mentor_ids = list(mentors)
+    rel = pd.DataFrame(fetch_all_rows(lambda: supabase.table("rel_maestros_asignaturas")
+                                      .select("maestro_id, asignatura_id").order("maestro_id").order("asignatura_id")),
+                       columns=["maestro_id", "asignatura_id"]).rename(columns={"maestro_id": "owner"})
+    m_codes, m_groups = _profile_codes(mentor_ids, [mentor_career.get(m, "") for m in mentor_ids], rel)
+
+    # 2. Perfil de alumnos: carrera y asignaturas inscritas en el periodo
+    enrolled = pd.DataFrame(fetch_all_rows(lambda: supabase.table("inscripciones_asignaturas")
+                                           .select("id, alumno_id, asignatura_id").eq("periodo_id", period_id).order("id")),
+                            columns=["id", "alumno_id", "asignatura_id"]).rename(columns={"alumno_id": "owner"})
+    careers = [_norm((p.get("alumnos") or {}).get("carrera")) for p in pending]
+    p_codes, p_groups = _profile_codes([p["alumno_id"] for p in pending], careers, enrolled)
+
+    # 3. Flujo de costo mínimo entre grupos
+    remaining = np.maximum(capacity - np.array([loads[m] for m in mentor_ids], dtype=float), 0)
+    group_capacity = np.bincount(m_codes, weights=remaining, minlength=len(m_groups))
+    supply = np.bincount(p_codes, minlength=len(p_groups)).astype(float)
+    try:
+        flows = solve_matching(p_groups, m_groups, supply, group_capacity)
+    except RuntimeError as e:
+        return False, str(e)
+
+    # 4. Reparto dentro de cada grupo de maestros: menor carga primero
+    members, queue = {}, {}
+    for mentor_id, j in zip(mentor_ids, m_codes.tolist()):
+        members.setdefault(j, []).append(mentor_id)
+    for p, i in zip(pending, p_codes.tolist()):
+        queue.setdefault(i, []).append(p["id"])
+    per_mentor_group = {}
+    same_career = shared_subjects = 0
+    for i, j, f, common in flows:
+        chosen, queue[i] = queue[i][:f], queue[i][f:]
+        per_mentor_group.setdefault(j, []).extend(chosen)
+        if p_groups.at[i, "carrera"] and p_groups.at[i, "carrera"] == m_groups.at[j, "carrera"]:
+            same_career += f
+        shared_subjects += f * common
+    unassigned = [project_id for rest in queue.values() for project_id in rest]
+    assignments = {}
+    for j, project_ids in per_mentor_group.items():
+        assignments.update(plan_least_loaded(project_ids, {m: loads[m] for m in members[j]}))
+
+    after = dict(loads)
+    for mentor_id in assignments.values():
+        after[mentor_id] += 1
+    return True, {
+        "period_id": period_id,
+        "mentors": mentors,
+        "assignments": assignments,
+        "before": loads,
+        "after": after,
+        "unassigned": unassigned,
+        "stats": {
+            "misma_carrera": int(same_career),
+            "asignaturas_en_comun": int(shared_subjects),
+            "sin_asignar": len(unassigned),
+        },
+    }
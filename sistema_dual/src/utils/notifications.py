@@ -3,8 +3,9 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,47 +15,117 @@ SMTP_PORT = os.getenv("SMTP_PORT", 587)
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USER)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
+
+EMAIL_TEMPLATE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../templates/email'))
+# En "development" las plantillas se recargan al editarse; fuera de él se compilan una vez por proceso
+APP_ENV = os.getenv("APP_ENV", "production").lower()
+# Directorio del caché de bytecode de Jinja (por defecto, el temporal del sistema)
+EMAIL_TEMPLATE_CACHE_DIR = os.getenv("EMAIL_TEMPLATE_CACHE_DIR")
+
+_email_env = None
+_email_env_lock = threading.Lock()
+
+def get_email_environment():
+    """
+    Environment de Jinja compartido por todo el proceso.
+    Las plantillas compiladas quedan en memoria y su bytecode en disco, de modo que
+    ni los envíos masivos ni un proceso nuevo vuelven a compilar el HTML.
+    """
+    global _email_env
+    if _email_env is None:
+        with _email_env_lock:
+            if _email_env is None:
+                if EMAIL_TEMPLATE_CACHE_DIR:
+                    os.makedirs(EMAIL_TEMPLATE_CACHE_DIR, exist_ok=True)
+                    bytecode_cache = FileSystemBytecodeCache(EMAIL_TEMPLATE_CACHE_DIR)
+                else:
+                    bytecode_cache = FileSystemBytecodeCache()
+                _email_env = Environment(
+                    loader=FileSystemLoader(EMAIL_TEMPLATE_DIR),
+                    bytecode_cache=bytecode_cache,
+                    auto_reload=APP_ENV == "development",
+                )
+    return _email_env
+
+def prewarm_email_templates():
+    """
+    Compila todas las plantillas de src/templates/email al arrancar.
+    Regresa el número de plantillas listas.
+    """
+    env = get_email_environment()
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        env.get_template(name)
+    return len(names)
 
 def load_template(template_name, context):
     """
     Carga y renderiza una plantilla HTML usando Jinja2.
     """
-    template_dir = os.path.join(os.path.dirname(__file__), '../templates/email')
-    env = Environment(loader=FileSystemLoader(template_dir))
-    template = env.get_template(template_name)
+    template = get_email_environment().get_template(template_name)
     return template.render(context)
 
+def build_message(to_email, subject, template_name, context, attachments=None):
+    """
+    Construye el mensaje MIME (HTML renderizado + adjuntos) listo para enviarse.
+    attachments: lista de rutas absolutas a archivos para adjuntar, o tuplas
+    (nombre_archivo, bytes) para adjuntar contenido generado en memoria.
+    """
+    html_content = load_template(template_name, context)
+
+    msg = MIMEMultipart()
+    msg['From'] = FROM_EMAIL
+    msg['To'] = to_email
+    msg['Subject'] = subject
+
+    msg.attach(MIMEText(html_content, 'html'))
+    
+    if attachments:
+        for attachment in attachments:
+            if isinstance(attachment, (tuple, list)):
+                filename, payload = attachment
+            elif os.path.exists(attachment):
+                filename = os.path.basename(attachment)
+                with open(attachment, "rb") as f:
+                    payload = f.read()
+            else:
+                continue
+            part = MIMEBase("application", "octet-stream")
+            part.set_payload(payload)
+            encoders.encode_base64(part)
+            part.add_header(
+                "Content-Disposition",
+                f'attachment; filename="{filename}"'
+            )
+            msg.attach(part)
+
+    return msg
+
+def open_smtp_connection(timeout=30):
+    """
+    Abre una sesión SMTP autenticada con la configuración del entorno.
+    STARTTLS y login se omiten si SMTP_STARTTLS=false o no hay credenciales
+    (p. ej. un relay local de pruebas).
+    """
+    server = smtplib.SMTP(SMTP_SERVER, int(SMTP_PORT), timeout=timeout)
+    if SMTP_STARTTLS:
+        server.starttls()
+    if SMTP_USER and SMTP_PASSWORD:
+        server.login(SMTP_USER, SMTP_PASSWORD)
+    return server
+
 def send_email(to_email, subject, template_name, context, attachments=None):
     """
     Envía un correo electrónico HTML usando una plantilla.
-    attachments: lista de rutas absolutas a archivos para adjuntar.
+    attachments: lista de rutas absolutas a archivos para adjuntar, o tuplas
+    (nombre_archivo, bytes) para adjuntar contenido generado en memoria.
+    Para envíos masivos usar mail_dispatcher.send_many (reutiliza conexiones).
     """
     try:
-        html_content = load_template(template_name, context)
+        msg = build_message(to_email, subject, template_name, context, attachments)
 
-        msg = MIMEMultipart()
-        msg['From'] = FROM_EMAIL
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(html_content, 'html'))
-        
-        if attachments:
-            for filepath in attachments:
-                if os.path.exists(filepath):
-                    with open(filepath, "rb") as attachment:
-                        part = MIMEBase("application", "octet-stream")
-                        part.set_payload(attachment.read())
-                    encoders.encode_base64(part)
-                    part.add_header(
-                        "Content-Disposition",
-                        f'attachment; filename="{os.path.basename(filepath)}"'
-                    )
-                    msg.attach(part)
-
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
+        with open_smtp_connection() as server:
             server.sendmail(FROM_EMAIL, to_email, msg.as_string())
         
         return True, "Correo enviado exitosamente"
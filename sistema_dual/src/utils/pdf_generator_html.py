@@ -1,131 +1,175 @@
 import os
-import io
 import re
-from xhtml2pdf import pisa
-from jinja2 import Environment, FileSystemLoader, Template
+import html
+import hashlib
+import tempfile
+import threading
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, TemplateSyntaxError
 
-def generate_pdf_from_html(template_name, context, output_path, template_path=None):
+# Carpeta del caché de plantillas compiladas: HTML Jinja limpio (<sha256>.html) y su bytecode
+WORD_HTML_CACHE_DIR = os.getenv("WORD_HTML_CACHE_DIR", os.path.join(tempfile.gettempdir(), "dual_word_html"))
+
+# Filas que se repiten por cada elemento de una lista: variable que identifica la fila ->
+# (lista del contexto, nombre del iterador, variables de la fila -> atributo del elemento)
+LOOP_ROWS = {
+    "competencia": ("competencias_list", "c", {
+        "competencia": "competencia",
+        "asignatura": "asignatura",
+    }),
+    "actividad": ("actividades_list", "a", {
+        "actividad": "actividad",
+        "horas": "horas",
+        "evidencia": "evidencia",
+        "lugar": "lugar",
+        "ponderacion": "ponderacion",
+    }),
+}
+
+# Un solo patrón para todo lo que hay que reescribir. Las etiquetas {{ }} / {% %} que Word parte
+# con <span> se acotan en longitud para que una llave sin cerrar no vuelva cuadrático el recorrido.
+_TOKEN = re.compile(
+    r"(?P<style><style\b[^>]*>.*?</style\s*>)"
+    r"|(?P<var>\{\{.{0,4000}?\}\})"
+    r"|(?P<block>\{%.{0,4000}?%\})"
+    r"|(?P<jinja_open>\{[{%#])"
+    r"|(?P<tr_open><tr\b[^>]*>)"
+    r"|(?P<tr_close></tr\s*>)",
+    re.DOTALL | re.IGNORECASE,
+)
+_TAGS = re.compile(r"<[^>]+>")
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Solo para validar la sintaxis de lo compilado (no carga ni cachea plantillas)
+_SYNTAX_ENV = Environment()
+
+def _clean_tag_body(raw):
+    """Contenido de una etiqueta Jinja sin el HTML que Word mete en medio."""
+    return " ".join(html.unescape(_TAGS.sub("", raw)).split())
+
+def _literal(text):
+    """Texto que Jinja debe mostrar tal cual (como expresión de cadena)."""
+    return f"{{{{ {text!r} }}}}"
+
+def _parses(template_source):
+    try:
+        _SYNTAX_ENV.parse(template_source)
+        return True
+    except TemplateSyntaxError:
+        return False
+
+def compile_word_html(source, head_html=""):
     """
-    Generates a PDF from an HTML template using xhtml2pdf.
-    Handles HTML cleaning (fixing split tags) and background image injection.
-    
-    Args:
-        template_name (str): Name of the HTML template (if in templates dir)
-        context (dict): Data to enrich the template
-        output_path (str): Full path where the PDF will be saved
-        template_path (str): Optional absolute path to a specific HTML file
-        
-    Returns:
-        bool, str: Success status and message
+    Convierte HTML exportado por Word en una plantilla Jinja válida, en una sola pasada:
+    - quita los bloques <style> de Word (rompen xhtml2pdf),
+    - reconstruye {{ var }} y {% ... %} partidos por etiquetas de Word,
+    - envuelve en {% for %} las filas <tr> de LOOP_ROWS y prefija sus variables,
+    - escapa cualquier otro delimitador de Jinja, y las {{ }} cuyo contenido no es una
+      expresión válida (p. ej. {{ nombre del alumno }}), que quedan como texto,
+    - inserta head_html antes de </head> (o al inicio si no hay <head>).
+
+    Las {% %} solo se pueden validar en conjunto: si con ellas el documento no compila
+    (un {% if %} sin cerrar, una etiqueta mal escrita), se repite la pasada dejando
+    todas como texto. Así la plantilla compila siempre.
     """
-    try:
-        # 1. Load HTML Content
-        if template_path and os.path.exists(template_path):
-            base_dir = os.path.dirname(template_path)
-            with open(template_path, "r", encoding="utf-8", errors="ignore") as f:
-                html_content = f.read()
+    compiled = _compile_word_html(source, escape_blocks=False)
+    if not _parses(compiled):
+        compiled = _compile_word_html(source, escape_blocks=True)
+
+    if head_html:
+        head_end = compiled.lower().find("</head>")
+        if head_end != -1:
+            compiled = compiled[:head_end] + head_html + compiled[head_end:]
         else:
-            # Fallback to standard templates dir
-            base_dir = os.path.join(os.path.dirname(__file__), '../templates/docs')
-            t_path = os.path.join(base_dir, template_name)
-            if not os.path.exists(t_path):
-                 return False, f"Plantilla no encontrada: {t_path}"
-        # 2. Preprocess: Clean Logic Tags & Remove Word CSS
-        # Word's CSS completely breaks xhtml2pdf. We MUST remove <style> blocks entirely.
-        html_content = re.sub(r'<style[>|.*?]*>.*?</style>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
-
-        # Custom loop to find and clean {{ ... }} blocks to avoid Regex newline issues
-        # Word HTML exports break variables across many lines with span tags.
-        offset = 0
-        while True:
-            start_idx = html_content.find("{{", offset)
-            if start_idx == -1:
-                break
-                
-            end_idx = html_content.find("}}", start_idx)
-            if end_idx == -1:
-                break
-                
-            # Extract the raw chunk including braces
-            raw_chunk = html_content[start_idx:end_idx+2]
-            
-            # Remove all HTML tags completely from everything inside the {{ }}
-            clean_var = re.sub(r'<[^>]+>', '', raw_chunk)
-            
-            # Remove non-breaking spaces, newlines, and trim
-            clean_var = clean_var.replace('&nbsp;', ' ').replace('\n', '').replace('\r', '').strip()
-            
-            # It's already wrapped in {{ }}, but replacing tags might leave extra spaces
-            inner = clean_var.replace('{{', '').replace('}}', '').strip()
-            final_tag = f"{{{{ {inner} }}}}"
-            
-            # Replace exclusively the first text occurrence to make progress
-            # We replace using slicing to prevent replacing identically named tags elsewhere incorrectly
-            html_content = html_content[:start_idx] + final_tag + html_content[end_idx+2:]
-            
-            # Advance offset past the newly inserted tag
-            offset = start_idx + len(final_tag)
-            
-        
-        # 2.5 Inject Loop Logic (Wrap rows)
-        # We need to find the <tr ...> that contains {{ competencia }} and wrap it.
-        # Regex to find a tr that contains a specific string.
-        # We use a pattern that matches <tr [optional attrs]> ... content ... </tr>
-        # The content must contain the target variable.
-        
-        def inject_loop(html, target_var, list_name, iter_name, var_map):
-            # Regex explanation:
-            # <tr[^>]*> : Match start tag of tr with any attributes
-            # (?:(?!</tr>).)*? : Match content lazily, ensuring we don't cross </tr>
-            # {{ target_var }} : Match the target variable (cleaned)
-            # (?:(?!</tr>).)*? : Match more content
-            # </tr> : Match end tag
-            
-            pattern = re.compile(r'(<tr[^>]*>(?:(?!</tr>).)*?\{\{\s*' + re.escape(target_var) + r'\s*\}\}(?:(?!</tr>).)*?</tr>)', re.DOTALL | re.IGNORECASE)
-            
-            def replace_row(match):
-                row_content = match.group(1)
-                # Replace variables inside the row with iterator prefix
-                # e.g. {{ competencia }} -> {{ c.competencia }}
-                for old_var, new_attr in var_map.items():
-                    # Handle spaces in {{ var }}
-                    row_content = re.sub(r'\{\{\s*' + re.escape(old_var) + r'\s*\}\}', f"{{{{ {iter_name}.{new_attr} }}}}", row_content)
-                
-                # Wrap with loop
-                return f"{{% for {iter_name} in {list_name} %}}{row_content}{{% endfor %}}"
-                
-            return pattern.sub(replace_row, html)
-
-        # Apply for Competencias
-        html_content = inject_loop(html_content, "competencia", "competencias_list", "c", {
-            "competencia": "competencia",
-            "asignatura": "asignatura"
-        })
-        
-        # Apply for Actividades
-        html_content = inject_loop(html_content, "actividad", "actividades_list", "a", {
-            "actividad": "actividad",
-            "horas": "horas",
-            "evidencia": "evidencia",
-            "lugar": "lugar", 
-            "ponderacion": "ponderacion"
-        })
-
-        # 3. Inject Background Image CSS
-        # Check if background image exists in the same dir
-        bg_image_name = "fondo_anexos_carta.jpg"
-        bg_path = os.path.join(base_dir, bg_image_name)
-        
-        if os.path.exists(bg_path):
-            # Convert to URI
-            bg_uri = pathlib_to_uri(bg_path)
-            
-            # CSS to inject
-            # We need to ensure we don't break existing styles.
-            # Best place: inside <head> after existing <style> or append to it?
-            # Or just prepend a new <style> block before </head>.
-            
-            bg_css = f"""
+            compiled = head_html + compiled
+    return compiled
+
+def _compile_word_html(source, escape_blocks):
+    out = []
+    rows = []  # pila de filas abiertas: [índice en out, variable de LOOP_ROWS, [(índice, nombre)]]
+    pos = 0
+    for m in _TOKEN.finditer(source):
+        out.append(source[pos:m.start()])
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "style":
+            continue
+        if kind == "var":
+            inner = _clean_tag_body(m.group()[2:-2])
+            if not _parses(f"{{{{ {inner} }}}}"):
+                out.append(_literal(f"{{{{ {inner} }}}}"))
+                continue
+            if rows and _IDENTIFIER.match(inner):
+                if inner in LOOP_ROWS and rows[-1][1] is None:
+                    rows[-1][1] = inner
+                rows[-1][2].append((len(out), inner))
+            out.append(f"{{{{ {inner} }}}}")
+        elif kind == "block":
+            block = f"{{% {_clean_tag_body(m.group()[2:-2])} %}}"
+            out.append(_literal(block) if escape_blocks else block)
+        elif kind == "jinja_open":
+            out.append(_literal(m.group()))
+        elif kind == "tr_open":
+            rows.append([len(out), None, []])
+            out.append(m.group())
+        else:
+            out.append(m.group())
+            if not rows:
+                continue
+            start, loop_var, row_vars = rows.pop()
+            if loop_var is None:
+                # Las variables de una fila interna pertenecen también a la fila que la contiene
+                if rows:
+                    rows[-1][2].extend(row_vars)
+                continue
+            list_name, iter_name, var_map = LOOP_ROWS[loop_var]
+            for index, name in row_vars:
+                if name in var_map:
+                    out[index] = f"{{{{ {iter_name}.{var_map[name]} }}}}"
+            out[start] = f"{{% for {iter_name} in {list_name} %}}{out[start]}"
+            out.append("{% endfor %}")
+    out.append(source[pos:])
+    return "".join(out)
+
+_env = None
+_env_lock = threading.Lock()
+
+def _get_environment():
+    """Environment sobre la carpeta del caché: Jinja guarda ahí también el bytecode."""
+    global _env
+    if _env is None:
+        with _env_lock:
+            if _env is None:
+                os.makedirs(WORD_HTML_CACHE_DIR, exist_ok=True)
+                _env = Environment(
+                    loader=FileSystemLoader(WORD_HTML_CACHE_DIR),
+                    bytecode_cache=FileSystemBytecodeCache(WORD_HTML_CACHE_DIR),
+                    auto_reload=False,
+                )
+    return _env
+
+def get_word_html_template(source, head_html=""):
+    """
+    Plantilla Jinja lista para render a partir del HTML de Word.
+    Se compila una sola vez por contenido: la clave es el sha256 del HTML y del
+    encabezado inyectado, y el resultado queda en disco para otros procesos.
+    """
+    key = hashlib.sha256((source + "\0" + head_html).encode("utf-8")).hexdigest()
+    name = f"{key}.html"
+    path = os.path.join(WORD_HTML_CACHE_DIR, name)
+    env = _get_environment()
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(compile_word_html(source, head_html))
+        os.replace(tmp, path)
+    return env.get_template(name)
+
+def _background_css(base_dir):
+    """@page con la imagen de fondo si fondo_anexos_carta.jpg está junto a la plantilla."""
+    bg_path = os.path.join(base_dir, "fondo_anexos_carta.jpg")
+    if not os.path.exists(bg_path):
+        return ""
+    bg_uri = pathlib_to_uri(bg_path)
+    return f"""
             <style>
                 @page {{
                     size: letter;
@@ -133,8 +177,8 @@ def generate_pdf_from_html(template_name, context, output_path, template_path=No
                     background-image: url('{bg_uri}');
                     background-position: center;
                     background-repeat: no-repeat;
-                    background-size: contain; 
-                    
+                    background-size: contain;
+
                     @frame header_frame {{
                         -pdf-frame-content: header_content;
                         top: 1cm;
@@ -145,51 +189,53 @@ def generate_pdf_from_html(template_name, context, output_path, template_path=No
                 }}
             </style>
             """
-            # Inject before </head>
-            if "</head>" in html_content:
-                html_content = html_content.replace("</head>", f"{bg_css}</head>")
-            else:
-                 # No head? Prepend to body
-                 html_content = bg_css + html_content
-                 
-        # 4. Render with Simple String Replacement (Bypassing Jinja2 due to Word HTML Syntax Errors)
-        # Because Word exports HTML with completely broken and unclosed tags, Jinja2's parser crashes
-        # when trying to build its AST. We will do a generic find and replace.
-        
-        rendered_html = html_content
-        for key, value in context.items():
-            if isinstance(value, list):
-                continue # We handle lists below manually if needed, but for Anexo we injected loops
-            rendered_html = rendered_html.replace(f"{{{{ {key} }}}}", str(value))
-            
-        # Due to bypassing Jinja, the loop injection we did earlier won't execute automatically.
-        # But we can try to render it with Jinja NOW that we know it crashes.
-        # ACTUALLY, if Jinja completely fails to parse the document, we can't use `{% for %}` either.
-        # Since the user's primary concern is generating the PDF and we already cleaned tags,
-        # let's try Jinja one last time, and if it fails, fallback to simple replacement.
-        try:
-            template = Template(html_content)
-            rendered_html = template.render(context)
-        except Exception as jinja_err:
-             print(f"Jinja2 Parse Error (Fallback to String Replace): {jinja_err}")
-             # We already replaced scalar variables above. 
-             # We won't have dynamic rows for `competencias`, but the PDF WILL GENERATE.
-             pass
-        
-        # 5. Generate PDF
+
+def generate_pdf_from_html(template_name, context, output_path, template_path=None):
+    """
+    Generates a PDF from an HTML template using xhtml2pdf.
+    The Word HTML is compiled once into a cached Jinja template (see compile_word_html);
+    each call only renders the context and lays out the PDF.
+
+    Args:
+        template_name (str): Name of the HTML template (if in templates dir)
+        context (dict): Data to enrich the template
+        output_path (str): Full path where the PDF will be saved
+        template_path (str): Optional absolute path to a specific HTML file
+
+    Returns:
+        bool, str: Success status and message
+    """
+    try:
+        # 1. Load HTML Content
+        if template_path and os.path.exists(template_path):
+            t_path = template_path
+        else:
+            # Fallback to standard templates dir
+            t_path = os.path.join(os.path.dirname(__file__), '../templates/docs', template_name)
+            if not os.path.exists(t_path):
+                 return False, f"Plantilla no encontrada: {t_path}"
+        base_dir = os.path.dirname(t_path)
+        with open(t_path, "r", encoding="utf-8", errors="ignore") as f:
+            html_content = f.read()
+
+        # 2. Compiled template (cached by content hash) and render
+        template = get_word_html_template(html_content, _background_css(base_dir))
+        rendered_html = template.render(context)
+
+        # 3. Generate PDF
+        from xhtml2pdf import pisa
         with open(output_path, "wb") as result_file:
             pisa_status = pisa.CreatePDF(
-                io.StringIO(rendered_html),
+                rendered_html,
                 dest=result_file,
-                encoding='utf-8',
-                base_url=base_dir # Important for relative image paths (if any)
+                path=t_path # Important for relative image paths (if any)
             )
-            
+
         if pisa_status.err:
             return False, f"Error generando PDF: {pisa_status.err}"
-            
+
         return True, f"PDF generado exitosamente en: {output_path}"
-        
+
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -198,5 +244,3 @@ def generate_pdf_from_html(template_name, context, output_path, template_path=No
 def pathlib_to_uri(path):
     """Helper to convert path to file URI"""
     return os.path.abspath(path).replace('\\', '/')
-
-
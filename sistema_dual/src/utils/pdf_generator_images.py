@@ -1,59 +1,88 @@
-import matplotlib.pyplot as plt
 import os
+import io
+import math
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+
+# Colors matching the user's provided UI
+COLOR_PROGRESS = '#149B8D' # A teal/green color
+COLOR_REMAINING = '#D3D3D3' # Light gray
+
+# Lado final del PNG en pixeles (≈ la gráfica de 2.5in a 150 dpi que generaba matplotlib)
+DONUT_SIZE = 300
+# Se dibuja a 4x y se reduce para suavizar bordes (antialiasing)
+_SUPERSAMPLE = 4
+# Fuente opcional; si no existe se busca DejaVu Sans Bold y al final la fuente por defecto de Pillow
+DONUT_FONT_PATH = os.getenv("DONUT_FONT_PATH", "")
+
+def _load_font(size):
+    for candidate in (DONUT_FONT_PATH, "DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"):
+        if candidate:
+            try:
+                return ImageFont.truetype(candidate, size)
+            except OSError:
+                pass
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1: fuente bitmap sin tamaño
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=128)
+def _render_donut_png(percentage):
+    """Dibuja la dona de un porcentaje (0-100) con Pillow y regresa los bytes PNG."""
+    size = DONUT_SIZE * _SUPERSAMPLE
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    margin = size * 0.03
+    box = [margin, margin, size - margin, size - margin]
+    radius = (size - 2 * margin) / 2
+    center = size / 2
+
+    # Anillo gris completo y avance en sentido horario desde las 12
+    draw.ellipse(box, fill=COLOR_REMAINING)
+    if percentage > 0:
+        draw.pieslice(box, start=-90, end=-90 + 360 * percentage / 100, fill=COLOR_PROGRESS)
+    if 0 < percentage < 100:
+        # Separadores blancos entre segmentos
+        for angle in (math.radians(-90), math.radians(-90 + 360 * percentage / 100)):
+            draw.line([(center, center), (center + radius * math.cos(angle), center + radius * math.sin(angle))],
+                      fill="white", width=2 * _SUPERSAMPLE)
+    hole = radius * 0.65
+    draw.ellipse([center - hole, center - hole, center + hole, center + hole], fill=(0, 0, 0, 0))
+
+    # Texto al centro
+    draw.text((center, center - radius * 0.1), f"{percentage}%", fill="black", anchor="mm",
+              font=_load_font(int(size * 0.13)))
+    draw.text((center, center + radius * 0.25), "Porcentaje UE", fill="black", anchor="mm",
+              font=_load_font(int(size * 0.055)))
+
+    img = img.resize((DONUT_SIZE, DONUT_SIZE), Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+def percentage_donut_png(percentage):
+    """
+    PNG (bytes) de la dona de porcentaje, listo para InlineImage.
+    Solo hay 101 porcentajes posibles y cada uno se dibuja una sola vez por proceso.
+    """
+    percentage = max(0, min(100, int(round(percentage))))
+    return _render_donut_png(percentage)
 
 def create_percentage_donut(percentage: int, output_path: str):
     """
     Creates a donut chart representing a percentage, styled similar to
     the DUAL system requirements (Teal/Green for progress, Gray for remaining).
     Saves the output as a PNG file.
-    
+
     Args:
         percentage (int): 0 to 100
         output_path (str): The file path where the image will be saved.
     """
-    # Ensure percentages are clamped between 0 and 100
-    percentage = max(0, min(100, percentage))
-    remaining = 100 - percentage
-    
-    # Colors matching the user's provided UI
-    color_progress = '#149B8D' # A teal/green color
-    color_remaining = '#D3D3D3' # Light gray
-    
-    # Data to plot
-    sizes = [percentage, remaining]
-    colors = [color_progress, color_remaining]
-    
-    # Check if empty (e.g. 0%)
-    if percentage == 0:
-        sizes = [1, 99] # Just so the chart draws a circle of gray
-        colors = [color_remaining, color_remaining]
-        
-    # Check if full (100%)
-    if percentage == 100:
-        sizes = [100, 0]
-        colors = [color_progress, color_progress]
-    
-    # Create figure and axis
-    fig, ax = plt.subplots(figsize=(2.5, 2.5), dpi=150) # Smaller high-res image
-    
-    # Plot the pie chart
-    wedges, _ = ax.pie(sizes, colors=colors, startangle=90, counterclock=False,
-                       wedgeprops=dict(width=0.35, edgecolor='white', linewidth=2))
-    
-    # Add the text in the middle
-    ax.text(0, 0.1, f"{percentage}%", ha='center', va='center', fontsize=22, fontweight='bold', color='black')
-    ax.text(0, -0.25, "Porcentaje UE", ha='center', va='center', fontsize=9, fontweight='bold', color='black')
-    
-    # Equal aspect ratio ensures that pie is drawn as a circle
-    ax.axis('equal')  
-    
-    # Save the chart transparently
-    plt.tight_layout()
-    plt.savefig(output_path, transparent=True, bbox_inches='tight', pad_inches=0.1)
-    
-    # Close figure to free memory
-    plt.close(fig)
-    
+    with open(output_path, "wb") as f:
+        f.write(percentage_donut_png(percentage))
     return output_path
 
 if __name__ == "__main__":
@@ -0,0 +1,101 @@
+"""
+Fase 3: sincronización masiva de la bandeja de evaluaciones UE.
+
+Por cada proyecto de la bandeja genera el Anexo 5.4 (contextos con una
+consulta por tabla y documentos en paralelo con batch_docs), encola el correo
+al Mentor UE y al alumno en la outbox y marca anexo_54_enviado en los
+proyectos cuyos correos quedaron en cola.
+"""
+from src.db_connection import get_supabase_client
+from src.utils.db_actions import fetch_all_rows
+
+ANEXO_54_TEMPLATE = "Anexo_5.4_Reporte_de_Actividades.docx"
+
+# Bandeja de la Fase 3: proyectos con calificación UE registrada
+PHASE3_INBOX_COLUMNS = (
+    "id, alumno_id, calificacion_ue, "
+    "alumnos(matricula, nombre, ap_paterno, ap_materno, email_institucional, email_personal), "
+    "mentores_ue(nombre_completo, email)"
+)
+
+def get_phase3_inbox(supabase=None):
+    """Proyectos de la bandeja de la Fase 3 (todas las páginas de PostgREST)."""
+    supabase = supabase or get_supabase_client()
+    return fetch_all_rows(lambda: supabase.table("proyectos_dual").select(PHASE3_INBOX_COLUMNS)
+                          .not_.is_("calificacion_ue", "null").is_("anexo_54_enviado", True).order("id"))
+
+def _phase3_messages(project, docx_bytes):
+    """Correos (Mentor UE y alumno) con el Anexo 5.4 adjunto de un proyecto."""
+    st_info = project.get('alumnos') or {}
+    matr = st_info.get('matricula', 'S/N')
+    name = f"{st_info.get('nombre', '')} {st_info.get('ap_paterno', '')}".strip()
+    attachment = (f"Anexo_5.4_{matr}.docx", docx_bytes)
+    m_info = project.get('mentores_ue') or {}
+    m_email = m_info.get('email')
+    m_name = m_info.get('nombre_completo', 'Mentor')
+    s_email = st_info.get('email_institucional') or st_info.get('email_personal')
+    document_key = f"anexo_5.4:{project['id']}"
+
+    messages = []
+    if m_email:
+        ctx_mentor = {
+            "title": f"Anexo 5.4 Finalizado - {name}",
+            "message": f"<p>Estimado/a <strong>{m_name}</strong>,</p><p>La Coordinación ha sincronizado exitosamente la evaluación que registró en el portal para el estudiante <b>{name}</b>.</p><p>Se adjunta para su archivo el <strong>Anexo 5.4</strong>.</p>"
+        }
+        messages.append({"to": m_email, "subject": "Sistema DUAL - Anexo 5.4 Final", "template_name": "base_notification.html",
+                         "context": ctx_mentor, "attachments": [attachment], "document_key": document_key})
+    if s_email:
+        ctx_student = {
+            "title": "¡Evaluación Empresarial Lista!",
+            "message": f"<p>Hola <strong>{name}</strong>,</p><p>Tu coordinador ha procesado la calificación otorgada por tu Mentor en la Unidad Económica.</p><p>Adjuntamos tu <strong>Anexo 5.4</strong>.</p>"
+        }
+        messages.append({"to": s_email, "subject": "Sistema DUAL - Evaluación UE", "template_name": "base_notification.html",
+                         "context": ctx_student, "attachments": [attachment], "document_key": document_key})
+    return messages
+
+def sync_phase3_inbox(projects, max_workers=None, progress_callback=None, outbox_path=None, supabase=None):
+    """
+    Genera y encola el Anexo 5.4 de cada proyecto de la bandeja.
+    progress_callback(done, total, result) se llama por documento generado.
+    outbox_path: outbox alternativa (por defecto MAIL_OUTBOX_PATH).
+
+    Regresa un dict {"documents", "render_errors", "queued", "queued_projects", "failed"}:
+    failed son tuplas (correo, mensaje) de lo que no pudo encolarse.
+    """
+    from src.utils.anexo_data import get_anexo_5_4_data_bulk
+    from src.utils.batch_docs import render_documents_batch
+    from src.utils.mail_queue import enqueue_email
+
+    supabase = supabase or get_supabase_client()
+    by_student = {p['alumno_id']: p for p in projects}
+    # Contextos de toda la bandeja con una consulta por tabla
+    jobs = [
+        {"key": student_id, "template_name": ANEXO_54_TEMPLATE, "context": data}
+        for student_id, data, _ in get_anexo_5_4_data_bulk(list(by_student.keys())) if data
+    ]
+
+    summary = {"documents": 0, "render_errors": [], "queued": 0, "queued_projects": [], "failed": []}
+    queued_projects = {}
+    # Los documentos se generan en paralelo y se encolan conforme terminan
+    for result in render_documents_batch(jobs, max_workers=max_workers, progress_callback=progress_callback):
+        if not result["success"]:
+            summary["render_errors"].append((result["key"], result["error"]))
+            continue
+        summary["documents"] += 1
+        project = by_student[result["key"]]
+        for m in _phase3_messages(project, result["data"]):
+            queued, msg = enqueue_email(m["to"], m["subject"], m["template_name"], m["context"], m["attachments"],
+                                        document_key=m["document_key"], path=outbox_path)
+            if queued:
+                summary["queued"] += 1
+                queued_projects[project['id']] = True
+            else:
+                summary["failed"].append((m["to"], msg))
+
+    summary["queued_projects"] = list(queued_projects)
+    if summary["queued_projects"]:
+        from src.utils.anexo_data import IN_FILTER_CHUNK
+        ids = summary["queued_projects"]
+        for start in range(0, len(ids), IN_FILTER_CHUNK):
+            supabase.table("proyectos_dual").update({"anexo_54_enviado": True}).in_("id", ids[start:start + IN_FILTER_CHUNK]).execute()
+    return summary
@@ -0,0 +1,124 @@
+"""
+Consultas independientes en paralelo para las vistas de detalle.
+
+Las pantallas de detalle (expediente del alumno, detalle de maestro, de UE y de
+asignatura) hacían varias lecturas seguidas que no dependen entre sí; cada una
+espera su viaje de ida y vuelta a PostgREST. run_queries() las lanza juntas en
+un pool de hilos acotado y compartido por el proceso, así que la página tarda
+lo que la consulta más lenta y no la suma de todas:
+
+    res = run_queries({
+        "alumno": supabase.table("alumnos").select("*").eq("id", student_id),
+        "proyecto": supabase.table("proyectos_dual").select("*").eq("alumno_id", student_id),
+        "mentores_ie": lambda: get_maestros(solo_mentores_ie=True),
+    })
+    res["alumno"].data, res["proyecto"].data, res["mentores_ie"]
+
+Se usa un pool de hilos y no el cliente async de supabase porque toda la app
+(cliente cacheado, catálogos, instrumentación) es síncrona; las peticiones
+salen por el mismo httpx.Client compartido (http_pool), que ya las multiplexa.
+
+Cada consulta corre con una copia del contexto de quien llama: el colector de
+query_metrics del rerun sigue registrándolas, y el ScriptRunContext de
+Streamlit se adjunta al hilo mientras dura la tarea (st.cache_data funciona
+igual que en el hilo del script).
+"""
+import os
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Hilos del pool compartido por todas las sesiones (0 = ejecutar en serie).
+# Conviene que no pase de SUPABASE_POOL_MAX_CONNECTIONS para no esperar conexión.
+QUERY_BATCH_WORKERS = int(os.getenv("QUERY_BATCH_WORKERS", "16"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=QUERY_BATCH_WORKERS, thread_name_prefix="query_batch")
+    return _executor
+
+
+def _script_run_ctx():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    return get_script_run_ctx(suppress_warning=True)
+
+
+def _run_one(query):
+    """Ejecuta un query builder (.execute()) o una función sin argumentos."""
+    if hasattr(query, "execute"):
+        return query.execute()
+    return query()
+
+
+def _run_in_worker(query, script_ctx):
+    thread = threading.current_thread()
+    if script_ctx is not None:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(thread, script_ctx)
+    _local.in_worker = True
+    try:
+        return _run_one(query)
+    finally:
+        _local.in_worker = False
+        if script_ctx is not None:
+            # El hilo vuelve al pool: no debe quedar ligado a la sesión
+            setattr(thread, "streamlit_script_run_ctx", None)
+
+
+def _capture(fn, *args):
+    try:
+        return fn(*args), None
+    except Exception as e:
+        return None, e
+
+
+def run_queries(queries, return_exceptions=False):
+    """
+    Ejecuta consultas independientes en paralelo y regresa {nombre: resultado}.
+
+    queries: dict {nombre: query builder sin ejecutar o función sin argumentos}.
+             Las consultas no deben depender unas de otras; las que usan el
+             resultado de otra van en una segunda llamada.
+    return_exceptions: si es False (default) se esperan todas y se relanza el
+                       error de la primera que falló (en el orden del dict);
+                       si es True, el error queda como valor en su nombre.
+
+    La primera consulta corre en el hilo que llama y el resto en el pool. Con
+    una sola consulta, QUERY_BATCH_WORKERS=0 o desde dentro de otra tarea del
+    pool (lotes anidados) todo corre en serie, sin tocar el pool.
+    """
+    names = list(queries)
+    if len(names) <= 1 or QUERY_BATCH_WORKERS <= 0 or getattr(_local, "in_worker", False):
+        outcomes = {name: _capture(_run_one, queries[name]) for name in names}
+    else:
+        executor = _get_executor()
+        script_ctx = _script_run_ctx()
+        futures = {
+            name: executor.submit(contextvars.copy_context().run, _capture, _run_in_worker, queries[name], script_ctx)
+            for name in names[1:]
+        }
+        outcomes = {names[0]: _capture(_run_one, queries[names[0]])}
+        for name in names[1:]:
+            outcomes[name] = futures[name].result()
+
+    results = {}
+    for name in names:
+        value, error = outcomes[name]
+        if error is not None and not return_exceptions:
+            raise error
+        results[name] = error if error is not None else value
+    return results
@@ -0,0 +1,243 @@
+"""
+Instrumentación de las consultas a Supabase/PostgREST.
+
+Con QUERY_METRICS=1, get_supabase_client() regresa el cliente envuelto en
+InstrumentedClient: cada .execute() registra tabla, método, filtros, filas,
+bytes de la respuesta y latencia en el colector del rerun actual (un
+contextvars.ContextVar, así que cada sesión de Streamlit tiene el suyo).
+
+- app.py abre un colector por rerun (start_rerun) y lo cierra al final
+  (finish_rerun), que acumula los totales por vista en view_stats().
+- Las consultas que tardan más de SLOW_QUERY_MS se agregan como JSON por
+  línea a SLOW_QUERY_LOG.
+- El panel de depuración del dashboard muestra las más lentas del rerun.
+- Los pools HTTP registrados (register_pool_stats) reportan conexiones
+  abiertas/inactivas y esperas en get_pool_stats().
+"""
+import os
+import json
+import time
+import threading
+import contextvars
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Activa el cliente instrumentado (0 = cliente de Supabase sin envoltura)
+QUERY_METRICS = os.getenv("QUERY_METRICS", "0").lower() in ("1", "true", "yes")
+# Consultas más lentas que esto (ms) se escriben en el log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+_DEFAULT_LOG = os.path.join(os.path.dirname(__file__), "..", "..", "data", "slow_queries.jsonl")
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.abspath(_DEFAULT_LOG))
+
+# Métodos del query builder que cuentan como operación y no como filtro
+_OPERATIONS = {"select", "insert", "update", "upsert", "delete"}
+# Métodos que solo cambian la forma de la respuesta; no se listan como filtros
+_MODIFIERS = {"order", "limit", "range", "single", "maybe_single", "csv", "explain"}
+# Elementos de una lista que se muestran en un filtro (in_ con cientos de ids)
+_MAX_LIST_ITEMS = 3
+
+_current = contextvars.ContextVar("query_collector", default=None)
+_view_stats = {}
+_stats_lock = threading.Lock()
+_log_lock = threading.Lock()
+_pool_providers = {}
+
+
+class QueryCollector:
+    """Consultas de un rerun de Streamlit."""
+
+    def __init__(self, view=None):
+        self.view = view or "-"
+        self.calls = []
+
+    def record(self, call):
+        call["view"] = self.view
+        self.calls.append(call)
+
+    def summary(self, top=10):
+        """{"view", "calls", "total_ms", "rows", "bytes", "by_table", "slowest"} del rerun."""
+        by_table = {}
+        for c in self.calls:
+            t = by_table.setdefault(c["table"], {"table": c["table"], "calls": 0, "total_ms": 0.0})
+            t["calls"] += 1
+            t["total_ms"] += c["ms"]
+        return {
+            "view": self.view,
+            "calls": len(self.calls),
+            "total_ms": round(sum(c["ms"] for c in self.calls), 1),
+            "rows": sum(c["rows"] for c in self.calls),
+            "bytes": sum(c["bytes"] for c in self.calls),
+            "by_table": sorted(by_table.values(), key=lambda t: -t["calls"]),
+            "slowest": sorted(self.calls, key=lambda c: -c["ms"])[:top],
+        }
+
+
+def start_rerun(view=None):
+    """Abre el colector del rerun actual y lo regresa."""
+    collector = QueryCollector(view)
+    _current.set(collector)
+    return collector
+
+def current_collector():
+    return _current.get()
+
+def set_view(view):
+    """Nombre de la vista que se está dibujando (para agrupar por vista)."""
+    collector = _current.get()
+    if collector is not None:
+        collector.view = view
+
+def finish_rerun(collector=None):
+    """Acumula el rerun en los totales por vista del proceso."""
+    collector = collector or _current.get()
+    if collector is None:
+        return
+    with _stats_lock:
+        stats = _view_stats.setdefault(collector.view, {"view": collector.view, "reruns": 0, "calls": 0,
+                                                         "total_ms": 0.0, "max_calls": 0})
+        stats["reruns"] += 1
+        stats["calls"] += len(collector.calls)
+        stats["total_ms"] += sum(c["ms"] for c in collector.calls)
+        stats["max_calls"] = max(stats["max_calls"], len(collector.calls))
+
+def view_stats():
+    """Totales por vista desde que arrancó el proceso, con promedio de consultas por rerun."""
+    with _stats_lock:
+        rows = [dict(s) for s in _view_stats.values()]
+    for s in rows:
+        s["avg_calls"] = round(s["calls"] / s["reruns"], 1) if s["reruns"] else 0
+        s["total_ms"] = round(s["total_ms"], 1)
+    return sorted(rows, key=lambda s: -s["avg_calls"])
+
+def reset_view_stats():
+    with _stats_lock:
+        _view_stats.clear()
+
+def register_pool_stats(name, provider):
+    """provider: función sin argumentos que regresa un dict con el estado del pool (o None)."""
+    _pool_providers[name] = provider
+
+def get_pool_stats():
+    """{nombre: estadísticas} de los pools HTTP registrados."""
+    stats = {}
+    for name, provider in list(_pool_providers.items()):
+        try:
+            value = provider()
+        except Exception:
+            # Diagnóstico: un pool cerrado no debe romper el panel
+            value = None
+        if value is not None:
+            stats[name] = value
+    return stats
+
+
+def _short(value):
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        shown = ", ".join(map(str, items[:_MAX_LIST_ITEMS]))
+        return f"[{shown}{', …' if len(items) > _MAX_LIST_ITEMS else ''}] ({len(items)})"
+    text = str(value)
+    return text if len(text) <= 60 else text[:57] + "..."
+
+def _payload_bytes(data):
+    if data is None:
+        return 0
+    try:
+        return len(json.dumps(data, default=str, separators=(",", ":")).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+def _write_slow_query(call):
+    line = json.dumps(dict(call, ts=time.strftime("%Y-%m-%dT%H:%M:%S")), default=str, ensure_ascii=False)
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG), exist_ok=True)
+            with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError:
+        # El log es diagnóstico: nunca debe romper la vista
+        pass
+
+def record_query(table, method, filters, data, ms):
+    """Registra una consulta ejecutada en el colector actual y, si es lenta, en el log."""
+    call = {
+        "table": table,
+        "method": method,
+        "filters": " ".join(filters),
+        "rows": len(data) if isinstance(data, list) else (0 if data is None else 1),
+        "bytes": _payload_bytes(data),
+        "ms": round(ms, 1),
+    }
+    collector = _current.get()
+    if collector is not None:
+        collector.record(call)
+    else:
+        call["view"] = "-"
+    if ms >= SLOW_QUERY_MS:
+        _write_slow_query(call)
+    return call
+
+
+class _InstrumentedQuery:
+    """Envuelve un query builder de postgrest: anota los filtros y mide .execute()."""
+
+    def __init__(self, builder, table, method=None, filters=()):
+        self._builder = builder
+        self._table = table
+        self._method = method
+        self._filters = tuple(filters)
+
+    def _wrap(self, result, name, args, kwargs):
+        if not hasattr(result, "execute"):
+            return result
+        method, filters = self._method, self._filters
+        if name in _OPERATIONS:
+            method = name
+        elif name not in _MODIFIERS:
+            parts = [_short(a) for a in args] + [f"{k}={_short(v)}" for k, v in kwargs.items()]
+            filters += (f"{name}({', '.join(parts)})" if parts or name != "not_" else "not",)
+        return _InstrumentedQuery(result, self._table, method, filters)
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if callable(attr) and not hasattr(attr, "execute"):
+            def call(*args, **kwargs):
+                return self._wrap(attr(*args, **kwargs), name, args, kwargs)
+            return call
+        # Propiedades como not_ regresan el mismo builder
+        return self._wrap(attr, name, (), {})
+
+    def execute(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self._builder.execute(*args, **kwargs)
+        except Exception:
+            record_query(self._table, self._method or "select", self._filters + ("error",), None,
+                         (time.perf_counter() - start) * 1000)
+            raise
+        record_query(self._table, self._method or "select", self._filters, getattr(response, "data", None),
+                     (time.perf_counter() - start) * 1000)
+        return response
+
+
+class InstrumentedClient:
+    """Cliente de Supabase con table()/from_()/rpc() instrumentados; el resto se delega."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _InstrumentedQuery(self._client.table(name), name)
+
+    def from_(self, name):
+        return _InstrumentedQuery(self._client.from_(name), name)
+
+    def rpc(self, fn, *args, **kwargs):
+        return _InstrumentedQuery(self._client.rpc(fn, *args, **kwargs), f"rpc:{fn}", "rpc")
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+def instrument_client(client):
+    return client if isinstance(client, InstrumentedClient) else InstrumentedClient(client)
@@ -0,0 +1,290 @@
+"""
+Cohortes sintéticas para pruebas de carga y benchmarks.
+
+generate_cohort(n) arma un universo completo y coherente (llaves foráneas
+válidas) con la forma del esquema real: carreras, periodos (uno activo y el
+anterior), asignaturas con competencias y actividades, maestros y su relación
+con asignaturas, unidades económicas con sus mentores, alumnos, proyectos
+DUAL e inscripciones. Con la misma semilla el resultado es idéntico (ids
+incluidos), así que los benchmarks comparan lo mismo entre commits.
+
+load_cohort() lo carga en bloque: directo a la FakeDatabase si el cliente es
+el backend en memoria, o con bulk_upsert_rows (una petición por bloque) en
+cualquier otro backend, p. ej. un Supabase local.
+
+Uso:
+    python -m src.utils.synthetic_cohort --students 1000 --out data/cohorte_1000.json
+    FAKE_SUPABASE_SEED=data/cohorte_1000.json SUPABASE_BACKEND=fake streamlit run streamlit_app.py
+"""
+import json
+import uuid
+import random
+import argparse
+from datetime import date, datetime, timedelta, timezone
+
+DEFAULT_SEED = 2026
+
+# Orden de carga: cada tabla después de las que referencia
+TABLE_ORDER = [
+    "carreras", "periodos", "asignaturas", "asignatura_competencias", "actividades_aprendizaje",
+    "maestros", "rel_maestros_asignaturas", "unidades_economicas", "mentores_ue",
+    "alumnos", "proyectos_dual", "inscripciones_asignaturas",
+]
+# Tablas sin columna id propia: upsert por su llave compuesta
+ON_CONFLICT = {"rel_maestros_asignaturas": "maestro_id, asignatura_id"}
+
+CARRERAS = [
+    ("ISC", "Ingeniería en Sistemas Computacionales"),
+    ("IIN", "Ingeniería Industrial"),
+    ("IME", "Ingeniería Mecatrónica"),
+    ("IGE", "Ingeniería en Gestión Empresarial"),
+    ("IQU", "Ingeniería Química"),
+    ("IEL", "Ingeniería Electrónica"),
+]
+SEMESTRES_DUAL = (6, 7, 8, 9)
+ASIGNATURAS_POR_SEMESTRE = 5
+COMPETENCIAS_POR_ASIGNATURA = 3
+ACTIVIDADES_POR_COMPETENCIA = 3
+# Proporciones de la cohorte (sobre alumnos o proyectos del periodo activo)
+ALUMNOS_POR_MAESTRO = 15
+ALUMNOS_POR_UE = 10
+MENTOR_IE_ASIGNADO = 0.85
+EVALUADO_UE = 0.70
+EVALUADO_IE = 0.50
+CONVENIO_TERMINA = 0.60
+CON_PROYECTO_ANTERIOR = 0.20
+
+NOMBRES = ["Ana", "Luis", "María", "José", "Fernanda", "Carlos", "Daniela", "Jorge", "Valeria", "Miguel",
+           "Sofía", "Diego", "Ximena", "Alejandro", "Regina", "Ricardo", "Camila", "Eduardo", "Paola", "Iván"]
+APELLIDOS = ["López", "García", "Hernández", "Martínez", "González", "Pérez", "Rodríguez", "Sánchez",
+             "Ramírez", "Cruz", "Flores", "Gómez", "Morales", "Vázquez", "Jiménez", "Reyes", "Díaz", "Torres"]
+EMPRESA_PREFIJOS = ["Grupo", "Industrias", "Soluciones", "Tecnologías", "Servicios", "Manufacturas", "Corporativo"]
+EMPRESA_NOMBRES = ["Aztlán", "Texcoco", "Anáhuac", "Nexus", "Vértice", "Orbital", "Tlaloc", "Pirámide", "Quetzal", "Altiplano"]
+TEMAS = ["Automatización", "Análisis de Datos", "Control de Calidad", "Logística", "Desarrollo Web",
+         "Mantenimiento Predictivo", "Optimización de Procesos", "Sistemas Embebidos", "Seguridad Industrial"]
+EVIDENCIAS = ["Reporte técnico", "Bitácora", "Presentación", "Prototipo", "Manual de usuario", "Código fuente"]
+LUGARES = ["UE", "IE", "Remoto"]
+
+
+class _CohortBuilder:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.base_time = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+        self.clock = 0
+
+    def uid(self):
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def created_at(self):
+        # Orden de creación estable (created_at decide el "proyecto más reciente")
+        self.clock += 1
+        return (self.base_time + timedelta(seconds=self.clock)).isoformat()
+
+    def person(self):
+        return self.rng.choice(NOMBRES), self.rng.choice(APELLIDOS), self.rng.choice(APELLIDOS)
+
+
+def _periodos(b):
+    def periodo(nombre, inicio, fin, activo):
+        fases = {}
+        span = (fin - inicio).days
+        for i, (ini_key, fin_key) in enumerate([("inicio_anexo_1", "fin_anexo_1"), ("inicio_anexo_2", "fin_anexo_2"),
+                                                ("inicio_anexo_3", "fin_anexo_3"), ("inicio_doc_4", "fin_doc_4"),
+                                                ("inicio_doc_5", "fin_doc_5")]):
+            fases[ini_key] = str(inicio + timedelta(days=span * i // 5))
+            fases[fin_key] = str(inicio + timedelta(days=span * (i + 1) // 5 - 1))
+        return dict({"id": b.uid(), "nombre": nombre, "fecha_inicio": str(inicio), "fecha_fin": str(fin),
+                     "fecha_limite_registro": str(inicio + timedelta(days=14)), "activo": activo,
+                     "carrera_id": None, "created_at": b.created_at()}, **fases)
+    return [periodo("2025-2", date(2025, 8, 18), date(2025, 12, 19), False),
+            periodo("2026-1", date(2026, 1, 26), date(2026, 6, 26), True)]
+
+
+def generate_cohort(students, seed=DEFAULT_SEED):
+    """
+    Regresa {tabla: [filas]} con una cohorte de `students` alumnos en el periodo activo.
+    El catálogo (carreras, asignaturas, competencias, actividades) no depende del tamaño;
+    maestros, empresas y mentores crecen con la cohorte.
+    """
+    b = _CohortBuilder(seed)
+    rng = b.rng
+    data = {name: [] for name in TABLE_ORDER}
+
+    # Catálogo académico
+    for _, nombre in CARRERAS:
+        data["carreras"].append({"id": b.uid(), "nombre": nombre, "created_at": b.created_at()})
+    data["periodos"] = _periodos(b)
+    anterior, activo = data["periodos"]
+
+    subjects_by_semester = {}
+    for carrera, (clave, _) in zip(data["carreras"], CARRERAS):
+        for semestre in SEMESTRES_DUAL:
+            for n in range(1, ASIGNATURAS_POR_SEMESTRE + 1):
+                tema = rng.choice(TEMAS)
+                asig = {"id": b.uid(), "clave_asignatura": f"{clave}-{semestre}{n:02d}",
+                        "nombre": f"{tema} {semestre}.{n}", "semestre": semestre,
+                        "carrera_id": carrera["id"], "created_at": b.created_at()}
+                data["asignaturas"].append(asig)
+                subjects_by_semester.setdefault((carrera["id"], semestre), []).append(asig)
+                for num in range(1, COMPETENCIAS_POR_ASIGNATURA + 1):
+                    comp = {"id": b.uid(), "asignatura_id": asig["id"], "numero_competencia": num,
+                            "descripcion_competencia": f"Competencia {num} de {asig['nombre']}: aplica {tema.lower()} "
+                                                       f"en un entorno productivo real con criterios de calidad.",
+                            "created_at": b.created_at()}
+                    data["asignatura_competencias"].append(comp)
+                    for act in range(1, ACTIVIDADES_POR_COMPETENCIA + 1):
+                        data["actividades_aprendizaje"].append({
+                            "id": b.uid(), "competencia_id": comp["id"],
+                            "descripcion_actividad": f"Actividad {num}.{act}: {rng.choice(TEMAS).lower()} aplicada al proyecto",
+                            "horas_dedicacion": rng.choice([10, 15, 20, 30, 40]),
+                            "evidencia": rng.choice(EVIDENCIAS), "lugar": rng.choice(LUGARES),
+                            "ponderacion": round(100.0 / ACTIVIDADES_POR_COMPETENCIA, 1),
+                            "created_at": b.created_at(),
+                        })
+
+    # Maestros (la mitad son Mentores IE) y quién imparte cada asignatura
+    teachers_by_carrera, mentors_ie_by_carrera = {}, {}
+    for i in range(max(len(CARRERAS) * 2, students // ALUMNOS_POR_MAESTRO)):
+        carrera = data["carreras"][i % len(CARRERAS)]
+        nombre, ap1, ap2 = b.person()
+        maestro = {"id": b.uid(), "clave_maestro": f"MAE-{i:05d}", "nombre_completo": f"{nombre} {ap1} {ap2}",
+                   "email_institucional": f"maestro{i:05d}@docentes.example.edu",
+                   "es_mentor_ie": (i // len(CARRERAS)) % 2 == 0,
+                   "carrera_id": carrera["id"], "created_at": b.created_at()}
+        data["maestros"].append(maestro)
+        teachers_by_carrera.setdefault(carrera["id"], []).append(maestro)
+        if maestro["es_mentor_ie"]:
+            mentors_ie_by_carrera.setdefault(carrera["id"], []).append(maestro)
+
+    teacher_by_subject = {}
+    for asig in data["asignaturas"]:
+        for maestro in rng.sample(teachers_by_carrera[asig["carrera_id"]], 2):
+            data["rel_maestros_asignaturas"].append({"maestro_id": maestro["id"], "asignatura_id": asig["id"]})
+            teacher_by_subject.setdefault(asig["id"], maestro["id"])
+
+    # Unidades económicas con 1 a 3 mentores cada una
+    mentors_by_ue = {}
+    for i in range(max(5, students // ALUMNOS_POR_UE)):
+        ue = {"id": b.uid(), "nombre_comercial": f"{rng.choice(EMPRESA_PREFIJOS)} {rng.choice(EMPRESA_NOMBRES)} {i:04d}",
+              "razon_social": f"Empresa Sintética {i:04d} S.A. de C.V.", "rfc": f"SYN{i:06d}XX0",
+              "created_at": b.created_at()}
+        data["unidades_economicas"].append(ue)
+        for j in range(rng.randint(1, 3)):
+            nombre, ap1, ap2 = b.person()
+            mentor = {"id": b.uid(), "ue_id": ue["id"], "nombre_completo": f"{nombre} {ap1} {ap2}",
+                      "email": f"mentor{i:04d}.{j}@empresa.example.com", "password_hash": None,
+                      "created_at": b.created_at()}
+            data["mentores_ue"].append(mentor)
+            mentors_by_ue.setdefault(ue["id"], []).append(mentor)
+
+    # Alumnos, proyectos (algunos con un proyecto del periodo anterior) e inscripciones
+    fin_periodo = date.fromisoformat(activo["fecha_fin"])
+    previous_projects, projects = [], []
+    for i in range(students):
+        carrera = data["carreras"][rng.randrange(len(CARRERAS))]
+        semestre = rng.choice(SEMESTRES_DUAL)
+        nombre, ap1, ap2 = b.person()
+        matricula = f"2022{i:06d}"
+        alumno = {"id": b.uid(), "matricula": matricula, "curp": f"SYNT{i:06d}HMCXXX{i % 10}{i % 7}",
+                  "nombre": nombre, "ap_paterno": ap1, "ap_materno": ap2,
+                  "email_institucional": f"{matricula}@alumnos.example.edu",
+                  "email_personal": f"alumno{matricula}@correo.example.com",
+                  "carrera": carrera["nombre"], "carrera_id": carrera["id"], "semestre": str(semestre),
+                  "tipo_ingreso": "Nuevo Ingreso", "estatus": "Activo", "created_at": b.created_at()}
+        data["alumnos"].append(alumno)
+
+        ue = data["unidades_economicas"][rng.randrange(len(data["unidades_economicas"]))]
+        mentor_ue = rng.choice(mentors_by_ue[ue["id"]])
+        tema = rng.choice(TEMAS)
+        if rng.random() < CON_PROYECTO_ANTERIOR:
+            previous_projects.append({
+                "id": b.uid(), "alumno_id": alumno["id"], "periodo_id": anterior["id"], "ue_id": ue["id"],
+                "mentor_ue_id": mentor_ue["id"], "mentor_ie_id": None, "nombre_proyecto": f"{tema} (anterior)",
+                "descripcion_proyecto": f"Proyecto previo de {tema.lower()}.",
+                "fecha_inicio_convenio": anterior["fecha_inicio"], "fecha_fin_convenio": anterior["fecha_fin"],
+                "calificacion_ue": None, "calificacion_ie": None, "anexo_54_enviado": False,
+                "created_at": (b.base_time - timedelta(days=120, seconds=-i)).isoformat(),
+            })
+
+        mentors_ie = mentors_ie_by_carrera.get(carrera["id"], [])
+        mentor_ie = rng.choice(mentors_ie) if mentors_ie and rng.random() < MENTOR_IE_ASIGNADO else None
+        evaluado_ue = mentor_ie is not None and rng.random() < EVALUADO_UE
+        termina = rng.random() < CONVENIO_TERMINA
+        projects.append({
+            "id": b.uid(), "alumno_id": alumno["id"], "periodo_id": activo["id"], "ue_id": ue["id"],
+            "mentor_ue_id": mentor_ue["id"], "mentor_ie_id": mentor_ie["id"] if mentor_ie else None,
+            "nombre_proyecto": f"{tema} en {ue['nombre_comercial']}",
+            "descripcion_proyecto": f"Implementación de {tema.lower()} en las operaciones de la unidad económica.",
+            "marco_teorico": f"Fundamentos de {tema.lower()} aplicados a la industria.",
+            "fecha_inicio_convenio": activo["fecha_inicio"],
+            "fecha_fin_convenio": str(fin_periodo if termina else fin_periodo + timedelta(days=rng.choice([90, 180]))),
+            "calificacion_ue": round(rng.uniform(7.0, 10.0), 1) if evaluado_ue else None,
+            "calificacion_ie": round(rng.uniform(7.0, 10.0), 1) if evaluado_ue and rng.random() < EVALUADO_IE else None,
+            # La bandeja de la Fase 3 lista los evaluados ya marcados como enviados
+            "anexo_54_enviado": evaluado_ue,
+            "created_at": b.created_at(),
+        })
+
+        candidates = subjects_by_semester[(carrera["id"], semestre)]
+        for asig in rng.sample(candidates, rng.randint(ASIGNATURAS_POR_SEMESTRE - 1, ASIGNATURAS_POR_SEMESTRE)):
+            data["inscripciones_asignaturas"].append({
+                "id": b.uid(), "alumno_id": alumno["id"], "periodo_id": activo["id"], "asignatura_id": asig["id"],
+                "maestro_id": teacher_by_subject[asig["id"]], "grupo": f"{semestre}{rng.randint(1, 3)}01",
+                "descripcion_actividades": f"Actividades de {asig['nombre']} dentro del proyecto DUAL.",
+                "parcial_1": True, "parcial_2": True, "parcial_3": True, "created_at": b.created_at(),
+            })
+
+    data["proyectos_dual"] = previous_projects + projects
+    return data
+
+
+def cohort_counts(data):
+    return {name: len(data.get(name, [])) for name in TABLE_ORDER}
+
+
+def load_cohort(data, supabase=None, chunk_size=None):
+    """
+    Carga la cohorte en el backend, tabla por tabla en TABLE_ORDER.
+    Con el backend en memoria usa FakeDatabase.load (sin latencia ni paginación);
+    con Supabase hace upserts por bloques.
+    Regresa {tabla: filas cargadas}.
+    """
+    from src.db_connection import get_supabase_client
+    from src.utils.db_actions import bulk_upsert_rows, BULK_WRITE_CHUNK
+    from src.utils.fake_backend import FakeDatabase
+
+    supabase = supabase or get_supabase_client()
+    fake_db = getattr(supabase, "db", None)
+    loaded = {}
+    for name in TABLE_ORDER:
+        rows = data.get(name, [])
+        if isinstance(fake_db, FakeDatabase):
+            loaded[name] = fake_db.load(name, rows)
+        else:
+            loaded[name] = bulk_upsert_rows(name, rows, on_conflict=ON_CONFLICT.get(name, "id"),
+                                            chunk_size=chunk_size or BULK_WRITE_CHUNK, supabase=supabase)
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--out", help="JSON {tabla: [filas]} compatible con FAKE_SUPABASE_SEED")
+    parser.add_argument("--load", action="store_true", help="Cargar en el backend configurado (SUPABASE_BACKEND)")
+    args = parser.parse_args()
+
+    data = generate_cohort(args.students, seed=args.seed)
+    for name, count in cohort_counts(data).items():
+        print(f"{name:>28} {count:>8}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        print(f"Cohorte guardada en {args.out}")
+    if args.load:
+        loaded = load_cohort(data)
+        print(f"Filas cargadas: {sum(loaded.values())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import streamlit as st
 import base64
-import os
 import textwrap
 
 def load_image_as_base64(path):
@@ -235,19 +234,11 @@ def inject_custom_css():
     """, unsafe_allow_html=True)
 
 def render_header():
-    """Renders the custom header with base64 logos."""
-    # Define paths - Correcting filenames based on user screenshot
-    # logo_institucional_tese.png
-    # logo_dual_sistema.png
-    # logo_estado_mexico.png
-    
-    base_path = os.path.join(os.path.dirname(__file__), "../assets/images/logos")
-    if not os.path.exists(base_path):
-        # Fallback or check if running from root without src in path (unlikely with our fix)
-        base_path = "src/assets/images/logos"
+    """Renders the custom header with the optimized logos (static URL or cached data URI)."""
+    from src.utils.assets import logo_src
 
-    logo_tese = load_image_as_base64(os.path.join(base_path, "logo_institucional_tese.png"))
-    logo_edomex = load_image_as_base64(os.path.join(base_path, "logo_estado_mexico.png"))
+    logo_tese = logo_src("tese")
+    logo_edomex = logo_src("edomex")
     
     # HTML IMG tags with refined styling
     img_tese = f'<img src="{logo_tese}" style="height: 60px; width: auto;">' if logo_tese else ''
@@ -0,0 +1,129 @@
+"""
+Carga masiva de la Lista Blanca desde CSV.
+
+Todo el archivo se normaliza y valida con operaciones vectorizadas de pandas;
+después se consultan las matrículas existentes por bloques y las nuevas se
+escriben con upsert(on_conflict="matricula") por bloques, en lugar de dos
+peticiones HTTP por fila.
+"""
+import os
+import pandas as pd
+from dotenv import load_dotenv
+from src.db_connection import get_supabase_client
+
+load_dotenv()
+
+# Filas por petición (consulta de existentes y upsert)
+WHITELIST_CHUNK_SIZE = int(os.getenv("WHITELIST_CHUNK_SIZE", "500"))
+# Formato aceptado de matrícula (tras pasar a mayúsculas)
+MATRICULA_PATTERN = os.getenv("MATRICULA_PATTERN", r"^[A-Z0-9][A-Z0-9-]{4,19}$")
+CURP_PATTERN = r"^[A-Z]{4}\d{6}[HMX][A-Z]{5}[A-Z0-9]\d$"
+
+REQUIRED_COLUMNS = ["MATRICULA", "NOMBRE COMPLETO"]
+
+def _text_column(df, column):
+    """Columna como texto recortado; vacía si no existe. Corrige matrículas leídas como float (2021.0)."""
+    if column not in df.columns:
+        return pd.Series("", index=df.index)
+    values = df[column].astype("string").fillna("").str.strip()
+    return values.str.replace(r"^(\d+)\.0$", r"\1", regex=True)
+
+def normalize_whitelist_frame(df):
+    """
+    Normaliza y valida el CSV completo.
+    Regresa (validas, invalidas): DataFrames con columnas fila, matricula, curp,
+    nombre_completo (y motivo en las inválidas). "fila" es el número de fila
+    en el archivo, contando el encabezado como fila 1.
+    """
+    df = df.copy()
+    df.columns = [str(c).upper().strip() for c in df.columns]
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"El archivo debe contener al menos las columnas: {', '.join(REQUIRED_COLUMNS)}")
+
+    frame = pd.DataFrame({
+        "fila": range(2, len(df) + 2),
+        "matricula": _text_column(df, "MATRICULA").str.upper().str.replace(r"\s+", "", regex=True).to_numpy(),
+        "curp": _text_column(df, "CURP").str.upper().str.replace(r"\s+", "", regex=True).to_numpy(),
+        "nombre_completo": _text_column(df, "NOMBRE COMPLETO").str.replace(r"\s+", " ", regex=True).to_numpy(),
+    })
+
+    # Si aplican varios motivos se reporta el más básico (los últimos tienen prioridad)
+    motivo = pd.Series("", index=frame.index)
+    checks = [
+        (frame["curp"].ne("") & ~frame["curp"].str.fullmatch(CURP_PATTERN), "CURP inválida"),
+        (frame["nombre_completo"].eq(""), "Nombre completo vacío"),
+        (~frame["matricula"].str.fullmatch(MATRICULA_PATTERN), "Formato de matrícula inválido"),
+        (frame["matricula"].eq(""), "Matrícula vacía"),
+    ]
+    for mask, reason in checks:
+        motivo = motivo.mask(mask.fillna(True).astype(bool), reason)
+
+    invalid = frame[motivo.ne("")].assign(motivo=motivo[motivo.ne("")])
+    valid = frame[motivo.eq("")]
+    return valid.reset_index(drop=True), invalid.reset_index(drop=True)
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def import_whitelist(df, carrera_id=None, supabase=None, chunk_size=None, progress_callback=None):
+    """
+    Importa un CSV de Lista Blanca (leído con dtype=str) para la carrera indicada.
+
+    progress_callback: función opcional (bloques_terminados, total_bloques).
+
+    Regresa un reporte {"inserted", "skipped", "invalid"}: listas de dicts
+    {"fila", "matricula", "nombre_completo", "motivo"} ordenadas por fila.
+    """
+    supabase = supabase or get_supabase_client()
+    chunk_size = chunk_size or WHITELIST_CHUNK_SIZE
+    valid, invalid = normalize_whitelist_frame(df)
+
+    # 1. Duplicados dentro del mismo archivo: se conserva la primera aparición
+    first_row = valid.groupby("matricula")["fila"].transform("first")
+    dup_mask = valid["fila"].ne(first_row)
+    skipped = valid[dup_mask].assign(motivo="Matrícula duplicada en el archivo (fila " + first_row[dup_mask].astype(str) + ")")
+    candidates = valid[~dup_mask]
+
+    # 2. Matrículas que ya están en la lista blanca (una consulta por bloque)
+    matriculas = candidates["matricula"].tolist()
+    chunks = list(_chunks(matriculas, chunk_size))
+    # Hay a lo más tantos bloques de alta como de consulta
+    total_steps = len(chunks) * 2
+    existing = set()
+    for i, chunk in enumerate(chunks):
+        res = supabase.table("lista_blanca").select("matricula").in_("matricula", chunk).execute()
+        existing.update(r["matricula"] for r in (res.data or []))
+        if progress_callback:
+            progress_callback(i + 1, total_steps)
+    exists_mask = candidates["matricula"].isin(existing)
+    skipped = pd.concat([skipped, candidates[exists_mask].assign(motivo="Ya existe en la lista blanca")])
+    new_rows = candidates[~exists_mask]
+
+    # 3. Alta por bloques; ignore_duplicates evita errores si otra carga insertó la misma matrícula
+    records = [{
+        "matricula": r.matricula,
+        "curp": r.curp or None,
+        "nombre_completo": r.nombre_completo,
+        "registrado": False,
+        "carrera_id": carrera_id,
+    } for r in new_rows.itertuples(index=False)]
+    inserted_matriculas = set()
+    record_chunks = list(_chunks(records, chunk_size))
+    for i, chunk in enumerate(record_chunks):
+        res = supabase.table("lista_blanca").upsert(chunk, on_conflict="matricula", ignore_duplicates=True).execute()
+        inserted_matriculas.update(r["matricula"] for r in (res.data or []))
+        if progress_callback:
+            progress_callback(len(chunks) + i + 1, total_steps)
+    if progress_callback and total_steps:
+        progress_callback(total_steps, total_steps)
+
+    inserted_mask = new_rows["matricula"].isin(inserted_matriculas)
+    inserted = new_rows[inserted_mask].assign(motivo="")
+    skipped = pd.concat([skipped, new_rows[~inserted_mask].assign(motivo="Ya existe en la lista blanca (alta concurrente)")])
+
+    def _rows(frame):
+        return frame.sort_values("fila")[["fila", "matricula", "nombre_completo", "motivo"]].to_dict("records")
+
+    return {"inserted": _rows(inserted), "skipped": _rows(skipped), "invalid": _rows(invalid)}
@@ -1,14 +1,26 @@
 # Force Reload
 import streamlit as st
 import pandas as pd
-import os
 import re
 from src.db_connection import get_supabase_client
 from src.views.registro_coordinador import render_registro_coordinador
 from src.utils.helpers import sanitize_input
 from src.utils.anexo_data import get_anexo_5_1_data
-from src.utils.pdf_generator_docx import generate_docx_document
+from src.utils.pdf_generator_docx import render_docx_bytes
+from src.utils.cohort_export import build_generic_context
 from src.utils.email_sender import send_document_email
+from src.utils.catalogs import get_unidades_economicas, get_mentores_ue, get_asignaturas, get_maestros
+from src.utils.db_actions import get_students_page, count_students
+from src.utils.assignment import assign_mentors_round_robin
+from src.utils.query_batch import run_queries
+
+# Opciones de tamaño de página del listado de alumnos
+PAGE_SIZE_OPTIONS = [25, 50, 100, 200]
+
+# Estatus incluidos en cada pestaña del listado
+STATUS_ACTIVOS = ["Activo", "Registrado"]
+STATUS_REINSCRIPCION = ["En Espera de Reinscripción"]
+STATUS_EGRESOS = ["En Espera de Egreso", "Egresado", "Terminado"]
 
 def render_alumnos():
     """
@@ -24,9 +36,27 @@ def render_alumnos():
         # DETAIL VIEW (EXPEDIENTE)
         student_id = st.session_state["view_student_id"]
         
-        # Load Student Data
+        # Load Student Data together with the independent reads of every tab
         supabase = get_supabase_client()
-        res = supabase.table("alumnos").select("*").eq("id", student_id).execute()
+        expediente = run_queries({
+            "alumno": supabase.table("alumnos").select("*").eq("id", student_id),
+            "proyecto": supabase.table("proyectos_dual").select(
+                "*, unidades_economicas(nombre_comercial), mentores_ue(nombre_completo, cargo, email), maestros(nombre_completo)"
+            ).eq("alumno_id", student_id),
+            "mentores_ie": lambda: get_maestros(solo_mentores_ie=True),
+            "inscripciones": supabase.table("inscripciones_asignaturas").select(
+                "id, *, asignaturas(clave_asignatura, nombre, semestre), maestros(nombre_completo)"
+            ).eq("alumno_id", student_id),
+            # Latest project: scores (academic tab) and document requirements (docs tab)
+            "ultimo_proyecto": supabase.table("proyectos_dual").select(
+                "*, unidades_economicas(*), mentores_ue(*), maestros(*)"
+            ).eq("alumno_id", student_id).order("created_at", desc=True).limit(1),
+        }, return_exceptions=True)
+        # The academic tab reports its own error; the rest fail as before
+        for name in ("alumno", "proyecto", "mentores_ie", "ultimo_proyecto"):
+            if isinstance(expediente[name], Exception):
+                raise expediente[name]
+        res = expediente["alumno"]
         
         if not res.data:
             st.error("Error al cargar el alumno.")
@@ -122,10 +152,8 @@ def render_alumnos():
         with tab_project:
             st.markdown("##### Información del Proyecto")
             
-            # Load Project Data
-            res_proj = supabase.table("proyectos_dual").select(
-                "*, unidades_economicas(nombre_comercial), mentores_ue(nombre_completo, cargo, email), maestros(nombre_completo)"
-            ).eq("alumno_id", student_id).execute()
+            # Project Data (loaded with the student)
+            res_proj = expediente["proyecto"]
             
             if res_proj.data:
                 proj = res_proj.data[0]
@@ -213,10 +241,10 @@ def render_alumnos():
                     st.markdown("###### Asignar Mentor IE")
                     
                     # Manual Assignment (Outside form to allow independent interaction)
-                    res_teachers = supabase.table("maestros").select("id, nombre_completo, email_institucional").eq("es_mentor_ie", True).execute()
-                    if res_teachers.data:
+                    mentores_ie = expediente["mentores_ie"]
+                    if mentores_ie:
                         # Find by name, keep teacher dict payload
-                        teacher_opts = {t['nombre_completo']: t for t in res_teachers.data}
+                        teacher_opts = {t['nombre_completo']: t for t in mentores_ie}
                         selected_new_mentor = st.selectbox("Seleccionar Manualmente", list(teacher_opts.keys()), index=None, placeholder="Seleccione un docente...")
                         
                         enviar_credenciales = st.checkbox("Generar y Enviar Credenciales de Acceso", help="Creará una contraseña temporal y se la enviará al maestro para ingresar al portal IE.", value=True)
@@ -265,13 +293,14 @@ def render_alumnos():
                                 from src.utils.anexo_data import get_anexo_5_4_data
                                 data_54, err_54 = get_anexo_5_4_data(student_id)
                                 if data_54:
-                                    succ_54, msg_54 = generate_docx_document("Anexo_5.4_Reporte_de_Actividades.docx", data_54, docx_path_5_4,
-                                                                           os.path.join(base_project_dir, "sistema_dual", "src", "templates", "docs", "Anexo_5.4_Reporte_de_Actividades.docx"))
+                                    succ_54, result_54 = render_docx_bytes("Anexo_5.4_Reporte_de_Actividades.docx", data_54)
                                     if succ_54:
+                                        # Se muestra en la tarjeta "Anexo 5.4" de Documentos
+                                        st.session_state[f"doc_bytes_btn_54_{student_id}"] = result_54
                                         st.success("Anexo 5.4 generado.")
                                         st.rerun()
                                     else:
-                                        st.error(msg_54)
+                                        st.error(result_54)
                                 else:
                                     st.error(err_54)
                     else:
@@ -290,8 +319,7 @@ def render_alumnos():
                 st.markdown("###### Registrar Proyecto DUAL")
                 
                 # Fetch available UEs
-                res_ue = supabase.table("unidades_economicas").select("id, nombre_comercial").execute()
-                ues = res_ue.data if res_ue.data else []
+                ues = get_unidades_economicas()
                 ue_options = {ue["nombre_comercial"]: ue["id"] for ue in ues}
                 
                 with st.form("coord_create_project_form"):
@@ -300,10 +328,7 @@ def render_alumnos():
                         selected_ue_name = st.selectbox("Unidad Económica", list(ue_options.keys()) if ues else ["No hay empresas registradas"])
                         ue_id = ue_options.get(selected_ue_name) if ues else None
                         
-                        mentors = []
-                        if ue_id:
-                            res_mentors = supabase.table("mentores_ue").select("id, nombre_completo").eq("ue_id", ue_id).execute()
-                            mentors = res_mentors.data
+                        mentors = get_mentores_ue(ue_id)
                         
                         mentor_options = {m["nombre_completo"]: m["id"] for m in mentors}
                         selected_mentor_name = st.selectbox("Mentor Industrial (Mentor UE)", list(mentor_options.keys()) if mentors else ["No hay mentores registrados"])
@@ -348,11 +373,11 @@ def render_alumnos():
         with tab_academic:
             st.markdown("##### Carga Académica")
             
-            # Need to fetch enrolled subjects: inscripciones_asignaturas joined with asignaturas and maestros
+            # Enrolled subjects: inscripciones_asignaturas joined with asignaturas and maestros
             try:
-                res_insc = supabase.table("inscripciones_asignaturas").select(
-                    "id, *, asignaturas(clave_asignatura, nombre, semestre), maestros(nombre_completo)"
-                ).eq("alumno_id", student_id).execute()
+                res_insc = expediente["inscripciones"]
+                if isinstance(res_insc, Exception):
+                    raise res_insc
                 
                 enrolled_subjects = res_insc.data if res_insc.data else []
                 
@@ -375,8 +400,8 @@ def render_alumnos():
                     
                     st.markdown("###### Desglose de Calificaciones y Actividades DUAL")
                     
-                    # Fetch project scores
-                    res_p = supabase.table("proyectos_dual").select("calificacion_ue, calificacion_ie").eq("alumno_id", student_id).order("created_at", desc=True).limit(1).execute()
+                    # Project scores (latest project)
+                    res_p = expediente["ultimo_proyecto"]
                     if res_p.data:
                          p_data = res_p.data[0]
                          c_ue = p_data.get("calificacion_ue")
@@ -442,15 +467,10 @@ def render_alumnos():
                     default_index = sem_options.index(str(current_sem)) if str(current_sem) in sem_options else 0
                     selected_sem_filter = st.selectbox("Filtrar Materias por Semestre", sem_options, index=default_index, key="filt_sem")
 
-                query = supabase.table("asignaturas").select("id, nombre, clave_asignatura, semestre")
-                if student.get("carrera_id"):
-                     query = query.eq("carrera_id", student.get("carrera_id"))
-                
-                if selected_sem_filter != "Todos":
-                    query = query.eq("semestre", selected_sem_filter)
-
-                res_subjects = query.execute()
-                subjects = res_subjects.data if res_subjects.data else []
+                subjects = get_asignaturas(
+                    carrera_id=student.get("carrera_id"),
+                    semestre=None if selected_sem_filter == "Todos" else selected_sem_filter
+                )
                 subject_options = {f"{s['clave_asignatura']} - {s['nombre']} (Sem {s['semestre']})": s["id"] for s in subjects}
 
                 with st.form("add_subject_form"):
@@ -468,8 +488,7 @@ def render_alumnos():
                             teacher_ids = [r["maestro_id"] for r in res_rels.data] if res_rels.data else []
                             
                             if teacher_ids:
-                                res_teachers = supabase.table("maestros").select("id, clave_maestro, nombre_completo").in_("id", teacher_ids).execute()
-                                filtered_teachers = res_teachers.data if res_teachers.data else []
+                                filtered_teachers = get_maestros(ids=teacher_ids)
                         
                         teacher_options = {}
                         if filtered_teachers:
@@ -528,54 +547,16 @@ def render_alumnos():
             st.info("Aquí puedes generar manualmente los documentos oficiales para este alumno o enviarlos por correo.")
             
             # Validar requisitos del alumno para generar documentos
-            res_reqs = supabase.table("proyectos_dual").select("*, unidades_economicas(*), mentores_ue(*), maestros(*)").eq("alumno_id", student_id).order("created_at", desc=True).limit(1).execute()
+            res_reqs = expediente["ultimo_proyecto"]
             reqs = res_reqs.data[0] if res_reqs.data else {}
             has_project_and_ue = bool(reqs.get('ue_id') and reqs.get('mentor_ue_id'))
             has_mentor_ie = bool(reqs.get('mentor_ie_id'))
             has_all_reqs = has_project_and_ue and has_mentor_ie
 
             # Prepare generic context map for 5.4, 5.5, Carta, Acta
-            ue = reqs.get("unidades_economicas", {}) or {}
-            mentor_ue = reqs.get("mentores_ue", {}) or {}
-            mentor_ie = reqs.get("maestros", {}) or {}
-            
-            from datetime import datetime
-            
-            # Simple context map for generic docs
-            generic_context = {
-                "alumno_nombre": f"{student.get('nombre')} {student.get('ap_paterno')} {student.get('ap_materno', '')}".strip(),
-                "alumno_matricula": student.get('matricula'),
-                "alumno_carrera": student.get('carrera', 'N/A'),
-                "alumno_semestre": str(student.get('semestre', 'N/A')),
-                "empresa_nombre": ue.get('nombre_comercial', 'N/A'),
-                "empresa_rfc": ue.get('rfc', 'N/A'),
-                "empresa_direccion": ue.get('direccion_fiscal', 'N/A'),
-                "empresa_representante": ue.get('nombre_titular', 'N/A'),
-                "empresa_cargo_representante": ue.get('cargo_titular', 'N/A'),
-                "mentor_ue_nombre": mentor_ue.get('nombre_completo', 'N/A'),
-                "mentor_ue_cargo": mentor_ue.get('cargo', 'N/A'),
-                "mentor_ue_email": mentor_ue.get('email', 'N/A'),
-                "mentor_ue_telefono": mentor_ue.get('telefono', 'N/A'),
-                "mentor_ie_nombre": mentor_ie.get('nombre_completo', 'N/A'),
-                "proyecto_nombre": reqs.get('nombre_proyecto', 'N/A'),
-                "proyecto_fecha_inicio": str(reqs.get('fecha_inicio_convenio', 'N/A')),
-                "proyecto_fecha_fin": str(reqs.get('fecha_fin_convenio', 'N/A')),
-                "materia_nombre": "Asignaturas Modelo DUAL",
-                "calificacion": "100", # Demostrativo
-                "fecha_actual": datetime.now().strftime('%d/%m/%Y'),
-                
-                # Context overrides for 5.4 format block
-                "numero_reporte": 1,
-                "fechas_periodo": str(reqs.get('fecha_inicio_convenio', 'N/A')),
-                "empresa": ue.get('nombre_comercial', 'N/A'),
-                "institucion_educativa": "TESE",
-                "carrera": student.get('carrera', 'N/A'),
-                "nombre_alumno": f"{student.get('nombre')} {student.get('ap_paterno')}",
-            }
+            generic_context = build_generic_context(student, reqs)
 
             st.markdown("---")
-            import tempfile
-            out_dir = tempfile.gettempdir()
             
             def render_coordinator_doc_card(title, desc, req_met, disabled_msg, btn_key, dl_key, filename, template_tgt, is_anexo_5_1=False):
                 st.markdown(f"**{title}**")
@@ -586,8 +567,9 @@ def render_alumnos():
                 else:
                     st.success("✅ Este anexo o documento ya es posible generarlo completo.")
                     
-                path_base = os.path.join(out_dir, f"{filename}_{student['matricula']}")
-                docx_path = f"{path_base}.docx"
+                docx_name = f"{filename}_{student['matricula']}.docx"
+                # El documento generado se conserva en memoria (sin archivos temporales)
+                state_key = f"doc_bytes_{btn_key}_{student_id}"
                 
                 if st.button(f"Generar {title.split('-')[0].strip('📄✉️📝 ')}", key=btn_key, disabled=not req_met):
                     with st.spinner("Compilando..."):
@@ -599,31 +581,28 @@ def render_alumnos():
                         if msg_err and is_anexo_5_1:
                             st.error(f"Error recuperando datos: {msg_err}")
                         else:
-                            base_project_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-                            t_path = os.path.join(base_project_dir, "sistema_dual", "src", "templates", "docs", template_tgt)
-                            
-                            succ, msg_gen = generate_docx_document(template_tgt, ctx_data, docx_path, t_path)
+                            succ, result = render_docx_bytes(template_tgt, ctx_data)
                             if succ:
+                                st.session_state[state_key] = result
                                 st.success(f"{title} generado exitosamente.")
                                 st.rerun()
                             else:
-                                st.error(msg_gen)
+                                st.error(result)
                                 
-                file_exists = os.path.exists(docx_path)
-                if file_exists:
-                    st.info(f"📄 Listo: {os.path.basename(docx_path)}")
+                docx_bytes = st.session_state.get(state_key)
+                if docx_bytes:
+                    st.info(f"📄 Listo: {docx_name}")
                     
                     c_dl, c_mail = st.columns([1, 1])
-                    with open(docx_path, "rb") as f:
-                        c_dl.download_button(
-                            label=f"⬇️ Descargar {title.split('-')[0].strip('📄✉️📝 ')}",
-                            data=f.read(),
-                            file_name=os.path.basename(docx_path),
-                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                            type="primary",
-                            use_container_width=True,
-                            key=dl_key
-                        )
+                    c_dl.download_button(
+                        label=f"⬇️ Descargar {title.split('-')[0].strip('📄✉️📝 ')}",
+                        data=docx_bytes,
+                        file_name=docx_name,
+                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                        type="primary",
+                        use_container_width=True,
+                        key=dl_key
+                    )
                         
                     if c_mail.button(f"📧 Enviar al Alumno", key=f"mail_{btn_key}", use_container_width=True):
                         target_email = student.get('email_institucional') or student.get('email_personal')
@@ -635,7 +614,8 @@ def render_alumnos():
                                     to_email=target_email,
                                     student_name=f"{student.get('nombre')} {student.get('ap_paterno')}",
                                     document_name=title.split('-')[0].strip('📄✉️📝 '),
-                                    file_path=docx_path
+                                    file_bytes=docx_bytes,
+                                    file_name=docx_name
                                 )
                                 if success_mail:
                                     st.success("Documento enviado exitosamente.")
@@ -702,36 +682,47 @@ def render_alumnos():
         tabs = st.tabs(["Activos", "Reinscripciones", "Egresos", "Todos (Histórico)", "Registrar Nuevo Alumno"])
         
         supabase = get_supabase_client()
-        res = supabase.table("alumnos").select("*").order("ap_paterno").execute()
-        all_students = res.data if res.data else []
-        
-        activos = [s for s in all_students if s.get("estatus") in ["Activo", "Registrado"]]
-        reinscripciones = [s for s in all_students if s.get("estatus") == "En Espera de Reinscripción"]
-        egresos = [s for s in all_students if s.get("estatus") in ["En Espera de Egreso", "Egresado", "Terminado"]]
         
-        def _render_student_list(students_list, key_prefix):
-            if not students_list:
-                st.info("No hay alumnos en esta categoría.")
-                return
-                
-            # --- Search Filter ---
-            col_search_1, col_search_2 = st.columns([1, 4])
+        def _render_student_list(estatus, key_prefix):
+            """Listado paginado en el servidor: solo se consultan y dibujan los alumnos de la página actual."""
+            # --- Search Filter & Page Size ---
+            col_search_1, col_search_2, col_search_3 = st.columns([2, 3, 1])
             with col_search_1:
-                search_query = st.text_input("🔍 Buscar Alumno:", key=f"search_{key_prefix}").lower()
+                search_query = st.text_input("🔍 Buscar Alumno:", key=f"search_{key_prefix}", placeholder="Matrícula, nombre o apellido").strip()
+            with col_search_3:
+                page_size = st.selectbox("Por página", PAGE_SIZE_OPTIONS, key=f"page_size_{key_prefix}")
             
-            # Filter results in memory
-            filtered_data = []
-            for item in students_list:
-                m = str(item.get("matricula", "")).lower()
-                ape = str(item.get("ap_paterno", "")).lower()
-                nom = str(item.get("nombre", "")).lower()
-                
-                if not search_query or search_query in m or search_query in ape or search_query in nom:
-                    filtered_data.append(item)
-                    
-            if not filtered_data:
-                 st.info("No se encontraron resultados para la búsqueda.")
-                 return
+            # Volver a la primera página cuando cambia la búsqueda o el tamaño de página
+            page_key = f"page_{key_prefix}"
+            filter_sig = (search_query.lower(), page_size)
+            if st.session_state.get(f"filter_sig_{key_prefix}") != filter_sig:
+                st.session_state[f"filter_sig_{key_prefix}"] = filter_sig
+                st.session_state[page_key] = 1
+            page = st.session_state.get(page_key, 1)
+            
+            filtered_data, total = get_students_page(estatus, search_query, page, page_size, supabase=supabase)
+            total_pages = max(1, -(-total // page_size))
+            if page > total_pages:
+                # La página quedó fuera de rango (p. ej. tras una baja masiva)
+                page = total_pages
+                st.session_state[page_key] = page
+                filtered_data, total = get_students_page(estatus, search_query, page, page_size, supabase=supabase)
+            
+            if not total:
+                if search_query:
+                    st.info("No se encontraron resultados para la búsqueda.")
+                else:
+                    st.info("No hay alumnos en esta categoría.")
+                return
+            
+            with col_search_2:
+                st.number_input(f"Página (de {total_pages})", min_value=1, max_value=total_pages, step=1, key=page_key)
+            
+            first_row = (page - 1) * page_size + 1
+            if search_query:
+                st.caption(f"Mostrando {first_row}–{first_row + len(filtered_data) - 1} de {total} resultados ({count_students(estatus, supabase=supabase)} alumnos en esta categoría).")
+            else:
+                st.caption(f"Mostrando {first_row}–{first_row + len(filtered_data) - 1} de {total} alumnos en esta categoría.")
                  
             # Add Select All functionality
             col_sa1, col_sa2 = st.columns([1, 4])
@@ -772,7 +763,7 @@ def render_alumnos():
                         st.rerun()
                 st.divider()
                 
-            counter_placeholder.markdown(f"✅ **Seleccionados:** `{len(selected_students)}` de `{len(filtered_data)}`")
+            counter_placeholder.markdown(f"✅ **Seleccionados:** `{len(selected_students)}` de `{len(filtered_data)}` en esta página")
 
             # Batch Action Area
             if selected_students:
@@ -846,21 +837,21 @@ def render_alumnos():
         
         with tabs[0]:
             st.markdown("#### Alumnos Activos (Periodo Actual)")
-            _render_student_list(activos, "activos")
+            _render_student_list(STATUS_ACTIVOS, "activos")
             
         with tabs[1]:
             st.markdown("#### En Espera de Reinscripción")
             st.info("Estos alumnos terminaron el periodo anterior y su convenio sigue vigente. Al ingresar al sistema, se les pedirá su carga académica para el nuevo periodo.")
-            _render_student_list(reinscripciones, "reins")
+            _render_student_list(STATUS_REINSCRIPCION, "reins")
             
         with tabs[2]:
             st.markdown("#### En Espera de Egreso / Terminados")
             st.info("Alumnos que han finalizado su carga académica y su convenio. Esperan la emisión de sus documentos finales de egreso DUAL.")
-            _render_student_list(egresos, "egresos")
+            _render_student_list(STATUS_EGRESOS, "egresos")
             
         with tabs[3]:
             st.markdown("#### Histórico Completo de Alumnos")
-            _render_student_list(all_students, "todos")
+            _render_student_list(None, "todos")
 
         with tabs[4]:
             render_registro_coordinador()
@@ -2,6 +2,8 @@
 import streamlit as st
 import pandas as pd
 from src.db_connection import get_supabase_client
+from src.utils.catalogs import invalidate_catalogs, ASIGNATURAS
+from src.utils.query_batch import run_queries
 
 def render_asignaturas():
     st.header("Gestión de Asignaturas y Competencias")
@@ -106,6 +108,7 @@ def render_asignaturas():
                                     "nombre": e_nombre,
                                     "semestre": e_semestre
                                 }).eq("id", s['id']).execute()
+                                invalidate_catalogs(ASIGNATURAS)
                                 st.success("Asignatura actualizada.")
                                 st.rerun()
                                 
@@ -122,6 +125,7 @@ def render_asignaturas():
                         st.error("Zona de Peligro")
                         if st.button("Eliminar Asignatura", key=f"del_s_{s['id']}"):
                             supabase.table("asignaturas").delete().eq("id", s['id']).execute()
+                            invalidate_catalogs(ASIGNATURAS)
                             st.success("Asignatura eliminada.")
                             st.rerun()
                     
@@ -138,6 +142,7 @@ def render_asignaturas():
                             if confirm_batch:
                                 try:
                                     supabase.table("asignaturas").delete().in_("id", selected_subjects).execute()
+                                    invalidate_catalogs(ASIGNATURAS)
                                     st.success(f"{len(selected_subjects)} asignatura(s) eliminadas correctamente.")
                                     st.rerun()
                                 except Exception as e:
@@ -179,6 +184,7 @@ def render_asignaturas():
                         }
                         try:
                             res = supabase.table("asignaturas").insert(new_subj).execute()
+                            invalidate_catalogs(ASIGNATURAS)
                             
                             if res.data:
                                 new_id = res.data[0]['id']
@@ -202,9 +208,37 @@ def render_asignaturas():
         st.button("< Volver al Listado", on_click=lambda: st.session_state.update({"view_subject_mode": "list"}))
         st.markdown(f"### Detalles de {subj_name}")
         
-        # Fetch Details
-        res_det = supabase.table("asignaturas").select("*").eq("id", subj_id).single().execute()
-        subj = res_det.data
+        # Fetch Details: the subject and the first read of each tab, in parallel
+        t_query = supabase.table("maestros").select("id, nombre_completo, clave_maestro")
+        if selected_career_id:
+            # Teachers FILTERED BY CAREER (via Division)
+            t_query = t_query.eq("carrera_id", selected_career_id)
+        detail = run_queries({
+            "asignatura": supabase.table("asignaturas").select("*").eq("id", subj_id).single(),
+            "competencias": supabase.table("asignatura_competencias").select("*").eq("asignatura_id", subj_id).order("numero_competencia"),
+            "maestros": t_query,
+            "vinculados": supabase.table("rel_maestros_asignaturas").select("maestro_id").eq("asignatura_id", subj_id),
+            "inscripciones": supabase.table("inscripciones_asignaturas").select("alumno_id, grupo").eq("asignatura_id", subj_id),
+        })
+        subj = detail["asignatura"].data
+        res_comps = detail["competencias"]
+        comp_ids = [c['id'] for c in res_comps.data] if res_comps.data else []
+        linked_ids = [r['maestro_id'] for r in detail["vinculados"].data] if detail["vinculados"].data else []
+        a_ids = [r['alumno_id'] for r in detail["inscripciones"].data] if detail["inscripciones"].data else []
+
+        # Second round: reads that need the ids above
+        dependent = {}
+        if comp_ids:
+            dependent["actividades"] = supabase.table("actividades_aprendizaje").select("*").in_("competencia_id", comp_ids).order("created_at")
+        if linked_ids:
+            dependent["maestros_vinculados"] = supabase.table("maestros").select("*").in_("id", linked_ids)
+        if a_ids:
+            dependent["alumnos"] = supabase.table("alumnos").select("*").in_("id", a_ids)
+        detail.update(run_queries(dependent))
+        acts_by_comp = {}
+        if "actividades" in detail:
+            for act in detail["actividades"].data or []:
+                acts_by_comp.setdefault(act["competencia_id"], []).append(act)
         
         # --- Edit Subject Form ---
         with st.expander("Editar Datos de la Asignatura"):
@@ -223,6 +257,7 @@ def render_asignaturas():
                             "nombre": new_nombre,
                             "semestre": new_semestre
                         }).eq("id", subj_id).execute()
+                        invalidate_catalogs(ASIGNATURAS)
                         st.success("Asignatura actualizada.")
                         st.session_state["selected_subject_name"] = f"{new_clave} - {new_nombre}"
                         st.rerun()
@@ -273,7 +308,6 @@ def render_asignaturas():
                             st.error(f"Error: {e}")
 
             # --- List Competencies ---
-            res_comps = supabase.table("asignatura_competencias").select("*").eq("asignatura_id", subj_id).order("numero_competencia").execute()
             
             if res_comps.data:
                 for comp in res_comps.data:
@@ -294,9 +328,8 @@ def render_asignaturas():
                                 except Exception as e:
                                     st.error(f"Error: {e}")
 
-                        # Fetch Activities for this Competency
-                        res_acts = supabase.table("actividades_aprendizaje").select("*").eq("competencia_id", comp['id']).order("created_at").execute()
-                        acts = res_acts.data if res_acts.data else []
+                        # Activities for this Competency
+                        acts = acts_by_comp.get(comp['id'], [])
                         
                         if acts:
                             st.markdown("**Actividades de Aprendizaje:**")
@@ -360,15 +393,8 @@ def render_asignaturas():
             
             # Feature Request: Link Teacher Here
             with st.expander("Vincular Maestro a esta Asignatura"):
-                # Fetch all teachers FILTERED BY CAREER (via Division)
-                t_query = supabase.table("maestros").select("id, nombre_completo, clave_maestro")
-                if selected_career_id:
-                    t_query = t_query.eq("carrera_id", selected_career_id)
-                all_teachers_res = t_query.execute()
-                all_teachers = all_teachers_res.data if all_teachers_res.data else []
-                
-                res_rel = supabase.table("rel_maestros_asignaturas").select("maestro_id").eq("asignatura_id", subj_id).execute()
-                linked_ids = [r['maestro_id'] for r in res_rel.data] if res_rel.data else []
+                # All teachers of the career (loaded above)
+                all_teachers = detail["maestros"].data if detail["maestros"].data else []
                 
                 available_teachers = [t for t in all_teachers if t['id'] not in linked_ids]
                 
@@ -391,19 +417,16 @@ def render_asignaturas():
 
             # List Linked Teachers
             if linked_ids:
-                res_teachers = supabase.table("maestros").select("*").in_("id", linked_ids).execute()
+                res_teachers = detail["maestros_vinculados"]
                 if res_teachers.data:
                      st.dataframe(pd.DataFrame(res_teachers.data)[["clave_maestro", "nombre_completo", "email_institucional"]], use_container_width=True)
             else:
                 st.info("No hay maestros asignados a esta materia.")
 
         with tab_alumnos:
-             # Query Enrollments
-             res_subjs = supabase.table("inscripciones_asignaturas").select("alumno_id, grupo").eq("asignatura_id", subj_id).execute()
-             a_ids = [r['alumno_id'] for r in res_subjs.data] if res_subjs.data else []
-             
+             # Enrollments and their students (loaded above)
              if a_ids:
-                 res_students = supabase.table("alumnos").select("*").in_("id", a_ids).execute()
+                 res_students = detail["alumnos"]
                  if res_students.data:
                       df_students = pd.DataFrame(res_students.data)
                       # Safe access to columns
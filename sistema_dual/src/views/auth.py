@@ -1,6 +1,7 @@
 import streamlit as st
 import time
 from src.db_connection import get_supabase_client
+from src.utils.catalogs import get_carreras
 from src.components.login_ui import get_login_css, get_login_header
 
 def render_login():
@@ -13,11 +14,7 @@ def render_login():
     
     try:
         supabase = get_supabase_client()
-        res_carreras = supabase.table("carreras").select("id, nombre").execute()
-        if res_carreras.data:
-            carreras_data = res_carreras.data
-            carreras_data.sort(key=lambda x: x["nombre"])
-            carreras_options = {c["nombre"]: c["id"] for c in carreras_data}
+        carreras_options = {c["nombre"]: c["id"] for c in get_carreras()}
     except Exception as e:
         fetch_error = f"Error conectando a la base de datos: {e}"
 
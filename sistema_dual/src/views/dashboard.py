@@ -1,12 +1,53 @@
 
 import streamlit as st
 from src.db_connection import get_supabase_client
-from src.views.registro_coordinador import render_registro_coordinador
-# Import New Modules
-from src.views.maestros import render_maestros
-from src.views.asignaturas import render_asignaturas
-from src.views.empresas import render_empresas
-from src.views.pruebas_documentos import render_pruebas_documentos
+from src.utils.query_metrics import QUERY_METRICS, SLOW_QUERY_MS, SLOW_QUERY_LOG, current_collector, set_view, view_stats, get_pool_stats
+# Los módulos de cada sección se importan al abrirla: así el inicio de sesión
+# no carga pandas, docx/docxtpl ni las plantillas de correo.
+
+def render_query_debug_panel(top=10):
+    """
+    Panel de depuración (solo coordinador, QUERY_METRICS=1): consultas de la página
+    actual, las más lentas, el promedio de consultas por rerun de cada vista y
+    el estado del pool de conexiones HTTP.
+    Se dibuja al final del dashboard para incluir las consultas de la vista.
+    """
+    if not QUERY_METRICS or st.session_state.get("role") != "coordinator":
+        return
+    collector = current_collector()
+    if collector is None:
+        return
+    summary = collector.summary(top=top)
+    with st.sidebar.expander(f"🛠️ Consultas de esta página: {summary['calls']}", expanded=False):
+        c1, c2 = st.columns(2)
+        c1.metric("Consultas", summary["calls"])
+        c2.metric("Tiempo total", f"{summary['total_ms']:.0f} ms")
+        st.caption(f"{summary['rows']} filas · {summary['bytes'] / 1024:.1f} KB · lentas ≥ {SLOW_QUERY_MS:.0f} ms en {SLOW_QUERY_LOG}")
+
+        st.markdown(f"**{top} más lentas**")
+        st.dataframe([{"ms": c["ms"], "Tabla": c["table"], "Método": c["method"], "Filtros": c["filters"],
+                       "Filas": c["rows"], "Bytes": c["bytes"]} for c in summary["slowest"]],
+                     use_container_width=True, hide_index=True)
+
+        # Muchas llamadas a la misma tabla en un rerun suelen ser un N+1
+        st.markdown("**Por tabla**")
+        st.dataframe([{"Tabla": t["table"], "Consultas": t["calls"], "ms": round(t["total_ms"], 1)}
+                      for t in summary["by_table"]], use_container_width=True, hide_index=True)
+
+        st.markdown("**Por vista (desde el arranque)**")
+        st.dataframe([{"Vista": v["view"], "Reruns": v["reruns"], "Prom. consultas": v["avg_calls"],
+                       "Máx. consultas": v["max_calls"], "ms totales": v["total_ms"]} for v in view_stats()],
+                     use_container_width=True, hide_index=True)
+
+        # Conexiones compartidas por todas las sesiones (src/utils/http_pool.py)
+        for name, pool in get_pool_stats().items():
+            st.markdown(f"**Pool HTTP: {name}** ({'HTTP/2' if pool['http2'] else 'HTTP/1.1'})")
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Conexiones", f"{pool['connections']}/{pool['max_connections']}")
+            c2.metric("Inactivas", pool["idle"])
+            c3.metric("Esperas", pool["waits"])
+            st.caption(f"{pool['requests']} peticiones · {pool['connections_opened']} conexiones abiertas desde el arranque · "
+                       f"{pool['in_flight']} en vuelo (máx. {pool['peak_in_flight']})")
 
 def render_dashboard():
     # Context
@@ -60,6 +101,7 @@ def render_dashboard():
     
     selected_menu = st.sidebar.radio("Seleccione un Módulo:", list(menu_sections.keys()))
     active_module = menu_sections[selected_menu]
+    set_view(active_module)
     
     st.sidebar.markdown("---")
     st.sidebar.info("Sistema de Gestión DUAL - Versión con Control de Fases Activo.")
@@ -78,18 +120,21 @@ def render_dashboard():
         
     elif active_module == "maestros":
         try:
+            from src.views.maestros import render_maestros
             render_maestros()
         except Exception as e:
             st.error(f"Error cargando maestros: {e}")
             
     elif active_module == "asignaturas":
         try:
+            from src.views.asignaturas import render_asignaturas
             render_asignaturas()
         except Exception as e:
             st.error(f"Error cargando asignaturas: {e}")
             
     elif active_module == "empresas":
         try:
+            from src.views.empresas import render_empresas
             render_empresas()
         except Exception as e:
             st.error(f"Error cargando empresas: {e}")
@@ -114,6 +159,7 @@ def render_dashboard():
             
     elif active_module == "pruebas":
         try:
+            from src.views.pruebas_documentos import render_pruebas_documentos
             render_pruebas_documentos()
         except Exception as e:
             st.error(f"Error cargando pruebas de documentos: {e}")
@@ -124,3 +170,5 @@ def render_dashboard():
             render_fases_control()
         except ImportError:
             st.info("Módulo de Control de Fases en desarrollo. Próximamente.")
+
+    render_query_debug_panel()
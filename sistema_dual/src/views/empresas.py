@@ -4,11 +4,15 @@ import random
 import string
 import hashlib
 from src.db_connection import get_supabase_client
-from src.utils.notifications import send_email
+from src.utils.catalogs import invalidate_catalogs, UNIDADES_ECONOMICAS, MENTORES_UE
+from src.utils.mail_queue import enqueue_email
+from src.utils.query_batch import run_queries
+from src.components.outbox_panel import render_outbox_panel
 
 def render_empresas():
     st.header("Gestión de Unidades Económicas (UE) y Mentores")
     supabase = get_supabase_client()
+    render_outbox_panel(key="empresas_outbox")
 
     if "view_ue_mode" not in st.session_state:
         st.session_state["view_ue_mode"] = "list"
@@ -92,6 +96,7 @@ def render_empresas():
                                     "rfc": e_rfc,
                                     "direccion_fiscal": e_dir
                                 }).eq("id", ue['id']).execute()
+                                invalidate_catalogs(UNIDADES_ECONOMICAS)
                                 st.success("Actualizado")
                                 st.rerun()
                         
@@ -102,6 +107,7 @@ def render_empresas():
                         if st.button("Eliminar Empresa", key=f"del_ue_{ue['id']}"):
                             try:
                                 supabase.table("unidades_economicas").delete().eq("id", ue['id']).execute()
+                                invalidate_catalogs(UNIDADES_ECONOMICAS, MENTORES_UE)
                                 st.success("Eliminada")
                                 st.rerun()
                             except Exception as e:
@@ -120,6 +126,7 @@ def render_empresas():
                             if confirm_batch:
                                 try:
                                     supabase.table("unidades_economicas").delete().in_("id", selected_companies).execute()
+                                    invalidate_catalogs(UNIDADES_ECONOMICAS, MENTORES_UE)
                                     st.success(f"{len(selected_companies)} empresa(s) eliminada(s) correctamente.")
                                     st.rerun()
                                 except Exception as e:
@@ -131,7 +138,6 @@ def render_empresas():
                     with st.form("batch_send_credentials_ue_form"):
                         if st.form_submit_button("📧 Enviar Credenciales a Mentores UE Seleccionados"):
                             import random, string, hashlib
-                            from src.utils.notifications import send_email
                             
                             try:
                                 # Get Mentores UE for the selected companies
@@ -151,11 +157,12 @@ def render_empresas():
                                             "mentor_password": raw_pw,
                                             "frase_inspiradora": "El aprendizaje en la práctica es el puente que transforma el talento estudiantil en excelencia profesional."
                                         }
-                                        send_email(m['email'], "Credenciales de Acceso Mentor UE - Sistema DUAL", "nuevo_mentor.html", ctx)
-                                        sent_count += 1
+                                        queued, _ = enqueue_email(m['email'], "Credenciales de Acceso Mentor UE - Sistema DUAL", "nuevo_mentor.html", ctx)
+                                        if queued:
+                                            sent_count += 1
                                         
-                                st.toast(f"Credenciales enviadas a {sent_count} Mentores UE.", icon="✅")
-                                st.success(f"Se generaron y enviaron credenciales a {sent_count} Mentores UE.")
+                                st.toast(f"Credenciales en cola para {sent_count} Mentores UE.", icon="✅")
+                                st.success(f"Se generaron credenciales para {sent_count} Mentores UE; los correos quedaron en cola de envío.")
                             except Exception as e:
                                 st.error(f"Error al enviar credenciales masivas: {e}")
             else:
@@ -242,6 +249,7 @@ def render_empresas():
                                     "password_hash": hashed_pwd
                                 }
                                 supabase.table("mentores_ue").insert(new_mentor).execute()
+                                invalidate_catalogs(UNIDADES_ECONOMICAS, MENTORES_UE)
                                 
                                 st.info(f"🔑 Contraseña de acceso inicial generada: **{raw_password}** (Las credenciales no se envían automáticamente. Use la acción masiva en el listado para enviar el acceso por primera vez).")
                                 st.success(f"Empresa '{nombre}' y Mentor '{m_nombre}' registrados exitosamente.")
@@ -261,10 +269,20 @@ def render_empresas():
         
         # Details Tab
         tab_det, tab_mentors, tab_students = st.tabs(["📝 Información General", "👥 Mentores UE", "🎓 Alumnos Asignados"])
+
+        # Las tres pestañas se cargan en paralelo
+        # Proyectos con datos del alumno y su carrera, y el mentor UE asignado
+        detail = run_queries({
+            "ue": supabase.table("unidades_economicas").select("*").eq("id", ue_id).single(),
+            "mentores": supabase.table("mentores_ue").select("*").eq("ue_id", ue_id),
+            "proyectos": supabase.table("proyectos_dual").select(
+                "*, alumnos(matricula, nombre, ap_paterno, ap_materno, carreras(nombre)), mentores_ue(nombre_completo)"
+            ).eq("ue_id", ue_id),
+        })
         
         # -- TAB 1: GENERAL INFO (EDITABLE) --
         with tab_det:
-             res_det = supabase.table("unidades_economicas").select("*").eq("id", ue_id).single().execute()
+             res_det = detail["ue"]
              if res_det.data:
                  ue = res_det.data
                  
@@ -304,6 +322,7 @@ def render_empresas():
                          }
                          try:
                              supabase.table("unidades_economicas").update(updates).eq("id", ue_id).execute()
+                             invalidate_catalogs(UNIDADES_ECONOMICAS)
                              st.success("Información actualizada correctamente.")
                              st.session_state["selected_ue_name"] = ed_nombre # Update title
                              st.rerun()
@@ -317,7 +336,7 @@ def render_empresas():
             st.markdown("##### Mentores Registrados")
             
             # List Mentors
-            res_mentors = supabase.table("mentores_ue").select("*").eq("ue_id", ue_id).execute()
+            res_mentors = detail["mentores"]
             mentors = res_mentors.data if res_mentors.data else []
             
             if mentors:
@@ -349,6 +368,7 @@ def render_empresas():
                                         "email": em_ema,
                                         "telefono": em_tel
                                     }).eq("id", mm['id']).execute()
+                                    invalidate_catalogs(MENTORES_UE)
                                     st.success("Guardado")
                                     st.rerun()
                                     
@@ -367,15 +387,18 @@ def render_empresas():
                                     "mentor_password": raw_pw,
                                     "frase_inspiradora": "El aprendizaje en la práctica es el puente que transforma el talento estudiantil en excelencia profesional."
                                 }
-                                from src.utils.notifications import send_email
-                                send_email(mm.get('email', ''), "Recuperación de Acceso - Sistema DUAL", "recuperacion_mentor.html", ctx)
-                                st.success(f"Contraseña regenerada y enviada a {mm['nombre_completo']}.")
+                                queued, msg = enqueue_email(mm.get('email', ''), "Recuperación de Acceso - Sistema DUAL", "recuperacion_mentor.html", ctx)
+                                if queued:
+                                    st.success(f"Contraseña regenerada para {mm['nombre_completo']}; el correo quedó en cola de envío.")
+                                else:
+                                    st.error(f"Contraseña regenerada para {mm['nombre_completo']}, pero no se pudo encolar el correo: {msg}")
                                 st.info(f"Contraseña temporal nueva: **{raw_pw}** (Cópiala y envíala directamente si es necesario o verifícala aquí).")
                             
                             st.divider()
                             
                             if st.button("Eliminar", key=f"del_mue_{mm['id']}"):
                                 supabase.table("mentores_ue").delete().eq("id", mm['id']).execute()
+                                invalidate_catalogs(MENTORES_UE)
                                 st.success("Eliminado")
                                 st.rerun()
                         st.divider()
@@ -410,6 +433,7 @@ def render_empresas():
                                     "email": m_email,
                                     "telefono": m_tel
                                 }).execute()
+                                invalidate_catalogs(MENTORES_UE)
                                 st.success("Mentor agregado.")
                                 st.rerun()
                             except Exception as e:
@@ -419,11 +443,8 @@ def render_empresas():
         with tab_students:
             st.markdown("##### Alumnos Asignados (Proyectos Activos)")
             
-            # Query projects linked to this UE
-            # We want student info, so we join with 'alumnos' and then 'carreras' to get the name
-            res_projs = supabase.table("proyectos_dual").select(
-                "*, alumnos(matricula, nombre, ap_paterno, ap_materno, carreras(nombre)), mentores_ue(nombre_completo)"
-            ).eq("ue_id", ue_id).execute()
+            # Projects linked to this UE (loaded above with student and career)
+            res_projs = detail["proyectos"]
             
             projs = res_projs.data if res_projs.data else []
             
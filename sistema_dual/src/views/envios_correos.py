@@ -1,23 +1,31 @@
 import streamlit as st
 import os
 from src.db_connection import get_supabase_client
-from src.utils.notifications import send_email
+from src.utils.mail_queue import enqueue_email
+from src.components.outbox_panel import render_outbox_panel
+from src.components.cohort_export_panel import render_cohort_export_panel
 from src.utils.calendar_generator import create_event_ics
 from src.utils.anexo_data import get_anexo_5_1_data, get_anexo_5_4_data
-from src.utils.pdf_generator_docx import generate_docx_document
+from src.utils.pdf_generator_docx import render_docx_bytes
+from src.utils.db_actions import get_phase2_projects, fetch_all_rows
+from src.utils.phase3_sync import get_phase3_inbox, sync_phase3_inbox
+from src.utils.grades import grades_frame, consolidate_grades, diff_grade_edits, save_grade_edits, acta_rows, ESTATUS_ACREDITADA, ESTATUS_NO_ACREDITADA, ESTATUS_PENDIENTE
 import random
 import string
 import hashlib
-import tempfile
-import zipfile
-import shutil
 import base64
 import time
+from datetime import datetime
 
 def render_fases_control():
     st.header("🚀 Centro de Control: Las 5 Fases DUAL")
     st.markdown("Administra el flujo completo de estudiantes, documentos y correos por fase.")
     
+    # Los correos se encolan y los envía el worker (python -m src.utils.mail_queue)
+    render_outbox_panel(key="fases_outbox")
+    # Expedientes de toda la cohorte en un ZIP (carrera/matrícula)
+    render_cohort_export_panel(key="fases_cohort_zip")
+    
     supabase = get_supabase_client()
     
     # Simple navigation structure: Top Tabs
@@ -74,8 +82,8 @@ def render_fases_control():
                             "frase_inspiradora": "El aprendizaje en la práctica es el puente que transforma el talento estudiantil en excelencia profesional."
                         }
                         
-                        success, m = send_email(target_email, "Sistema DUAL - Registro Confirmado", "registro_alumno.html", ctx)
-                        if success: st.success("Correo enviado.")
+                        success, m = enqueue_email(target_email, "Sistema DUAL - Registro Confirmado", "registro_alumno.html", ctx)
+                        if success: st.success(m)
                         else: st.error(m)
                     else:
                         st.error("Sin correo.")
@@ -86,21 +94,17 @@ def render_fases_control():
         st.subheader("Fase 2: Asignación y Envío Plan de Trabajo (Anexo 5.1 y Actividades)")
         st.info("Envía a los alumnos su Mentor IE oficial, con el Anexo 5.1 adjunto y un evento de calendario de fechas.")
         
-        # Query projects that have mentor_ie assigned
-        res_p2 = supabase.table("proyectos_dual").select(
-            "id, alumno_id, mentor_ie_id, ue_id, mentor_ue_id, periodo_id, mentores_ue(nombre_completo), unidades_economicas(nombre_comercial), maestros(nombre_completo, email_institucional), periodos(inicio_anexo_1, fin_anexo_1, fecha_inicio, fecha_fin)"
-        ).not_.is_("mentor_ie_id", "null").execute()
+        # Projects of the active period that have mentor_ie assigned (student embedded)
+        projects_p2 = get_phase2_projects(supabase=supabase)
         
-        if res_p2.data:
+        if projects_p2:
             st.markdown("##### Alumnos con Mentor Académico (IE) Asignado")
             
-            for proj in res_p2.data:
+            for proj in projects_p2:
                 student_id = proj['alumno_id']
-                # Get student details
-                res_st = supabase.table("alumnos").select("nombre, ap_paterno, email_institucional, email_personal").eq("id", student_id).single().execute()
-                student = res_st.data if res_st.data else {}
+                student = proj.get('alumnos') or {}
                 
-                mentor_ie_name = proj.get('maestros', {}).get('nombre_completo', 'Desconocido')
+                mentor_ie_name = (proj.get('maestros') or {}).get('nombre_completo', 'Desconocido')
                 student_name = f"{student.get('nombre', '')} {student.get('ap_paterno', '')}".strip()
                 
                 c2_1, c2_2, c2_3 = st.columns([2, 2, 1])
@@ -131,31 +135,21 @@ def render_fases_control():
                         # 2. Generate Anexo 5.1 PDF
                         data_51, msg_51 = get_anexo_5_1_data(student_id)
                         if data_51:
-                            out_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "tests", "output")
-                            os.makedirs(out_dir, exist_ok=True)
-                            docx_path_5_1 = os.path.join(out_dir, f"Anexo_5.1_{student_id}.docx")
-                            template_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "docs", "Anexo_5.1_Plan_de_Formacion.docx")
-                            
-                            succ_docx, msg_docx = generate_docx_document(
-                                template_name="Anexo_5.1_Plan_de_Formacion.docx", 
-                                context=data_51, 
-                                output_path=docx_path_5_1,
-                                template_path=template_path
-                            )
-                            if succ_docx and os.path.exists(docx_path_5_1):
-                                attachments.append(docx_path_5_1)
+                            succ_docx, docx_5_1 = render_docx_bytes("Anexo_5.1_Plan_de_Formacion.docx", data_51)
+                            if succ_docx:
+                                attachments.append((f"Anexo_5.1_{student_id}.docx", docx_5_1))
                         
                         # 3. Send Email
                         ctx = {
                             "nombre_alumno": student_name,
                             "mentor_ie_nombre": mentor_ie_name,
-                            "mentor_ie_email": proj.get('maestros', {}).get('email_institucional', 'N/A')
+                            "mentor_ie_email": (proj.get('maestros') or {}).get('email_institucional', 'N/A')
                         }
                         
-                        success_em, msg_em = send_email(target_email, "Sistema DUAL - Asignación Mentor IE Oficial", "asignacion_mentor_ie.html", ctx, attachments)
+                        success_em, msg_em = enqueue_email(target_email, "Sistema DUAL - Asignación Mentor IE Oficial", "asignacion_mentor_ie.html", ctx, attachments, document_key=f"anexo_5.1:{proj['id']}")
                         
                         if success_em:
-                            st.success(f"Correo enviado a {target_email} con {len(attachments)} archivos adjuntos.")
+                            st.success(f"{msg_em}: {target_email} con {len(attachments)} archivos adjuntos.")
                         else:
                             st.error(f"Fallo envío: {msg_em}")
         else:
@@ -232,10 +226,10 @@ def render_fases_control():
                             "empresa_nombre": ue_name
                         }
                         
-                        success_m, msg_m = send_email(m_email, "Sistema DUAL - Portal de Evaluación Empresarial", "nuevo_mentor.html", ctx, attachments)
+                        success_m, msg_m = enqueue_email(m_email, "Sistema DUAL - Portal de Evaluación Empresarial", "nuevo_mentor.html", ctx, attachments)
                         
                         if success_m:
-                            st.success(f"Correo y claves enviados a {m_email}.")
+                            st.success(f"Claves actualizadas. {msg_m}: {m_email}.")
                         else:
                             st.error(f"Error al enviar: {msg_m}")
         else:
@@ -246,17 +240,15 @@ def render_fases_control():
         st.info("Alumnos que ya fueron evaluados por la empresa. Su Anexo 5.4 se sincronizó y envió automáticamente. Utilice esta lista para consultas o reenvíos.")
         
         # Query students with calificacion_ue NOT NULL and anexo_54_enviado TRUE (Historial)
-        res_inbox = supabase.table("proyectos_dual").select(
-             "id, alumno_id, calificacion_ue, alumnos(matricula, nombre, ap_paterno, ap_materno, email_institucional, email_personal)"
-        ).not_.is_("calificacion_ue", "null").is_("anexo_54_enviado", True).execute()
+        inbox = get_phase3_inbox(supabase)
         
-        if res_inbox.data:
+        if inbox:
              inbox_cols = st.columns([3, 2, 2])
              inbox_cols[0].markdown("**Alumno**")
              inbox_cols[1].markdown("**Calificación UE**")
              inbox_cols[2].markdown("**Acción**")
              
-             for p in res_inbox.data:
+             for p in inbox:
                   st_info = p.get('alumnos', {})
                   matr = st_info.get('matricula', 'S/N')
                   name = f"{st_info.get('nombre', '')} {st_info.get('ap_paterno', '')}".strip()
@@ -267,25 +259,19 @@ def render_fases_control():
                   
                   if c3.button("Reenviar Documento Oficial", key=f"btn_sync_{p['id']}"):
                        with st.spinner("Regenerando PDF y reenviando correos..."):
-                            import tempfile, shutil, time
                             from src.utils.anexo_data import get_anexo_5_4_data
                             
                             student_id = p['alumno_id']
                             data, msg = get_anexo_5_4_data(student_id)
                             
                             if data:
-                                 tmp_dir = os.path.join(tempfile.gettempdir(), f"dual_sync_{student_id}_{int(time.time())}")
-                                 os.makedirs(tmp_dir, exist_ok=True)
-                                 
-                                 docx_path = os.path.join(tmp_dir, f"Anexo_5.4_{matr}.docx")
-                                 t_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "docs", "Anexo_5.4_Reporte_de_Actividades.docx")
-                                 suc, _ = generate_docx_document("Anexo_5.4_Reporte_de_Actividades.docx", data, docx_path, t_path)
+                                 suc, docx_bytes = render_docx_bytes("Anexo_5.4_Reporte_de_Actividades.docx", data)
                                  
-                                 if suc and os.path.exists(docx_path):
-                                      # Fetch Mentor UE email
-                                      res_proj_info = supabase.table("proyectos_dual").select("mentores_ue(nombre_completo, email)").eq("id", p['id']).single().execute()
-                                      m_email = res_proj_info.data.get('mentores_ue', {}).get('email') if res_proj_info.data and res_proj_info.data.get('mentores_ue') else None
-                                      m_name = res_proj_info.data.get('mentores_ue', {}).get('nombre_completo', 'Mentor') if res_proj_info.data and res_proj_info.data.get('mentores_ue') else 'Mentor'
+                                 if suc:
+                                      attachment = (f"Anexo_5.4_{matr}.docx", docx_bytes)
+                                      m_info = p.get('mentores_ue') or {}
+                                      m_email = m_info.get('email')
+                                      m_name = m_info.get('nombre_completo', 'Mentor')
                                       s_email = st_info.get('email_institucional') or st_info.get('email_personal')
                                       
                                       ctx_mentor = {
@@ -301,7 +287,7 @@ def render_fases_control():
                                       success_flags = []
                                       if m_email:
                                            # Send to mentor
-                                           msuc, _ = send_email(m_email, f"Sistema DUAL - Anexo 5.4 Final", "base_notification.html", ctx_mentor, [docx_path])
+                                           msuc, _ = enqueue_email(m_email, f"Sistema DUAL - Anexo 5.4 Final", "base_notification.html", ctx_mentor, [attachment], document_key=f"anexo_5.4:{p['id']}")
                                            success_flags.append(msuc)
                                       
                                       if s_email:
@@ -314,18 +300,16 @@ def render_fases_control():
                                                 <p>Adjuntamos el <strong>Anexo 5.4 (Reporte de Actividades DUAL)</strong> como respaldo de tu excelente desempeño empresarial correspondiente al 70% de tu calificación DUAL.</p>
                                                 """
                                            }
-                                           ssuc, _ = send_email(s_email, f"Sistema DUAL - Evaluación Empresarial (Anexo 5.4)", "base_notification.html", ctx_student, [docx_path])
+                                           ssuc, _ = enqueue_email(s_email, f"Sistema DUAL - Evaluación Empresarial (Anexo 5.4)", "base_notification.html", ctx_student, [attachment], document_key=f"anexo_5.4:{p['id']}")
                                            success_flags.append(ssuc)
                                            
                                       if any(success_flags):
-                                           st.success("Anexo 5.4 Oficial Reenviado a las partes.")
+                                           st.success("Anexo 5.4 Oficial en cola de envío para las partes.")
                                       else:
-                                           st.error("No se pudo enviar el correo.")
+                                           st.error("No se pudo encolar el correo.")
                                            
                                  else:
                                       st.error("Error generando PDF.")
-                                      
-                                 shutil.rmtree(tmp_dir, ignore_errors=True)
                             else:
                                  st.error(f"Faltan datos: {msg}")
 
@@ -333,54 +317,17 @@ def render_fases_control():
              st.markdown("###### Acciones de Bandeja")
              if st.button("🚀 Sincronizar y Enviar Todos", type="primary", use_container_width=True):
                   with st.spinner("Procesando bandeja de entrada masiva..."):
-                       import tempfile, shutil, time
-                       from src.utils.anexo_data import get_anexo_5_4_data
-                       
-                       tmp_dir = os.path.join(tempfile.gettempdir(), f"dual_batch_{int(time.time())}")
-                       os.makedirs(tmp_dir, exist_ok=True)
+                       # Los documentos se generan en paralelo y se encolan conforme terminan
+                       progress = st.progress(0.0, text="Generando Anexos 5.4...")
+                       def _on_progress(done, total, _result):
+                            progress.progress(done / total, text=f"Anexos 5.4 generados: {done}/{total}")
                        
-                       success_count = 0
-                       for p in res_inbox.data:
-                            student_id = p['alumno_id']
-                            st_info = p.get('alumnos', {})
-                            matr = st_info.get('matricula', 'S/N')
-                            name = f"{st_info.get('nombre', '')} {st_info.get('ap_paterno', '')}".strip()
-                            
-                            data, _ = get_anexo_5_4_data(student_id)
-                            if data:
-                                 docx_path = os.path.join(tmp_dir, f"Anexo_5.4_{matr}.docx")
-                                 t_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "docs", "Anexo_5.4_Reporte_de_Actividades.docx")
-                                 suc, _ = generate_docx_document("Anexo_5.4_Reporte_de_Actividades.docx", data, docx_path, t_path)
-                                 
-                                 if suc and os.path.exists(docx_path):
-                                      res_proj_info = supabase.table("proyectos_dual").select("mentores_ue(nombre_completo, email)").eq("id", p['id']).single().execute()
-                                      m_email = res_proj_info.data.get('mentores_ue', {}).get('email') if res_proj_info.data and res_proj_info.data.get('mentores_ue') else None
-                                      m_name = res_proj_info.data.get('mentores_ue', {}).get('nombre_completo', 'Mentor') if res_proj_info.data and res_proj_info.data.get('mentores_ue') else 'Mentor'
-                                      s_email = st_info.get('email_institucional') or st_info.get('email_personal')
-                                      
-                                      ctx_mentor = {
-                                           "title": f"Anexo 5.4 Finalizado - {name}",
-                                           "message": f"<p>Estimado/a <strong>{m_name}</strong>,</p><p>La Coordinación ha sincronizado exitosamente la evaluación que registró en el portal para el estudiante <b>{name}</b>.</p><p>Se adjunta para su archivo el <strong>Anexo 5.4</strong>.</p>"
-                                      }
-                                      ctx_student = {
-                                           "title": f"¡Evaluación Empresarial Lista!",
-                                           "message": f"<p>Hola <strong>{name}</strong>,</p><p>Tu coordinador ha procesado la calificación otorgada por tu Mentor en la Unidad Económica.</p><p>Adjuntamos tu <strong>Anexo 5.4</strong>.</p>"
-                                      }
-                                      
-                                      sent_any = False
-                                      if m_email:
-                                           sent, _ = send_email(m_email, f"Sistema DUAL - Anexo 5.4 Final", "base_notification.html", ctx_mentor, [docx_path])
-                                           if sent: sent_any = True
-                                      if s_email:
-                                           sent, _ = send_email(s_email, f"Sistema DUAL - Evaluación UE", "base_notification.html", ctx_student, [docx_path])
-                                           if sent: sent_any = True
-                                           
-                                      if sent_any:
-                                           supabase.table("proyectos_dual").update({"anexo_54_enviado": True}).eq("id", p['id']).execute()
-                                           success_count += 1
-                                           
-                       shutil.rmtree(tmp_dir, ignore_errors=True)
-                       st.success(f"Se sincronizaron y enviaron {success_count} expedientes.")
+                       # La outbox persiste los correos; el worker los envía con reintentos
+                       summary = sync_phase3_inbox(inbox, progress_callback=_on_progress, supabase=supabase)
+                       failed = summary["failed"]
+                       if failed:
+                            st.warning(f"{len(failed)} correos no pudieron encolarse: " + "; ".join(f"{to} ({msg})" for to, msg in failed[:5]))
+                       st.success(f"Se sincronizaron {len(summary['queued_projects'])} expedientes; sus correos quedaron en la cola de envío.")
                        st.rerun()
                        
         else:
@@ -425,7 +372,7 @@ def render_fases_control():
                         st.error("Docente sin correo registrado.")
                         continue
                         
-                    with st.spinner("Enviando recordatorio..."):
+                    with st.spinner("Encolando recordatorio..."):
                         ctx = {
                             "title": "Apertura de Evaluación Final IE (30%) - Sistema DUAL",
                             "message": f"""
@@ -447,9 +394,9 @@ def render_fases_control():
                             start_date=dt_end_period
                         )
                         
-                        suc, msg = send_email(m_email, "Acceso a Evaluación DUAL (Mentor IE)", "base_notification.html", ctx, [ics_path_ie] if ics_path_ie else None)
+                        suc, msg = enqueue_email(m_email, "Acceso a Evaluación DUAL (Mentor IE)", "base_notification.html", ctx, [ics_path_ie] if ics_path_ie else None)
                         
-                        if suc: st.success("Enlace enviado correctamente.")
+                        if suc: st.success(msg)
                         else: st.error(f"Error: {msg}")
         else:
             st.info("No hay proyectos activos con Mentor Institucional para evaluar.")
@@ -459,112 +406,86 @@ def render_fases_control():
         st.info("Ponderación final (Anexo 5.5) y emisión automática masiva de actas o PDF a profesores de asignatura.")
         
         # We need projects to display the consolidation
-        res_p5 = supabase.table("proyectos_dual").select(
+        projects_p5 = fetch_all_rows(lambda: supabase.table("proyectos_dual").select(
             "id, alumno_id, calificacion_ue, calificacion_ie, alumnos(matricula, nombre, ap_paterno, ap_materno)"
-        ).execute()
+        ).order("id"))
         
-        if res_p5.data:
+        if projects_p5:
             st.markdown("##### Concentrado General de Calificaciones DUAL")
+            st.caption("Edita las calificaciones en la tabla y guarda todos los cambios a la vez. UE en escala 0-100 (70%), IE en escala 0-10 (30%).")
+            if "f5_save_msg" in st.session_state:
+                st.success(st.session_state.pop("f5_save_msg"))
             
-            # Create a simple table or list
-            for proj in res_p5.data:
-                student = proj.get('alumnos') or {}
-                s_name = f"{student.get('nombre', '')} {student.get('ap_paterno', '')}".strip()
-                matr = student.get('matricula', 'S/N')
-                
-                c_ue = proj.get('calificacion_ue')
-                c_ie = proj.get('calificacion_ie')
-                
-                # Handling None values safely
-                val_ue = float(c_ue) if c_ue is not None else 0.0 # 0-100 scale
-                val_ie = float(c_ie) if c_ie is not None else 0.0 # 0-10 scale
-                
-                # Consolidation Logic (Convert everything to a 10-point scale)
-                final_grade = ((val_ue / 10.0) * 0.7) + (val_ie * 0.3)
-                
-                status_color = "🟢" if final_grade >= 7.0 and c_ue is not None and c_ie is not None else "🔴"
-                if c_ue is None or c_ie is None: status_color = "🟡" # Pendiente
-                
-                c5_1, c5_2, c5_3, c5_4, c5_5, c5_6 = st.columns([2.5, 1.5, 1.5, 1.5, 1.5, 1.5])
-                c5_1.write(f"{status_color} **{s_name}** ({matr})")
-                
-                # Let coordinator manually adjust if needed via a quick popover
-                with c5_2.popover(f"UE: {val_ue} (70%)"):
-                    new_ue = st.number_input("Ajustar Calif. UE (Escala 0-100)", min_value=0.0, max_value=100.0, value=val_ue, step=1.0, key=f"adj_ue_{proj['id']}")
-                    if st.button("Guardar (UE)", key=f"save_ue_{proj['id']}"):
-                        supabase.table("proyectos_dual").update({"calificacion_ue": new_ue}).eq("id", proj['id']).execute()
-                        st.rerun()
-                        
-                with c5_3.popover(f"IE: {val_ie:.1f} (30%)"):
-                    new_ie = st.number_input("Ajustar Calif. IE (Escala 0-10)", min_value=0.0, max_value=10.0, value=val_ie, step=0.1, key=f"adj_ie_{proj['id']}")
-                    if st.button("Guardar (IE)", key=f"save_ie_{proj['id']}"):
-                        supabase.table("proyectos_dual").update({"calificacion_ie": new_ie}).eq("id", proj['id']).execute()
-                        st.rerun()
-                
-                c5_4.markdown(f"**Total: {final_grade:.2f}/10**")
-                
-                # To do: Generate real Anexo 5.5
-                c5_5.button("Emitir 5.5", key=f"f5_btn_{proj['id']}", disabled=(c_ue is None or c_ie is None))
+            grades = consolidate_grades(grades_frame(projects_p5))
+            edited = st.data_editor(
+                grades[["semaforo", "matricula", "alumno", "calificacion_ue", "calificacion_ie", "calificacion_final", "estatus"]],
+                column_config={
+                    "semaforo": st.column_config.TextColumn("", width="small"),
+                    "matricula": "Matrícula",
+                    "alumno": "Alumno",
+                    "calificacion_ue": st.column_config.NumberColumn("Calif. UE (70%)", min_value=0.0, max_value=100.0, step=1.0),
+                    "calificacion_ie": st.column_config.NumberColumn("Calif. IE (30%)", min_value=0.0, max_value=10.0, step=0.1, format="%.1f"),
+                    "calificacion_final": st.column_config.NumberColumn("Total /10", format="%.2f"),
+                    "estatus": "Estatus",
+                },
+                disabled=["semaforo", "matricula", "alumno", "calificacion_final", "estatus"],
+                hide_index=True,
+                use_container_width=True,
+                key="f5_grades_editor"
+            )
+            
+            changes = diff_grade_edits(grades, edited)
+            preview = consolidate_grades(grades.assign(calificacion_ue=edited["calificacion_ue"], calificacion_ie=edited["calificacion_ie"]))
+            m5_1, m5_2, m5_3 = st.columns(3)
+            m5_1.metric("Acreditados", int((preview["estatus"] == ESTATUS_ACREDITADA).sum()))
+            m5_2.metric("No Acreditados", int((preview["estatus"] == ESTATUS_NO_ACREDITADA).sum()))
+            m5_3.metric("Pendientes", int((preview["estatus"] == ESTATUS_PENDIENTE).sum()))
+            
+            if st.button(f"💾 Guardar Calificaciones ({len(changes)} proyectos con cambios)", disabled=not changes, key="f5_save_grades"):
+                with st.spinner("Guardando calificaciones..."):
+                    ok_save, msg_save = save_grade_edits(changes, supabase)
+                if ok_save:
+                    st.session_state.pop("f5_grades_editor", None)
+                    st.session_state["f5_save_msg"] = msg_save
+                    st.rerun()
+                else:
+                    st.error(f"No se pudieron guardar las calificaciones: {msg_save}")
             
             st.divider()
             st.markdown("##### Acciones Globales")
             
             if st.button("📄 Exportar Actas de Calificaciones (DOCX)", type="secondary", use_container_width=True):
                 with st.spinner("Generando Acta Global DUAL..."):
-                    import os, base64, tempfile, time
-                    from src.utils.pdf_generator_docx import generate_docx_document
-                    
-                    # Construct Data for the Template
-                    lista_alumnos = []
-                    for idx, proj in enumerate(res_p5.data):
-                        student = proj.get('alumnos') or {}
-                        c_ue = proj.get('calificacion_ue')
-                        c_ie = proj.get('calificacion_ie')
-                        
-                        val_ue = float(c_ue) if c_ue is not None else 0.0
-                        val_ie = float(c_ie) if c_ie is not None else 0.0
-                        final_grade = min(10.0, ((val_ue / 10.0) * 0.7) + (val_ie * 0.3))
-                        
-                        letra = "Acreditada" if final_grade >= 7.0 else "No Acreditada"
-                        if c_ue is None or c_ie is None: letra = "Pendiente de Evaluar"
-                        
-                        lista_alumnos.append({
-                            "numero": idx + 1,
-                            "matricula": student.get("matricula", "S/N"),
-                            "nombre_alumno": f"{student.get('nombre', '')} {student.get('ap_paterno', '')} {student.get('ap_materno', '')}".strip(),
-                            "calificacion_final": f"{final_grade:.2f}" if c_ue is not None and c_ie is not None else "N/A",
-                            "calificacion_letra": letra
-                        })
+                    # Construct Data for the Template (same consolidation as the grid)
+                    lista_alumnos = acta_rows(grades)
                         
                     acta_data = {
                         "fecha_impresion": datetime.today().strftime('%d/%m/%Y'),
                         "periodo_escolar": "Semestre Actual", # Could be dynamically fetched
                         "asignatura": "PROGRAMA EDUCACIÓN DUAL (GLOBAL)",
-                        "profesor": user.get('nombre_completo', 'Coordinador DUAL'),
+                        "profesor": (st.session_state.get("user") or {}).get('nombre_completo', 'Coordinador DUAL'),
                         "alumnos": lista_alumnos
                     }
                     
-                    tmp_dir = os.path.join(tempfile.gettempdir(), f"dual_actas_{int(time.time())}")
-                    os.makedirs(tmp_dir, exist_ok=True)
-                    docx_path = os.path.join(tmp_dir, "Acta_Calificaciones_DUAL.docx")
-                    t_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "docs", "Acta_Calificaciones_Materia.docx")
+                    suc, result = render_docx_bytes("Acta_Calificaciones_Materia.docx", acta_data)
                     
-                    suc, msg = generate_docx_document("Acta_Calificaciones_Materia.docx", acta_data, docx_path, t_path)
-                    
-                    if suc and os.path.exists(docx_path):
-                        with open(docx_path, "rb") as f:
-                            docx_bytes = f.read()
-                        b64_docx = base64.b64encode(docx_bytes).decode()
-                        download_href = f'<a href="data:application/vnd.openxmlformats-officedocument.wordprocessingml.document;base64,{b64_docx}" download="Acta_Calificaciones_DUAL.docx" style="display:inline-block; padding:8px 16px; background-color:#8d2840; color:white; text-decoration:none; border-radius:4px; font-weight:bold;">⬇️ Descargar Acta de Calificaciones DUAL (DOCX)</a>'
-                        st.markdown(download_href, unsafe_allow_html=True)
+                    if suc:
+                        st.download_button(
+                            "⬇️ Descargar Acta de Calificaciones DUAL (DOCX)",
+                            data=result,
+                            file_name="Acta_Calificaciones_DUAL.docx",
+                            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                            type="primary",
+                            key="dl_acta_dual"
+                        )
                         st.success("Acta generada exitosamente. Haga clic en el botón superior para descargarla.")
                     else:
-                        st.error(f"Error al generar Acta: {msg}")
+                        st.error(f"Error al generar Acta: {result}")
             
             if st.button("🎓 Generar Cartas de Terminación y Reconocimientos en Lote (Fase 5.1)", type="primary", use_container_width=True, key="btn_lote_51"):
                 with st.spinner("Generando documentos de cierre en lote..."):
                     # Find eligible students
-                    eligible = [p for p in res_p5.data if p.get('calificacion_ue') is not None and p.get('calificacion_ie') is not None]
+                    eligible = [p for p in projects_p5 if p.get('calificacion_ue') is not None and p.get('calificacion_ie') is not None]
                     
                     if not eligible:
                         st.warning("No hay alumnos con calificaciones completas para generar constancias.")
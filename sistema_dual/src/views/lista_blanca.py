@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from src.db_connection import get_supabase_client
+from src.utils.whitelist_import import import_whitelist, REQUIRED_COLUMNS
 import io
 
 def render_lista_blanca():
@@ -23,12 +24,13 @@ def render_lista_blanca():
         
         if uploaded_file is not None:
             try:
-                df = pd.read_csv(uploaded_file)
+                # Como texto: evita que las matrículas se lean como números (y pierdan ceros)
+                df = pd.read_csv(uploaded_file, dtype=str, keep_default_na=False)
                 
                 # Normalize headers
                 df.columns = [c.upper().strip() for c in df.columns]
                 
-                required_cols = ["MATRICULA", "NOMBRE COMPLETO"]
+                required_cols = REQUIRED_COLUMNS
                 if not all(col in df.columns for col in required_cols):
                     st.error(f"El archivo debe contener al menos las columnas: {', '.join(required_cols)}")
                 else:
@@ -37,39 +39,26 @@ def render_lista_blanca():
                     
                     if st.button("Procesar y Cargar Lista"):
                         progress_bar = st.progress(0)
-                        success_count = 0
-                        skip_count = 0
-                        error_count = 0
                         
-                        total = len(df)
+                        def _on_progress(done, total):
+                            progress_bar.progress(min(done / total, 1.0))
                         
-                        for i, row in df.iterrows():
-                            matricula = str(row["MATRICULA"]).strip()
-                            nombre = str(row["NOMBRE COMPLETO"]).strip()
-                            curp = str(row.get("CURP", "")).strip() if "CURP" in df.columns else None
-                            
-                            try:
-                                # Check duplicate (Ideally per career, but usually global unique matricula)
-                                res = supabase.table("lista_blanca").select("matricula").eq("matricula", matricula).execute()
-                                if res.data:
-                                    skip_count += 1
-                                else:
-                                    # Insert
-                                    new_record = {
-                                        "matricula": matricula,
-                                        "nombre_completo": nombre,
-                                        "curp": curp,
-                                        "registrado": False,
-                                        "carrera_id": coordinator_career_id # Associate with Coordinator's Career
-                                    }
-                                    supabase.table("lista_blanca").insert(new_record).execute()
-                                    success_count += 1
-                            except Exception as e:
-                                error_count += 1
-                            
-                            progress_bar.progress((i + 1) / total)
-                            
-                        st.success(f"Proceso finalizado: {success_count} nuevos, {skip_count} omitidos, {error_count} errores.")
+                        try:
+                            report = import_whitelist(df, coordinator_career_id, supabase=supabase, progress_callback=_on_progress)
+                        except Exception as e:
+                            st.error(f"Error al cargar la lista: {e}")
+                        else:
+                            progress_bar.progress(1.0)
+                            st.success(
+                                f"Proceso finalizado: {len(report['inserted'])} nuevos, "
+                                f"{len(report['skipped'])} omitidos, {len(report['invalid'])} inválidos."
+                            )
+                            if report["invalid"]:
+                                with st.expander(f"⚠️ Filas inválidas ({len(report['invalid'])})", expanded=True):
+                                    st.dataframe(pd.DataFrame(report["invalid"]), use_container_width=True, hide_index=True)
+                            if report["skipped"]:
+                                with st.expander(f"Filas omitidas ({len(report['skipped'])})"):
+                                    st.dataframe(pd.DataFrame(report["skipped"]), use_container_width=True, hide_index=True)
                         
             except Exception as e:
                 st.error(f"Error al leer el archivo: {e}")
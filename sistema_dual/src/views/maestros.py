@@ -3,6 +3,10 @@ import streamlit as st
 import pandas as pd
 import json
 from src.db_connection import get_supabase_client
+from src.utils.catalogs import invalidate_catalogs, MAESTROS
+from src.utils.mail_queue import enqueue_email
+from src.utils.query_batch import run_queries
+from src.components.outbox_panel import render_outbox_panel
 
 def render_maestros():
     st.header("Gestión de Maestros y Mentores IE")
@@ -15,6 +19,8 @@ def render_maestros():
     if selected_career_name:
         st.caption(f"Gestionando para: **{selected_career_name}**")
 
+    render_outbox_panel(key="maestros_outbox")
+
     # Tabs for List and Create
     tab_list, tab_create = st.tabs(["Listado de Maestros", "Registrar Nuevo Maestro"])
 
@@ -102,6 +108,7 @@ def render_maestros():
                                 "telefono": e_tel,
                                 "es_mentor_ie": e_mentor
                             }).eq("id", m['id']).execute()
+                            invalidate_catalogs(MAESTROS)
                             st.success("Maestro actualizado.")
                             st.rerun()
                     
@@ -138,10 +145,12 @@ def render_maestros():
                                 "mentor_password": raw_pw,
                                 "frase_inspiradora": frase_ie
                             }
-                            from src.utils.notifications import send_email
-                            send_email(m.get('email_institucional', ''), "Credenciales de Acceso Mentor IE - Sistema DUAL", "recuperacion_mentor.html", ctx)
-                            st.toast("Contraseña regenerada y enviada al docente.", icon="✅")
-                            st.success(f"Contraseña de Mentor IE regenerada y enviada a {m['nombre_completo']}.")
+                            queued, msg = enqueue_email(m.get('email_institucional', ''), "Credenciales de Acceso Mentor IE - Sistema DUAL", "recuperacion_mentor.html", ctx)
+                            if queued:
+                                st.toast("Contraseña regenerada; el correo quedó en cola de envío.", icon="✅")
+                                st.success(f"Contraseña de Mentor IE regenerada para {m['nombre_completo']}; el correo quedó en cola de envío.")
+                            else:
+                                st.error(f"Contraseña de Mentor IE regenerada para {m['nombre_completo']}, pero no se pudo encolar el correo: {msg}")
                             st.info(f"Contraseña temporal nueva: **{raw_pw}**")
                         st.divider()
 
@@ -149,6 +158,7 @@ def render_maestros():
                     st.error("Zona de Peligro")
                     if st.button("Eliminar Maestro", key=f"del_m_{m['id']}"):
                         supabase.table("maestros").delete().eq("id", m['id']).execute()
+                        invalidate_catalogs(MAESTROS)
                         st.success("Maestro eliminado.")
                         st.rerun()
                 
@@ -165,6 +175,7 @@ def render_maestros():
                         if confirm_batch:
                             try:
                                 supabase.table("maestros").delete().in_("id", selected_teachers).execute()
+                                invalidate_catalogs(MAESTROS)
                                 st.success(f"{len(selected_teachers)} maestro(s) eliminados correctamente.")
                                 st.rerun()
                             except Exception as e:
@@ -176,7 +187,6 @@ def render_maestros():
                 with st.form("batch_send_credentials_maestros_form"):
                     if st.form_submit_button("📧 Enviar Credenciales a Mentores IE Seleccionados"):
                         import random, string, hashlib
-                        from src.utils.notifications import send_email
                         
                         sent_count = 0
                         for t_id in selected_teachers:
@@ -204,11 +214,12 @@ def render_maestros():
                                     "mentor_password": raw_pw,
                                     "frase_inspiradora": frase_ie
                                 }
-                                send_email(t_info['email_institucional'], "Credenciales de Acceso Mentor IE - Sistema DUAL", "nuevo_mentor_ie.html", ctx)
-                                sent_count += 1
+                                queued, _ = enqueue_email(t_info['email_institucional'], "Credenciales de Acceso Mentor IE - Sistema DUAL", "nuevo_mentor_ie.html", ctx)
+                                if queued:
+                                    sent_count += 1
                                 
-                        st.toast(f"Credenciales enviadas a {sent_count} Mentores IE.", icon="✅")
-                        st.success(f"Se generaron y enviaron credenciales a {sent_count} Mentores IE.")
+                        st.toast(f"Credenciales en cola para {sent_count} Mentores IE.", icon="✅")
+                        st.success(f"Se generaron credenciales para {sent_count} Mentores IE; los correos quedaron en cola de envío.")
                         # We don't always rerun immediately to let them read the success message.
 
         else:
@@ -226,10 +237,20 @@ def render_maestros():
             st.rerun()
             
         t_tab1, t_tab2 = st.tabs(["Asignaturas Impartidas", "Alumnos Inscritos"])
+
+        # Las dos pestañas se cargan juntas; los errores se muestran en su pestaña
+        detail = run_queries({
+            "asignaturas": supabase.table("rel_maestros_asignaturas").select("asignatura_id, asignaturas(nombre, clave_asignatura, semestre)").eq("maestro_id", t_id),
+            "alumnos": supabase.table("inscripciones_asignaturas").select(
+                "alumno_id, alumnos(matricula, nombre, ap_paterno, ap_materno), asignatura_id, asignaturas(nombre), grupo"
+            ).eq("maestro_id", t_id),
+        }, return_exceptions=True)
         
         with t_tab1:
             # Get Subjects
-            res_s = supabase.table("rel_maestros_asignaturas").select("asignatura_id, asignaturas(nombre, clave_asignatura, semestre)").eq("maestro_id", t_id).execute()
+            res_s = detail["asignaturas"]
+            if isinstance(res_s, Exception):
+                raise res_s
             # Note: 'grupo' is likely not in 'asignaturas' table but in the relation or students table? 
             # In 'rel_maestros_asignaturas' there is NO group. Group is defined when STUDENT registers. 
             # Wait, 'asignaturas' table has static data. 
@@ -268,9 +289,9 @@ def render_maestros():
                 # I suspect 'rel_alumnos_asignaturas' Does NOT exist in the new schema. 
                 # It should be 'inscripciones_asignaturas'.
                 
-                res_students = supabase.table("inscripciones_asignaturas").select(
-                    "alumno_id, alumnos(matricula, nombre, ap_paterno, ap_materno), asignatura_id, asignaturas(nombre), grupo"
-                ).eq("maestro_id", t_id).execute()
+                res_students = detail["alumnos"]
+                if isinstance(res_students, Exception):
+                    raise res_students
                 
                 if res_students.data:
                     # Flatten
@@ -294,7 +315,7 @@ def render_maestros():
                         if not t_email:
                             st.error("El docente no cuenta con un correo institucional registrado para enviar la relación.")
                         else:
-                            with st.spinner("Generando y enviando relación..."):
+                            with st.spinner("Generando y encolando relación..."):
                                 # Generate HTML rows
                                 html_rows = ""
                                 for st_item in stud_list:
@@ -317,13 +338,12 @@ def render_maestros():
                                     "frase_inspiradora": frase_ie
                                 }
                                 
-                                from src.utils.notifications import send_email
-                                suc, msg = send_email(t_email, "Relación Oficial de Alumnos Asignados - DUAL", "relacion_alumnos_ie.html", ctx)
+                                suc, msg = enqueue_email(t_email, "Relación Oficial de Alumnos Asignados - DUAL", "relacion_alumnos_ie.html", ctx, document_key=f"relacion_ie:{t_id}")
                                 
                                 if suc:
-                                    st.success(f"Relación enviada exitosamente a {t_email}")
+                                    st.success(f"{msg}: relación para {t_email}")
                                 else:
-                                    st.error(f"Error al enviar correo: {msg}")
+                                    st.error(f"Error al encolar correo: {msg}")
                 else:
                     st.info("No hay alumnos inscritos con este maestro.")
             except Exception as ex:
@@ -397,6 +417,7 @@ def render_maestros():
                     
                     try:
                         res_ins = supabase.table("maestros").insert(maestro_data).execute()
+                        invalidate_catalogs(MAESTROS)
                         if res_ins.data:
                             new_id = res_ins.data[0]["id"]
                             
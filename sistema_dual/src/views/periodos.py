@@ -2,13 +2,7 @@ import streamlit as st
 from datetime import datetime
 from src.db_connection import get_supabase_client
 from src.utils.email_sender import send_period_invites
-
-def wipe_mentor_passwords(supabase):
-    """Borra todas las contraseñas de los Mentores UE cuando se cierra un periodo."""
-    try:
-        supabase.table("mentores_ue").update({"password_hash": None}).neq("nombre_completo", "").execute()
-    except Exception as e:
-        print(f"Error wiped: {e}")
+from src.utils.db_actions import wipe_mentor_passwords, close_period
 
 def render_periodos():
     st.subheader("Gestión de Periodos Escolares")
@@ -276,52 +270,20 @@ def render_periodos():
                      st.write("**Periodo Activo.** Al cerrar el periodo, los alumnos activos serán evaluados y enviados a 'Egresos' o 'Reinscripción' dependiendo de la vigencia de su convenio. También se borrarán las contraseñas temporales de los Mentores UE.")
                      
                      if st.button("Ejecutar Cierre Automático", type="primary", key=f"btn_close_adv_{p['id']}"):
-                         try:
-                             # 1. Disable Period & Wipe Passwords
-                             supabase.table("periodos").update({"activo": False}).eq("id", p['id']).execute()
-                             wipe_mentor_passwords(supabase)
-                             
-                             # 2. Automated Handle Students based on fecha_fin_convenio
-                             res_proj = supabase.table("proyectos_dual").select("alumno_id, fecha_fin_convenio").eq("periodo_id", p['id']).execute()
-                             if res_proj.data:
-                                 to_grad = []
-                                 to_keep = []
-                                 
-                                 # Get current period end date
-                                 period_end_date_str = p.get('fecha_fin')
-                                 period_end_date = datetime.strptime(period_end_date_str, '%Y-%m-%d').date() if period_end_date_str else datetime.today().date()
-                                 
-                                 for row in res_proj.data:
-                                     al_id = row['alumno_id']
-                                     fin_conv_str = row.get('fecha_fin_convenio')
-                                     
-                                     if fin_conv_str:
-                                         try:
-                                            fin_conv = datetime.strptime(fin_conv_str, '%Y-%m-%d').date()
-                                            if fin_conv <= period_end_date:
-                                                to_grad.append(al_id) # Finalizó
-                                            else:
-                                                to_keep.append(al_id) # Sigue vivo (Reinscribe)
-                                         except ValueError:
-                                            to_keep.append(al_id) # Safe fallback
-                                     else:
-                                         to_keep.append(al_id) # Safe fallback
-                                 
-                                 if to_grad:
-                                     supabase.table("alumnos").update({"estatus": "En Espera de Egreso"}).in_("id", to_grad).execute()
-                                 
-                                 if to_keep:
-                                     supabase.table("alumnos").update({"estatus": "En Espera de Reinscripción"}).in_("id", to_keep).execute()
-                                     
-                                 st.success(f"Cierre completado. {len(to_grad)} pasaron a Egreso y {len(to_keep)} a Reinscripción.")
+                         # Desactiva, borra contraseñas y reparte a Egreso/Reinscripción por fecha fin de convenio
+                         ok, result = close_period(p, supabase)
+                         if ok:
+                             to_grad, to_keep = result
+                             if to_grad or to_keep:
+                                 st.success(f"Cierre completado. {to_grad} pasaron a Egreso y {to_keep} a Reinscripción.")
                              else:
                                  st.success("Periodo cerrado. No había proyectos activos.")
                              
                              import time
                              time.sleep(2)
                              st.rerun()
-                         except Exception as e:
-                             st.error(f"Error al cerrar periodo: {e}")
+                         else:
+                             st.error(f"Error al cerrar periodo: {result}")
                  
                  with c3.popover("⚠️ Purgar"):
                     st.error("¿ELIMINAR A TODOS LOS ALUMNOS de este periodo activo? (Borrando proyectos, inscripciones y anexos).")
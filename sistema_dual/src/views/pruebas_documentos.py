@@ -3,9 +3,10 @@ import os
 import random
 from datetime import datetime
 from src.db_connection import get_supabase_client
+from src.utils.catalogs import invalidate_catalogs
 from src.utils.anexo_data import get_anexo_5_1_data
 from src.utils.pdf_generator_docx import generate_docx_document
-from src.utils.pdf_generator_images import create_percentage_donut
+from src.utils.pdf_generator_images import percentage_donut_png
 import base64
 
 def auto_download_file(file_path, file_name):
@@ -144,11 +145,8 @@ def render_pruebas_documentos():
         st.subheader("Anexo 5.4 - Reporte de Actividades")
         if st.button("Generar Prueba Anexo 5.4", use_container_width=True):
             with st.spinner("Compilando documento e insertando gráficas simuladas..."):
-                chart_path = os.path.join(os.path.dirname(__file__), "test_chart_temp.png")
-                create_percentage_donut(85, chart_path) # Dummy 85%
-                
                 context = get_dummy_context()
-                context["grafica_promedio"] = f"IMAGE_PATH:{chart_path}"
+                context["grafica_promedio"] = percentage_donut_png(85) # Dummy 85%
                 
                 import tempfile
                 out_dir = tempfile.gettempdir()
@@ -156,7 +154,6 @@ def render_pruebas_documentos():
                 template_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "docs", "Anexo_5.4_Reporte_de_Actividades.docx")
                 
                 success, result_msg = generate_docx_document("Anexo_5.4_Reporte_de_Actividades.docx", context, docx_path, template_path)
-                if os.path.exists(chart_path): os.remove(chart_path)
                 if success:
                     auto_download_file(docx_path, os.path.basename(docx_path))
                     st.success("¡Documento generado! La descarga comenzará automáticamente.")
@@ -242,6 +239,7 @@ def render_pruebas_documentos():
 
             # 4. Subjects are deleted explicitly last.
             supa.table("asignaturas").delete().like("clave_asignatura", "MOCK-%").execute()
+            invalidate_catalogs()
 
         col_mock1, col_mock2 = st.columns(2)
         
@@ -361,6 +359,7 @@ def render_pruebas_documentos():
                                     if actividades_data:
                                         supabase.table("actividades_aprendizaje").insert(actividades_data).execute()
                                 
+                                invalidate_catalogs()
                                 st.success("¡Universo MOCK Inyectado! (3 Asignaturas, 6 Competencias, 5 Maestros, 2 UEs, 3 Mentores UE, 3 Alumnos). Todos usarán el correo proporcionado para pruebas de Fases.")
                     except Exception as e:
                         st.error(f"Error insertando: {e}")
@@ -2,15 +2,13 @@
 import streamlit as st
 from datetime import date, datetime
 from src.utils.helpers import calculate_age
-from src.db_connection import get_supabase_client
 from src.utils.db_actions import create_student_transaction
+from src.utils.catalogs import get_unidades_economicas, get_mentores_ue, get_asignaturas, get_maestros
 
 def render_registro_coordinador():
     st.header("Alta de Alumno (Modalidad Coordinador)")
     st.info("Utilice este formulario para registrar manualmente a un alumno en el sistema DUAL.")
     
-    supabase = get_supabase_client()
-    
     # State management for Coordinator's form
     if "coord_reg_step" not in st.session_state:
         st.session_state["coord_reg_step"] = 1
@@ -87,8 +85,7 @@ def render_registro_coordinador():
         st.subheader("Paso 2: Datos del Proyecto DUAL")
         
         # Load Companies
-        res_ue = supabase.table("unidades_economicas").select("id, nombre_comercial").execute()
-        ues = res_ue.data if res_ue.data else []
+        ues = get_unidades_economicas()
         ue_options = {ue["nombre_comercial"]: ue["id"] for ue in ues}
         
         col_proj1, col_proj2 = st.columns(2)
@@ -98,10 +95,7 @@ def render_registro_coordinador():
             ue_id = ue_options.get(selected_ue_name)
             
             # Load Mentors for selected UE
-            mentors = []
-            if ue_id:
-                res_mentors = supabase.table("mentores_ue").select("id, nombre_completo").eq("ue_id", ue_id).execute()
-                mentors = res_mentors.data
+            mentors = get_mentores_ue(ue_id)
             
             mentor_options = {m["nombre_completo"]: m["id"] for m in mentors}
             selected_mentor_name = st.selectbox("Mentor Industrial (Mentor UE)", list(mentor_options.keys()) if mentors else ["No hay mentores registrados"])
@@ -156,12 +150,10 @@ def render_registro_coordinador():
             st.session_state["coord_subjects_data"] = []
             
         # Fetch Catalogues
-        res_subjects = supabase.table("asignaturas").select("id, nombre, clave_asignatura").execute()
-        subjects = res_subjects.data if res_subjects.data else []
+        subjects = get_asignaturas()
         subject_options = {f"{s['clave_asignatura']} - {s['nombre']}": s["id"] for s in subjects}
         
-        res_teachers = supabase.table("maestros").select("id, nombre_completo, es_mentor_ie").execute()
-        teachers = res_teachers.data if res_teachers.data else []
+        teachers = get_maestros()
         teacher_options = {t["nombre_completo"]: t["id"] for t in teachers}
 
         # Add form
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from src.db_connection import get_supabase_client
-from src.utils.assignment import assign_mentors_round_robin
+from src.utils.assignment import assign_mentors_round_robin, apply_mentor_assignment, assignment_distribution
 
 def render_reportes():
     st.title("📊 Panel de Inteligencia y Reportes")
@@ -14,14 +14,51 @@ def render_reportes():
     # -----------------------------------------
     col_auto1, col_auto2 = st.columns(2)
     with col_auto1:
-        st.info("**Asignación Global de Mentores IE**\n\nEste botón buscará a todos los alumnos con proyectos activos que NO tengan Mentor IE asignado, y se los asignará equitativamente (Round-Robin) basándose en los maestros registrados.")
-        if st.button("🎲 Ejecutar Asignación Global", use_container_width=True):
-            with st.spinner("Asignando..."):
-                success, msg = assign_mentors_round_robin()
+        st.info("**Asignación Global de Mentores IE**\n\nEste botón buscará a todos los alumnos con proyectos activos que NO tengan Mentor IE asignado. *Balanceo de carga* los asigna al Mentor IE con menos proyectos en el periodo; *Afinidad* prefiere maestros de la misma carrera que impartan las asignaturas del alumno, sin pasar del cupo por maestro.")
+        estrategia = st.radio("Estrategia", ["Balanceo de carga", "Afinidad (carrera y asignaturas)"], horizontal=True)
+        if estrategia != "Balanceo de carga":
+            # scipy solo se carga si se usa la asignación por afinidad
+            from src.utils.mentor_matching import plan_affinity_assignment, CAPACIDAD_MAX
+            capacidad = st.number_input("Cupo máximo de proyectos por Mentor IE", min_value=1, value=CAPACIDAD_MAX, step=1)
+        if st.button("🎲 Vista Previa de Asignación Global", use_container_width=True):
+            with st.spinner("Calculando asignación..."):
+                if estrategia == "Balanceo de carga":
+                    success, plan = assign_mentors_round_robin(dry_run=True)
+                else:
+                    success, plan = plan_affinity_assignment(capacity=capacidad)
                 if success:
-                    st.success(msg)
+                    st.session_state["assignment_plan"] = plan
                 else:
-                    st.error(msg)
+                    st.session_state.pop("assignment_plan", None)
+                    st.error(plan)
+
+        plan = st.session_state.get("assignment_plan")
+        if plan is not None:
+            if not plan["assignments"] and not plan.get("unassigned"):
+                st.success("No pending assignments found.")
+                st.session_state.pop("assignment_plan", None)
+            else:
+                st.markdown(f"###### Distribución resultante ({len(plan['assignments'])} proyectos por asignar)")
+                if "stats" in plan:
+                    m1, m2, m3 = st.columns(3)
+                    m1.metric("Misma carrera", plan["stats"]["misma_carrera"])
+                    m2.metric("Asignaturas en común", plan["stats"]["asignaturas_en_comun"])
+                    m3.metric("Sin cupo", plan["stats"]["sin_asignar"])
+                    if plan["stats"]["sin_asignar"]:
+                        st.warning(f"{plan['stats']['sin_asignar']} proyectos quedarán sin Mentor IE: no hay cupo suficiente.")
+                st.dataframe(pd.DataFrame(assignment_distribution(plan)), use_container_width=True, hide_index=True)
+                c_ok, c_cancel = st.columns(2)
+                if c_ok.button("✅ Confirmar Asignación", use_container_width=True, type="primary"):
+                    with st.spinner("Asignando..."):
+                        success, msg = apply_mentor_assignment(plan)
+                    st.session_state.pop("assignment_plan", None)
+                    if success:
+                        st.success(msg)
+                    else:
+                        st.error(msg)
+                if c_cancel.button("Descartar", use_container_width=True):
+                    st.session_state.pop("assignment_plan", None)
+                    st.rerun()
                     
     with col_auto2:
          st.warning("**Envío Masivo de Documentos**\n\nEste botón generará y enviará los documentos según las fechas del Periodo Activo a los alumnos que corresponda.")
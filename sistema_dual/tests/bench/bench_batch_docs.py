@@ -0,0 +1,88 @@
+"""
+Benchmark del motor de generación masiva (src/utils/batch_docs.py).
+
+Mide documentos por segundo generando Anexos 5.1 y 5.4 sintéticos con
+distinto número de procesos. Uso:
+
+    python tests/bench/bench_batch_docs.py --docs 200 --workers 1 2 4 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils.batch_docs import render_documents_batch
+
+
+def make_context_51(i):
+    return {
+        "nombre_proyecto": f"Proyecto DUAL {i}",
+        "unidad_economica": "Empresa Sintética S.A. de C.V.",
+        "programa_educativo": "Ingeniería en Sistemas Computacionales",
+        "mentor_ue": "Mentor UE", "mentor_ie": "Mentor IE",
+        "competencias_list": [{"competencia": f"Competencia {c}", "asignatura": f"Materia {c % 6}"} for c in range(24)],
+        "actividades_list": [
+            {"actividad": f"Actividad {a}", "horas": "10", "evidencia": "Reporte", "lugar": "UE", "ponderacion": "25.0%"}
+            for a in range(72)
+        ],
+    }
+
+
+def make_context_54(i):
+    actividades = [{"descripcion_actividad": f"Actividad {a}", "evidencia": "Reporte", "horas": 10,
+                    "p0": "", "p70": "", "p80": "", "p90": "X", "p100": ""} for a in range(3)]
+    return {
+        "nombre_alumno": f"Alumno {i}",
+        "nombre_proyecto": f"Proyecto DUAL {i}",
+        "lista_competencias": [{"numero_consecutivo": c + 1, "competencia_desarrollada": f"Competencia {c}",
+                                "asignaturas_cubre": f"Materia {c % 6}", "conocimientos_teoricos": "- Tema",
+                                "descripcion_actividades": "- Evidencia: Reporte (10h)"} for c in range(12)],
+        "evaluaciones": [{"competencia_alcanzada": f"Competencia {c}", "firma_y_fecha": "Mentor UE",
+                          "actividades": actividades} for c in range(12)],
+    }
+
+
+def make_jobs(n_docs):
+    jobs = []
+    for i in range(n_docs):
+        if i % 2 == 0:
+            jobs.append({"key": i, "template_name": "Anexo_5.1_Plan_de_Formacion.docx", "context": make_context_51(i)})
+        else:
+            jobs.append({"key": i, "template_name": "Anexo_5.4_Reporte_de_Actividades.docx", "context": make_context_54(i)})
+    return jobs
+
+
+def run(n_docs, workers):
+    jobs = make_jobs(n_docs)
+    start = time.perf_counter()
+    errors = sum(1 for r in render_documents_batch(jobs, max_workers=workers) if not r["success"])
+    elapsed = time.perf_counter() - start
+    return {"workers": workers, "docs": n_docs, "seconds": round(elapsed, 3),
+            "docs_per_second": round(n_docs / elapsed, 2), "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--json", help="Ruta opcional para guardar los resultados")
+    args = parser.parse_args()
+
+    results = [run(args.docs, w) for w in args.workers]
+    base = results[0]["docs_per_second"]
+    print(f"cpu_count={os.cpu_count()}  docs={args.docs}")
+    print(f"{'workers':>8} {'seconds':>9} {'docs/s':>8} {'speedup':>8} {'errors':>7}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['seconds']:>9} {r['docs_per_second']:>8} {r['docs_per_second'] / base:>8.2f} {r['errors']:>7}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Memoria y tiempo de la exportación en ZIP de la cohorte (src/utils/cohort_export.py).
+
+Genera cohortes sintéticas de distinto tamaño con las plantillas reales y mide
+el pico de memoria de Python (tracemalloc) en el proceso que arma el ZIP; debe
+mantenerse plano aunque crezca la cohorte. Uso:
+
+    python tests/bench/bench_cohort_zip.py --students 25 100 400 --workers 4 [--json resultados.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.append(os.path.dirname(__file__))
+
+import src.utils.anexo_data as anexo_data
+from src.utils.cohort_export import iter_cohort_jobs, write_cohort_zip
+from bench_batch_docs import make_context_51
+
+
+def make_projects(n_students):
+    carreras = ["Ing. Sistemas", "Ing. Industrial", "Ing. Mecatrónica"]
+    for i in range(n_students):
+        carrera = carreras[i % len(carreras)]
+        yield {
+            "id": i, "alumno_id": i, "ue_id": "ue", "mentor_ue_id": "mu", "mentor_ie_id": "mi",
+            "nombre_proyecto": f"Proyecto DUAL {i}",
+            "alumnos": {"id": i, "matricula": f"2023{i:05d}", "nombre": "Alumno", "ap_paterno": str(i),
+                        "carrera": carrera, "carreras": {"nombre": carrera}},
+            "unidades_economicas": {"nombre_comercial": "Empresa Sintética S.A. de C.V."},
+            "mentores_ue": {"nombre_completo": "Mentor UE"},
+            "maestros": {"nombre_completo": "Mentor IE"},
+        }
+
+
+def run(n_students, workers):
+    fd, path = tempfile.mkstemp(suffix=".zip")
+    os.close(fd)
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        summary = write_cohort_zip(iter_cohort_jobs(make_projects(n_students)), f, max_workers=workers)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = os.path.getsize(path)
+    os.remove(path)
+    return {
+        "students": n_students,
+        "documents": summary["written"],
+        "errors": len(summary["errors"]),
+        "seconds": round(elapsed, 2),
+        "zip_mb": round(size / (1024 * 1024), 2),
+        "peak_python_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, nargs="+", default=[25, 100, 400])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", help="Ruta opcional para guardar los resultados")
+    args = parser.parse_args()
+
+    # Sin base de datos: el Anexo 5.1 usa el contexto sintético del benchmark de generación masiva
+    anexo_data.get_anexo_5_1_data_for_projects = lambda projects, supabase=None: (
+        (p, make_context_51(p["alumno_id"]), None) for p in projects)
+
+    results = [run(n, args.workers) for n in args.students]
+    print(f"{'students':>9} {'docs':>6} {'seconds':>8} {'zip_mb':>7} {'peak_py_mb':>11}")
+    for r in results:
+        print(f"{r['students']:>9} {r['documents']:>6} {r['seconds']:>8} {r['zip_mb']:>7} {r['peak_python_mb']:>11}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Prueba de carga del transporte HTTP del cliente de Supabase (src/utils/http_pool.py).
+
+Levanta un servidor local que imita a PostgREST (HTTP/1.1 con keep-alive y
+HTTP/2 sin TLS) con un costo por conexión nueva (handshake TCP+TLS) y una
+latencia por petición, y simula la inscripción: muchas sesiones de Streamlit
+arrancan a la vez y cada rerun hace varias consultas seguidas con el cliente
+real de supabase-py. Compara:
+
+- default       create_client(url, key) tal como estaba (pool propio de postgrest)
+- pooled_http1  build_http_client(http2=False): pool compartido, keep-alive largo
+- pooled_http2  build_http_client(http2=True): una conexión multiplexada
+
+Uso:
+    python tests/bench/bench_http_pool.py --sessions 40 --reruns 5 --queries 6 --handshake-ms 60 --latency-ms 15 [--json resultados.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import warnings
+import threading
+import statistics
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from supabase import create_client, ClientOptions
+from src.utils.http_pool import build_http_client, pool_stats, http2_available
+
+H2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+
+class StandInServer:
+    """PostgREST de mentira en un hilo con su propio event loop."""
+
+    def __init__(self, handshake_ms, latency_ms, body_bytes):
+        self.handshake = handshake_ms / 1000
+        self.latency = latency_ms / 1000
+        row = {"id": "00000000-0000-0000-0000-000000000000", "matricula": "2022000000", "nombre": "Alumno"}
+        rows = max(1, body_bytes // len(json.dumps(row)))
+        self.body = json.dumps([row] * rows).encode()
+        self.connections = 0
+        self.requests = 0
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+        self._ready = threading.Event()
+        self._writers = set()
+        self._tasks = set()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _shutdown(self):
+        # Cerrar los sockets termina cada handler por EOF (sin cancelar tareas)
+        self.server.close()
+        for writer in list(self._writers):
+            writer.close()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=2)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self._writers.add(writer)
+        # Costo de abrir la conexión (TCP + TLS) antes de atender la primera petición
+        await asyncio.sleep(self.handshake)
+        try:
+            head = await reader.readexactly(len(H2_PREFACE))
+            if head == H2_PREFACE:
+                await self._serve_h2(head, reader, writer)
+            else:
+                await self._serve_h1(head, reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self._writers.discard(writer)
+            self._tasks.discard(task)
+
+    async def _serve_h1(self, buffered, reader, writer):
+        while True:
+            data = buffered + await reader.readuntil(b"\r\n\r\n")
+            buffered = b""
+            headers = data.decode("latin-1").lower()
+            length = 0
+            for line in headers.split("\r\n"):
+                if line.startswith("content-length:"):
+                    length = int(line.split(":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            self.requests += 1
+            await asyncio.sleep(self.latency)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: " + str(len(self.body)).encode() + b"\r\n\r\n" + self.body)
+            await writer.drain()
+
+    async def _serve_h2(self, preface, reader, writer):
+        import h2.config
+        import h2.events
+        import h2.connection
+
+        conn = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+
+        async def respond(stream_id):
+            self.requests += 1
+            await asyncio.sleep(self.latency)
+            conn.send_headers(stream_id, [(":status", "200"), ("content-type", "application/json"),
+                                          ("content-length", str(len(self.body)))])
+            conn.send_data(stream_id, self.body, end_stream=True)
+            writer.write(conn.data_to_send())
+
+        data = preface
+        while True:
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.StreamEnded):
+                    asyncio.ensure_future(respond(event.stream_id))
+                elif isinstance(event, h2.events.DataReceived):
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+            writer.write(conn.data_to_send())
+            await writer.drain()
+            data = await reader.read(65535)
+            if not data:
+                return
+
+
+def make_client(profile, url):
+    if profile == "default":
+        return create_client(url, "anon-key"), None
+    http_client = build_http_client(http2=profile == "pooled_http2", http1=profile != "pooled_http2")
+    return create_client(url, "anon-key", options=ClientOptions(httpx_client=http_client)), http_client
+
+
+def run_profile(profile, args):
+    server = StandInServer(args.handshake_ms, args.latency_ms, args.body_bytes).start()
+    url = f"http://127.0.0.1:{server.port}"
+    client, http_client = make_client(profile, url)
+    latencies, errors = [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(args.sessions)
+
+    def session(n):
+        rng = random.Random(n)
+        barrier.wait()
+        for _ in range(args.reruns):
+            # Un rerun: consultas seguidas, como en registro.py
+            for q in range(args.queries):
+                start = time.perf_counter()
+                try:
+                    client.table("alumnos").select("id, matricula, nombre").eq("matricula", f"{n}-{q}").execute()
+                    with lock:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                except Exception as e:
+                    with lock:
+                        errors.append(type(e).__name__)
+            time.sleep(rng.uniform(0, args.think_ms) / 1000)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(args.sessions)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        "profile": profile,
+        "seconds": round(elapsed, 2),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1) if latencies else None,
+        "max_ms": round(latencies[-1], 1) if latencies else None,
+        "server_connections": server.connections,
+    }
+    if http_client is not None:
+        result["pool"] = pool_stats(http_client)
+        http_client.close()
+    else:
+        client.postgrest.session.close()
+    server.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=6, help="Consultas por rerun")
+    parser.add_argument("--think-ms", type=float, default=300, help="Pausa máxima entre reruns de una sesión")
+    parser.add_argument("--handshake-ms", type=float, default=60, help="Costo por conexión nueva")
+    parser.add_argument("--latency-ms", type=float, default=15, help="Latencia por petición")
+    parser.add_argument("--body-bytes", type=int, default=4096)
+    parser.add_argument("--profiles", nargs="+", default=["default", "pooled_http1", "pooled_http2"])
+    parser.add_argument("--json", help="Ruta opcional para guardar los resultados")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    profiles = [p for p in args.profiles if p != "pooled_http2" or http2_available()]
+    results = [run_profile(p, args) for p in profiles]
+    print(f"{'profile':>13} {'seconds':>8} {'rps':>7} {'p50_ms':>7} {'p95_ms':>7} {'max_ms':>7} {'conns':>6} {'waits':>6} {'errors':>6}")
+    for r in results:
+        waits = r["pool"]["waits"] if "pool" in r else "-"
+        print(f"{r['profile']:>13} {r['seconds']:>8} {r['rps']:>7} {r['p50_ms']:>7} {r['p95_ms']:>7} "
+              f"{r['max_ms']:>7} {r['server_connections']:>6} {waits:>6} {r['errors']:>6}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Tamaño del HTML de logos que viaja por el websocket en cada rerun.
+
+Compara el encabezado y la tarjeta de login con los PNG originales en base64
+(como se hacía antes), con el data URI del logo reducido (respaldo sin static
+serving) y con la URL de static serving. Uso:
+
+    python tests/bench/bench_logo_payload.py [--json resultados.json]
+"""
+import os
+import sys
+import json
+import base64
+import argparse
+import tempfile
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.assets as assets
+from src.components.login_ui import get_login_header
+
+
+def inline_original(name):
+    with open(os.path.join(assets.LOGOS_SOURCE_DIR, assets.LOGO_FILES[name]), "rb") as f:
+        return "data:image/png;base64," + base64.b64encode(f.read()).decode()
+
+
+def payload(logo_src):
+    """Bytes del HTML del encabezado + login con la estrategia de src indicada."""
+    original = assets.logo_src
+    assets.logo_src = logo_src
+    import src.components.login_ui as login_ui
+    login_ui.logo_src = logo_src
+    try:
+        header = "".join(f'<img src="{logo_src(n)}" style="height: 60px; width: auto;">' for n in ("tese", "edomex"))
+        return len(header.encode()) + len(get_login_header().encode())
+    finally:
+        assets.logo_src = original
+        login_ui.logo_src = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="Ruta opcional para guardar los resultados")
+    args = parser.parse_args()
+
+    static_dir = tempfile.mkdtemp()
+    results = {
+        "inline_original": payload(inline_original),
+        "inline_optimized": payload(assets._logo_data_uri),
+        "static_url": payload(lambda n: assets._logo_static_urls(static_dir)[n]),
+    }
+    base = results["inline_original"]
+    print(f"{'strategy':>17} {'bytes':>10} {'vs original':>12}")
+    for name, size in results.items():
+        print(f"{name:>17} {size:>10} {size / base:>11.1%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
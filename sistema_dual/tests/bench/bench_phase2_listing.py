@@ -0,0 +1,80 @@
+"""
+Benchmark del listado de la Fase 2 (Centro de Control de envíos).
+
+Compara la latencia de un rerun contra el número de proyectos para el listado
+anterior (una consulta de alumnos por proyecto) y el actual (una consulta con
+alumnos embebidos, get_phase2_projects). Cada petición al backend simulado
+espera --latency-ms, que es lo que domina contra Supabase. Uso:
+
+    python tests/bench/bench_phase2_listing.py --projects 50 100 200 400 --latency-ms 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils.db_actions import get_phase2_projects
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+def make_client(n_projects, latency_ms):
+    """Backend en memoria con n proyectos con Mentor IE en el periodo; cada petición cuesta latency_ms."""
+    return FakeSupabaseClient(FakeDatabase({
+        "alumnos": [{"id": f"a{i}", "nombre": f"Alumno{i}", "ap_paterno": "Pérez",
+                     "email_institucional": f"a{i}@uni.mx", "email_personal": None} for i in range(n_projects)],
+        "maestros": [{"id": "m1", "nombre_completo": "Mentor IE"}],
+        "proyectos_dual": [{"id": f"p{i:05d}", "alumno_id": f"a{i}", "periodo_id": "per-1", "mentor_ie_id": "m1"}
+                           for i in range(n_projects)],
+    }, latency_ms=latency_ms))
+
+
+def legacy_listing(supabase):
+    """Listado anterior: proyectos con Mentor IE y luego una consulta de alumno por fila."""
+    rows = []
+    for proj in supabase.table("proyectos_dual").select("*").not_.is_("mentor_ie_id", "null").execute().data:
+        student = supabase.table("alumnos").select("nombre, ap_paterno, email_institucional, email_personal") \
+            .eq("id", proj["alumno_id"]).single().execute().data or {}
+        rows.append(f"{student.get('nombre', '')} {student.get('ap_paterno', '')}".strip())
+    return rows
+
+
+def embedded_listing(supabase):
+    return [f"{(p.get('alumnos') or {}).get('nombre', '')} {(p.get('alumnos') or {}).get('ap_paterno', '')}".strip()
+            for p in get_phase2_projects("per-1", supabase=supabase)]
+
+
+def run(listing, n_projects, latency_ms):
+    client = make_client(n_projects, latency_ms)
+    start = time.perf_counter()
+    names = listing(client)
+    elapsed = time.perf_counter() - start
+    assert len(names) == n_projects
+    return {"projects": n_projects, "requests": client.db.requests, "seconds": round(elapsed, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, nargs="+", default=[50, 100, 200, 400])
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--json", help="Ruta opcional para guardar los resultados")
+    args = parser.parse_args()
+
+    results = []
+    print(f"latency_ms={args.latency_ms}")
+    print(f"{'projects':>9} {'legacy_req':>11} {'legacy_s':>9} {'embedded_req':>13} {'embedded_s':>11}")
+    for n in args.projects:
+        legacy, embedded = run(legacy_listing, n, args.latency_ms), run(embedded_listing, n, args.latency_ms)
+        results.append({"projects": n, "legacy": legacy, "embedded": embedded})
+        print(f"{n:>9} {legacy['requests']:>11} {legacy['seconds']:>9} {embedded['requests']:>13} {embedded['seconds']:>11}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"latency_ms": args.latency_ms, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
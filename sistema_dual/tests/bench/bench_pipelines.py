@@ -0,0 +1,234 @@
+"""
+Suite de benchmarks de los flujos reales sobre cohortes sintéticas.
+
+Para cada tamaño genera una cohorte (src/utils/synthetic_cohort.py), la carga
+en el backend en memoria (SUPABASE_BACKEND=fake, con latencia por petición
+opcional) y mide:
+
+- anexo_5_1      contexto del Anexo 5.1 de una muestra de alumnos (uno por uno, como la vista)
+- anexo_5_4_bulk contextos del Anexo 5.4 de toda la bandeja de la Fase 3 (get_anexo_5_4_data_bulk)
+- docx_render    render DOCX de una muestra de contextos 5.1 y 5.4 (render_documents_batch)
+- phase3_sync    "Sincronizar y Enviar Todos" de la Fase 3 sobre una muestra de la bandeja:
+                 genera, encola en una outbox temporal y la vacía contra un SMTP local (aiosmtpd)
+- period_close   cierre automático del periodo activo (db_actions.close_period)
+
+Cada etapa reporta segundos, peticiones al backend y elementos procesados. Los
+resultados llevan el commit actual para compararlos entre commits. Uso:
+
+    python tests/bench/bench_pipelines.py --students 100 1000 10000 --latency-ms 5 --json resultados.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.db_connection as db_connection
+import src.utils.fake_backend as fake_backend
+from src.utils import notifications
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+from src.utils.synthetic_cohort import generate_cohort, load_cohort, cohort_counts, DEFAULT_SEED
+
+STAGES = ["generate", "load", "anexo_5_1", "anexo_5_4_bulk", "docx_render", "phase3_sync", "period_close"]
+
+
+class _SinkHandler:
+    """Servidor SMTP local que solo cuenta los mensajes recibidos."""
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def start_smtp_sink():
+    """Levanta aiosmtpd en un puerto libre y apunta notifications a él (None si no está instalado)."""
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        return None, None
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = _SinkHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    notifications.SMTP_SERVER = "127.0.0.1"
+    notifications.SMTP_PORT = port
+    notifications.SMTP_STARTTLS = False
+    notifications.SMTP_USER = None
+    notifications.SMTP_PASSWORD = None
+    notifications.FROM_EMAIL = "dual@example.edu"
+    return controller, handler
+
+
+def git_commit():
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=root, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--", "src"], cwd=root, text=True).strip())
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Stage:
+    """Mide segundos y peticiones al backend de un bloque."""
+
+    def __init__(self, db, results, name):
+        self.db, self.results, self.name = db, results, name
+        self.items = 0
+        self.extra = {}
+
+    def __enter__(self):
+        self.requests = self.db.requests
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.results[self.name] = dict({
+            "seconds": round(seconds, 3),
+            "requests": self.db.requests - self.requests,
+            "items": self.items,
+            "ms_per_item": round(seconds * 1000 / self.items, 2) if self.items else None,
+        }, **self.extra)
+        return False
+
+
+def use_database(db):
+    """get_supabase_client() de toda la app regresa el backend en memoria con esta base."""
+    db_connection.SUPABASE_BACKEND = "fake"
+    fake_backend._fake_db = db
+    db_connection.get_supabase_client.clear()
+
+
+def run(n_students, args, sink):
+    from src.utils.anexo_data import get_anexo_5_1_data, get_anexo_5_4_data_bulk
+    from src.utils.batch_docs import render_documents_batch
+    from src.utils.phase3_sync import get_phase3_inbox, sync_phase3_inbox
+    from src.utils.mail_queue import process_due
+    from src.utils.db_actions import close_period
+
+    results = {}
+    db = FakeDatabase(latency_ms=0)
+    client = FakeSupabaseClient(db)
+
+    with Stage(db, results, "generate") as stage:
+        data = generate_cohort(n_students, seed=args.seed)
+        stage.items = sum(cohort_counts(data).values())
+    with Stage(db, results, "load") as stage:
+        stage.items = sum(load_cohort(data, client).values())
+    active_period = next(p for p in data["periodos"] if p["activo"])
+    sample_ids = [a["id"] for a in data["alumnos"][:args.sample]]
+    del data
+
+    # La latencia aplica solo a los flujos medidos, no a la carga
+    db.latency_ms = args.latency_ms
+    use_database(db)
+
+    contexts = []
+    with Stage(db, results, "anexo_5_1") as stage:
+        for student_id in sample_ids:
+            context, _ = get_anexo_5_1_data(student_id)
+            if context:
+                contexts.append(("Anexo_5.1_Plan_de_Formacion.docx", context))
+        stage.items = len(sample_ids)
+
+    inbox = get_phase3_inbox(client)
+    with Stage(db, results, "anexo_5_4_bulk") as stage:
+        built = 0
+        for _, context, _ in get_anexo_5_4_data_bulk([p["alumno_id"] for p in inbox]):
+            if context:
+                built += 1
+                if len(contexts) < 2 * args.sample:
+                    contexts.append(("Anexo_5.4_Reporte_de_Actividades.docx", context))
+        stage.items = built
+
+    jobs = [{"key": i, "template_name": t, "context": c} for i, (t, c) in enumerate(contexts[:args.render])]
+    with Stage(db, results, "docx_render") as stage:
+        stage.items = sum(1 for r in render_documents_batch(jobs, max_workers=args.workers) if r["success"])
+        stage.extra["errors"] = len(jobs) - stage.items
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outbox = os.path.join(tmp, "outbox.sqlite3")
+        with Stage(db, results, "phase3_sync") as stage:
+            summary = sync_phase3_inbox(inbox[:args.sync], max_workers=args.workers, outbox_path=outbox, supabase=client)
+            enqueued_at = time.perf_counter()
+            sent = failed = 0
+            if sink is not None:
+                before = sink.received
+                while True:
+                    batch = process_due(path=outbox, batch_size=50)
+                    sent += batch["sent"]
+                    failed += batch["failed"] + batch["retry"]
+                    if not batch["claimed"]:
+                        break
+                stage.extra["smtp_received"] = sink.received - before
+            stage.items = summary["documents"]
+            stage.extra.update({
+                "emails_queued": summary["queued"], "emails_sent": sent, "emails_failed": failed,
+                "enqueue_seconds": round(enqueued_at - stage.start, 3),
+                "deliver_seconds": round(time.perf_counter() - enqueued_at, 3) if sink is not None else None,
+            })
+
+    with Stage(db, results, "period_close") as stage:
+        ok, result = close_period(active_period, client)
+        stage.items = sum(result) if ok else 0
+        stage.extra["ok"] = ok
+
+    return {"students": n_students, "stages": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latencia simulada por petición al backend")
+    parser.add_argument("--sample", type=int, default=50, help="Alumnos para el Anexo 5.1 uno por uno")
+    parser.add_argument("--render", type=int, default=60, help="Documentos en la etapa docx_render")
+    parser.add_argument("--sync", type=int, default=100, help="Proyectos de la bandeja en phase3_sync")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", help="Ruta opcional para guardar los resultados")
+    args = parser.parse_args()
+
+    controller, sink = start_smtp_sink()
+    if sink is None:
+        print("aiosmtpd no está instalado: phase3_sync solo encola (sin entrega SMTP)")
+    try:
+        runs = [run(n, args, sink) for n in args.students]
+    finally:
+        if controller is not None:
+            controller.stop()
+
+    print(f"{'stage':>15} " + " ".join(f"{r['students']:>16}" for r in runs))
+    for name in STAGES:
+        cells = [f"{r['stages'][name]['seconds']:>8.3f}s {r['stages'][name]['requests']:>5}rq" for r in runs]
+        print(f"{name:>15} " + " ".join(f"{c:>16}" for c in cells))
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"seed": args.seed, "latency_ms": args.latency_ms, "sample": args.sample,
+                   "render": args.render, "sync": args.sync, "workers": args.workers},
+        "runs": runs,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Reporte de tiempo de importación del arranque (pantalla de inicio de sesión).
+
+Ejecuta `python -X importtime` en un proceso nuevo importando los módulos que
+necesita el login, muestra los paquetes más caros y falla (código 1) si el total
+pasa del presupuesto o si se cargó algo de la pila de documentos. Uso:
+
+    python tests/bench/bench_startup_imports.py --top 15 --budget-ms 2000
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Lo que carga streamlit run src/app.py antes de mostrar el login
+STARTUP_MODULES = ["src.app", "src.views.auth"]
+# Paquetes que no deben cargarse hasta que se abre la sección que los usa
+FORBIDDEN_AT_STARTUP = [
+    "pandas", "numpy", "scipy", "matplotlib", "PIL", "docx", "docxtpl", "jinja2", "xhtml2pdf",
+    "src.utils.notifications", "src.utils.pdf_generator_docx", "src.utils.anexo_data",
+]
+# Presupuesto en milisegundos para el total de importaciones del arranque
+STARTUP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "2000"))
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def measure_imports(modules=None):
+    """
+    Importa los módulos en un intérprete nuevo con -X importtime.
+    Regresa lista de {"module", "self_us", "cumulative_us", "depth"} en el orden del reporte.
+    """
+    modules = modules or STARTUP_MODULES
+    code = f"import sys; sys.path.insert(0, {ROOT!r}); " + "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            entries.append({"module": m.group(4), "self_us": int(m.group(1)), "cumulative_us": int(m.group(2)),
+                             "depth": (len(m.group(3)) - 1) // 2})
+    return entries
+
+def summarize(entries, top=15):
+    """Total (suma de importaciones de primer nivel), los paquetes más caros y los prohibidos que se cargaron."""
+    loaded = {e["module"] for e in entries}
+    roots = [e for e in entries if e["depth"] == 0]
+    return {
+        "total_ms": round(sum(e["cumulative_us"] for e in roots) / 1000, 1),
+        "top": [{"module": e["module"], "cumulative_ms": round(e["cumulative_us"] / 1000, 1)}
+                for e in sorted(entries, key=lambda e: -e["cumulative_us"]) if e["depth"] <= 1][:top],
+        "forbidden_loaded": [m for m in FORBIDDEN_AT_STARTUP if m in loaded],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=STARTUP_MODULES)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_IMPORT_BUDGET_MS)
+    parser.add_argument("--json", help="Ruta opcional para guardar el reporte")
+    args = parser.parse_args()
+
+    summary = summarize(measure_imports(args.modules), args.top)
+    print(f"modules={' '.join(args.modules)}")
+    print(f"{'cumulative_ms':>14}  module")
+    for row in summary["top"]:
+        print(f"{row['cumulative_ms']:>14}  {row['module']}")
+    print(f"total_ms={summary['total_ms']}  budget_ms={args.budget_ms}")
+    if summary["forbidden_loaded"]:
+        print(f"FORBIDDEN: {', '.join(summary['forbidden_loaded'])}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(summary, budget_ms=args.budget_ms, modules=args.modules), f, indent=2)
+
+    if summary["total_ms"] > args.budget_ms or summary["forbidden_loaded"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
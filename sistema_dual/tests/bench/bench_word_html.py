@@ -0,0 +1,165 @@
+"""
+Tiempo de preparación de una plantilla HTML exportada por Word (~1 MB).
+
+Compara el preprocesamiento anterior (recorte de {{ }} con cortes de cadena,
+un regex por cada fila con bucle y Template() en cada documento) con el
+compilador de una sola pasada: compilación en frío, acierto del caché en disco
+(proceso nuevo) y render por documento. Uso:
+
+    python tests/bench/bench_word_html.py [--size-mb 1] [--docs 20] [--pdf] [--json resultados.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.pdf_generator_html as pgh
+
+WORD_HEAD = """<html xmlns:o="urn:schemas-microsoft-com:office:office"><head>
+<meta http-equiv=Content-Type content="text/html; charset=utf-8">
+<style>
+/* Font Definitions */ @font-face {font-family:"Cambria Math";}
+p.MsoNormal, li.MsoNormal, div.MsoNormal {margin:0cm; font-size:11.0pt; font-family:"Calibri",sans-serif;}
+</style></head><body lang=ES-MX style='tab-interval:35.4pt'>
+"""
+WORD_PARAGRAPH = ("<p class=MsoNormal><span lang=ES style='font-size:10.0pt;mso-bidi-font-family:Arial'>"
+                  "{{</span><span lang=ES style='font-size:10.0pt'>nombre_alumno</span>"
+                  "<span lang=ES style='font-size:10.0pt'>&nbsp;}}</span> texto de relleno del formato "
+                  "<b><span lang=ES>matrícula {{ matricula }}</span></b></p>\n")
+WORD_TABLE = """<table class=MsoTableGrid border=1 cellspacing=0 cellpadding=0>
+<tr style='height:14.2pt'><td><p class=MsoNormal><b><span lang=ES>Competencia</span></b></p></td>
+<td><p class=MsoNormal><b><span lang=ES>Asignatura</span></b></p></td></tr>
+<tr style='height:14.2pt'><td><p class=MsoNormal><span lang=ES>{{<span style='mso-spacerun:yes'> </span>competencia }}</span></p></td>
+<td><p class=MsoNormal><span lang=ES>{{ asignatura }}</span></p></td></tr>
+</table>
+<table class=MsoTableGrid border=1 cellspacing=0 cellpadding=0>
+<tr><td><span lang=ES>{{ actividad }}</span></td><td>{{ horas }}</td><td>{{ evidencia }}</td>
+<td>{{ lugar }}</td><td>{{ ponderacion }}</td></tr>
+</table>
+"""
+
+CONTEXT = {
+    "nombre_alumno": "Ana López",
+    "matricula": "202312345",
+    "competencias_list": [{"competencia": f"C{i}", "asignatura": "Redes"} for i in range(5)],
+    "actividades_list": [{"actividad": f"A{i}", "horas": 10, "evidencia": "Reporte", "lugar": "Planta",
+                          "ponderacion": "20%"} for i in range(5)],
+}
+
+
+def make_word_export(size_mb=1.0):
+    """HTML con la forma de una exportación de Word: spans partidos, tablas y estilos en línea."""
+    target = int(size_mb * 1024 * 1024)
+    parts = [WORD_HEAD, WORD_TABLE]
+    size = len(WORD_HEAD) + len(WORD_TABLE)
+    while size < target:
+        parts.append(WORD_PARAGRAPH)
+        size += len(WORD_PARAGRAPH)
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def legacy_render(html_content, context):
+    """Pasos 2-4 de generate_pdf_from_html antes del compilador (sin cambios de lógica)."""
+    from jinja2 import Template
+
+    html_content = re.sub(r'<style[>|.*?]*>.*?</style>', '', html_content, flags=re.DOTALL | re.IGNORECASE)
+    offset = 0
+    while True:
+        start_idx = html_content.find("{{", offset)
+        if start_idx == -1:
+            break
+        end_idx = html_content.find("}}", start_idx)
+        if end_idx == -1:
+            break
+        clean_var = re.sub(r'<[^>]+>', '', html_content[start_idx:end_idx + 2])
+        clean_var = clean_var.replace('&nbsp;', ' ').replace('\n', '').replace('\r', '').strip()
+        final_tag = f"{{{{ {clean_var.replace('{{', '').replace('}}', '').strip()} }}}}"
+        html_content = html_content[:start_idx] + final_tag + html_content[end_idx + 2:]
+        offset = start_idx + len(final_tag)
+
+    for target_var, (list_name, iter_name, var_map) in pgh.LOOP_ROWS.items():
+        pattern = re.compile(r'(<tr[^>]*>(?:(?!</tr>).)*?\{\{\s*' + re.escape(target_var) + r'\s*\}\}(?:(?!</tr>).)*?</tr>)',
+                             re.DOTALL | re.IGNORECASE)
+
+        def replace_row(match):
+            row_content = match.group(1)
+            for old_var, new_attr in var_map.items():
+                row_content = re.sub(r'\{\{\s*' + re.escape(old_var) + r'\s*\}\}', f"{{{{ {iter_name}.{new_attr} }}}}", row_content)
+            return f"{{% for {iter_name} in {list_name} %}}{row_content}{{% endfor %}}"
+
+        html_content = pattern.sub(replace_row, html_content)
+
+    rendered_html = html_content
+    for key, value in context.items():
+        if not isinstance(value, list):
+            rendered_html = rendered_html.replace(f"{{{{ {key} }}}}", str(value))
+    try:
+        rendered_html = Template(html_content).render(context)
+    except Exception:
+        pass
+    return rendered_html
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=1.0)
+    parser.add_argument("--docs", type=int, default=20, help="Documentos generados con la misma plantilla")
+    parser.add_argument("--pdf", action="store_true", help="Incluir la maquetación con xhtml2pdf de un documento")
+    parser.add_argument("--json", help="Ruta opcional para guardar los resultados")
+    args = parser.parse_args()
+
+    source = make_word_export(args.size_mb)
+    pgh.WORD_HTML_CACHE_DIR = tempfile.mkdtemp()
+    pgh._env = None
+
+    legacy_ms, _ = timed(lambda: legacy_render(source, CONTEXT))
+    compile_ms, compiled = timed(lambda: pgh.compile_word_html(source))
+    cold_ms, template = timed(lambda: pgh.get_word_html_template(source))
+    render_ms, _ = timed(lambda: [template.render(CONTEXT) for _ in range(args.docs)])
+    # Proceso nuevo: HTML compilado y bytecode ya en disco
+    pgh._env = None
+    warm_ms, _ = timed(lambda: pgh.get_word_html_template(source))
+
+    results = {
+        "source_bytes": len(source.encode("utf-8")),
+        "compiled_bytes": len(compiled.encode("utf-8")),
+        "legacy_per_doc_ms": round(legacy_ms, 1),
+        "compile_ms": round(compile_ms, 1),
+        "cold_template_ms": round(cold_ms, 1),
+        "disk_cache_hit_ms": round(warm_ms, 1),
+        "render_per_doc_ms": round(render_ms / args.docs, 1),
+    }
+    if args.pdf:
+        out = os.path.join(pgh.WORD_HTML_CACHE_DIR, "bench.pdf")
+        rendered = template.render(CONTEXT)
+        from xhtml2pdf import pisa
+        with open(out, "wb") as f:
+            results["pdf_layout_ms"] = round(timed(lambda: pisa.CreatePDF(rendered, dest=f))[0], 1)
+
+    print(f"source={results['source_bytes']} bytes  compiled={results['compiled_bytes']} bytes  docs={args.docs}")
+    for key, value in results.items():
+        if key.endswith("_ms"):
+            print(f"{key:>20} {value:>10}")
+    print(f"{'legacy total':>20} {legacy_ms * args.docs:>10.1f}")
+    print(f"{'new total':>20} {cold_ms + render_ms:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import os
+import sys
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.anexo_data as anexo_data
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+def make_client(tables):
+    return FakeSupabaseClient(FakeDatabase(tables, latency_ms=0, log_requests=True))
+
+
+def queried_tables(client):
+    return [table for table, _ in client.db.calls()]
+
+
+def build_tables(n_asignaturas=6, n_competencias=4, n_actividades=3):
+    asignaturas = [{"id": f"asig-{i}", "nombre": f"Materia {i}", "clave_asignatura": f"CL{i}"} for i in range(n_asignaturas)]
+    # Inscripciones en orden distinto al de los ids para validar que se respeta
+    inscripciones = [{"id": f"insc-{i}", "alumno_id": "alu-1", "asignatura_id": a["id"]} for i, a in enumerate(reversed(asignaturas))]
+
+    competencias = []
+    actividades = []
+    for a in asignaturas:
+        # Se insertan con numero_competencia desordenado
+        for n in reversed(range(1, n_competencias + 1)):
+            comp_id = f"{a['id']}-comp-{n}"
+            competencias.append({
+                "id": comp_id,
+                "asignatura_id": a["id"],
+                "numero_competencia": n,
+                "descripcion_competencia": f"Competencia {n} de {a['nombre']}",
+            })
+            for k in range(n_actividades):
+                actividades.append({
+                    "id": f"{comp_id}-act-{k}",
+                    "competencia_id": comp_id,
+                    "descripcion_actividad": f"Actividad {k} ({comp_id})",
+                    "horas_dedicacion": 10 + k,
+                    "evidencia": "Reporte",
+                    "lugar": "UE",
+                    "ponderacion": 25,
+                })
+
+    return {
+        "carreras": [{"id": "car-1", "nombre": "Sistemas"}],
+        "alumnos": [{"id": "alu-1", "nombre": "Ana", "ap_paterno": "López", "carrera_id": "car-1"}],
+        "unidades_economicas": [{"id": "ue-1", "nombre_comercial": "UE"}],
+        "mentores_ue": [{"id": "mue-1", "ue_id": "ue-1", "nombre_completo": "Mentor UE"}],
+        "maestros": [{"id": "m-1", "nombre_completo": "Mentor IE"}],
+        "periodos": [{"id": "per-1", "fecha_inicio": "2026-01-15", "fecha_fin": "2026-06-30"}],
+        "proyectos_dual": [{
+            "id": "proj-1", "alumno_id": "alu-1", "created_at": "2026-01-10", "nombre_proyecto": "Proyecto",
+            "ue_id": "ue-1", "mentor_ue_id": "mue-1", "mentor_ie_id": "m-1", "periodo_id": "per-1",
+        }],
+        "asignaturas": asignaturas,
+        "inscripciones_asignaturas": inscripciones,
+        "asignatura_competencias": competencias,
+        "actividades_aprendizaje": actividades,
+    }
+
+
+def legacy_lists(client, student_id):
+    """Reproduce el recorrido anterior (una consulta por asignatura y por competencia)."""
+    competencias_list, actividades_list = [], []
+    inscripciones = client.table("inscripciones_asignaturas").select("*, asignaturas(*)").eq("alumno_id", student_id).execute().data
+    for insc in inscripciones:
+        asig = insc["asignaturas"]
+        comps = client.table("asignatura_competencias").select("*").eq("asignatura_id", asig["id"]).order("numero_competencia").execute().data
+        for comp in comps:
+            competencias_list.append({"competencia": comp["descripcion_competencia"], "asignatura": asig["nombre"]})
+            acts = client.table("actividades_aprendizaje").select("*").eq("competencia_id", comp["id"]).execute().data
+            for act in acts:
+                pond = float(act["ponderacion"]) if act["ponderacion"] else 0
+                actividades_list.append({
+                    "actividad": act["descripcion_actividad"],
+                    "horas": str(act["horas_dedicacion"]),
+                    "evidencia": act["evidencia"],
+                    "lugar": act["lugar"],
+                    "ponderacion": f"{pond:.1f}%"
+                })
+    return competencias_list, actividades_list
+
+
+def test_anexo_5_1_constant_queries(monkeypatch):
+    client = make_client(build_tables())
+    monkeypatch.setattr(anexo_data, "get_supabase_client", lambda: client)
+
+    context, err = anexo_data.get_anexo_5_1_data("alu-1")
+
+    assert err is None
+    # alumno, proyecto, inscripciones, competencias, actividades
+    assert len(queried_tables(client)) == 5
+    assert queried_tables(client).count("asignatura_competencias") == 1
+    assert queried_tables(client).count("actividades_aprendizaje") == 1
+    assert len(context["competencias_list"]) == 6 * 4
+    assert len(context["actividades_list"]) == 6 * 4 * 3
+
+
+def test_anexo_5_1_same_ordering_as_legacy(monkeypatch):
+    client = make_client(build_tables())
+    monkeypatch.setattr(anexo_data, "get_supabase_client", lambda: client)
+
+    context, _ = anexo_data.get_anexo_5_1_data("alu-1")
+    expected_comps, expected_acts = legacy_lists(make_client(build_tables()), "alu-1")
+
+    assert context["competencias_list"] == expected_comps
+    assert context["actividades_list"] == expected_acts
+    assert context["competencias_list"][0] == {"competencia": "Competencia 1 de Materia 5", "asignatura": "Materia 5"}
+
+
+def test_anexo_5_1_without_enrollments(monkeypatch):
+    tables = build_tables()
+    tables["inscripciones_asignaturas"] = []
+    client = make_client(tables)
+    monkeypatch.setattr(anexo_data, "get_supabase_client", lambda: client)
+
+    context, err = anexo_data.get_anexo_5_1_data("alu-1")
+
+    assert err is None
+    assert context["competencias_list"] == []
+    assert context["actividades_list"] == []
+    assert "asignatura_competencias" not in queried_tables(client)
+
+
+def build_cohort_tables(n_students):
+    tables = build_tables()
+    base_insc = tables["inscripciones_asignaturas"]
+    tables["alumnos"], tables["proyectos_dual"], tables["inscripciones_asignaturas"] = [], [], []
+    for i in range(n_students):
+        sid = f"alu-{i}"
+        tables["alumnos"].append({"id": sid, "nombre": f"Alumno{i}", "ap_paterno": "Pérez", "carrera_id": "car-1"})
+        # Proyecto antiguo y proyecto reciente: debe usarse el reciente
+        for created, nombre in (("2025-01-01", "Anterior"), ("2026-01-01", f"Proyecto {i}")):
+            tables["proyectos_dual"].append({
+                "id": f"proj-{i}-{created}", "alumno_id": sid, "created_at": created,
+                "nombre_proyecto": nombre, "calificacion_ue": 9, "calificacion_ie": 8,
+                "ue_id": "ue-1", "mentor_ue_id": "mue-1", "mentor_ie_id": "m-1", "periodo_id": "per-1",
+            })
+        for insc in base_insc[:2 + i % 3]:
+            tables["inscripciones_asignaturas"].append(dict(insc, id=f"{insc['id']}-{sid}", alumno_id=sid))
+    return tables
+
+
+def test_anexo_5_4_bulk_queries_scale_with_tables(monkeypatch):
+    for n_students in (3, 40):
+        client = make_client(build_cohort_tables(n_students))
+        monkeypatch.setattr(anexo_data, "get_supabase_client", lambda: client)
+
+        results = list(anexo_data.get_anexo_5_4_data_bulk([f"alu-{i}" for i in range(n_students)]))
+
+        assert [sid for sid, _, _ in results] == [f"alu-{i}" for i in range(n_students)]
+        assert all(err is None for _, _, err in results)
+        # alumnos, proyectos, inscripciones, competencias, actividades
+        assert len(queried_tables(client)) == 5
+
+
+def test_anexo_5_4_bulk_matches_single_student(monkeypatch):
+    client = make_client(build_cohort_tables(4))
+    monkeypatch.setattr(anexo_data, "get_supabase_client", lambda: client)
+
+    bulk = {sid: ctx for sid, ctx, _ in anexo_data.get_anexo_5_4_data_bulk(["alu-2", "alu-0"])}
+    single, err = anexo_data.get_anexo_5_4_data("alu-2")
+
+    assert err is None
+    for key in ("nombre_proyecto", "nombre_alumno", "lista_competencias", "evaluaciones"):
+        assert bulk["alu-2"][key] == single[key]
+    assert bulk["alu-2"]["nombre_proyecto"] == "Proyecto 2"
+    # 4 materias x 4 competencias, numeradas consecutivamente
+    assert [c["numero_consecutivo"] for c in single["lista_competencias"]] == list(range(1, 17))
+
+
+def test_anexo_5_4_bulk_reports_missing_rows(monkeypatch):
+    tables = build_cohort_tables(2)
+    tables["proyectos_dual"] = [p for p in tables["proyectos_dual"] if p["alumno_id"] != "alu-1"]
+    client = make_client(tables)
+    monkeypatch.setattr(anexo_data, "get_supabase_client", lambda: client)
+
+    results = {sid: (ctx, err) for sid, ctx, err in anexo_data.get_anexo_5_4_data_bulk(["alu-0", "alu-1", "alu-x"])}
+
+    assert results["alu-0"][1] is None
+    assert results["alu-1"] == (None, "El alumno no tiene un proyecto dual registrado.")
+    assert results["alu-x"] == (None, "Alumno no encontrado")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,85 @@
+import os
+import sys
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.assignment as assignment
+from src.utils.assignment import plan_least_loaded, plan_mentor_assignment, apply_mentor_assignment, assignment_distribution
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+def make_client(pending=1000, current=None):
+    current = current or {"m1": 5, "m2": 0, "m3": 2}
+    mentors = [{"id": m, "nombre_completo": f"Mentor {m}", "es_mentor_ie": True} for m in current]
+    mentors.append({"id": "m9", "nombre_completo": "No Mentor", "es_mentor_ie": False})
+    projects = []
+    for mentor_id, load in current.items():
+        projects += [{"id": f"{mentor_id}-{i}", "periodo_id": "p1", "mentor_ie_id": mentor_id,
+                      "alumno_id": "a", "ue_id": "ue"} for i in range(load)]
+    projects += [{"id": f"x{i:05d}", "periodo_id": "p1", "mentor_ie_id": None,
+                  "alumno_id": f"a{i}", "ue_id": "ue"} for i in range(pending)]
+    # Proyecto de otro periodo: no cuenta ni se asigna
+    projects.append({"id": "old", "periodo_id": "p0", "mentor_ie_id": None, "alumno_id": "a", "ue_id": "ue"})
+    db = FakeDatabase({"maestros": mentors, "proyectos_dual": projects}, latency_ms=0, log_requests=True)
+    return FakeSupabaseClient(db)
+
+
+def mentor_loads(client):
+    loads = {}
+    for p in client.db.tables["proyectos_dual"].rows.values():
+        if p["periodo_id"] == "p1":
+            loads[p["mentor_ie_id"]] = loads.get(p["mentor_ie_id"], 0) + 1
+    return loads
+
+
+def test_least_loaded_fills_from_current_load():
+    plan = plan_least_loaded(["a", "b", "c", "d", "e"], {"m1": 3, "m2": 0, "m3": 1})
+    assert plan == {"a": "m2", "b": "m2", "c": "m3", "d": "m2", "e": "m3"}
+
+
+def test_dry_run_plan_balances_without_writing(monkeypatch):
+    monkeypatch.setattr(assignment, "get_active_period_id", lambda: "p1")
+    client = make_client(pending=10)
+
+    ok, plan = plan_mentor_assignment(client)
+
+    assert ok and len(plan["assignments"]) == 10 and "old" not in plan["assignments"]
+    assert plan["before"] == {"m1": 5, "m2": 0, "m3": 2}
+    assert plan["after"] == {"m1": 6, "m2": 6, "m3": 5}
+    assert all(op == "select" for _, op in client.db.calls())
+    rows = assignment_distribution(plan)
+    assert rows[0]["Total"] == 6 and sum(r["Nuevos"] for r in rows) == 10
+
+
+def test_thousand_projects_use_few_round_trips(monkeypatch):
+    monkeypatch.setattr(assignment, "get_active_period_id", lambda: "p1")
+    client = make_client(pending=1000)
+
+    ok, plan = plan_mentor_assignment(client)
+    client.db.log.clear()
+    ok, msg = apply_mentor_assignment(plan, client)
+
+    assert ok and "1000" in msg
+    # Un update por mentor (menos de 500 ids cada uno), en lugar de 1,000 updates ni relectura de filas
+    assert client.db.calls() == [("proyectos_dual", "update")] * 3
+    assert all(q.payload.keys() == {"mentor_ie_id"} for q in client.db.log)
+    loads = mentor_loads(client)
+    assert max(loads.values()) - min(loads.values()) <= 1 and None not in loads
+
+
+def test_projects_assigned_meanwhile_are_skipped(monkeypatch):
+    monkeypatch.setattr(assignment, "get_active_period_id", lambda: "p1")
+    client = make_client(pending=3)
+    ok, plan = plan_mentor_assignment(client)
+    client.table("proyectos_dual").update({"mentor_ie_id": "m1"}).eq("id", "x00002").execute()
+
+    ok, msg = apply_mentor_assignment(plan, client)
+
+    assert ok and "2 students" in msg and "1 already had a mentor" in msg
+    assert client.db.tables["proyectos_dual"].rows["x00002"]["mentor_ie_id"] == "m1"
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
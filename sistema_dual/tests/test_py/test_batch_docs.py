@@ -0,0 +1,51 @@
+import os
+import sys
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils.batch_docs import render_documents_batch
+
+ANEXO_51 = "Anexo_5.1_Plan_de_Formacion.docx"
+
+
+def make_jobs(n):
+    return [{
+        "key": f"alu-{i}",
+        "template_name": ANEXO_51,
+        "context": {
+            "nombre_proyecto": f"Proyecto {i}",
+            "competencias_list": [{"competencia": "Comp", "asignatura": "Materia"}],
+            "actividades_list": [{"actividad": "Act", "horas": "10", "evidencia": "Rep", "lugar": "UE", "ponderacion": "100.0%"}],
+        },
+    } for i in range(n)]
+
+
+def run_batch(jobs, workers):
+    progress = []
+    results = list(render_documents_batch(jobs, max_workers=workers, progress_callback=lambda d, t, r: progress.append((d, t))))
+    return results, progress
+
+
+def test_batch_in_process_pool_reports_progress_and_errors():
+    jobs = make_jobs(4) + [{"key": "roto", "template_name": "No_Existe.docx", "context": {}}]
+
+    results, progress = run_batch(jobs, workers=2)
+
+    by_key = {r["key"]: r for r in results}
+    assert set(by_key) == {"alu-0", "alu-1", "alu-2", "alu-3", "roto"}
+    assert all(by_key[f"alu-{i}"]["success"] and by_key[f"alu-{i}"]["data"][:2] == b"PK" for i in range(4))
+    assert not by_key["roto"]["success"] and "no encontrada" in by_key["roto"]["error"]
+    assert progress == [(i, 5) for i in range(1, 6)]
+
+
+def test_batch_single_worker_runs_inline():
+    results, progress = run_batch(make_jobs(2), workers=1)
+
+    assert [r["key"] for r in results] == ["alu-0", "alu-1"]
+    assert progress[-1] == (2, 2)
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils import catalogs
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeSupabaseClient(FakeDatabase({
+        "carreras": [{"id": "c2", "nombre": "Sistemas"}, {"id": "c1", "nombre": "Industrial"}],
+        "unidades_economicas": [{"id": "ue1", "nombre_comercial": "Empresa 1"}],
+        "asignaturas": [
+            {"id": "a1", "nombre": "Redes", "clave_asignatura": "R1", "semestre": 8, "carrera_id": "c2"},
+            {"id": "a2", "nombre": "Calidad", "clave_asignatura": "Q1", "semestre": 7, "carrera_id": "c1"},
+        ],
+        "maestros": [
+            {"id": "m1", "nombre_completo": "Docente 1", "es_mentor_ie": True},
+            {"id": "m2", "nombre_completo": "Docente 2", "es_mentor_ie": False},
+        ],
+        "mentores_ue": [{"id": "mu1", "nombre_completo": "Mentor 1", "ue_id": "ue1"}],
+    }, latency_ms=0, log_requests=True))
+    monkeypatch.setattr(catalogs, "get_supabase_client", lambda: fake)
+    catalogs.invalidate_catalogs()
+    yield fake
+    catalogs.invalidate_catalogs()
+
+
+def queried_tables(client):
+    return [table for table, _ in client.db.calls()]
+
+
+def test_reruns_reuse_cached_catalogs(client):
+    for _ in range(5):
+        assert [c["nombre"] for c in catalogs.get_carreras()] == ["Industrial", "Sistemas"]
+        catalogs.get_unidades_economicas()
+        catalogs.get_asignaturas()
+        catalogs.get_maestros()
+        catalogs.get_mentores_ue("ue1")
+
+    assert sorted(queried_tables(client)) == sorted(["carreras", "unidades_economicas", "asignaturas", "maestros", "mentores_ue"])
+
+
+def test_mentores_ue_cached_per_company(client):
+    assert [m["id"] for m in catalogs.get_mentores_ue("ue1")] == ["mu1"]
+    assert catalogs.get_mentores_ue("ue2") == []
+    catalogs.get_mentores_ue("ue1")
+    assert catalogs.get_mentores_ue(None) == []
+
+    assert queried_tables(client) == ["mentores_ue", "mentores_ue"]
+
+
+def test_local_filters(client):
+    assert [a["id"] for a in catalogs.get_asignaturas(carrera_id="c2")] == ["a1"]
+    assert [a["id"] for a in catalogs.get_asignaturas(semestre="7")] == ["a2"]
+    assert [m["id"] for m in catalogs.get_maestros(solo_mentores_ie=True)] == ["m1"]
+    assert [m["id"] for m in catalogs.get_maestros(ids=["m2"])] == ["m2"]
+    assert queried_tables(client) == ["asignaturas", "maestros"]
+
+
+def test_invalidation_refetches_only_affected_catalog(client):
+    catalogs.get_maestros()
+    catalogs.get_unidades_economicas()
+    client.db.load("maestros", [{"id": "m3", "nombre_completo": "Docente 3", "es_mentor_ie": True}])
+
+    assert len(catalogs.get_maestros()) == 2
+    catalogs.invalidate_catalogs(catalogs.MAESTROS)
+    assert len(catalogs.get_maestros()) == 3
+    catalogs.get_unidades_economicas()
+
+    assert queried_tables(client) == ["maestros", "unidades_economicas", "maestros"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,147 @@
+import os
+import sys
+import zipfile
+
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.batch_docs as batch_docs
+import src.utils.cohort_export as cohort_export
+from src.utils.cohort_export import export_cohort_zip, build_generic_context, COHORT_PROJECT_COLUMNS
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+def make_project(pid, alumno_id, created_at, periodo_id="p1", mentor_ie_id="m1"):
+    return {
+        "id": pid, "alumno_id": alumno_id, "periodo_id": periodo_id, "created_at": created_at,
+        "ue_id": "ue1", "mentor_ue_id": "mu1", "mentor_ie_id": mentor_ie_id,
+        "nombre_proyecto": f"Proyecto {pid}",
+    }
+
+
+def make_student(alumno_id, matricula, carrera):
+    return {"id": alumno_id, "matricula": matricula, "nombre": "Ana", "ap_paterno": "López",
+            "carrera": carrera, "carrera_id": carrera}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(cohort_export, "get_active_period_id", lambda: "p1")
+    db = FakeDatabase({
+        "carreras": [{"id": c, "nombre": c} for c in ("Ing. Sistemas", "Ing. Industrial")],
+        "alumnos": [make_student("a1", "2023001", "Ing. Sistemas"), make_student("a2", "2023002", "Ing. Industrial"),
+                    make_student("a9", "2019009", "Ing. Sistemas")],
+        "unidades_economicas": [{"id": "ue1", "nombre_comercial": "Empresa S.A."}],
+        "mentores_ue": [{"id": "mu1", "ue_id": "ue1", "nombre_completo": "Mentor UE"}],
+        "maestros": [{"id": "m1", "nombre_completo": "Mentor IE"}],
+        "proyectos_dual": [
+            make_project("1", "a1", "2026-02-01"),
+            # Proyecto anterior del mismo alumno: se usa el más reciente, como en la tarjeta de Documentos
+            make_project("0", "a1", "2026-01-01"),
+            make_project("2", "a2", "2026-02-01", mentor_ie_id=None),
+            make_project("9", "a9", "2026-02-01", periodo_id="p0"),
+            # Proyecto posterior de a1 en otro periodo: el Anexo 5.1 del periodo p1 no debe usarlo
+            make_project("5", "a1", "2026-08-01", periodo_id="p2"),
+        ],
+        "asignaturas": [{"id": "as1", "nombre": "Redes", "clave_asignatura": "R1"}],
+        "inscripciones_asignaturas": [{"id": "i1", "alumno_id": "a1", "asignatura_id": "as1"},
+                                      {"id": "i2", "alumno_id": "a2", "asignatura_id": "as1"}],
+        "asignatura_competencias": [{"id": "c1", "asignatura_id": "as1", "numero_competencia": 1,
+                                     "descripcion_competencia": "Configura redes"}],
+        "actividades_aprendizaje": [{"id": "ac1", "competencia_id": "c1", "descripcion_actividad": "Cableado",
+                                     "horas_dedicacion": 10, "evidencia": "Reporte", "lugar": "UE",
+                                     "ponderacion": 50}],
+    }, latency_ms=0, log_requests=True)
+    return FakeSupabaseClient(db)
+
+
+def embedded_project(client, pid):
+    return client.table("proyectos_dual").select(COHORT_PROJECT_COLUMNS).eq("id", pid).single().execute().data
+
+
+def test_zip_is_organized_by_carrera_and_matricula(client, tmp_path, monkeypatch):
+    def fake_render(job):
+        if job["template_name"] == "Acta_Calificaciones_Materia.docx":
+            return False, "plantilla dañada"
+        return True, f"{job['template_name']}|{job['context'].get('proyecto_nombre', '')}".encode()
+    monkeypatch.setattr(batch_docs, "_render_job", fake_render)
+
+    out = tmp_path / "cohorte.zip"
+    ok, result = export_cohort_zip(output_path=str(out), max_workers=1, supabase=client)
+
+    assert ok, result
+    assert result["students"] == 2 and result["written"] == 5
+    with zipfile.ZipFile(out) as zf:
+        names = set(zf.namelist())
+        assert names == {
+            "Ing._Sistemas/2023001/Anexo_5.1_2023001.docx",
+            "Ing._Sistemas/2023001/Anexo_5.4_2023001.docx",
+            "Ing._Sistemas/2023001/Anexo_5.5_2023001.docx",
+            "Ing._Sistemas/2023001/Carta_Mentor_IE_2023001.docx",
+            "Ing._Industrial/2023002/Anexo_5.1_2023002.docx",
+            "ERRORES.txt",
+        }
+        assert zf.read("Ing._Sistemas/2023001/Anexo_5.4_2023001.docx") == b"Anexo_5.4_Reporte_de_Actividades.docx|Proyecto 1"
+        assert "plantilla dañada" in zf.read("ERRORES.txt").decode()
+    # Sin Mentor IE: 5.4, 5.5, Carta y Acta se omiten
+    assert len(result["skipped"]) == 4
+    assert not os.path.exists(str(out) + ".part")
+
+
+def test_anexo_5_1_uses_period_project_and_batched_reads(client):
+    for i in range(3, 300):
+        client.db.load("alumnos", [make_student(f"a{i}", f"2023{i:03d}", "Ing. Sistemas")])
+        client.db.load("proyectos_dual", [make_project(f"n{i}", f"a{i}", "2026-02-01")])
+    projects = cohort_export.load_cohort_projects(supabase=client)
+    client.db.log.clear()
+
+    jobs = {job["key"]: job["context"] for job in cohort_export.iter_cohort_jobs(
+        projects, documents=cohort_export.COHORT_DOCUMENTS[:1], supabase=client)}
+
+    context = jobs["Ing._Sistemas/2023001/Anexo_5.1_2023001.docx"]
+    assert context["nombre_proyecto"] == "Proyecto 1"
+    assert context["programa_educativo"] == "Ing. Sistemas" and context["mentor_ie"] == "Mentor IE"
+    assert context["competencias_list"] == [{"competencia": "Configura redes", "asignatura": "Redes"}]
+    assert context["actividades_list"][0]["ponderacion"] == "50.0%"
+    assert len(jobs) == 299
+    # Dos bloques de COHORT_CHUNK alumnos: inscripciones, competencias y actividades por bloque,
+    # sin releer alumnos ni proyectos
+    tables = [table for table, _ in client.db.calls()]
+    assert tables.count("inscripciones_asignaturas") == 2 and len(tables) <= 6
+    assert "alumnos" not in tables and "proyectos_dual" not in tables
+
+
+def test_generic_context_matches_card_fields(client):
+    project = embedded_project(client, "1")
+    context = build_generic_context(project["alumnos"], project)
+
+    assert context["alumno_matricula"] == "2023001"
+    assert context["empresa_nombre"] == "Empresa S.A."
+    assert context["mentor_ie_nombre"] == "Mentor IE"
+    assert context["nombre_alumno"] == "Ana López"
+
+
+def test_batch_pulls_generator_jobs_lazily(client, monkeypatch):
+    monkeypatch.setattr(batch_docs, "DOC_PENDING_PER_WORKER", 2)
+    project = embedded_project(client, "1")
+    context = build_generic_context(project["alumnos"], project)
+    pulled = []
+
+    def jobs():
+        for i in range(12):
+            pulled.append(i)
+            yield {"key": i, "template_name": "Carta_Asignacion_Mentor_IE.docx", "context": context}
+
+    yielded = 0
+    for result in batch_docs.render_documents_batch(jobs(), max_workers=2):
+        assert result["success"], result["error"]
+        yielded += 1
+        # Nunca hay más de workers * DOC_PENDING_PER_WORKER documentos en vuelo
+        assert len(pulled) - yielded <= 4
+    assert yielded == 12
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,82 @@
+import os
+import sys
+import shutil
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.pdf_generator_docx as pdf_docx
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'templates', 'docs')
+ANEXO_51 = "Anexo_5.1_Plan_de_Formacion.docx"
+
+
+def make_context(i):
+    return {
+        "nombre_proyecto": f"Proyecto {i}",
+        "competencias_list": [{"competencia": f"Competencia {i}", "asignatura": "Materia"}],
+        "actividades_list": [{"actividad": "Act", "horas": "10", "evidencia": "Rep", "lugar": "UE", "ponderacion": "100.0%"}],
+    }
+
+
+def test_preprocessing_runs_once_per_template(tmp_path, monkeypatch):
+    calls = []
+    original = pdf_docx._preprocess_template
+    monkeypatch.setattr(pdf_docx, "_preprocess_template", lambda *args: calls.append(args) or original(*args))
+    monkeypatch.setattr(pdf_docx, "_TEMPLATE_CACHE", {})
+
+    template = tmp_path / ANEXO_51
+    shutil.copy(os.path.join(TEMPLATES_DIR, ANEXO_51), template)
+
+    for i in range(5):
+        ok, msg = pdf_docx.generate_docx_document(ANEXO_51, make_context(i), str(tmp_path / f"out_{i}.docx"), str(template))
+        assert ok, msg
+
+    assert len(calls) == 1
+    # Sin archivos intermedios _INJECTED junto a la salida
+    assert not [f for f in os.listdir(tmp_path) if "_INJECTED" in f]
+
+
+def test_cache_invalidated_when_template_changes(tmp_path, monkeypatch):
+    calls = []
+    original = pdf_docx._preprocess_template
+    monkeypatch.setattr(pdf_docx, "_preprocess_template", lambda *args: calls.append(args) or original(*args))
+    monkeypatch.setattr(pdf_docx, "_TEMPLATE_CACHE", {})
+
+    template = tmp_path / ANEXO_51
+    shutil.copy(os.path.join(TEMPLATES_DIR, ANEXO_51), template)
+
+    pdf_docx.generate_docx_document(ANEXO_51, make_context(1), str(tmp_path / "a.docx"), str(template))
+    stat = os.stat(template)
+    os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    pdf_docx.generate_docx_document(ANEXO_51, make_context(2), str(tmp_path / "b.docx"), str(template))
+
+    assert len(calls) == 2
+    # Solo se conserva la versión vigente de la plantilla
+    assert len(pdf_docx._TEMPLATE_CACHE) == 1
+
+
+def test_render_docx_bytes_in_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pdf_docx, "DOCX_DEBUG_DUMP", None)
+
+    ok, result = pdf_docx.render_docx_bytes(ANEXO_51, make_context(7))
+
+    assert ok, result
+    assert isinstance(result, bytes) and result[:2] == b"PK"
+    # Ni volcado de depuración ni archivos intermedios por defecto
+    assert os.listdir(tmp_path) == []
+
+
+def test_render_docx_bytes_debug_dump_is_opt_in(tmp_path):
+    dump = tmp_path / "final_jinja_src.txt"
+
+    ok, _ = pdf_docx.render_docx_bytes(ANEXO_51, make_context(8), debug_dump_path=str(dump))
+
+    assert ok
+    assert "competencias_list" in dump.read_text(encoding="utf-8")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
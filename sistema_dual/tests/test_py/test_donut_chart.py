@@ -0,0 +1,70 @@
+import io
+import os
+import sys
+import subprocess
+import zipfile
+
+import docx
+from PIL import Image
+
+# Add project root path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.append(ROOT)
+
+from src.utils.pdf_generator_images import percentage_donut_png, create_percentage_donut, _render_donut_png
+from src.utils.pdf_generator_docx import render_docx_bytes
+
+
+def test_donut_is_png_bytes():
+    png = percentage_donut_png(85)
+
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    img = Image.open(io.BytesIO(png))
+    assert img.size == (300, 300) and img.mode == "RGBA"
+    # Esquina transparente, anillo pintado
+    assert img.getpixel((0, 0))[3] == 0
+    assert img.getpixel((150, 10))[3] == 255
+
+
+def test_batch_renders_each_percentage_once():
+    _render_donut_png.cache_clear()
+
+    for i in range(500):
+        percentage_donut_png((i * 37) % 120 - 10)  # incluye valores fuera de 0-100
+
+    info = _render_donut_png.cache_info()
+    assert info.misses <= 101
+    assert percentage_donut_png(150) == percentage_donut_png(100)
+
+
+def test_matplotlib_is_not_imported():
+    code = ("import sys; sys.path.insert(0, %r); "
+            "from src.utils.pdf_generator_images import percentage_donut_png; percentage_donut_png(40); "
+            "print('matplotlib' in sys.modules)") % ROOT
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_png_bytes_become_inline_image(tmp_path):
+    template = tmp_path / "grafica.docx"
+    document = docx.Document()
+    document.add_paragraph("{{ grafica_promedio }}")
+    document.save(template)
+
+    ok, result = render_docx_bytes("grafica.docx", {"grafica_promedio": percentage_donut_png(70)}, str(template))
+
+    assert ok
+    names = zipfile.ZipFile(io.BytesIO(result)).namelist()
+    assert any(n.startswith("word/media/") for n in names)
+
+
+def test_create_percentage_donut_still_writes_file(tmp_path):
+    path = create_percentage_donut(12, str(tmp_path / "dona.png"))
+
+    with open(path, "rb") as f:
+        assert f.read() == percentage_donut_png(12)
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils import notifications
+
+
+@pytest.fixture
+def fresh_env(tmp_path, monkeypatch):
+    """Environment nuevo (como en un proceso recién iniciado) con caché de bytecode aislado."""
+    monkeypatch.setattr(notifications, "EMAIL_TEMPLATE_CACHE_DIR", str(tmp_path / "jinja"))
+    monkeypatch.setattr(notifications, "_email_env", None)
+
+    def start(app_env="production"):
+        monkeypatch.setattr(notifications, "APP_ENV", app_env)
+        monkeypatch.setattr(notifications, "_email_env", None)
+        env = notifications.get_email_environment()
+        compiled = []
+        original = env.compile
+
+        def counting_compile(source, name=None, filename=None, *args, **kwargs):
+            compiled.append(name)
+            return original(source, name, filename, *args, **kwargs)
+
+        monkeypatch.setattr(env, "compile", counting_compile)
+        return env, compiled
+
+    return start
+
+
+def test_bulk_rendering_compiles_template_once(fresh_env):
+    env, compiled = fresh_env()
+    for i in range(50):
+        html = notifications.load_template("base_notification.html", {"title": f"Aviso {i}", "message": "<p>Hola</p>"})
+        assert f"Aviso {i}" in html
+
+    assert compiled == ["base_notification.html"]
+    assert notifications.get_email_environment() is env
+
+
+def test_prewarm_compiles_every_email_template(fresh_env, tmp_path):
+    _, compiled = fresh_env()
+    expected = sorted(n for n in os.listdir(notifications.EMAIL_TEMPLATE_DIR) if n.endswith(".html"))
+
+    assert notifications.prewarm_email_templates() == len(expected)
+    assert sorted(compiled) == expected
+    assert len(os.listdir(tmp_path / "jinja")) == len(expected)
+
+    # Ya compiladas: renderizar no vuelve a compilar
+    notifications.load_template("base_correos_maestra.html", {})
+    assert sorted(compiled) == expected
+
+
+def test_bytecode_cache_survives_new_environment(fresh_env):
+    fresh_env()
+    notifications.prewarm_email_templates()
+
+    _, compiled = fresh_env()
+    notifications.prewarm_email_templates()
+
+    assert compiled == []
+
+
+def test_auto_reload_only_in_development(fresh_env):
+    env, _ = fresh_env("production")
+    assert env.auto_reload is False
+    env, _ = fresh_env("development")
+    assert env.auto_reload is True
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import threading
+from datetime import date
+
+import pytest
+from postgrest.exceptions import APIError
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.db_connection as db_connection
+import src.utils.fake_backend as fake_backend
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+from src.utils.db_actions import get_students_page, count_students, get_phase2_projects, create_student_transaction
+from src.utils.assignment import plan_mentor_assignment, apply_mentor_assignment
+
+
+def make_db(n_projects=2500, latency_ms=0):
+    db = FakeDatabase(latency_ms=latency_ms)
+    db.load("carreras", [{"id": "c1", "nombre": "Ing. Sistemas"}])
+    db.load("periodos", [{"id": "p1", "activo": True}, {"id": "p0", "activo": False}])
+    db.load("maestros", [{"id": f"m{i}", "nombre_completo": f"Mentor {i}", "es_mentor_ie": True} for i in range(3)])
+    db.load("alumnos", [{"id": f"a{i}", "matricula": f"2023{i:05d}", "nombre": "Ana" if i % 2 else "Luis",
+                         "ap_paterno": f"López{i:05d}", "estatus": "Activo" if i % 3 else "Egresado",
+                         "carrera_id": "c1"} for i in range(n_projects)])
+    db.load("proyectos_dual", [{"id": f"x{i:05d}", "alumno_id": f"a{i}", "periodo_id": "p1",
+                                "mentor_ie_id": "m0" if i % 5 == 0 else None, "ue_id": "ue", "mentor_ue_id": "mu"}
+                               for i in range(n_projects)])
+    return db
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """SUPABASE_BACKEND=fake: get_supabase_client() regresa el cliente en memoria."""
+    db = make_db()
+    monkeypatch.setattr(db_connection, "SUPABASE_BACKEND", "fake")
+    monkeypatch.setattr(fake_backend, "_fake_db", db)
+    db_connection.get_supabase_client.clear()
+    yield db
+    db_connection.get_supabase_client.clear()
+
+
+def test_embeds_in_both_directions_with_count():
+    client = FakeSupabaseClient(make_db(10))
+    res = client.table("alumnos").select("id, carrera:carreras(nombre), proyectos_dual(id, periodos(activo))",
+                                         count="exact").eq("id", "a3").execute()
+
+    assert res.count == 1
+    assert res.data == [{"id": "a3", "carrera": {"nombre": "Ing. Sistemas"},
+                         "proyectos_dual": [{"id": "x00003", "periodos": {"activo": True}}]}]
+    with pytest.raises(APIError):
+        client.table("alumnos").select("id, empresas(*)").execute()
+
+
+def test_listing_queries_run_unchanged():
+    client = FakeSupabaseClient(make_db())
+
+    rows, total = get_students_page(estatus=["Activo"], search="lópez0001", page=2, page_size=5, supabase=client)
+    # López00010..López00019 sin los múltiplos de 3 (Egresado)
+    assert total == count_students(estatus=["Activo"], search="lópez0001", supabase=client) == 7
+    assert len(rows) == 2
+    assert [r["ap_paterno"] for r in rows] == sorted(r["ap_paterno"] for r in rows)
+    assert set(rows[0]) == {"id", "matricula", "nombre", "ap_paterno", "ap_materno", "estatus"}
+
+    # max-rows de PostgREST: sin paginar solo llegan 1000 filas; fetch_all_rows las junta todas
+    assert len(client.table("proyectos_dual").select("id").execute().data) == 1000
+    phase2 = get_phase2_projects(period_id="p1", supabase=client)
+    assert len(phase2) == 500 and phase2[0]["alumnos"]["nombre"] == "Luis"
+    assert "periodo_id" in client.db.tables["proyectos_dual"].indexes
+
+
+def test_writes_follow_postgrest_semantics():
+    client = FakeSupabaseClient(make_db(5))
+    q = client.table("proyectos_dual")
+
+    with pytest.raises(APIError):
+        q.insert({"id": "x00000", "alumno_id": "a0"}).execute()
+    inserted = client.table("periodos").insert({"activo": False}).execute().data[0]
+    assert inserted["id"] and inserted["created_at"]
+
+    # Upsert masivo: la unión de columnas se aplica a todas las filas (las faltantes quedan NULL)
+    client.table("proyectos_dual").upsert([{"id": "x00001", "mentor_ie_id": "m1"}, {"id": "x00002", "nombre_proyecto": "P"}]).execute()
+    rows = {r["id"]: r for r in client.table("proyectos_dual").select("*").in_("id", ["x00001", "x00002"]).execute().data}
+    assert rows["x00001"]["mentor_ie_id"] == "m1" and rows["x00001"]["nombre_proyecto"] is None
+    assert rows["x00002"]["mentor_ie_id"] is None and rows["x00002"]["alumno_id"] == "a2"
+
+    updated = client.table("proyectos_dual").update({"ue_id": "ue2"}).not_.is_("mentor_ie_id", "null").execute().data
+    assert [r["id"] for r in updated] == ["x00000", "x00001"]
+    assert client.table("proyectos_dual").select("id", count="exact", head=True).eq("ue_id", "ue2").execute().count == 2
+
+    deleted = client.table("proyectos_dual").delete().eq("id", "x00004").execute().data
+    assert deleted[0]["id"] == "x00004"
+    with pytest.raises(APIError):
+        client.table("proyectos_dual").select("*").eq("id", "x00004").single().execute()
+
+
+def test_app_code_uses_fake_backend_from_env(backend):
+    ok, plan = plan_mentor_assignment()
+    assert ok and len(plan["assignments"]) == 2000
+    ok, _ = apply_mentor_assignment(plan)
+    assert ok
+    assert not any(r["mentor_ie_id"] is None for r in backend.tables["proyectos_dual"].rows.values())
+
+    backend.load("unidades_economicas", [{"id": "ue9"}])
+    ok, msg = create_student_transaction(
+        {"matricula": "2026X", "curp": "C", "nombre": "Eva", "ap_paterno": "Ruiz", "ap_materno": "",
+         "fecha_nacimiento": date(2004, 1, 1)},
+        {"ue_id": "ue9", "mentor_ue_id": "mu", "nombre_proyecto": "Nuevo", "fecha_inicio": date(2026, 1, 1),
+         "fecha_fin": date(2026, 6, 30)},
+        [],
+    )
+    assert ok, msg
+    student = db_connection.get_supabase_client().table("alumnos").select("id, proyectos_dual(nombre_proyecto)") \
+        .eq("matricula", "2026X").single().execute().data
+    assert student["proyectos_dual"] == [{"nombre_proyecto": "Nuevo"}]
+
+
+def test_latency_is_per_request_and_concurrent():
+    client = FakeSupabaseClient(make_db(10, latency_ms=40))
+    start = time.perf_counter()
+    threads = [threading.Thread(target=lambda: client.table("alumnos").select("id").execute()) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    assert client.db.requests == 8
+    assert 0.04 <= elapsed < 0.04 * 8 / 2
+
+
+def test_request_log_records_executed_queries():
+    db = make_db(10)
+    client = FakeSupabaseClient(db)
+    client.table("alumnos").select("id").execute()
+    assert db.log is None and db.calls() == []
+
+    db = FakeDatabase(latency_ms=0, log_requests=True)
+    db.load("alumnos", [{"id": "a1", "nombre": "Ana"}])
+    client = FakeSupabaseClient(db)
+    client.table("alumnos").select("id").or_("nombre.ilike.*an*").execute()
+    client.table("alumnos").update({"nombre": "Ana María"}).in_("id", ["a1"]).execute()
+
+    assert db.calls() == [("alumnos", "select"), ("alumnos", "update")]
+    assert db.log[0].or_expressions == ["nombre.ilike.*an*"]
+    assert db.tables["alumnos"].rows["a1"]["nombre"] == "Ana María"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
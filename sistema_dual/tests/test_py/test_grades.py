@@ -0,0 +1,95 @@
+import os
+import sys
+import random
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils.grades import grades_frame, consolidate_grades, diff_grade_edits, save_grade_edits, acta_rows
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+def make_projects(n=500, seed=3):
+    rng = random.Random(seed)
+    projects = []
+    for i in range(n):
+        projects.append({
+            "id": f"p{i:04d}", "alumno_id": f"a{i}", "periodo_id": "per-1", "mentor_ie_id": "m1",
+            "calificacion_ue": None if i % 9 == 0 else rng.choice([55, 70, 80.5, 100, 200]),
+            "calificacion_ie": None if i % 7 == 0 else rng.choice([5.0, 7.5, 9.9, 10]),
+            "alumnos": {"matricula": f"20{i:06d}", "nombre": "Ana", "ap_paterno": "López", "ap_materno": "Ruiz"},
+        })
+    return projects
+
+
+def make_client(projects):
+    """proyectos_dual en el backend en memoria (sin el alumno embebido)."""
+    rows = [{k: v for k, v in p.items() if k != "alumnos"} for p in projects]
+    return FakeSupabaseClient(FakeDatabase({"proyectos_dual": rows}, latency_ms=0, log_requests=True))
+
+
+def legacy_acta(proj):
+    """Cálculo fila por fila que hacía la exportación de Actas."""
+    c_ue, c_ie = proj.get("calificacion_ue"), proj.get("calificacion_ie")
+    val_ue = float(c_ue) if c_ue is not None else 0.0
+    val_ie = float(c_ie) if c_ie is not None else 0.0
+    final_grade = min(10.0, ((val_ue / 10.0) * 0.7) + (val_ie * 0.3))
+    letra = "Acreditada" if final_grade >= 7.0 else "No Acreditada"
+    if c_ue is None or c_ie is None:
+        letra = "Pendiente de Evaluar"
+    return f"{final_grade:.2f}" if c_ue is not None and c_ie is not None else "N/A", letra
+
+
+def test_vectorized_consolidation_matches_row_by_row():
+    projects = make_projects()
+
+    rows = acta_rows(consolidate_grades(grades_frame(projects)))
+
+    assert [(r["calificacion_final"], r["calificacion_letra"]) for r in rows] == [legacy_acta(p) for p in projects]
+    assert rows[1]["numero"] == 2 and rows[1]["nombre_alumno"] == "Ana López Ruiz"
+
+
+def test_semaforo_and_status():
+    frame = consolidate_grades(grades_frame([
+        {"id": 1, "calificacion_ue": 100, "calificacion_ie": 10},
+        {"id": 2, "calificacion_ue": 50, "calificacion_ie": 5},
+        {"id": 3, "calificacion_ue": 90, "calificacion_ie": None},
+    ]))
+
+    assert frame["semaforo"].tolist() == ["🟢", "🔴", "🟡"]
+    assert frame["calificacion_final"].tolist()[:2] == [10.0, 5.0]
+
+
+def test_edits_are_diffed_and_saved_in_grouped_updates():
+    projects = make_projects(500)
+    client = make_client(projects)
+    original = consolidate_grades(grades_frame(projects))
+    edited = original.copy()
+    edited["calificacion_ue"] = 90.0
+    edited.loc[3, "calificacion_ie"] = None
+
+    changes = diff_grade_edits(original, edited)
+    ok, msg = save_grade_edits(changes, client)
+
+    expected = {p["id"] for p in projects if p["calificacion_ue"] != 90.0}
+    assert set(changes) == expected | {"p0003"}
+    assert changes["p0003"]["calificacion_ie"] is None
+    assert ok and str(len(changes)) in msg
+    # Un update por cambio distinto (todo el lote a 90 y la fila 3), en lugar de uno y un rerun por celda
+    assert client.db.calls() == [("proyectos_dual", "update")] * 2
+    assert all(set(q.payload) <= {"calificacion_ue", "calificacion_ie"} for q in client.db.log)
+    assert all(p["calificacion_ue"] == 90.0 for p in client.db.tables["proyectos_dual"].rows.values())
+
+
+def test_no_changes_means_no_requests():
+    projects = make_projects(20)
+    original = consolidate_grades(grades_frame(projects))
+    client = make_client(projects)
+
+    assert diff_grade_edits(original, original.copy()) == {}
+    assert save_grade_edits({}, client)[0] and client.db.calls() == []
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import time
+import threading
+import warnings
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import httpx
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.query_metrics as qm
+from src.utils.http_pool import build_http_client, pool_stats
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        self.server.seen.append((urlparse(self.path).path, self.headers.get("apikey")))
+        delay = parse_qs(urlparse(self.path).query).get("delay")
+        if delay:
+            time.sleep(float(delay[0]))
+        body = json.dumps([]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.seen = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_supabase_subclients_share_one_keepalive_pool(server):
+    from supabase import create_client, ClientOptions
+
+    http_client = build_http_client(http2=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        client = create_client(f"http://127.0.0.1:{server.server_port}", "anon-key",
+                               options=ClientOptions(httpx_client=http_client))
+    assert client.postgrest.session is http_client and client.auth._http_client is http_client
+
+    for i in range(5):
+        client.table("alumnos").select("id").eq("matricula", str(i)).execute()
+    client.storage.list_buckets()
+
+    assert [path for path, _ in server.seen] == ["/rest/v1/alumnos"] * 5 + ["/storage/v1/bucket"]
+    assert all(key == "anon-key" for _, key in server.seen)
+    stats = pool_stats(http_client)
+    # Peticiones seguidas: una sola conexión reutilizada, inactiva al terminar
+    assert stats["requests"] == 6 and stats["connections_opened"] == 1
+    assert stats["connections"] == stats["idle"] == 1 and stats["in_flight"] == 0
+    assert stats["waits"] == 0 and stats["http2"] is False
+    http_client.close()
+
+
+def test_waits_are_counted_and_pool_timeout_is_bounded(server):
+    url = f"http://127.0.0.1:{server.server_port}/slow"
+    http_client = build_http_client(http2=False, max_connections=1, timeout=httpx.Timeout(5.0))
+    threads = [threading.Thread(target=http_client.get, args=(url,), kwargs={"params": {"delay": "0.3"}})
+               for _ in range(2)]
+    for t in threads:
+        t.start()
+        time.sleep(0.05)
+    for t in threads:
+        t.join()
+
+    stats = pool_stats(http_client)
+    assert stats["waits"] == 1 and stats["peak_in_flight"] == 2
+    assert stats["connections_opened"] == 1 and stats["in_flight"] == 0
+
+    # Sin conexión libre dentro de timeout.pool: falla rápido en vez de colgar la sesión
+    http_client = build_http_client(http2=False, max_connections=1, timeout=httpx.Timeout(5.0, pool=0.05))
+    blocker = threading.Thread(target=http_client.get, args=(url,), kwargs={"params": {"delay": "0.4"}})
+    blocker.start()
+    time.sleep(0.1)
+    with pytest.raises(httpx.PoolTimeout):
+        http_client.get(url)
+    blocker.join()
+    assert pool_stats(http_client)["in_flight"] == 0
+
+
+def test_pool_stats_reach_query_metrics(server, monkeypatch):
+    monkeypatch.setattr(qm, "_pool_providers", {})
+    http_client = build_http_client(http2=False)
+    http_client.get(f"http://127.0.0.1:{server.server_port}/rest/v1/alumnos")
+
+    qm.register_pool_stats("supabase", lambda: pool_stats(http_client))
+    qm.register_pool_stats("roto", lambda: 1 / 0)
+    qm.register_pool_stats("otro", lambda: pool_stats(httpx.Client()))
+
+    stats = qm.get_pool_stats()
+    assert list(stats) == ["supabase"]
+    assert stats["supabase"]["requests"] == 1 and stats["supabase"]["max_connections"] == 20
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,68 @@
+import io
+import base64
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.assets as assets
+from src.components.login_ui import get_login_header
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    assets._logo_data_uri.cache_clear()
+    assets._logo_static_urls.cache_clear()
+    yield
+    assets._logo_data_uri.cache_clear()
+    assets._logo_static_urls.cache_clear()
+
+
+def test_build_downsizes_to_display_height(tmp_path):
+    built = assets.build_logo_assets(str(tmp_path))
+
+    assert set(built) == {"tese", "edomex", "dual"}
+    for name, path in built.items():
+        original = os.path.getsize(os.path.join(assets.LOGOS_SOURCE_DIR, assets.LOGO_FILES[name]))
+        with Image.open(path) as img:
+            assert img.height <= assets.LOGO_DISPLAY_HEIGHT
+        assert os.path.getsize(path) <= min(original, 64 * 1024)
+
+    mtime = os.path.getmtime(built["dual"])
+    assets.build_logo_assets(str(tmp_path))
+    assert os.path.getmtime(built["dual"]) == mtime
+
+
+def test_static_url_when_static_serving_enabled(tmp_path, monkeypatch):
+    monkeypatch.setenv("STREAMLIT_STATIC_DIR", str(tmp_path))
+    monkeypatch.setattr(assets, "static_serving_enabled", lambda: True)
+
+    src = assets.logo_src("tese")
+    html = get_login_header()
+
+    assert src.startswith("app/static/logos/logo_institucional_tese.png?v=")
+    assert (tmp_path / "logos" / "logo_institucional_tese.png").exists()
+    assert "base64" not in html and len(html) < 2000
+
+
+def test_data_uri_fallback_is_small_and_cached(monkeypatch):
+    monkeypatch.setattr(assets, "static_serving_enabled", lambda: False)
+
+    first = assets.logo_src("tese")
+    second = assets.logo_src("tese")
+
+    assert first.startswith("data:image/png;base64,")
+    assert first is second
+    assert assets._logo_data_uri.cache_info().misses == 1
+    # El original en base64 pesa ~400 KB
+    assert len(first) < 64 * 1024
+    png = Image.open(io.BytesIO(base64.b64decode(first.split(",", 1)[1])))
+    assert png.height == assets.LOGO_DISPLAY_HEIGHT
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
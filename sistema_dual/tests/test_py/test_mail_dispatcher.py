@@ -0,0 +1,153 @@
+import os
+import sys
+import email
+import socket
+
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from src.utils import notifications
+from src.utils.mail_dispatcher import send_many
+
+
+class RecordingHandler:
+    """Relay SMTP local: guarda los mensajes y cuenta las sesiones abiertas."""
+
+    def __init__(self, fail_once_for=(), refuse=()):
+        self.messages = []
+        self.sessions = 0
+        self.fail_once_for = set(fail_once_for)
+        self.refuse = set(refuse)
+        self.rcpt_attempts = {}
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        self.rcpt_attempts[address] = self.rcpt_attempts.get(address, 0) + 1
+        if address in self.refuse:
+            # Rechazo permanente: no debe reintentarse
+            return "550 5.1.1 Mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        rcpt = envelope.rcpt_tos[0]
+        if rcpt in self.fail_once_for:
+            # Falla temporal: el cliente debe reconectar y reintentar
+            self.fail_once_for.discard(rcpt)
+            return "421 Service not available, closing transmission channel"
+        self.messages.append(email.message_from_bytes(envelope.content))
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_relay(monkeypatch):
+    def start(handler):
+        port = free_port()
+        controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+        controller.start()
+        monkeypatch.setattr(notifications, "SMTP_SERVER", "127.0.0.1")
+        monkeypatch.setattr(notifications, "SMTP_PORT", port)
+        monkeypatch.setattr(notifications, "SMTP_STARTTLS", False)
+        monkeypatch.setattr(notifications, "SMTP_USER", None)
+        monkeypatch.setattr(notifications, "SMTP_PASSWORD", None)
+        monkeypatch.setattr(notifications, "FROM_EMAIL", "dual@tese.edu.mx")
+        started.append(controller)
+        return handler
+
+    started = []
+    yield start
+    for controller in started:
+        controller.stop()
+
+
+def make_messages(n, attachments=None):
+    return [{
+        "to": f"alumno{i}@tese.edu.mx",
+        "subject": f"Aviso {i}",
+        "template_name": "base_notification.html",
+        "context": {"title": f"Aviso {i}", "message": "<p>Hola</p>"},
+        "attachments": attachments,
+    } for i in range(n)]
+
+
+def test_send_many_reuses_pooled_sessions(smtp_relay):
+    handler = smtp_relay(RecordingHandler())
+    stats = {}
+
+    results = send_many(make_messages(12, [("Anexo_5.4.docx", b"PK-fake")]), pool_size=3, stats=stats)
+
+    assert [r[0] for r in results] == [f"alumno{i}@tese.edu.mx" for i in range(12)]
+    assert all(success for _, success, _ in results)
+    assert len(handler.messages) == 12
+    # 12 mensajes sobre como máximo 3 sesiones
+    assert stats["connections"] <= 3
+    assert handler.sessions <= 3
+    attachment = [p for p in handler.messages[0].walk() if p.get_filename()][0]
+    assert attachment.get_filename() == "Anexo_5.4.docx"
+    assert attachment.get_payload(decode=True) == b"PK-fake"
+
+
+def test_send_many_reconnects_after_transient_failure(smtp_relay):
+    handler = smtp_relay(RecordingHandler(fail_once_for={"alumno2@tese.edu.mx"}))
+    stats = {}
+
+    results = send_many(make_messages(5), pool_size=1, stats=stats)
+
+    assert all(success for _, success, _ in results)
+    assert len(handler.messages) == 5
+    assert stats["connections"] == 2
+
+
+def test_send_many_does_not_retry_permanent_rejections(smtp_relay):
+    handler = smtp_relay(RecordingHandler(refuse={"alumno1@tese.edu.mx"}))
+    stats = {}
+
+    results = send_many(make_messages(3), pool_size=1, stats=stats)
+
+    assert [success for _, success, _ in results] == [True, False, True]
+    assert "550" in results[1][2]
+    assert handler.rcpt_attempts["alumno1@tese.edu.mx"] == 1
+    # La sesión sigue sirviendo para los demás: sin reconexión
+    assert len(handler.messages) == 2 and stats["connections"] == 1
+
+
+def test_transient_classification():
+    from smtplib import SMTPRecipientsRefused, SMTPAuthenticationError, SMTPDataError, SMTPServerDisconnected
+    from src.utils.mail_dispatcher import _is_transient
+
+    assert not _is_transient(SMTPRecipientsRefused({"a@x.mx": (550, b"no")}))
+    assert _is_transient(SMTPRecipientsRefused({"a@x.mx": (450, b"busy")}))
+    assert not _is_transient(SMTPAuthenticationError(535, b"bad"))
+    assert not _is_transient(SMTPDataError(554, b"rejected"))
+    assert _is_transient(SMTPDataError(421, b"closing"))
+    assert _is_transient(SMTPServerDisconnected("gone"))
+    assert _is_transient(ConnectionResetError())
+
+
+def test_send_many_reports_per_recipient_errors(smtp_relay):
+    smtp_relay(RecordingHandler())
+    messages = make_messages(2)
+    messages[1]["template_name"] = "no_existe.html"
+
+    results = send_many(messages, pool_size=2)
+
+    assert results[0][1] is True
+    assert results[1][1] is False and "no_existe.html" in results[1][2]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
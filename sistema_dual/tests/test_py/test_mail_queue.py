@@ -0,0 +1,197 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils import mail_queue
+from src.utils import mail_dispatcher
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    path = str(tmp_path / "outbox.sqlite3")
+    monkeypatch.setattr(mail_queue, "MAIL_OUTBOX_PATH", path)
+    return path
+
+
+@pytest.fixture
+def fake_send_many(monkeypatch):
+    """Sustituye el envío SMTP: registra los mensajes y falla para los destinatarios indicados."""
+    calls = {"messages": [], "fail_for": set()}
+
+    def send_many(messages, pool_size=None, stats=None):
+        calls["messages"].extend(messages)
+        return [(m["to"], m["to"] not in calls["fail_for"], "421 temporal" if m["to"] in calls["fail_for"] else "ok")
+                for m in messages]
+
+    monkeypatch.setattr(mail_dispatcher, "send_many", send_many)
+    return calls
+
+
+def enqueue_anexo(to="alumno@tese.edu.mx", message="<p>Hola</p>", payload=b"PK-1"):
+    return mail_queue.enqueue_email(
+        to, "Anexo 5.4", "base_notification.html", {"title": "Anexo", "message": message},
+        [("Anexo_5.4.docx", payload)], document_key="anexo_5.4:10"
+    )
+
+
+def test_double_enqueue_keeps_single_pending_message(outbox):
+    assert enqueue_anexo()[0]
+    ok, msg = enqueue_anexo(message="<p>Versión nueva</p>", payload=b"PK-2")
+
+    assert ok and "ya estaba en cola" in msg
+    rows = mail_queue.list_messages()
+    assert len(rows) == 1
+    assert mail_queue.queue_stats()["pending"] == 1
+
+
+def test_pending_message_keeps_latest_content(outbox, fake_send_many):
+    enqueue_anexo()
+    enqueue_anexo(message="<p>Versión nueva</p>", payload=b"PK-2")
+
+    mail_queue.process_due()
+
+    (sent,) = fake_send_many["messages"]
+    assert sent["context"]["message"] == "<p>Versión nueva</p>"
+    assert sent["attachments"] == [("Anexo_5.4.docx", b"PK-2")]
+
+
+def test_identical_message_is_not_resent_after_delivery(outbox, fake_send_many):
+    enqueue_anexo()
+    mail_queue.process_due()
+
+    ok, msg = enqueue_anexo()
+    assert ok and "enviado recientemente" in msg
+    # Un contenido distinto (p. ej. una contraseña nueva) sí se vuelve a encolar
+    assert "en cola de envío" in enqueue_anexo(message="<p>Otra</p>")[1]
+    stats = mail_queue.queue_stats()
+    assert (stats["pending"], stats["sent"]) == (1, 1)
+
+
+def test_changed_attachment_is_resent_within_dedupe_window(outbox, fake_send_many):
+    enqueue_anexo()
+    mail_queue.process_due()
+
+    # Mismo asunto y contexto, documento re-generado: "Reenviar Documento Oficial"
+    ok, msg = enqueue_anexo(payload=b"PK-corregido")
+    assert ok and "en cola de envío" in msg
+    mail_queue.process_due()
+
+    assert [m["attachments"] for m in fake_send_many["messages"]] == \
+        [[("Anexo_5.4.docx", b"PK-1")], [("Anexo_5.4.docx", b"PK-corregido")]]
+
+
+def test_different_documents_are_independent(outbox):
+    enqueue_anexo()
+    mail_queue.enqueue_email("alumno@tese.edu.mx", "Anexo 5.1", "asignacion_mentor_ie.html", {},
+                             document_key="anexo_5.1:10")
+    mail_queue.enqueue_email("otro@tese.edu.mx", "Anexo 5.4", "base_notification.html", {},
+                             document_key="anexo_5.4:10")
+
+    assert mail_queue.queue_stats()["pending"] == 3
+
+
+def test_sent_message_drops_context_and_attachments(outbox, fake_send_many):
+    enqueue_anexo()
+    mail_queue.process_due()
+
+    with mail_queue.connect() as conn:
+        row = conn.execute("SELECT status, context_json, sent_at FROM outbox").fetchone()
+        n_files = conn.execute("SELECT COUNT(*) FROM outbox_attachments").fetchone()[0]
+    assert row["status"] == "sent" and row["context_json"] is None and row["sent_at"]
+    assert n_files == 0
+
+
+def test_failures_back_off_exponentially_then_fail(outbox, fake_send_many, monkeypatch):
+    monkeypatch.setattr(mail_queue, "MAIL_OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(mail_queue, "MAIL_OUTBOX_BACKOFF_BASE", 10)
+    fake_send_many["fail_for"].add("alumno@tese.edu.mx")
+    enqueue_anexo()
+
+    delays = []
+    for _ in range(2):
+        before = time.time()
+        assert mail_queue.process_due()["retry"] == 1
+        (row,) = mail_queue.list_messages()
+        delays.append(row["next_attempt_at"] - before)
+        assert row["status"] == "pending" and row["last_error"] == "421 temporal"
+        # Aún no vence: el worker no lo vuelve a tomar
+        assert mail_queue.process_due()["claimed"] == 0
+        with mail_queue.connect() as conn:
+            conn.execute("UPDATE outbox SET next_attempt_at = 0")
+
+    assert 9 <= delays[0] <= 11 and 19 <= delays[1] <= 21
+    assert mail_queue.process_due()["failed"] == 1
+    assert mail_queue.list_messages()[0]["attempts"] == 3
+
+    fake_send_many["fail_for"].clear()
+    assert mail_queue.retry_failed() == 1
+    assert mail_queue.process_due()["sent"] == 1
+
+
+def test_stale_sending_messages_are_recovered(outbox):
+    enqueue_anexo()
+    with mail_queue.connect() as conn:
+        conn.execute("UPDATE outbox SET status = 'sending', updated_at = 0")
+
+    assert mail_queue.requeue_stale() == 1
+    assert mail_queue.queue_stats()["pending"] == 1
+
+
+def enqueue_password(password):
+    return mail_queue.enqueue_email("mentor@tese.edu.mx", "Acceso", "base_notification.html",
+                                    {"password": password}, document_key="credenciales")
+
+
+def test_new_content_enqueued_while_sending_is_sent_afterwards(outbox, fake_send_many, monkeypatch):
+    send_many = mail_dispatcher.send_many
+    replies = []
+
+    def send_and_reset(messages, pool_size=None, stats=None):
+        # Se regenera la contraseña mientras el worker envía la anterior
+        if not replies:
+            replies.append(enqueue_password("NEW"))
+        return send_many(messages, pool_size, stats)
+
+    monkeypatch.setattr(mail_dispatcher, "send_many", send_and_reset)
+    enqueue_password("OLD")
+
+    assert mail_queue.process_due() == {"claimed": 1, "sent": 1, "retry": 0, "failed": 0}
+    assert replies[0][0] and "contenido actualizado" in replies[0][1]
+    assert mail_queue.queue_stats()["pending"] == 1
+    mail_queue.process_due()
+
+    assert [m["context"]["password"] for m in fake_send_many["messages"]] == ["OLD", "NEW"]
+    assert mail_queue.queue_stats()["sent"] == 1
+
+
+def test_new_content_survives_stale_sending_row(outbox, fake_send_many):
+    enqueue_password("OLD")
+    with mail_queue.connect() as conn:
+        conn.execute("UPDATE outbox SET status = 'sending', updated_at = 0")
+
+    ok, _ = enqueue_password("NEW")
+    assert ok
+    assert mail_queue.requeue_stale(older_than=-1) == 1
+    mail_queue.process_due()
+
+    assert [m["context"]["password"] for m in fake_send_many["messages"]] == ["NEW"]
+
+
+def test_path_attachments_are_stored_at_enqueue(outbox, fake_send_many, tmp_path):
+    ics = tmp_path / "evento_dual.ics"
+    ics.write_bytes(b"BEGIN:VCALENDAR")
+    mail_queue.enqueue_email("mentor@empresa.mx", "Evaluación", "base_notification.html", {}, [str(ics)])
+    ics.unlink()
+
+    mail_queue.run_worker(once=True)
+
+    assert fake_send_many["messages"][0]["attachments"] == [("evento_dual.ics", b"BEGIN:VCALENDAR")]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
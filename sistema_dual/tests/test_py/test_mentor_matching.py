@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import random
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.assignment as assignment
+from src.utils.mentor_matching import plan_affinity_assignment
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+def make_client(mentors, students, current=None):
+    """
+    mentors: {id: (carrera, [asignaturas])}; students: {alumno: (carrera, [asignaturas])}.
+    current: {mentor: proyectos ya asignados en el periodo}.
+    """
+    current = current or {}
+    careers = sorted({c for c, _ in list(mentors.values()) + list(students.values())})
+    career_id = {c: f"car-{i}" for i, c in enumerate(careers)}
+    projects = [{"id": f"old-{m}-{k}", "periodo_id": "p1", "mentor_ie_id": m, "alumno_id": "x"}
+                for m, n in current.items() for k in range(n)]
+    projects += [{"id": f"proj-{a}", "periodo_id": "p1", "mentor_ie_id": None, "alumno_id": a}
+                 for a in students]
+    db = FakeDatabase({
+        "alumnos": [{"id": a, "carrera": " " + c.upper()} for a, (c, _) in students.items()],
+        "maestros": [{"id": m, "nombre_completo": m, "es_mentor_ie": True, "carrera_id": career_id[c]}
+                     for m, (c, _) in mentors.items()],
+        "carreras": [{"id": i, "nombre": c} for c, i in career_id.items()],
+        "rel_maestros_asignaturas": [{"maestro_id": m, "asignatura_id": s}
+                                     for m, (_, subj) in mentors.items() for s in subj],
+        "inscripciones_asignaturas": [{"id": f"{a}-{s}", "alumno_id": a, "asignatura_id": s, "periodo_id": "p1"}
+                                      for a, (_, subj) in students.items() for s in subj],
+        "proyectos_dual": projects,
+    }, latency_ms=0)
+    return FakeSupabaseClient(db)
+
+
+def test_prefers_career_and_subject_affinity(monkeypatch):
+    monkeypatch.setattr(assignment, "get_active_period_id", lambda: "p1")
+    mentors = {"sis-bd": ("Sistemas", ["bd"]), "sis-redes": ("Sistemas", ["redes"]), "ind": ("Industrial", ["bd"])}
+    students = {"a1": ("Sistemas", ["bd"]), "a2": ("Sistemas", ["redes"]), "a3": ("Industrial", ["calidad"])}
+
+    ok, plan = plan_affinity_assignment(capacity=5, supabase=make_client(mentors, students))
+
+    assert ok
+    assert plan["assignments"] == {"proj-a1": "sis-bd", "proj-a2": "sis-redes", "proj-a3": "ind"}
+    assert plan["stats"] == {"misma_carrera": 3, "asignaturas_en_comun": 2, "sin_asignar": 0}
+
+
+def test_capacity_counts_current_load_and_reports_overflow(monkeypatch):
+    monkeypatch.setattr(assignment, "get_active_period_id", lambda: "p1")
+    mentors = {"m1": ("Sistemas", ["bd"]), "m2": ("Industrial", [])}
+    students = {f"a{i}": ("Sistemas", ["bd"]) for i in range(6)}
+
+    ok, plan = plan_affinity_assignment(capacity=3, supabase=make_client(mentors, students, current={"m1": 1}))
+
+    assert ok
+    # m1 solo tiene 2 lugares; el resto se va a otra carrera y lo que no cabe queda pendiente
+    assert plan["after"] == {"m1": 3, "m2": 3}
+    assert len(plan["unassigned"]) == 1 and plan["stats"]["sin_asignar"] == 1
+    assert plan["stats"]["misma_carrera"] == 2
+
+
+def test_scales_to_thousands_of_projects(monkeypatch):
+    monkeypatch.setattr(assignment, "get_active_period_id", lambda: "p1")
+    rng = random.Random(7)
+    subjects = {c: [f"{c}-{k}" for k in range(20)] for c in ("Sistemas", "Industrial", "Mecánica", "Mecatrónica")}
+    careers = list(subjects)
+    mentors = {f"m{i}": (careers[i % 4], rng.sample(subjects[careers[i % 4]], 3)) for i in range(200)}
+    students = {f"a{i}": (careers[i % 4], rng.sample(subjects[careers[i % 4]], 5)) for i in range(3000)}
+    client = make_client(mentors, students)
+
+    start = time.perf_counter()
+    ok, plan = plan_affinity_assignment(capacity=20, supabase=client)
+    elapsed = time.perf_counter() - start
+
+    assert ok and len(plan["assignments"]) == 3000 and not plan["unassigned"]
+    assert max(plan["after"].values()) <= 20
+    assert plan["stats"]["misma_carrera"] == 3000
+    assert elapsed < 10
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
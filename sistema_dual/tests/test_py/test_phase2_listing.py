@@ -0,0 +1,49 @@
+import os
+import sys
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils.db_actions import get_phase2_projects, PHASE2_PROJECT_COLUMNS
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+def make_client(n=400):
+    alumnos = [{"id": f"a{i}", "nombre": f"Alumno{i}", "ap_paterno": "Pérez", "email_institucional": f"a{i}@uni.mx",
+                "email_personal": None} for i in range(n)]
+    projects = [{"id": f"p{i:05d}", "alumno_id": f"a{i}", "periodo_id": "per-1",
+                 "mentor_ie_id": "m1" if i % 4 else None} for i in range(n)]
+    # Otro periodo: no debe aparecer en la Fase 2
+    projects.append({"id": "old", "alumno_id": "a0", "periodo_id": "per-0", "mentor_ie_id": "m1"})
+    db = FakeDatabase({
+        "alumnos": alumnos,
+        "maestros": [{"id": "m1", "nombre_completo": "Mentor", "email_institucional": "m@uni.mx"}],
+        "proyectos_dual": projects,
+    }, latency_ms=0, log_requests=True)
+    return FakeSupabaseClient(db)
+
+
+def test_phase2_listing_is_one_query_with_embedded_student():
+    client = make_client(400)
+
+    projects = get_phase2_projects("per-1", supabase=client)
+
+    assert len(projects) == 300
+    assert projects[0]["alumnos"]["nombre"] == "Alumno1"
+    # Una sola petición a proyectos_dual y ninguna a alumnos, sin importar el número de proyectos
+    assert client.db.calls() == [("proyectos_dual", "select")]
+    assert "alumnos(nombre, ap_paterno, email_institucional, email_personal)" in PHASE2_PROJECT_COLUMNS
+
+
+def test_phase2_listing_pages_large_periods():
+    client = make_client(2000)
+
+    projects = get_phase2_projects("per-1", supabase=client)
+
+    assert len(projects) == 1500 and len({p["id"] for p in projects}) == 1500
+    assert client.db.calls() == [("proyectos_dual", "select")] * 2
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+import threading
+
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.query_batch as query_batch
+import src.utils.query_metrics as qm
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+from src.utils.query_batch import run_queries
+
+
+@pytest.fixture
+def client():
+    db = FakeDatabase(latency_ms=0)
+    db.load("alumnos", [{"id": f"a{i}", "matricula": str(2024000 + i), "estatus": "Activo"} for i in range(5)])
+    db.load("maestros", [{"id": "m1", "nombre_completo": "Docente", "es_mentor_ie": True}])
+    return FakeSupabaseClient(db)
+
+
+def test_independent_queries_overlap_and_return_by_name(client):
+    client.db.latency_ms = 100
+    queries = {
+        "alumno": client.table("alumnos").select("*").eq("id", "a1"),
+        "activos": client.table("alumnos").select("id").eq("estatus", "Activo"),
+        "maestros": client.table("maestros").select("*"),
+        "catalogo": lambda: client.table("maestros").select("id").execute().data,
+    }
+    start = time.perf_counter()
+    res = run_queries(queries)
+    elapsed = time.perf_counter() - start
+
+    assert list(res) == ["alumno", "activos", "maestros", "catalogo"]
+    assert res["alumno"].data[0]["matricula"] == "2024001"
+    assert len(res["activos"].data) == 5 and res["catalogo"] == [{"id": "m1"}]
+    # Cuatro viajes de 100 ms en paralelo: lo que tarda uno, no la suma
+    assert client.db.requests == 4
+    assert elapsed < 0.3
+
+
+def test_errors_wait_for_all_and_keep_declared_order(client):
+    done = []
+
+    def boom(name):
+        def run():
+            time.sleep(0.05 if name == "primero" else 0)
+            done.append(name)
+            raise ValueError(name)
+        return run
+
+    queries = {"ok": lambda: done.append("ok") or 1, "primero": boom("primero"), "segundo": boom("segundo")}
+    with pytest.raises(ValueError, match="primero"):
+        run_queries(queries)
+    assert sorted(done) == ["ok", "primero", "segundo"]
+
+    res = run_queries({"alumno": client.table("alumnos").select("*").eq("id", "zz").single(),
+                       "maestros": client.table("maestros").select("id")}, return_exceptions=True)
+    assert isinstance(res["alumno"], Exception)
+    assert res["maestros"].data == [{"id": "m1"}]
+
+
+def test_workers_keep_rerun_metrics_and_nested_batches_run_inline(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(qm, "SLOW_QUERY_LOG", str(tmp_path / "slow.jsonl"))
+    # Pool de un solo hilo: un lote anidado que usara el pool se quedaría esperando
+    monkeypatch.setattr(query_batch, "QUERY_BATCH_WORKERS", 1)
+    monkeypatch.setattr(query_batch, "_executor", None)
+    instrumented = qm.instrument_client(client)
+    threads = set()
+
+    def nested():
+        threads.add(threading.current_thread().name)
+        inner = run_queries({"a": instrumented.table("alumnos").select("id").eq("id", "a2"),
+                             "b": instrumented.table("alumnos").select("id").eq("id", "a3")})
+        return [r.data[0]["id"] for r in inner.values()]
+
+    collector = qm.start_rerun("alumnos")
+    res = run_queries({"alumno": instrumented.table("alumnos").select("*").eq("id", "a1"),
+                       "maestros": instrumented.table("maestros").select("*"),
+                       "anidado": nested})
+    query_batch._executor.shutdown()
+
+    assert res["anidado"] == ["a2", "a3"]
+    assert threads and all(name.startswith("query_batch") for name in threads)
+    # Las consultas de los hilos del pool quedan en el colector del rerun que las lanzó
+    assert sorted(c["filters"] for c in collector.calls if c["table"] == "alumnos") == \
+        ["eq(id, a1)", "eq(id, a2)", "eq(id, a3)"]
+    assert len(collector.calls) == 4 and {c["view"] for c in collector.calls} == {"alumnos"}
+    assert qm.current_collector() is collector
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
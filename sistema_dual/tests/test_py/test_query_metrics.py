@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import threading
+
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.query_metrics as qm
+from src.utils.db_actions import fetch_all_rows
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(qm, "SLOW_QUERY_LOG", str(tmp_path / "slow.jsonl"))
+    qm.reset_view_stats()
+    rows = [{"id": i, "periodo_id": "p1", "mentor_ie_id": None if i % 2 else "m1"} for i in range(2500)]
+    db = FakeDatabase({"proyectos_dual": rows, "alumnos": [{"id": 1}]}, latency_ms=0)
+    return qm.instrument_client(FakeSupabaseClient(db))
+
+
+def test_execute_records_table_filters_rows_and_bytes(client):
+    collector = qm.start_rerun("alumnos")
+    res = client.table("proyectos_dual").select("id").eq("periodo_id", "p1").not_.is_("mentor_ie_id", "null") \
+        .in_("id", list(range(10))).order("id").execute()
+
+    assert len(res.data) == 5
+    call = collector.calls[0]
+    assert call["table"] == "proyectos_dual" and call["method"] == "select"
+    assert call["filters"] == "eq(periodo_id, p1) not is_(mentor_ie_id, null) in_(id, [0, 1, 2, …] (10))"
+    assert call["rows"] == 5 and call["bytes"] == len(json.dumps(res.data, separators=(",", ":")))
+    assert call["view"] == "alumnos" and call["ms"] >= 0
+
+
+def test_per_rerun_and_per_view_aggregation(client):
+    for _ in range(2):
+        collector = qm.start_rerun("login")
+        qm.set_view("alumnos")
+        # Paginación de 1000 en 1000: 3 consultas para 2500 filas
+        fetch_all_rows(lambda: client.table("proyectos_dual").select("*").order("id"))
+        for i in range(4):
+            client.table("alumnos").select("*").eq("id", i).execute()
+        qm.finish_rerun(collector)
+
+    summary = collector.summary(top=2)
+    assert summary["calls"] == 7 and summary["rows"] == 2501
+    assert summary["by_table"][0] == dict(summary["by_table"][0], table="alumnos", calls=4)
+    assert len(summary["slowest"]) == 2
+    stats = {v["view"]: v for v in qm.view_stats()}
+    assert stats["alumnos"]["reruns"] == 2 and stats["alumnos"]["avg_calls"] == 7
+    assert "login" not in stats
+
+
+def test_slow_queries_are_logged(client, monkeypatch, tmp_path):
+    qm.start_rerun("fases")
+    monkeypatch.setattr(qm, "SLOW_QUERY_MS", 0)
+    client.table("alumnos").select("id").eq("id", 1).execute()
+    monkeypatch.setattr(qm, "SLOW_QUERY_MS", 10 ** 6)
+    client.table("alumnos").select("id").execute()
+
+    lines = (tmp_path / "slow.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry["table"] == "alumnos" and entry["view"] == "fases" and entry["filters"] == "eq(id, 1)"
+
+
+def test_collectors_are_isolated_per_thread(client):
+    main_collector = qm.start_rerun("main")
+    counts = {}
+
+    def session(name, n):
+        collector = qm.start_rerun(name)
+        for _ in range(n):
+            client.table("alumnos").select("id").execute()
+        counts[name] = len(collector.calls)
+
+    threads = [threading.Thread(target=session, args=(f"s{i}", i + 1)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counts == {"s0": 1, "s1": 2, "s2": 3}
+    assert main_collector.calls == [] and qm.current_collector() is main_collector
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,26 @@
+import os
+import sys
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'bench')))
+
+from bench_startup_imports import measure_imports, summarize, STARTUP_IMPORT_BUDGET_MS
+
+
+def test_login_path_skips_document_stack_and_fits_budget():
+    summary = summarize(measure_imports())
+
+    assert summary["forbidden_loaded"] == []
+    assert summary["total_ms"] <= STARTUP_IMPORT_BUDGET_MS, summary["top"]
+
+
+def test_dashboard_shell_loads_sections_lazily():
+    summary = summarize(measure_imports(["src.views.dashboard"]))
+
+    assert summary["forbidden_loaded"] == []
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,87 @@
+import os
+import sys
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.utils.db_actions import get_students_page, count_students
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+
+
+def make_client(n=1000):
+    estatus = ["Activo", "Registrado", "En Espera de Reinscripción", "Egresado"]
+    alumnos = [{
+        "id": f"id-{i:05d}",
+        "matricula": f"20{i:06d}",
+        "nombre": "Ana" if i % 10 == 0 else "Luis",
+        "ap_paterno": f"Apellido{i % 97:02d}",
+        "ap_materno": "Materno",
+        "curp": "X" * 18,
+        "estatus": estatus[i % 4],
+    } for i in range(n)]
+    return FakeSupabaseClient(FakeDatabase({"alumnos": alumnos}, latency_ms=0, log_requests=True))
+
+
+def test_page_is_bounded_and_counted_on_server():
+    client = make_client(1000)
+
+    rows, total = get_students_page(["Activo", "Registrado"], page=3, page_size=25, supabase=client)
+
+    assert total == 500
+    assert len(rows) == 25
+    # Solo las columnas del listado, nunca el registro completo
+    assert set(rows[0]) == {"id", "matricula", "nombre", "ap_paterno", "ap_materno", "estatus"}
+    (query,) = client.db.log
+    assert query.window == (50, 74)
+    assert query.count == "exact"
+
+
+def test_pages_cover_category_without_overlap():
+    client = make_client(230)
+    seen = []
+    for page in range(1, 4):
+        rows, total = get_students_page(None, page=page, page_size=100, supabase=client)
+        seen.extend(r["id"] for r in rows)
+
+    assert total == 230
+    assert len(seen) == len(set(seen)) == 230
+
+
+def test_search_uses_ilike_on_matricula_nombre_and_apellido():
+    client = make_client(1000)
+
+    rows, total = get_students_page(None, search="ana", page_size=200, supabase=client)
+    assert total == 100 and all(r["nombre"] == "Ana" for r in rows)
+
+    rows, total = get_students_page(None, search="apellido05", supabase=client)
+    assert total == len([i for i in range(1000) if i % 97 == 5])
+
+    rows, total = get_students_page(None, search="20000123", supabase=client)
+    assert [r["id"] for r in rows] == ["id-00123"]
+
+    (or_filter,) = client.db.log[0].or_expressions
+    assert or_filter == "matricula.ilike.*ana*,nombre.ilike.*ana*,ap_paterno.ilike.*ana*"
+
+
+def test_search_strips_filter_syntax_characters():
+    client = make_client(10)
+
+    get_students_page(None, search="ana,nombre.eq.(x)*", supabase=client)
+    get_students_page(None, search=" ,() ", supabase=client)
+
+    (or_filter,) = client.db.log[0].or_expressions
+    assert or_filter.count(",") == 2 and "(" not in or_filter
+    assert client.db.log[1].or_expressions == []
+
+
+def test_count_students_uses_head_request():
+    client = make_client(1000)
+
+    assert count_students(["En Espera de Reinscripción"], supabase=client) == 250
+    assert count_students(None, supabase=client) == 1000
+    assert all(query.head is True for query in client.db.log)
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
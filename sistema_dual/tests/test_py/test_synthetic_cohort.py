@@ -0,0 +1,108 @@
+import os
+import sys
+import sqlite3
+
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.db_connection as db_connection
+import src.utils.fake_backend as fake_backend
+import src.utils.anexo_data as anexo_data
+import src.utils.batch_docs as batch_docs
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient, FOREIGN_KEYS
+from src.utils.synthetic_cohort import generate_cohort, load_cohort, cohort_counts
+from src.utils.db_actions import close_period
+from src.utils.phase3_sync import get_phase3_inbox, sync_phase3_inbox
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Cohorte de 1200 alumnos (más de una página de PostgREST) en el backend en memoria."""
+    db = FakeDatabase(latency_ms=0)
+    client = FakeSupabaseClient(db)
+    data = generate_cohort(1200, seed=7)
+    load_cohort(data, client)
+    monkeypatch.setattr(db_connection, "SUPABASE_BACKEND", "fake")
+    monkeypatch.setattr(fake_backend, "_fake_db", db)
+    db_connection.get_supabase_client.clear()
+    yield client, data
+    db_connection.get_supabase_client.clear()
+
+
+def test_cohort_is_deterministic_and_referentially_sound():
+    data = generate_cohort(200, seed=3)
+    assert data == generate_cohort(200, seed=3)
+    assert data["alumnos"] != generate_cohort(200, seed=4)["alumnos"]
+
+    counts = cohort_counts(data)
+    assert counts["alumnos"] == 200 and counts["proyectos_dual"] >= 200
+    assert counts["inscripciones_asignaturas"] >= 4 * 200
+
+    ids = {name: {r["id"] for r in rows if "id" in r} for name, rows in data.items()}
+    for table, fks in FOREIGN_KEYS.items():
+        for row in data.get(table, []):
+            for column, target in fks.items():
+                if row.get(column) is not None:
+                    assert row[column] in ids[target], (table, column)
+
+    active = [p for p in data["periodos"] if p["activo"]]
+    assert len(active) == 1
+    mentors_ie = {m["id"] for m in data["maestros"] if m["es_mentor_ie"]}
+    students = {a["id"]: a for a in data["alumnos"]}
+    teachers = {m["id"]: m for m in data["maestros"]}
+    for p in data["proyectos_dual"]:
+        if p["mentor_ie_id"]:
+            assert p["mentor_ie_id"] in mentors_ie
+            assert teachers[p["mentor_ie_id"]]["carrera_id"] == students[p["alumno_id"]]["carrera_id"]
+        # Solo los proyectos con Mentor IE llegan a tener calificación de la UE
+        assert p["calificacion_ue"] is None or p["mentor_ie_id"]
+
+
+def test_close_period_pages_and_chunks_updates(backend, monkeypatch):
+    client, data = backend
+    monkeypatch.setattr(anexo_data, "IN_FILTER_CHUNK", 100)
+    db = client.db
+    period = next(p for p in data["periodos"] if p["activo"])
+    current = [p for p in data["proyectos_dual"] if p["periodo_id"] == period["id"]]
+    expected_grad = sum(1 for p in current if p["fecha_fin_convenio"] <= period["fecha_fin"])
+
+    before = db.requests
+    ok, (to_grad, to_keep) = close_period(period, client)
+
+    assert ok
+    assert (to_grad, to_keep) == (expected_grad, 1200 - expected_grad)
+    # Periodo y contraseñas + 2 páginas de proyectos + bloques de 100 ids por estatus
+    assert db.requests - before == 2 + 2 + -(-to_grad // 100) + -(-to_keep // 100)
+    statuses = [a["estatus"] for a in db.tables["alumnos"].rows.values()]
+    assert statuses.count("En Espera de Egreso") == to_grad
+    assert statuses.count("En Espera de Reinscripción") == to_keep
+    assert db.tables["periodos"].rows[period["id"]]["activo"] is False
+    assert all(m["password_hash"] is None for m in db.tables["mentores_ue"].rows.values())
+
+
+def test_phase3_sync_queues_documents_and_marks_projects(backend, monkeypatch, tmp_path):
+    client, _ = backend
+    monkeypatch.setattr(batch_docs, "_render_job", lambda job: (True, f"5.4|{job['context']['nombre_proyecto']}".encode()))
+    inbox = get_phase3_inbox(client)
+    assert inbox and all(p["calificacion_ue"] is not None for p in inbox)
+
+    outbox = str(tmp_path / "outbox.sqlite3")
+    projects = inbox[:30]
+    progress = []
+    summary = sync_phase3_inbox(projects, max_workers=1, outbox_path=outbox, supabase=client,
+                                progress_callback=lambda done, total, _r: progress.append((done, total)))
+
+    assert summary["documents"] == 30 and not summary["render_errors"] and not summary["failed"]
+    assert sorted(summary["queued_projects"]) == sorted(p["id"] for p in projects)
+    assert progress[-1] == (30, 30)
+    with sqlite3.connect(outbox) as conn:
+        rows = conn.execute("SELECT recipient, document_key FROM outbox").fetchall()
+    # Mentor UE y alumno por proyecto
+    assert len(rows) == summary["queued"] == 60
+    assert {key for _, key in rows} == {f"anexo_5.4:{p['id']}" for p in projects}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,111 @@
+import io
+import os
+import sys
+
+import pandas as pd
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.fake_backend as fake_backend
+from src.utils.fake_backend import FakeDatabase, FakeSupabaseClient
+from src.utils.whitelist_import import import_whitelist, normalize_whitelist_frame
+
+
+def make_client(existing=()):
+    db = FakeDatabase({"lista_blanca": [{"matricula": m} for m in existing]}, latency_ms=0, log_requests=True)
+    return FakeSupabaseClient(db)
+
+
+def whitelist(client):
+    """{matrícula: fila} sin las columnas que agrega la base (id, created_at)."""
+    return {r["matricula"]: {k: v for k, v in r.items() if k not in ("id", "created_at")}
+            for r in client.db.tables["lista_blanca"].rows.values()}
+
+
+def read_csv(text):
+    return pd.read_csv(io.StringIO(text), dtype=str, keep_default_na=False)
+
+
+CSV = """matricula , Nombre Completo,curp
+ 202120001 , ana  lópez ,gohm010203hmcrrna1
+202120002,Luis Pérez,
+202120001,Ana Repetida,
+,Sin Matrícula,
+20-2,Formato Malo,
+202120005,,
+202120006,Curp Mala,ABC
+202120007,Ya Registrado,
+"""
+
+
+def test_normalization_is_vectorized_and_reports_reasons():
+    valid, invalid = normalize_whitelist_frame(read_csv(CSV))
+
+    assert valid.loc[0, "matricula"] == "202120001"
+    assert valid.loc[0, "curp"] == "GOHM010203HMCRRNA1"
+    assert valid.loc[0, "nombre_completo"] == "ana lópez"
+    assert dict(zip(invalid["fila"], invalid["motivo"])) == {
+        5: "Matrícula vacía",
+        6: "Formato de matrícula inválido",
+        7: "Nombre completo vacío",
+        8: "CURP inválida",
+    }
+
+
+def test_import_report_with_row_numbers():
+    client = make_client(existing={"202120007"})
+
+    report = import_whitelist(read_csv(CSV), carrera_id="car-1", supabase=client)
+
+    assert [(r["fila"], r["matricula"]) for r in report["inserted"]] == [(2, "202120001"), (3, "202120002")]
+    assert [(r["fila"], r["motivo"]) for r in report["skipped"]] == [
+        (4, "Matrícula duplicada en el archivo (fila 2)"),
+        (9, "Ya existe en la lista blanca"),
+    ]
+    assert [r["fila"] for r in report["invalid"]] == [5, 6, 7, 8]
+    rows = whitelist(client)
+    assert rows["202120001"] == {
+        "matricula": "202120001", "curp": "GOHM010203HMCRRNA1", "nombre_completo": "ana lópez",
+        "registrado": False, "carrera_id": "car-1",
+    }
+    assert rows["202120002"]["curp"] is None
+
+
+def test_large_file_uses_chunked_requests():
+    rows = "\n".join(f"2021{i:05d},Alumno {i}," for i in range(2000))
+    client = make_client(existing={f"2021{i:05d}" for i in range(0, 2000, 4)})
+    progress = []
+
+    report = import_whitelist(read_csv("MATRICULA,NOMBRE COMPLETO,CURP\n" + rows), supabase=client,
+                              chunk_size=500, progress_callback=lambda done, total: progress.append((done, total)))
+
+    assert len(report["inserted"]) == 1500 and len(report["skipped"]) == 500
+    # 4 consultas de existentes + 3 upserts, en lugar de 4,000 peticiones
+    assert [op for _, op in client.db.calls()] == ["select"] * 4 + ["upsert"] * 3
+    # Las existentes se omiten en el servidor por matrícula
+    assert all(q.on_conflict == "matricula" and q.ignore_duplicates for q in client.db.log if q.op == "upsert")
+    assert progress[-1] == (8, 8)
+
+
+def test_rows_inserted_concurrently_are_skipped(monkeypatch):
+    client = make_client()
+    original_execute = fake_backend.FakeQuery.execute
+
+    def racing_execute(self):
+        result = original_execute(self)
+        if self.op == "select":
+            # Otra carga inserta la matrícula entre la consulta y el upsert
+            self.db.load("lista_blanca", [{"matricula": "202120002"}])
+        return result
+
+    monkeypatch.setattr(fake_backend.FakeQuery, "execute", racing_execute)
+    report = import_whitelist(read_csv("MATRICULA,NOMBRE COMPLETO\n202120001,A\n202120002,B\n"), supabase=client)
+
+    assert [r["matricula"] for r in report["inserted"]] == ["202120001"]
+    assert report["skipped"][0]["motivo"] == "Ya existe en la lista blanca (alta concurrente)"
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
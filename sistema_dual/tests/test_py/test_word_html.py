@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Add project root path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import src.utils.pdf_generator_html as pgh
+
+WORD_HTML = """<html><head><style>p.MsoNormal {margin:0}</style></head><body>
+<p class=MsoNormal>Alumno: {{<span lang=ES>nombre_</span><span>alumno</span>&nbsp;}}</p>
+<table>
+<tr><td>Competencia</td><td>Asignatura</td></tr>
+<tr style='height:12pt'><td><span>{{ competencia }}</span></td><td>{{
+asignatura }}</td></tr>
+</table>
+<table>
+<tr><td>{{ actividad }}</td><td>{{ horas }}</td><td>{{ total }}</td></tr>
+</table>
+<p>{# no es un comentario #} {% if aprobado %}Aprobado{% endif %}</p>
+</body></html>"""
+
+CONTEXT = {
+    "nombre_alumno": "Ana López",
+    "competencias_list": [{"competencia": "C1", "asignatura": "Redes"}, {"competencia": "C2", "asignatura": "BD"}],
+    "actividades_list": [{"actividad": "Diseño", "horas": 10}],
+    "total": 10,
+    "aprobado": True,
+}
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pgh, "WORD_HTML_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(pgh, "_env", None)
+    return tmp_path
+
+
+def test_compile_cleans_split_tags_and_wraps_loop_rows():
+    compiled = pgh.compile_word_html(WORD_HTML, "<style>@page {}</style>")
+
+    assert "MsoNormal {margin" not in compiled
+    assert "{{ nombre_alumno }}" in compiled
+    assert "{% for c in competencias_list %}<tr style='height:12pt'>" in compiled
+    assert "{{ c.competencia }}" in compiled and "{{ c.asignatura }}" in compiled
+    # La fila de encabezados no se repite
+    assert compiled.count("{% for c in") == 1
+    # Solo se prefijan las variables del mapa; total sigue siendo del contexto
+    assert "{{ a.actividad }}" in compiled and "{{ a.horas }}" in compiled and "{{ total }}" in compiled
+    assert compiled.index("<style>@page {}</style>") < compiled.index("</head>")
+
+    rendered = pgh.get_word_html_template(WORD_HTML).render(CONTEXT)
+    assert "Alumno: Ana López" in rendered
+    assert rendered.index("C1") < rendered.index("Redes") < rendered.index("C2") < rendered.index("BD")
+    assert "{# no es un comentario #}" in rendered and "Aprobado" in rendered
+
+
+def test_invalid_variable_is_left_as_text():
+    source = WORD_HTML.replace("</body>", "<p>{{ nombre del <span>alumno</span> }}</p></body>")
+
+    rendered = pgh.get_word_html_template(source).render(CONTEXT)
+
+    assert "<p>{{ nombre del alumno }}</p>" in rendered
+    # El resto de la plantilla se sigue llenando
+    assert "Alumno: Ana López" in rendered and "Aprobado" in rendered
+
+
+def test_unbalanced_blocks_are_left_as_text():
+    source = WORD_HTML.replace("</body>", "<p>{% if <b>x</b> %}Condicional</p></body>")
+
+    rendered = pgh.get_word_html_template(source).render(CONTEXT)
+
+    assert "{% if x %}Condicional" in rendered
+    # Las {% %} del documento quedan como texto; los {{ }} y las filas repetidas no cambian
+    assert "{% if aprobado %}Aprobado{% endif %}" in rendered
+    assert "Alumno: Ana López" in rendered and rendered.count("Redes") == 1 and "BD" in rendered
+
+
+def test_generate_pdf_with_mangled_tags(tmp_path):
+    template = tmp_path / "plantilla.html"
+    template.write_text(WORD_HTML.replace("</body>", "<p>{{ nombre del alumno }}</p><p>{% if x %}</p></body>"),
+                        encoding="utf-8")
+    output = tmp_path / "salida.pdf"
+
+    ok, msg = pgh.generate_pdf_from_html("ignored", CONTEXT, str(output), template_path=str(template))
+
+    assert ok, msg
+    assert output.read_bytes().startswith(b"%PDF")
+
+
+def test_template_is_compiled_once_and_persisted(cache_dir, monkeypatch):
+    calls = []
+    original = pgh.compile_word_html
+    monkeypatch.setattr(pgh, "compile_word_html", lambda *a: calls.append(1) or original(*a))
+
+    first = pgh.get_word_html_template(WORD_HTML)
+    second = pgh.get_word_html_template(WORD_HTML)
+    assert len(calls) == 1 and first is second
+    assert len(list(cache_dir.glob("*.html"))) == 1
+
+    # Otro proceso (Environment nuevo) reutiliza el HTML compilado en disco
+    monkeypatch.setattr(pgh, "_env", None)
+    assert pgh.get_word_html_template(WORD_HTML).render(CONTEXT) == first.render(CONTEXT)
+    assert len(calls) == 1
+
+    pgh.get_word_html_template(WORD_HTML.replace("Alumno", "Estudiante"))
+    assert len(calls) == 2
+
+
+def test_compile_is_linear_with_unclosed_braces():
+    # Una llave sin cerrar en cada fila era cuadrático con el find("}}") del recorte anterior
+    row = "<tr><td>{{ competencia </td><td>texto de relleno</td></tr>\n"
+    small, big = row * 2000, row * 8000
+
+    start = time.perf_counter()
+    pgh.compile_word_html(small)
+    t_small = time.perf_counter() - start
+    start = time.perf_counter()
+    pgh.compile_word_html(big)
+    t_big = time.perf_counter() - start
+
+    assert t_big < max(t_small, 0.01) * 12
+
+
+def test_generate_pdf_from_html_renders_cached_template(tmp_path):
+    template = tmp_path / "plantilla.html"
+    template.write_text(WORD_HTML, encoding="utf-8")
+    output = tmp_path / "salida.pdf"
+
+    ok, msg = pgh.generate_pdf_from_html("ignored", CONTEXT, str(output), template_path=str(template))
+
+    assert ok, msg
+    assert output.read_bytes().startswith(b"%PDF")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))